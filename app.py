@@ -2,6 +2,10 @@
 from utils.env_check import load_and_check_env_variables  # Import the environment check function
 load_and_check_env_variables()
 
+# Times every import below when STARTUP_PROFILE=True
+from utils.startup_profile import startup_profiler
+startup_profiler.install()
+
 from flask import Flask, render_template
 from flask_wtf.csrf import CSRFProtect  # Import CSRF protection
 from extensions import socketio  # Import SocketIO
@@ -44,8 +48,10 @@ from database.chartink_db import init_db as ensure_chartink_tables_exists
 from database.traffic_db import init_logs_db as ensure_traffic_logs_exists
 from database.latency_db import init_latency_db as ensure_latency_tables_exists
 from database.strategy_db import init_db as ensure_strategy_tables_exists
+from database.db_engine import remove_sessions
 
 from utils.plugin_loader import load_broker_auth_functions
+from utils.broker_registry import load_brokers
 
 import os
 
@@ -153,6 +159,9 @@ def create_app():
     with app.app_context():
         init_latency_monitoring(app)
 
+    # Return every shared database session's connection once a request or app context ends
+    app.teardown_appcontext(remove_sessions)
+
     @app.errorhandler(404)
     def not_found_error(error):
         return render_template('404.html'), 404
@@ -176,6 +185,8 @@ def setup_environment(app):
     with app.app_context():
         #load broker plugins
         app.broker_auth_functions = load_broker_auth_functions()
+        # Resolve order/data/funds/mapping functions of the enabled brokers once
+        load_brokers()
         # Ensure all the tables exist
         ensure_auth_tables_exists()
         ensure_user_tables_exists()
@@ -194,13 +205,18 @@ def setup_environment(app):
         public_url = ngrok.connect(name='flask').public_url  # Assuming Flask runs on the default port 5000
         logger.info(f"ngrok URL: {public_url}")
 
-app = create_app()
+with startup_profiler.phase('create_app'):
+    app = create_app()
 
 # Explicitly call the setup environment function
-setup_environment(app)
+with startup_profiler.phase('setup_environment'):
+    setup_environment(app)
 
 # Integrate the WebSocket proxy server with the Flask app
-start_websocket_proxy(app)
+with startup_profiler.phase('start_websocket_proxy'):
+    start_websocket_proxy(app)
+
+startup_profiler.report()
 
 # Start Flask development server with SocketIO support if directly executed
 if __name__ == '__main__':
@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, jsonify, request, session, flash, redirect, url_for, Response
+from flask import Blueprint, render_template, jsonify, request, session, flash, redirect, url_for
 from database.analyzer_db import AnalyzerLog, db_session
 from utils.session import check_session_validity
+from utils.csv_stream import CSV_CHUNK_ROWS, csv_response
 from sqlalchemy import func, desc
 from utils.api_analyzer import get_analyzer_stats
 import json
@@ -8,8 +9,6 @@ from datetime import datetime, timedelta
 import pytz
 from utils.logging import get_logger
 import traceback
-import io
-import csv
 
 logger = get_logger(__name__)
 
@@ -75,26 +74,33 @@ def get_recent_requests():
         logger.error(f"Error getting recent requests: {str(e)}")
         return []
 
+def build_requests_query(start_date=None, end_date=None):
+    """Build the date filtered AnalyzerLog query (defaults to today's requests)"""
+    ist = pytz.timezone('Asia/Kolkata')
+    query = AnalyzerLog.query
+
+    # Apply date filters if provided
+    if start_date:
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        query = query.filter(func.date(AnalyzerLog.created_at) >= start_date)
+    if end_date:
+        if isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        query = query.filter(func.date(AnalyzerLog.created_at) <= end_date)
+
+    # If no dates provided, default to today
+    if not start_date and not end_date:
+        today_ist = datetime.now(ist).date()
+        query = query.filter(func.date(AnalyzerLog.created_at) == today_ist)
+
+    return query
+
 def get_filtered_requests(start_date=None, end_date=None):
     """Get analyzer requests with date filtering"""
     try:
         ist = pytz.timezone('Asia/Kolkata')
-        query = AnalyzerLog.query
-
-        # Apply date filters if provided
-        if start_date:
-            if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(func.date(AnalyzerLog.created_at) >= start_date)
-        if end_date:
-            if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(func.date(AnalyzerLog.created_at) <= end_date)
-        
-        # If no dates provided, default to today
-        if not start_date and not end_date:
-            today_ist = datetime.now(ist).date()
-            query = query.filter(func.date(AnalyzerLog.created_at) == today_ist)
+        query = build_requests_query(start_date, end_date)
 
         # Get results ordered by created_at
         results = query.order_by(AnalyzerLog.created_at.desc()).all()
@@ -110,38 +116,33 @@ def get_filtered_requests(start_date=None, end_date=None):
         logger.error(f"Error getting filtered requests: {str(e)}\n{traceback.format_exc()}")
         return []
 
-def generate_csv(requests):
-    """Generate CSV from analyzer requests"""
-    try:
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers
-        headers = ['Timestamp', 'API Type', 'Source', 'Symbol', 'Exchange', 'Action', 
-                  'Quantity', 'Price Type', 'Product Type', 'Status', 'Error Message']
-        writer.writerow(headers)
-        
-        # Write data
-        for req in requests:
-            row = [
-                req['timestamp'],
-                req['api_type'],
-                req['source'],
-                req.get('symbol', ''),
-                req.get('exchange', ''),
-                req.get('action', ''),
-                req.get('quantity', ''),
-                req.get('price_type', ''),
-                req.get('product_type', ''),
-                'Error' if req['analysis']['issues'] else 'Success',
-                req['analysis'].get('error', '')
-            ]
-            writer.writerow(row)
-        
-        return output.getvalue()
-    except Exception as e:
-        logger.error(f"Error generating CSV: {str(e)}\n{traceback.format_exc()}")
-        return ""
+def iter_requests(query):
+    """Format the requests of a query, fetching them from the database in batches"""
+    ist = pytz.timezone('Asia/Kolkata')
+    for req in query.order_by(AnalyzerLog.created_at.desc()).yield_per(CSV_CHUNK_ROWS):
+        formatted = format_request(req, ist)
+        if formatted:
+            yield formatted
+
+CSV_HEADERS = ['Timestamp', 'API Type', 'Source', 'Symbol', 'Exchange', 'Action', 
+               'Quantity', 'Price Type', 'Product Type', 'Status', 'Error Message']
+
+def generate_csv_rows(requests):
+    """Generate CSV rows from analyzer requests"""
+    for req in requests:
+        yield [
+            req['timestamp'],
+            req['api_type'],
+            req['source'],
+            req.get('symbol', ''),
+            req.get('exchange', ''),
+            req.get('action', ''),
+            req.get('quantity', ''),
+            req.get('price_type', ''),
+            req.get('product_type', ''),
+            'Error' if req['analysis']['issues'] else 'Success',
+            req['analysis'].get('error', '')
+        ]
 
 @analyzer_bp.route('/')
 @check_session_validity
@@ -244,16 +245,10 @@ def export_requests():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        # Get filtered requests
-        requests = get_filtered_requests(start_date, end_date)
-        
-        # Generate CSV
-        csv_data = generate_csv(requests)
-        
-        # Create the response
-        output = Response(csv_data, mimetype='text/csv')
-        output.headers["Content-Disposition"] = f"attachment; filename=analyzer_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        return output
+        # Requests are streamed from the database while the CSV is sent
+        query = build_requests_query(start_date, end_date)
+        filename = f"analyzer_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return csv_response(CSV_HEADERS, generate_csv_rows(iter_requests(query)), filename)
     except Exception as e:
         logger.error(f"Error exporting requests: {str(e)}\n{traceback.format_exc()}")
         flash('Error exporting requests', 'error')
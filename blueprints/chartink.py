@@ -1,136 +1,46 @@
 from flask import Blueprint, render_template, request, jsonify, session, flash, redirect, url_for, abort
 from database.chartink_db import (
     ChartinkStrategy, ChartinkSymbolMapping, db_session,
-    create_strategy, add_symbol_mapping, get_strategy_by_webhook_id,
+    create_strategy, add_symbol_mapping,
     get_symbol_mappings, get_all_strategies, delete_strategy,
     update_strategy_times, delete_symbol_mapping, bulk_add_symbol_mappings,
-    toggle_strategy, get_strategy, get_user_strategies
+    toggle_strategy, get_strategy, get_user_strategies, get_webhook_context
 )
 from database.symbol import enhanced_search_symbols
 from database.auth_db import get_api_key_for_tradingview
 from utils.session import check_session_validity
 import json
-from datetime import datetime, time
+from datetime import datetime
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from utils.logging import get_logger
-import requests
-import os
+from services import webhook_order_service
 import uuid
-import time as time_module
-import queue
 import threading
-from collections import deque
-from time import time
 
 logger = get_logger(__name__)
 
 chartink_bp = Blueprint('chartink_bp', __name__, url_prefix='/chartink')
 
-# Initialize scheduler for time-based controls
-scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Kolkata'))
-scheduler.start()
+# Scheduler for time-based controls, started on first use
+scheduler = None
+scheduler_lock = threading.Lock()
 
-# Get base URL from environment or default to localhost
-BASE_URL = os.getenv('HOST_SERVER', 'http://127.0.0.1:5000')
+def get_scheduler():
+    """Get the square-off scheduler, creating and starting it on first use"""
+    global scheduler
+    with scheduler_lock:
+        if scheduler is None:
+            scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Kolkata'))
+            scheduler.start()
+    return scheduler
 
 # Valid exchanges
 VALID_EXCHANGES = ['NSE', 'BSE']
 
-# Separate queues for different order types
-regular_order_queue = queue.Queue()  # For placeorder (up to 10/sec)
-smart_order_queue = queue.Queue()    # For placesmartorder (1/sec)
-
-# Order processor state
-order_processor_running = False
-order_processor_lock = threading.Lock()
-
-# Rate limiting state for regular orders
-last_regular_orders = deque(maxlen=10)  # Track last 10 regular order timestamps
-
-def process_orders():
-    """Background task to process orders from both queues with rate limiting"""
-    global order_processor_running
-    
-    while True:
-        try:
-            # Process smart orders first (1 per second)
-            try:
-                smart_order = smart_order_queue.get_nowait()
-                if smart_order is None:  # Poison pill
-                    break
-                
-                try:
-                    response = requests.post(f'{BASE_URL}/api/v1/placesmartorder', json=smart_order['payload'])
-                    if response.ok:
-                        logger.info(f'Smart order placed for {smart_order["payload"]["symbol"]} in strategy {smart_order["payload"]["strategy"]}')
-                    else:
-                        logger.error(f'Error placing smart order for {smart_order["payload"]["symbol"]}: {response.text}')
-                except Exception as e:
-                    logger.error(f'Error placing smart order: {str(e)}')
-                
-                # Always wait 1 second after smart order
-                time_module.sleep(1)
-                continue  # Start next iteration
-                
-            except queue.Empty:
-                pass  # No smart orders, continue to regular orders
-            
-            # Process regular orders (up to 10 per second)
-            now = time()
-            
-            # Clean up old timestamps
-            while last_regular_orders and now - last_regular_orders[0] > 1:
-                last_regular_orders.popleft()
-            
-            # Process regular orders if under rate limit
-            if len(last_regular_orders) < 10:
-                try:
-                    regular_order = regular_order_queue.get_nowait()
-                    if regular_order is None:  # Poison pill
-                        break
-                    
-                    try:
-                        response = requests.post(f'{BASE_URL}/api/v1/placeorder', json=regular_order['payload'])
-                        if response.ok:
-                            logger.info(f'Regular order placed for {regular_order["payload"]["symbol"]} in strategy {regular_order["payload"]["strategy"]}')
-                            last_regular_orders.append(now)
-                        else:
-                            logger.error(f'Error placing regular order for {regular_order["payload"]["symbol"]}: {response.text}')
-                    except Exception as e:
-                        logger.error(f'Error placing regular order: {str(e)}')
-                        
-                except queue.Empty:
-                    time_module.sleep(0.1)  # No orders to process
-            else:
-                # Rate limit hit, wait until next second
-                time_module.sleep(0.1)
-                
-        except Exception as e:
-            logger.error(f'Error in order processor: {str(e)}')
-            time_module.sleep(0.1)  # Prevent tight loop on error
-    
-    with order_processor_lock:
-        order_processor_running = False
-
-def ensure_order_processor():
-    """Ensure order processor is running"""
-    global order_processor_running
-    
-    with order_processor_lock:
-        if not order_processor_running:
-            order_processor_running = True
-            thread = threading.Thread(target=process_orders, daemon=True)
-            thread.start()
-
 def queue_order(endpoint, payload):
-    """Add order to appropriate processing queue"""
-    ensure_order_processor()
-    
-    if endpoint == 'placesmartorder':
-        smart_order_queue.put({'endpoint': endpoint, 'payload': payload})
-    else:  # placeorder
-        regular_order_queue.put({'endpoint': endpoint, 'payload': payload})
+    """Queue order on the shared webhook dispatcher (placeorder or placesmartorder)"""
+    webhook_order_service.queue_order('chartink', endpoint, payload)
 
 def validate_strategy_times(start_time, end_time, squareoff_time):
     """Validate strategy time settings"""
@@ -173,12 +83,14 @@ def schedule_squareoff(strategy_id):
         hours, minutes = map(int, strategy.squareoff_time.split(':'))
         job_id = f'squareoff_{strategy_id}'
         
+        squareoff_scheduler = get_scheduler()
+        
         # Remove existing job if any
-        if scheduler.get_job(job_id):
-            scheduler.remove_job(job_id)
+        if squareoff_scheduler.get_job(job_id):
+            squareoff_scheduler.remove_job(job_id)
         
         # Add new job
-        scheduler.add_job(
+        squareoff_scheduler.add_job(
             squareoff_positions,
             'cron',
             hour=hours,
@@ -349,7 +261,7 @@ def delete_strategy_route(strategy_id):
     try:
         # Remove squareoff job if exists
         job_id = f'squareoff_{strategy_id}'
-        if scheduler.get_job(job_id):
+        if scheduler and scheduler.get_job(job_id):
             scheduler.remove_job(job_id)
         
         # Delete strategy and its mappings
@@ -536,11 +448,12 @@ def search_symbols():
 def webhook(webhook_id):
     """Handle webhook from Chartink"""
     try:
-        # Get strategy by webhook ID
-        strategy = get_strategy_by_webhook_id(webhook_id)
-        if not strategy:
+        # Get resolved strategy context by webhook ID
+        context = get_webhook_context(webhook_id)
+        if not context:
             logger.error(f'Strategy not found for webhook ID: {webhook_id}')
             return jsonify({'status': 'error', 'error': 'Invalid webhook ID'}), 404
+        strategy = context.strategy
         
         if not strategy.is_active:
             logger.info(f'Strategy {strategy.id} is inactive, ignoring webhook')
@@ -580,14 +493,12 @@ def webhook(webhook_id):
         # Time validations for intraday strategies
         if strategy.is_intraday:
             current_time = datetime.now(pytz.timezone('Asia/Kolkata')).time()
-            
-            # Convert strategy times to time objects
-            start_time = datetime.strptime(strategy.start_time, '%H:%M').time()
-            end_time = datetime.strptime(strategy.end_time, '%H:%M').time()
-            squareoff_time = datetime.strptime(strategy.squareoff_time, '%H:%M').time()
+            start_time = context.start_time
+            end_time = context.end_time
+            squareoff_time = context.squareoff_time
             
             # Check if before start time for all orders
-            if current_time < start_time:
+            if start_time and current_time < start_time:
                 logger.info(f'Strategy {strategy.id} received webhook before start time, ignoring')
                 return jsonify({
                     'status': 'error',
@@ -595,7 +506,7 @@ def webhook(webhook_id):
                 }), 400
             
             # Check if after squareoff time for all orders
-            if current_time >= squareoff_time:
+            if squareoff_time and current_time >= squareoff_time:
                 logger.info(f'Strategy {strategy.id} received webhook after squareoff time, ignoring')
                 return jsonify({
                     'status': 'error',
@@ -603,7 +514,7 @@ def webhook(webhook_id):
                 }), 400
             
             # For entry orders (BUY/SHORT), check end time
-            if is_entry_order and current_time >= end_time:
+            if is_entry_order and end_time and current_time >= end_time:
                 logger.info(f'Strategy {strategy.id} received entry order after end time, ignoring')
                 return jsonify({
                     'status': 'error',
@@ -619,15 +530,12 @@ def webhook(webhook_id):
             return jsonify({'status': 'error', 'error': 'No symbols received'}), 400
         
         # Get symbol mappings
-        mappings = get_symbol_mappings(strategy.id)
-        if not mappings:
+        mapping_dict = context.mappings
+        if not mapping_dict:
             logger.error(f'No symbol mappings found for strategy {strategy.id}')
             return jsonify({'status': 'error', 'error': 'No symbol mappings configured'}), 400
         
-        mapping_dict = {m.chartink_symbol: m for m in mappings}
-        
-        # Get API key from database
-        api_key = get_api_key_for_tradingview(strategy.user_id)
+        api_key = context.api_key
         if not api_key:
             logger.error(f'No API key found for user {strategy.user_id}')
             return jsonify({'status': 'error', 'error': 'No API key found'}), 401
@@ -1,23 +1,13 @@
 from flask import Blueprint, render_template, session, redirect, url_for, g, jsonify, request
 from database.auth_db import get_auth_token
-from importlib import import_module
 from utils.session import check_session_validity
 import multiprocessing
 import sys
+from utils.broker_registry import get_broker_function
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
-def dynamic_import(broker):
-    try:
-        module_path = f'broker.{broker}.api.funds'
-        module = import_module(module_path)
-        get_margin_data = getattr(module, 'get_margin_data')
-        return get_margin_data
-    except ImportError as e:
-        logger.error(f"Error importing module: {e}")
-        return None
-
 dashboard_bp = Blueprint('dashboard_bp', __name__, url_prefix='/')
 scalper_process = None
 
@@ -36,7 +26,7 @@ def dashboard():
         logger.error("Broker not set in session")
         return "Broker not set in session", 400
     
-    get_margin_data_func = dynamic_import(broker)
+    get_margin_data_func = get_broker_function(broker, 'get_margin_data')
     if get_margin_data_func is None:
         logger.error(f"Failed to import broker module for {broker}")
         return "Failed to import broker module", 500
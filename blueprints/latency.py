@@ -1,6 +1,7 @@
-from flask import Blueprint, jsonify, render_template, request, session, Response
+from flask import Blueprint, jsonify, render_template, request, session
 from database.latency_db import OrderLatency, latency_session
 from utils.session import check_session_validity
+from utils.csv_stream import CSV_CHUNK_ROWS, csv_response
 from limiter import limiter
 from utils.logging import get_logger
 from sqlalchemy import func
@@ -8,8 +9,6 @@ from collections import defaultdict
 import numpy as np
 from datetime import datetime
 import pytz
-import csv
-import io
 
 logger = get_logger(__name__)
 
@@ -89,17 +88,12 @@ def get_histogram_data(broker=None):
             'max_rtt': 0
         }
 
-def generate_csv(logs):
-    """Generate CSV file from latency logs"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Timestamp', 'Broker', 'Order ID', 'Symbol', 'Order Type', 'RTT (ms)', 'Overhead (ms)', 'Total Latency (ms)', 'Status'])
-    
-    # Write data
+CSV_HEADERS = ['Timestamp', 'Broker', 'Order ID', 'Symbol', 'Order Type', 'RTT (ms)', 'Overhead (ms)', 'Total Latency (ms)', 'Status']
+
+def generate_csv_rows(logs):
+    """Generate CSV rows from latency logs"""
     for log in logs:
-        writer.writerow([
+        yield [
             format_ist_time(log.timestamp),
             log.broker,
             log.order_id,
@@ -109,9 +103,7 @@ def generate_csv(logs):
             round(log.overhead_ms, 2),
             round(log.total_latency_ms, 2),
             log.status
-        ])
-    
-    return output.getvalue()
+        ]
 
 @latency_bp.route('/', methods=['GET'])
 @check_session_validity
@@ -209,20 +201,9 @@ def get_broker_stats(broker):
 def export_logs():
     """Export latency logs to CSV"""
     try:
-        # Get all logs for the current day
-        logs = OrderLatency.get_recent_logs(limit=None)  # None to get all logs
-        
-        # Generate CSV
-        csv_data = generate_csv(logs)
-        
-        # Create the response
-        response = Response(
-            csv_data,
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=latency_logs.csv'}
-        )
-        
-        return response
+        # Logs are streamed from the database while the CSV is sent
+        logs = OrderLatency.iter_logs(batch_size=CSV_CHUNK_ROWS)
+        return csv_response(CSV_HEADERS, generate_csv_rows(logs), 'latency_logs.csv')
         
     except Exception as e:
         logger.error(f"Error exporting latency logs: {e}")
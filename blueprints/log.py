@@ -1,15 +1,14 @@
 # blueprints/log.py
 
-from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify, Response
-from database.apilog_db import OrderLog
+from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify
+from database.apilog_db import EXTRACTED_FIELDS, OrderLog, search_filter
 from utils.session import check_session_validity
-from sqlalchemy import func
+from utils.csv_stream import CSV_CHUNK_ROWS, csv_response
+from sqlalchemy import tuple_
 import pytz
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from utils.logging import get_logger
 import json
-import csv
-import io
 import traceback
 
 logger = get_logger(__name__)
@@ -70,131 +69,157 @@ def format_log_entry(log, ist):
             'created_at': log.created_at.astimezone(ist).strftime('%Y-%m-%d %I:%M:%S %p')
         }
 
-def get_filtered_logs(start_date=None, end_date=None, search_query=None, page=None, per_page=None):
-    """Get filtered logs with pagination"""
+def _day_start(day, ist):
+    """Start of a calendar day in IST, comparable with the stored timestamps"""
+    if isinstance(day, str):
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+    return ist.localize(datetime.combine(day, time.min))
+
+def build_logs_query(start_date=None, end_date=None, search_query=None, filters=None):
+    """
+    Build the filtered OrderLog query (defaults to today's logs).
+
+    Dates become ranges on the raw created_at column so its index is used,
+    ``filters`` matches the extracted columns (symbol, exchange, strategy,
+    action, orderid, status) and ``search_query`` uses the full-text index.
+    """
     ist = pytz.timezone('Asia/Kolkata')
     query = OrderLog.query
 
+    # If no dates provided, default to today
+    if not start_date and not end_date:
+        start_date = end_date = datetime.now(ist).date()
+
+    # Apply date filters if provided
+    if start_date:
+        query = query.filter(OrderLog.created_at >= _day_start(start_date, ist))
+    if end_date:
+        query = query.filter(OrderLog.created_at < _day_start(end_date, ist) + timedelta(days=1))
+
+    for field, value in (filters or {}).items():
+        if field in EXTRACTED_FIELDS and value:
+            query = query.filter(getattr(OrderLog, field) == value)
+
+    # Apply search filter if provided
+    if search_query:
+        query = query.filter(search_filter(search_query))
+
+    return query
+
+def get_filtered_logs(start_date=None, end_date=None, search_query=None, before=None, after=None,
+                      per_page=20, filters=None):
+    """
+    Get one page of filtered logs, newest first, with keyset pagination.
+
+    ``before`` / ``after`` are the IDs of the last / first log of the page
+    being left; the returned cursors are the values to pass for the next
+    older / newer page (None when there is none).
+    """
+    ist = pytz.timezone('Asia/Kolkata')
+    position = tuple_(OrderLog.created_at, OrderLog.id)
+
     try:
-        # Apply date filters if provided
-        if start_date:
-            if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(func.date(OrderLog.created_at) >= start_date)
-        if end_date:
-            if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(func.date(OrderLog.created_at) <= end_date)
-        
-        # If no dates provided, default to today
-        if not start_date and not end_date:
-            today_ist = datetime.now(ist).date()
-            query = query.filter(func.date(OrderLog.created_at) == today_ist)
-
-        # Apply search filter if provided
-        if search_query:
-            search = f"%{search_query}%"
-            query = query.filter(
-                (OrderLog.api_type.ilike(search)) |
-                (OrderLog.request_data.ilike(search)) |
-                (OrderLog.response_data.ilike(search))
-            )
-
-        # Get total count
-        total_logs = query.count()
-
-        # Calculate total pages only if pagination is enabled
-        if page is not None and per_page is not None:
-            total_pages = (total_logs + per_page - 1) // per_page
-            # Apply pagination
-            query = query.order_by(OrderLog.created_at.desc())\
-                       .offset((page - 1) * per_page)\
-                       .limit(per_page)
+        query = build_logs_query(start_date, end_date, search_query, filters)
+
+        cursor = before or after
+        anchor = None
+        if cursor:
+            created_at = OrderLog.query.with_entities(OrderLog.created_at).filter(OrderLog.id == cursor).scalar()
+            if created_at is not None:
+                anchor = (created_at, int(cursor))
+
+        if anchor and after:
+            # Newer page: walk forward from the anchor, then show newest first
+            rows = query.filter(position > anchor)\
+                        .order_by(OrderLog.created_at.asc(), OrderLog.id.asc())\
+                        .limit(per_page + 1).all()
+            has_newer = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            has_older = True
         else:
-            total_pages = 1
-            query = query.order_by(OrderLog.created_at.desc())
+            if anchor:
+                query = query.filter(position < anchor)
+            rows = query.order_by(OrderLog.created_at.desc(), OrderLog.id.desc())\
+                        .limit(per_page + 1).all()
+            has_older = len(rows) > per_page
+            rows = rows[:per_page]
+            has_newer = anchor is not None
 
         # Format logs
-        logs = [format_log_entry(log, ist) for log in query.all()]
+        logs = [format_log_entry(log, ist) for log in rows]
         logger.info(f"Retrieved {len(logs)} logs")
 
-        return logs, total_pages, total_logs
+        older = rows[-1].id if rows and has_older else None
+        newer = rows[0].id if rows and has_newer else None
+        return logs, older, newer
 
     except Exception as e:
         logger.error(f"Error in get_filtered_logs: {str(e)}\n{traceback.format_exc()}")
-        return [], 1, 0
+        return [], None, None
 
-def generate_csv(logs):
-    """Generate CSV file from logs"""
-    try:
-        si = io.StringIO()
-        writer = csv.writer(si)
-        
-        # Write headers - include all possible fields from all request types
-        headers = [
-            'ID', 
-            'Timestamp', 
-            'API Type', 
-            'Strategy',
-            'Exchange',
-            'Symbol',
-            'Action',
-            'Product',
-            'Price Type',
-            'Quantity',
-            'Position Size',  # For placesmartorder
-            'Price',
-            'Trigger Price',
-            'Disclosed Quantity',
-            'Order ID',  # For modifyorder, cancelorder
-            'Response'
-        ]
-        writer.writerow(headers)
-        
-        # Write data
-        for log in logs:
-            try:
-                request_data = log['request_data']
-                if not isinstance(request_data, dict):
-                    request_data = {}
-                
-                # Format response data for CSV
-                response_data = log['response_data']
-                if isinstance(response_data, dict):
-                    response_str = json.dumps(response_data)
-                else:
-                    response_str = str(response_data)
-                
-                # Build row with all possible fields
-                row = [
-                    log['id'],
-                    log['created_at'],
-                    log['api_type'],
-                    log['strategy'],
-                    request_data.get('exchange', ''),
-                    request_data.get('symbol', ''),
-                    request_data.get('action', ''),
-                    request_data.get('product', ''),
-                    request_data.get('pricetype', ''),
-                    request_data.get('quantity', ''),
-                    request_data.get('position_size', ''),  # Only for placesmartorder
-                    request_data.get('price', ''),
-                    request_data.get('trigger_price', ''),
-                    request_data.get('disclosed_quantity', ''),
-                    request_data.get('orderid', ''),  # For modifyorder, cancelorder
-                    response_str
-                ]
-                writer.writerow(row)
-                logger.debug(f"Wrote row: {row}")
-            except Exception as e:
-                logger.error(f"Error writing row for log {log.get('id')}: {str(e)}")
-                continue
-        
-        return si.getvalue()
+def iter_logs(query):
+    """Format the logs of a query, fetching them from the database in batches"""
+    ist = pytz.timezone('Asia/Kolkata')
+    for log in query.order_by(OrderLog.created_at.desc(), OrderLog.id.desc()).yield_per(CSV_CHUNK_ROWS):
+        yield format_log_entry(log, ist)
 
-    except Exception as e:
-        logger.error(f"Error generating CSV: {str(e)}\n{traceback.format_exc()}")
-        raise
+# CSV headers - include all possible fields from all request types
+CSV_HEADERS = [
+    'ID', 
+    'Timestamp', 
+    'API Type', 
+    'Strategy',
+    'Exchange',
+    'Symbol',
+    'Action',
+    'Product',
+    'Price Type',
+    'Quantity',
+    'Position Size',  # For placesmartorder
+    'Price',
+    'Trigger Price',
+    'Disclosed Quantity',
+    'Order ID',  # For modifyorder, cancelorder
+    'Response'
+]
+
+def generate_csv_rows(logs):
+    """Generate CSV rows from logs"""
+    for log in logs:
+        try:
+            request_data = log['request_data']
+            if not isinstance(request_data, dict):
+                request_data = {}
+            
+            # Format response data for CSV
+            response_data = log['response_data']
+            if isinstance(response_data, dict):
+                response_str = json.dumps(response_data)
+            else:
+                response_str = str(response_data)
+            
+            # Build row with all possible fields
+            yield [
+                log['id'],
+                log['created_at'],
+                log['api_type'],
+                log['strategy'],
+                request_data.get('exchange', ''),
+                request_data.get('symbol', ''),
+                request_data.get('action', ''),
+                request_data.get('product', ''),
+                request_data.get('pricetype', ''),
+                request_data.get('quantity', ''),
+                request_data.get('position_size', ''),  # Only for placesmartorder
+                request_data.get('price', ''),
+                request_data.get('trigger_price', ''),
+                request_data.get('disclosed_quantity', ''),
+                request_data.get('orderid', ''),  # For modifyorder, cancelorder
+                response_str
+            ]
+        except Exception as e:
+            logger.error(f"Error writing row for log {log.get('id')}: {str(e)}")
+            continue
 
 @log_bp.route('/')
 @check_session_validity
@@ -204,31 +229,35 @@ def view_logs():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         search_query = request.args.get('search', '').strip()
-        page = int(request.args.get('page', 1))
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        filters = {field: request.args.get(field) for field in EXTRACTED_FIELDS}
         per_page = 20
 
         # Get filtered logs
-        logs, total_pages, _ = get_filtered_logs(
+        logs, older_cursor, newer_cursor = get_filtered_logs(
             start_date=start_date,
             end_date=end_date,
             search_query=search_query,
-            page=page,
-            per_page=per_page
+            before=before,
+            after=after,
+            per_page=per_page,
+            filters=filters
         )
 
         # If AJAX request, return JSON
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return jsonify({
                 'logs': logs,
-                'total_pages': total_pages,
-                'current_page': page
+                'older': older_cursor,
+                'newer': newer_cursor
             })
 
         logger.info(f"Found {len(logs)} log entries")
         return render_template('logs.html', 
                              logs=logs,
-                             total_pages=total_pages, 
-                             current_page=page,
+                             older_cursor=older_cursor,
+                             newer_cursor=newer_cursor,
                              search_query=search_query,
                              start_date=start_date,
                              end_date=end_date)
@@ -237,8 +266,8 @@ def view_logs():
         logger.error(f"Error in view_logs: {str(e)}\n{traceback.format_exc()}")
         return render_template('logs.html', 
                              logs=[],
-                             total_pages=1,
-                             current_page=1,
+                             older_cursor=None,
+                             newer_cursor=None,
                              search_query='',
                              start_date=None,
                              end_date=None)
@@ -256,34 +285,21 @@ def export_logs():
 
         logger.info(f"Export parameters - start_date: {start_date}, end_date: {end_date}, search: {search_query}")
 
-        # Get all logs without pagination
-        logs, _, total = get_filtered_logs(
+        # Logs are streamed from the database while the CSV is sent
+        query = build_logs_query(
             start_date=start_date,
             end_date=end_date,
             search_query=search_query,
-            page=None,
-            per_page=None
+            filters={field: request.args.get(field) for field in EXTRACTED_FIELDS}
         )
 
-        logger.info(f"Retrieved {total} logs for export")
-
-        # Generate CSV content
-        csv_output = generate_csv(logs)
-        
         # Generate filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'openalgo_logs_{timestamp}.csv'
 
-        logger.info(f"Generated CSV file: {filename}")
+        logger.info(f"Streaming CSV file: {filename}")
 
-        return Response(
-            csv_output,
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}',
-                'Content-Type': 'text/csv'
-            }
-        )
+        return csv_response(CSV_HEADERS, generate_csv_rows(iter_logs(query)), filename)
 
     except Exception as e:
         error_msg = f"Error exporting logs: {str(e)}\n{traceback.format_exc()}"
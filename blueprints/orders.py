@@ -1,43 +1,31 @@
-from flask import Blueprint, jsonify, request, render_template, session, redirect, url_for, Response
-from importlib import import_module
+from flask import Blueprint, jsonify, request, render_template, session, redirect, url_for
 from database.auth_db import get_auth_token
 from utils.session import check_session_validity
 from services.place_smart_order_service import place_smart_order
 from services.close_position_service import close_position
+from services.account_data_cache import invalidate_account_data
+from utils.broker_registry import get_broker_functions
+from utils.csv_stream import csv_response
 from utils.logging import get_logger
-import csv
-import io
 
 logger = get_logger(__name__)
 
 # Define the blueprint
 orders_bp = Blueprint('orders_bp', __name__, url_prefix='/')
 
-def dynamic_import(broker, module_name, function_names):
-    module_functions = {}
-    try:
-        # Import the module based on the broker name
-        module = import_module(f'broker.{broker}.{module_name}')
-        for name in function_names:
-            module_functions[name] = getattr(module, name)
-        return module_functions
-    except (ImportError, AttributeError) as e:
-        logger.error(f"Error importing functions {function_names} from {module_name} for broker {broker}: {e}")
-
-        return None
-def generate_orderbook_csv(order_data):
-    """Generate CSV file from orderbook data"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write headers matching the terminal display
-    headers = ['Trading Symbol', 'Exchange', 'Transaction Type', 'Quantity', 'Price', 
-              'Trigger Price', 'Order Type', 'Product Type', 'Order ID', 'Status', 'Time']
-    writer.writerow(headers)
-    
-    # Write data in the same order as the headers
+# Headers matching the terminal display
+ORDERBOOK_CSV_HEADERS = ['Trading Symbol', 'Exchange', 'Transaction Type', 'Quantity', 'Price', 
+                         'Trigger Price', 'Order Type', 'Product Type', 'Order ID', 'Status', 'Time']
+
+TRADEBOOK_CSV_HEADERS = ['Trading Symbol', 'Exchange', 'Product Type', 'Transaction Type', 'Fill Size', 
+                         'Fill Price', 'Trade Value', 'Order ID', 'Fill Time']
+
+POSITIONS_CSV_HEADERS = ['Symbol', 'Exchange', 'Product Type', 'Net Qty', 'Avg Price', 'LTP', 'P&L']
+
+def generate_orderbook_csv_rows(order_data):
+    """Generate CSV rows from orderbook data, in the same order as the headers"""
     for order in order_data:
-        row = [
+        yield [
             order.get('symbol', ''),
             order.get('exchange', ''),
             order.get('action', ''),
@@ -50,23 +38,11 @@ def generate_orderbook_csv(order_data):
             order.get('order_status', ''),
             order.get('timestamp', '')
         ]
-        writer.writerow(row)
-    
-    return output.getvalue()
 
-def generate_tradebook_csv(trade_data):
-    """Generate CSV file from tradebook data"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write headers
-    headers = ['Trading Symbol', 'Exchange', 'Product Type', 'Transaction Type', 'Fill Size', 
-              'Fill Price', 'Trade Value', 'Order ID', 'Fill Time']
-    writer.writerow(headers)
-    
-    # Write data
+def generate_tradebook_csv_rows(trade_data):
+    """Generate CSV rows from tradebook data"""
     for trade in trade_data:
-        row = [
+        yield [
             trade.get('symbol', ''),
             trade.get('exchange', ''),
             trade.get('product', ''),
@@ -77,22 +53,11 @@ def generate_tradebook_csv(trade_data):
             trade.get('orderid', ''),
             trade.get('timestamp', '')
         ]
-        writer.writerow(row)
-    
-    return output.getvalue()
 
-def generate_positions_csv(positions_data):
-    """Generate CSV file from positions data"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write headers - updated to match terminal output exactly
-    headers = ['Symbol', 'Exchange', 'Product Type', 'Net Qty', 'Avg Price', 'LTP', 'P&L']
-    writer.writerow(headers)
-    
-    # Write data
+def generate_positions_csv_rows(positions_data):
+    """Generate CSV rows from positions data"""
     for position in positions_data:
-        row = [
+        yield [
             position.get('symbol', ''),
             position.get('exchange', ''),
             position.get('product', ''),
@@ -101,9 +66,6 @@ def generate_positions_csv(positions_data):
             position.get('ltp', ''),
             position.get('pnl', '')
         ]
-        writer.writerow(row)
-    
-    return output.getvalue()
 
 @orders_bp.route('/orderbook')
 @check_session_validity
@@ -114,8 +76,8 @@ def orderbook():
         return "Broker not set in session", 400
 
     # Dynamically import broker-specific modules for API and mapping
-    api_funcs = dynamic_import(broker, 'api.order_api', ['get_order_book'])
-    mapping_funcs = dynamic_import(broker, 'mapping.order_data', [
+    api_funcs = get_broker_functions(broker, ['get_order_book'])
+    mapping_funcs = get_broker_functions(broker, [
         'calculate_order_statistics', 'map_order_data', 
         'transform_order_data'
     ])
@@ -155,8 +117,8 @@ def tradebook():
         return "Broker not set in session", 400
 
     # Dynamically import broker-specific modules for API and mapping
-    api_funcs = dynamic_import(broker, 'api.order_api', ['get_trade_book'])
-    mapping_funcs = dynamic_import(broker, 'mapping.order_data', [
+    api_funcs = get_broker_functions(broker, ['get_trade_book'])
+    mapping_funcs = get_broker_functions(broker, [
         'map_trade_data', 'transform_tradebook_data'
     ])
 
@@ -198,8 +160,8 @@ def positions():
         return "Broker not set in session", 400
 
     # Dynamically import broker-specific modules for API and mapping
-    api_funcs = dynamic_import(broker, 'api.order_api', ['get_positions'])
-    mapping_funcs = dynamic_import(broker, 'mapping.order_data', [
+    api_funcs = get_broker_functions(broker, ['get_positions'])
+    mapping_funcs = get_broker_functions(broker, [
         'map_position_data', 'transform_positions_data'
     ])
 
@@ -241,8 +203,8 @@ def holdings():
         return "Broker not set in session", 400
 
     # Dynamically import broker-specific modules for API and mapping
-    api_funcs = dynamic_import(broker, 'api.order_api', ['get_holdings'])
-    mapping_funcs = dynamic_import(broker, 'mapping.order_data', [
+    api_funcs = get_broker_functions(broker, ['get_holdings'])
+    mapping_funcs = get_broker_functions(broker, [
         'map_portfolio_data', 'calculate_portfolio_statistics', 'transform_holdings_data'
     ])
 
@@ -286,8 +248,8 @@ def export_orderbook():
             logger.error("Broker not set in session")
             return "Broker not set in session", 400
 
-        api_funcs = dynamic_import(broker, 'api.order_api', ['get_order_book'])
-        mapping_funcs = dynamic_import(broker, 'mapping.order_data', ['map_order_data', 'transform_order_data'])
+        api_funcs = get_broker_functions(broker, ['get_order_book'])
+        mapping_funcs = get_broker_functions(broker, ['map_order_data', 'transform_order_data'])
 
         if not api_funcs or not mapping_funcs:
             logger.error(f"Error loading broker-specific modules for {broker}")
@@ -308,12 +270,7 @@ def export_orderbook():
         order_data = mapping_funcs['map_order_data'](order_data=order_data)
         order_data = mapping_funcs['transform_order_data'](order_data)
 
-        csv_data = generate_orderbook_csv(order_data)
-        return Response(
-            csv_data,
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=orderbook.csv'}
-        )
+        return csv_response(ORDERBOOK_CSV_HEADERS, generate_orderbook_csv_rows(order_data), 'orderbook.csv')
     except Exception as e:
         logger.error(f"Error exporting orderbook: {str(e)}")
         return "Error exporting orderbook", 500
@@ -327,8 +284,8 @@ def export_tradebook():
             logger.error("Broker not set in session")
             return "Broker not set in session", 400
 
-        api_funcs = dynamic_import(broker, 'api.order_api', ['get_trade_book'])
-        mapping_funcs = dynamic_import(broker, 'mapping.order_data', ['map_trade_data', 'transform_tradebook_data'])
+        api_funcs = get_broker_functions(broker, ['get_trade_book'])
+        mapping_funcs = get_broker_functions(broker, ['map_trade_data', 'transform_tradebook_data'])
 
         if not api_funcs or not mapping_funcs:
             logger.error(f"Error loading broker-specific modules for {broker}")
@@ -349,12 +306,7 @@ def export_tradebook():
         tradebook_data = mapping_funcs['map_trade_data'](tradebook_data)
         tradebook_data = mapping_funcs['transform_tradebook_data'](tradebook_data)
 
-        csv_data = generate_tradebook_csv(tradebook_data)
-        return Response(
-            csv_data,
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=tradebook.csv'}
-        )
+        return csv_response(TRADEBOOK_CSV_HEADERS, generate_tradebook_csv_rows(tradebook_data), 'tradebook.csv')
     except Exception as e:
         logger.error(f"Error exporting tradebook: {str(e)}")
         return "Error exporting tradebook", 500
@@ -368,8 +320,8 @@ def export_positions():
             logger.error("Broker not set in session")
             return "Broker not set in session", 400
 
-        api_funcs = dynamic_import(broker, 'api.order_api', ['get_positions'])
-        mapping_funcs = dynamic_import(broker, 'mapping.order_data', [
+        api_funcs = get_broker_functions(broker, ['get_positions'])
+        mapping_funcs = get_broker_functions(broker, [
             'map_position_data', 'transform_positions_data'
         ])
 
@@ -392,12 +344,7 @@ def export_positions():
         positions_data = mapping_funcs['map_position_data'](positions_data)
         positions_data = mapping_funcs['transform_positions_data'](positions_data)
 
-        csv_data = generate_positions_csv(positions_data)
-        return Response(
-            csv_data,
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=positions.csv'}
-        )
+        return csv_response(POSITIONS_CSV_HEADERS, generate_positions_csv_rows(positions_data), 'positions.csv')
     except Exception as e:
         logger.error(f"Error exporting positions: {str(e)}")
         return "Error exporting positions", 500
@@ -431,7 +378,7 @@ def close_position():
             }), 401
         
         # Dynamically import broker-specific modules for API
-        api_funcs = dynamic_import(broker_name, 'api.order_api', ['place_smartorder_api', 'get_open_position'])
+        api_funcs = get_broker_functions(broker_name, ['place_smartorder_api', 'get_open_position'])
         
         if not api_funcs:
             logger.error(f"Error loading broker-specific modules for {broker_name}")
@@ -506,7 +453,7 @@ def close_all_positions():
             }), 401
         
         # Dynamically import broker-specific modules for API
-        api_funcs = dynamic_import(broker_name, 'api.order_api', ['close_all_positions'])
+        api_funcs = get_broker_functions(broker_name, ['close_all_positions'])
         
         if not api_funcs or 'close_all_positions' not in api_funcs:
             logger.error(f"Error loading broker-specific modules for {broker_name}")
@@ -517,6 +464,7 @@ def close_all_positions():
         
         # Use the broker's close_all_positions function directly
         response_code, status_code = api_funcs['close_all_positions']('', auth_token)
+        invalidate_account_data(broker_name, auth_token)
         
         if status_code == 200:
             response_data = {
@@ -1,46 +1,47 @@
 from flask import Blueprint, render_template, request, jsonify, session, flash, redirect, url_for, abort
 from database.strategy_db import (
     Strategy, StrategySymbolMapping, db_session,
-    create_strategy, add_symbol_mapping, get_strategy_by_webhook_id,
+    create_strategy, add_symbol_mapping,
     get_symbol_mappings, get_all_strategies, delete_strategy,
     update_strategy_times, delete_symbol_mapping, bulk_add_symbol_mappings,
-    toggle_strategy, get_strategy, get_user_strategies
+    toggle_strategy, get_strategy, get_user_strategies, get_webhook_context
 )
 from database.symbol import enhanced_search_symbols
 from database.auth_db import get_api_key_for_tradingview
 from utils.session import check_session_validity, is_session_valid
 import json
-from datetime import datetime, time
+from datetime import datetime
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from utils.logging import get_logger
-import requests
-import os
+from services import webhook_order_service
 import uuid
-import time as time_module
-import queue
 import threading
-from collections import deque
-from time import time
 import re
 
 logger = get_logger(__name__)
 
 strategy_bp = Blueprint('strategy_bp', __name__, url_prefix='/strategy')
 
-# Initialize scheduler for time-based controls
-scheduler = BackgroundScheduler(
-    timezone=pytz.timezone('Asia/Kolkata'),
-    job_defaults={
-        'coalesce': True,
-        'misfire_grace_time': 300,
-        'max_instances': 1
-    }
-)
-scheduler.start()
+# Scheduler for time-based controls, started on first use
+scheduler = None
+scheduler_lock = threading.Lock()
 
-# Get base URL from environment or default to localhost
-BASE_URL = os.getenv('HOST_SERVER', 'http://127.0.0.1:5000')
+def get_scheduler():
+    """Get the square-off scheduler, creating and starting it on first use"""
+    global scheduler
+    with scheduler_lock:
+        if scheduler is None:
+            scheduler = BackgroundScheduler(
+                timezone=pytz.timezone('Asia/Kolkata'),
+                job_defaults={
+                    'coalesce': True,
+                    'misfire_grace_time': 300,
+                    'max_instances': 1
+                }
+            )
+            scheduler.start()
+    return scheduler
 
 # Valid exchanges
 VALID_EXCHANGES = ['NSE', 'BSE', 'NFO', 'CDS', 'BFO', 'BCD', 'MCX', 'NCDEX']
@@ -61,94 +62,9 @@ EXCHANGE_PRODUCTS = {
 DEFAULT_EXCHANGE = 'NSE'
 DEFAULT_PRODUCT = 'MIS'
 
-# Separate queues for different order types
-regular_order_queue = queue.Queue()  # For placeorder (up to 10/sec)
-smart_order_queue = queue.Queue()    # For placesmartorder (1/sec)
-
-# Order processor state
-order_processor_running = False
-order_processor_lock = threading.Lock()
-
-# Rate limiting state for regular orders
-last_regular_orders = deque(maxlen=10)  # Track last 10 regular order timestamps
-
-def process_orders():
-    """Background task to process orders from both queues with rate limiting"""
-    global order_processor_running
-    
-    while True:
-        try:
-            # Process smart orders first (1 per second)
-            try:
-                smart_order = smart_order_queue.get_nowait()
-                if smart_order is None:  # Poison pill
-                    break
-                
-                try:
-                    response = requests.post(f'{BASE_URL}/api/v1/placesmartorder', json=smart_order['payload'])
-                    if response.ok:
-                        logger.info(f'Smart order placed for {smart_order["payload"]["symbol"]} in strategy {smart_order["payload"]["strategy"]}')
-                    else:
-                        logger.error(f'Error placing smart order for {smart_order["payload"]["symbol"]}: {response.text}')
-                except Exception as e:
-                    logger.error(f'Error placing smart order: {str(e)}')
-                
-                # Always wait 1 second after smart order
-                time_module.sleep(1)
-                continue  # Start next iteration
-                
-            except queue.Empty:
-                pass  # No smart orders, continue to regular orders
-            
-            # Process regular orders (up to 10 per second)
-            now = time()
-            
-            # Clean up old timestamps
-            while last_regular_orders and now - last_regular_orders[0] > 1:
-                last_regular_orders.popleft()
-            
-            # Process regular orders if under rate limit
-            if len(last_regular_orders) < 10:
-                try:
-                    regular_order = regular_order_queue.get_nowait()
-                    if regular_order is None:  # Poison pill
-                        break
-                    
-                    try:
-                        response = requests.post(f'{BASE_URL}/api/v1/placeorder', json=regular_order['payload'])
-                        if response.ok:
-                            logger.info(f'Regular order placed for {regular_order["payload"]["symbol"]} in strategy {regular_order["payload"]["strategy"]}')
-                            last_regular_orders.append(now)
-                        else:
-                            logger.error(f'Error placing regular order for {regular_order["payload"]["symbol"]}: {response.text}')
-                    except Exception as e:
-                        logger.error(f'Error placing regular order: {str(e)}')
-                    
-                except queue.Empty:
-                    pass  # No regular orders
-            
-            # Small sleep to prevent CPU spinning
-            time_module.sleep(0.1)
-            
-        except Exception as e:
-            logger.error(f'Error in order processor: {str(e)}')
-            time_module.sleep(1)  # Sleep on error to prevent rapid retries
-
-def ensure_order_processor():
-    """Ensure the order processor is running"""
-    global order_processor_running
-    with order_processor_lock:
-        if not order_processor_running:
-            threading.Thread(target=process_orders, daemon=True).start()
-            order_processor_running = True
-
 def queue_order(endpoint, payload):
-    """Add order to appropriate queue"""
-    ensure_order_processor()
-    if endpoint == 'placesmartorder':
-        smart_order_queue.put({'payload': payload})
-    else:
-        regular_order_queue.put({'payload': payload})
+    """Queue order on the shared webhook dispatcher (placeorder or placesmartorder)"""
+    webhook_order_service.queue_order('strategy', endpoint, payload)
 
 def validate_strategy_times(start_time, end_time, squareoff_time):
     """Validate strategy time settings"""
@@ -208,12 +124,14 @@ def schedule_squareoff(strategy_id):
         hours, minutes = map(int, strategy.squareoff_time.split(':'))
         job_id = f'squareoff_{strategy_id}'
         
+        squareoff_scheduler = get_scheduler()
+        
         # Remove existing job if any
-        if scheduler.get_job(job_id):
-            scheduler.remove_job(job_id)
+        if squareoff_scheduler.get_job(job_id):
+            squareoff_scheduler.remove_job(job_id)
         
         # Add new job
-        scheduler.add_job(
+        squareoff_scheduler.add_job(
             squareoff_positions,
             'cron',
             hour=hours,
@@ -402,7 +320,8 @@ def toggle_strategy_route(strategy_id):
             else:
                 # Remove squareoff job if being deactivated
                 try:
-                    scheduler.remove_job(f'squareoff_{strategy_id}')
+                    if scheduler:
+                        scheduler.remove_job(f'squareoff_{strategy_id}')
                 except Exception:
                     pass
                 flash('Strategy deactivated successfully', 'success')
@@ -434,7 +353,8 @@ def delete_strategy_route(strategy_id):
     try:
         # Remove squareoff job if exists
         try:
-            scheduler.remove_job(f'squareoff_{strategy_id}')
+            if scheduler:
+                scheduler.remove_job(f'squareoff_{strategy_id}')
         except Exception:
             pass
             
@@ -597,9 +517,10 @@ def search_symbols():
 def webhook(webhook_id):
     """Handle webhook from trading platform"""
     try:
-        strategy = get_strategy_by_webhook_id(webhook_id)
-        if not strategy:
+        context = get_webhook_context(webhook_id)
+        if not context:
             return jsonify({'error': 'Invalid webhook ID'}), 404
+        strategy = context.strategy
         
         if not strategy.is_active:
             return jsonify({'error': 'Strategy is inactive'}), 400
@@ -683,12 +604,11 @@ def webhook(webhook_id):
             use_smart_order = position_size == 0
             
         # Get symbol mapping
-        mapping = next((m for m in get_symbol_mappings(strategy.id) if m.symbol == data['symbol']), None)
+        mapping = context.mappings.get(data['symbol'])
         if not mapping:
             return jsonify({'error': f'No mapping found for symbol {data["symbol"]}'}), 400
             
-        # Get API key from database
-        api_key = get_api_key_for_tradingview(strategy.user_id)
+        api_key = context.api_key
         if not api_key:
             logger.error(f'No API key found for user {strategy.user_id}')
             return jsonify({'error': 'No API key found'}), 401
@@ -1,13 +1,12 @@
-from flask import Blueprint, jsonify, render_template, request, session, Response
+from flask import Blueprint, jsonify, render_template, request, session
 from database.traffic_db import TrafficLog, logs_session
 from utils.session import check_session_validity
+from utils.csv_stream import CSV_CHUNK_ROWS, csv_response
 from limiter import limiter
 from sqlalchemy import func
 import logging
 from datetime import datetime
 import pytz
-import csv
-import io
 
 logger = logging.getLogger(__name__)
 
@@ -28,17 +27,12 @@ def format_ist_time(timestamp):
     ist_time = convert_to_ist(timestamp)
     return ist_time.strftime('%d-%m-%Y %I:%M:%S %p')
 
-def generate_csv(logs):
-    """Generate CSV file from traffic logs"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Timestamp', 'Client IP', 'Method', 'Path', 'Status Code', 'Duration (ms)', 'Host', 'Error'])
-    
-    # Write data
+CSV_HEADERS = ['Timestamp', 'Client IP', 'Method', 'Path', 'Status Code', 'Duration (ms)', 'Host', 'Error']
+
+def generate_csv_rows(logs):
+    """Generate CSV rows from traffic logs"""
     for log in logs:
-        writer.writerow([
+        yield [
             format_ist_time(log.timestamp),
             log.client_ip,
             log.method,
@@ -47,9 +41,7 @@ def generate_csv(logs):
             round(log.duration_ms, 2),
             log.host,
             log.error
-        ])
-    
-    return output.getvalue()
+        ]
 
 @traffic_bp.route('/', methods=['GET'])
 @check_session_validity
@@ -148,20 +140,9 @@ def get_stats():
 def export_logs():
     """Export traffic logs to CSV"""
     try:
-        # Get all logs for the current day
-        logs = TrafficLog.get_recent_logs(limit=None)  # None to get all logs
-        
-        # Generate CSV
-        csv_data = generate_csv(logs)
-        
-        # Create the response
-        response = Response(
-            csv_data,
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=traffic_logs.csv'}
-        )
-        
-        return response
+        # Logs are streamed from the database while the CSV is sent
+        logs = TrafficLog.iter_logs(batch_size=CSV_CHUNK_ROWS)
+        return csv_response(CSV_HEADERS, generate_csv_rows(logs), 'traffic_logs.csv')
         
     except Exception as e:
         logger.error(f"Error exporting traffic logs: {e}")
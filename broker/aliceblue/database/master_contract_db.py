@@ -9,14 +9,13 @@ import json
 import pandas as pd
 import gzip
 import io
-from utils.httpx_client import get_httpx_client
 
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader, format_strike
+from utils.contract_downloader import download_contract_files, mark_contract_loaded
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -58,68 +57,19 @@ data_types = {
     "Reserved column3": str, 
 }
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
-
-
-
 def download_csv_aliceblue_data(output_path):
-    """Download AliceBlue master contract CSV files using shared connection pooling."""
+    """
+    Download the AliceBlue master contract CSV files concurrently.
+
+    Files are fetched conditionally (ETag/Last-Modified) and cached on disk.
+    When the contract already loaded in the database is unchanged nothing is
+    copied and the returned download has ``current`` set.
+    """
 
     logger.info("Downloading Master Contract CSV Files")
     # URLs of the CSV files to be downloaded
@@ -133,32 +83,18 @@ def download_csv_aliceblue_data(output_path):
         "MCX": "https://v2api.aliceblueonline.com/restpy/static/contract_master/MCX.csv",
         "INDICES": "https://v2api.aliceblueonline.com/restpy/static/contract_master/INDICES.csv"
     }
-    
-    # Get the shared httpx client with connection pooling
-    client = get_httpx_client()
-    
-    # Create a list to hold the paths of the downloaded files
-    downloaded_files = []
-
-    # Iterate through the URLs and download the CSV files
-    for key, url in csv_urls.items():
-        try:
-            # Send GET request using the shared httpx client
-            response = client.get(url, timeout=10)
-            response.raise_for_status()  # Raise exception for error status codes
-            
-            # Construct the full output path for the file
-            file_path = f"{output_path}/{key}.csv"
-            
-            # Write the content to the file with a larger chunk size for better performance
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
-                
-            downloaded_files.append(file_path)
-            logger.info(f"Successfully downloaded {key} master contract")
-            
-        except Exception as e:
-            logger.error(f"Failed to download {key} from {url}. Error: {e}")
+
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    download = download_contract_files('aliceblue', csv_urls)
+    if download.current:
+        return download
+
+    for key, item in download.available_files().items():
+        shutil.copyfile(item.path, os.path.join(output_path, f"{key}.csv"))
+
+    return download
 
     
 def reformat_symbol_detail(s):
@@ -167,6 +103,14 @@ def reformat_symbol_detail(s):
     # Assuming the format is consistent and always "Name DD Mon YY FUT"
     return f"{parts[0]}{parts[3]}{parts[2].upper()}{parts[1]}{parts[4]}"
 
+def format_option_symbol(df):
+    """
+    Builds the option symbol prefix (Symbol + DDMMMYY + strike) for every row.
+    Rows without an expiry use the NOEXP placeholder.
+    """
+    expiry = df['Expiry Date'].dt.strftime('%d%b%y').str.upper().fillna('NOEXP')
+    return df['Symbol'].astype(str) + expiry + format_strike(df['Strike Price'])
+
 def process_aliceblue_nse_csv(path):
     """
     Processes the aliceblue CSV file to fit the existing database schema and performs exchange name mapping.
@@ -241,29 +185,17 @@ def process_aliceblue_nfo_csv(path):
     # Convert 'Expiry Date' column to datetime format with error handling
     df['Expiry Date'] = pd.to_datetime(df['Expiry Date'], errors='coerce')  # 'coerce' will set invalid dates to NaT
 
-    # Define the function to reformat symbol details
-    def reformat_symbol_detail(row):
-        if row['Strike Price'].is_integer():
-            Strike_price = int(row['Strike Price'])
-        else:
-            Strike_price = float(row['Strike Price'])
-        
-        # Check if the date is NaT (Not a Time) before formatting
-        if pd.notna(row['Expiry Date']):
-            date_str = row['Expiry Date'].strftime('%d%b%y').upper()
-        else:
-            date_str = 'NOEXP'  # Use a placeholder for missing dates
-            
-        return f"{row['Symbol']}{date_str}{Strike_price}"
+    # Symbol, expiry and strike shared by the option rows
+    option_symbol = format_option_symbol(df)
 
     # Apply the function to rows where 'Option Type' is 'XX'
     df.loc[df['Option Type'] == 'XX', 'symbol'] = df['Trading Symbol'] + 'UT'
 
     # Apply the function to rows where 'Option Type' is 'CE'
-    df.loc[df['Option Type'] == 'CE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'CE', axis=1)
+    df.loc[df['Option Type'] == 'CE', 'symbol'] = option_symbol + 'CE'
 
     # Apply the function to rows where 'Option Type' is 'PE'
-    df.loc[df['Option Type'] == 'PE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'PE', axis=1)
+    df.loc[df['Option Type'] == 'PE', 'symbol'] = option_symbol + 'PE'
 
     # Create token_df with the relevant columns
     token_df = df[['symbol']].copy()
@@ -275,7 +207,7 @@ def process_aliceblue_nfo_csv(path):
     token_df['token'] = df['Token'].values
 
     # Convert 'Expiry Date' to desired format with NaT handling
-    token_df['expiry'] = df['Expiry Date'].apply(lambda x: x.strftime('%d-%b-%y').upper() if pd.notna(x) else None)
+    token_df['expiry'] = df['Expiry Date'].dt.strftime('%d-%b-%y').str.upper()
     token_df['strike'] = df['Strike Price'].values
     token_df['lotsize'] = df['Lot Size'].values
     token_df['instrumenttype'] = df['Option Type'].map({
@@ -303,29 +235,17 @@ def process_aliceblue_cds_csv(path):
         # Convert 'Expiry Date' column to datetime format
     df['Expiry Date'] = pd.to_datetime(df['Expiry Date'])
 
-    # Define the function to reformat symbol details
-    def reformat_symbol_detail(row):
-        if row['Strike Price'].is_integer():
-            Strike_price = int(row['Strike Price'])
-        else:
-            Strike_price = float(row['Strike Price'])
-        
-        # Check if the date is NaT (Not a Time) before formatting
-        if pd.notna(row['Expiry Date']):
-            date_str = row['Expiry Date'].strftime('%d%b%y').upper()
-        else:
-            date_str = 'NOEXP'  # Use a placeholder for missing dates
-            
-        return f"{row['Symbol']}{date_str}{Strike_price}"
+    # Symbol, expiry and strike shared by the option rows
+    option_symbol = format_option_symbol(df)
 
     # Apply the function to rows where 'Option Type' is 'XX'
     df.loc[df['Option Type'] == 'XX', 'symbol'] = df['Trading Symbol'] + 'UT'
 
     # Apply the function to rows where 'Option Type' is 'CE'
-    df.loc[df['Option Type'] == 'CE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'CE', axis=1)
+    df.loc[df['Option Type'] == 'CE', 'symbol'] = option_symbol + 'CE'
 
     # Apply the function to rows where 'Option Type' is 'PE'
-    df.loc[df['Option Type'] == 'PE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'PE', axis=1)
+    df.loc[df['Option Type'] == 'PE', 'symbol'] = option_symbol + 'PE'
 
     # Create token_df with the relevant columns
     token_df = df[['symbol']].copy()
@@ -337,7 +257,7 @@ def process_aliceblue_cds_csv(path):
     token_df['token'] = df['Token'].values
 
     # Convert 'Expiry Date' to desired format with NaT handling
-    token_df['expiry'] = df['Expiry Date'].apply(lambda x: x.strftime('%d-%b-%y').upper() if pd.notna(x) else None)
+    token_df['expiry'] = df['Expiry Date'].dt.strftime('%d-%b-%y').str.upper()
     token_df['strike'] = df['Strike Price'].values
     token_df['lotsize'] = df['Lot Size'].values
     token_df['instrumenttype'] = df['Option Type'].map({
@@ -387,7 +307,7 @@ def process_aliceblue_bfo_csv(path):
     token_df['token'] = df['Token'].values
 
     # Convert 'Expiry Date' to desired format with NaT handling
-    token_df['expiry'] = df['Expiry Date'].apply(lambda x: x.strftime('%d-%b-%y').upper() if pd.notna(x) else None)
+    token_df['expiry'] = df['Expiry Date'].dt.strftime('%d-%b-%y').str.upper()
     token_df['strike'] = df['Strike Price'].values
     token_df['lotsize'] = df['Lot Size'].values
     token_df['instrumenttype'] = df['Option Type'].map({
@@ -420,20 +340,8 @@ def process_aliceblue_mcx_csv(path):
 
     df['Expiry Date'] = pd.to_datetime(df['Expiry Date'])
 
-    # Define the function to reformat symbol details
-    def reformat_symbol_detail(row):
-        if row['Strike Price'].is_integer():
-            Strike_price = int(row['Strike Price'])
-        else:
-            Strike_price = float(row['Strike Price'])
-        
-        # Check if the date is NaT (Not a Time) before formatting
-        if pd.notna(row['Expiry Date']):
-            date_str = row['Expiry Date'].strftime('%d%b%y').upper()
-        else:
-            date_str = 'NOEXP'  # Use a placeholder for missing dates
-            
-        return f"{row['Symbol']}{date_str}{Strike_price}"
+    # Symbol, expiry and strike shared by the option rows
+    option_symbol = format_option_symbol(df)
 
     df.loc[df['Instrument Type'] == 'FUTCOM', 'Option Type'] = 'XX'
     df.loc[df['Instrument Type'] == 'FUTIDX', 'Option Type'] = 'XX'
@@ -442,10 +350,10 @@ def process_aliceblue_mcx_csv(path):
     df.loc[df['Option Type'] == 'XX', 'symbol'] = df['Trading Symbol'] + 'FUT'
 
     # Apply the function to rows where 'Option Type' is 'CE'
-    df.loc[df['Option Type'] == 'CE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'CE', axis=1)
+    df.loc[df['Option Type'] == 'CE', 'symbol'] = option_symbol + 'CE'
 
     # Apply the function to rows where 'Option Type' is 'PE'
-    df.loc[df['Option Type'] == 'PE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'PE', axis=1)
+    df.loc[df['Option Type'] == 'PE', 'symbol'] = option_symbol + 'PE'
 
     # Create token_df with the relevant columns
     token_df = df[['symbol']].copy()
@@ -457,7 +365,7 @@ def process_aliceblue_mcx_csv(path):
     token_df['token'] = df['Token'].values
 
     # Convert 'Expiry Date' to desired format with NaT handling
-    token_df['expiry'] = df['Expiry Date'].apply(lambda x: x.strftime('%d-%b-%y').upper() if pd.notna(x) else None)
+    token_df['expiry'] = df['Expiry Date'].dt.strftime('%d-%b-%y').str.upper()
     token_df['strike'] = df['Strike Price'].values
     token_df['lotsize'] = df['Lot Size'].values
     token_df['instrumenttype'] = df['Option Type'].map({
@@ -487,20 +395,8 @@ def process_aliceblue_bcd_csv(path):
         # Convert 'Expiry Date' column to datetime format
     df['Expiry Date'] = pd.to_datetime(df['Expiry Date'])
 
-    # Define the function to reformat symbol details
-    def reformat_symbol_detail(row):
-        if row['Strike Price'].is_integer():
-            Strike_price = int(row['Strike Price'])
-        else:
-            Strike_price = float(row['Strike Price'])
-        
-        # Check if the date is NaT (Not a Time) before formatting
-        if pd.notna(row['Expiry Date']):
-            date_str = row['Expiry Date'].strftime('%d%b%y').upper()
-        else:
-            date_str = 'NOEXP'  # Use a placeholder for missing dates
-            
-        return f"{row['Symbol']}{date_str}{Strike_price}"
+    # Symbol, expiry and strike shared by the option rows
+    option_symbol = format_option_symbol(df)
 
     df.loc[df['Instrument Type'] == 'FUTCUR', 'Option Type'] = 'XX'
     df.loc[df['Instrument Type'] == 'FUTCUR', 'Strike Price'] = 1
@@ -509,10 +405,10 @@ def process_aliceblue_bcd_csv(path):
     df.loc[df['Option Type'] == 'XX', 'symbol'] = df['Trading Symbol'] + 'UT'
 
     # Apply the function to rows where 'Option Type' is 'CE'
-    df.loc[df['Option Type'] == 'CE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'CE', axis=1)
+    df.loc[df['Option Type'] == 'CE', 'symbol'] = option_symbol + 'CE'
 
     # Apply the function to rows where 'Option Type' is 'PE'
-    df.loc[df['Option Type'] == 'PE', 'symbol'] = df.apply(lambda row: reformat_symbol_detail(row) + 'PE', axis=1)
+    df.loc[df['Option Type'] == 'PE', 'symbol'] = option_symbol + 'PE'
 
     # Create token_df with the relevant columns
     token_df = df[['symbol']].copy()
@@ -524,7 +420,7 @@ def process_aliceblue_bcd_csv(path):
     token_df['token'] = df['Token'].values
 
     # Convert 'Expiry Date' to desired format with NaT handling
-    token_df['expiry'] = df['Expiry Date'].apply(lambda x: x.strftime('%d-%b-%y').upper() if pd.notna(x) else None)
+    token_df['expiry'] = df['Expiry Date'].dt.strftime('%d-%b-%y').str.upper()
     token_df['strike'] = df['Strike Price'].values
     token_df['lotsize'] = df['Lot Size'].values
     token_df['instrumenttype'] = df['Option Type'].map({
@@ -595,24 +491,30 @@ def master_contract_download():
 
     output_path = 'tmp'
     try:
-        download_csv_aliceblue_data(output_path)
-        delete_symtoken_table()
+        download = download_csv_aliceblue_data(output_path)
+        if download.current:
+            logger.info("AliceBlue master contract unchanged since last load, skipping reload")
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
+
+        loader = MasterContractLoader()
         token_df = process_aliceblue_nse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_bse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_nfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_cds_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_mcx_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_bfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_bcd_csv(output_path) 
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_aliceblue_indices_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
+        mark_contract_loaded(download)
         delete_aliceblue_temp_data(output_path)
         
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
@@ -2,89 +2,42 @@
 
 import os
 import pandas as pd
-import requests
 import gzip
 import shutil
-from datetime import datetime
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader
+from utils.contract_downloader import download_contract_files, mark_contract_loaded
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 def download_json_angel_data(url, output_path):
     """
-    Downloads a JSON file from the specified URL and saves it to the specified path.
+    Downloads the JSON file conditionally (ETag/Last-Modified) and saves it to the specified path.
+
+    Returns the download result; when the contract already loaded in the
+    database is unchanged nothing is written and ``current`` is set.
     """
     logger.info("Downloading JSON data")
-    response = requests.get(url, timeout=10)  # timeout after 10 seconds
-    if response.status_code == 200:  # Successful download
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+    download = download_contract_files('angel', {'ALL': url})
+    if download.current:
+        return download
+
+    item = download.files['ALL']
+    if item.available:
+        shutil.copyfile(item.path, output_path)
         logger.info("Download complete")
     else:
-        logger.error(f"Failed to download data. Status code: {response.status_code}")
+        logger.error(f"Failed to download data: {item.error}")
+    return download
 
 
 def reformat_symbol(row):
@@ -107,13 +60,11 @@ def reformat_symbol(row):
     return symbol
 
 
-def convert_date(date_str):
+def convert_date(expiry):
     # Convert from '19MAR2024' to '19-MAR-24'
-    try:
-        return datetime.strptime(date_str, '%d%b%Y').strftime('%d-%b-%y')
-    except ValueError:
-        # Return the original date if it doesn't match the format
-        return date_str
+    parsed = pd.to_datetime(expiry, format='%d%b%Y', errors='coerce')
+    # Keep the original date where it doesn't match the format
+    return parsed.dt.strftime('%d-%b-%y').fillna(expiry)
 
 def process_angel_json(path):
     """
@@ -158,7 +109,7 @@ def process_angel_json(path):
     
     
     # Assuming the 'expiry' field in the JSON is in the format '19MAR2024'
-    df['expiry'] = df['expiry'].apply(lambda x: convert_date(x) if pd.notnull(x) else x)
+    df['expiry'] = convert_date(df['expiry'])
     df['expiry'] = df['expiry'].str.upper()
 
     
@@ -215,15 +166,21 @@ def master_contract_download():
     url = 'https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json'
     output_path = 'tmp/angel.json'
     try:
-        download_json_angel_data(url,output_path)
+        download = download_json_angel_data(url, output_path)
+        if download.current:
+            logger.info("Angel master contract unchanged since last load, skipping reload")
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
+
         token_df = process_angel_json(output_path)
         delete_angel_temp_data(output_path)
         #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
         
         #token_df = token_df.drop_duplicates(subset='symbol', keep='first')
 
-        delete_symtoken_table()  # Consider the implications of this action
-        copy_from_dataframe(token_df)
+        loader = MasterContractLoader()
+        loader.add(token_df)
+        loader.commit()
+        mark_contract_loaded(download)
                 
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
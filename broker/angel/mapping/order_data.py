@@ -1,9 +1,59 @@
 import json
-from database.token_db import get_symbol, get_oa_symbol 
+from database.token_db import get_oa_symbol
+from utils.book_mapping import (
+    Field, FieldMap, map_products, order_statistics, resolve_oa_symbols, resolve_symbols, transform_rows
+)
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+PRODUCT_RULES = {
+    'DELIVERY': ('CNC', ('NSE', 'BSE')),
+    'INTRADAY': ('MIS', None),
+    'CARRYFORWARD': ('NRML', ('NFO', 'MCX', 'BFO', 'CDS')),
+}
+
+ORDER_TYPE_MAP = {
+    'STOPLOSS_LIMIT': 'SL',
+    'STOPLOSS_MARKET': 'SL-M',
+}
+
+ORDER_FIELDS = FieldMap({
+    "symbol": "tradingsymbol",
+    "exchange": "exchange",
+    "action": "transactiontype",
+    "quantity": Field("quantity", 0),
+    "price": Field("averageprice", 0.0),
+    "trigger_price": Field("triggerprice", 0.0),
+    "pricetype": Field("ordertype", values=ORDER_TYPE_MAP),
+    "product": "producttype",
+    "orderid": "orderid",
+    "order_status": "status",
+    "timestamp": "updatetime",
+})
+
+TRADE_FIELDS = FieldMap({
+    "symbol": "tradingsymbol",
+    "exchange": "exchange",
+    "product": "producttype",
+    "action": "transactiontype",
+    "quantity": Field("quantity", 0),
+    "average_price": Field("fillprice", 0.0),
+    "trade_value": Field("tradevalue", 0),
+    "orderid": "orderid",
+    "timestamp": "filltime",
+})
+
+POSITION_FIELDS = FieldMap({
+    "symbol": "tradingsymbol",
+    "exchange": "exchange",
+    "product": "producttype",
+    "quantity": Field("netqty", 0),
+    "average_price": Field("avgnetprice", 0.0),
+    "ltp": Field("ltp", 0.0),
+    "pnl": Field("pnl", 0.0),
+})
+
 
 def map_order_data(order_data):
     """
@@ -24,33 +74,15 @@ def map_order_data(order_data):
         order_data = {}  # or set it to an empty list if it's supposed to be a list
     else:
         order_data = order_data['data']
-        logger.info(f"{order_data}")
         
 
 
     if order_data:
-        for order in order_data:
-            # Extract the instrument_token and exchange for the current order
-            symboltoken = order['symboltoken']
-            exchange = order['exchange']
-            
-            # Use the get_symbol function to fetch the symbol from the database
-            symbol_from_db = get_symbol(symboltoken, exchange)
-            
-            # Check if a symbol was found; if so, update the trading_symbol in the current order
-            if symbol_from_db:
-                order['tradingsymbol'] = symbol_from_db
-                if (order['exchange'] == 'NSE' or order['exchange'] == 'BSE') and order['producttype'] == 'DELIVERY':
-                    order['producttype'] = 'CNC'
-                               
-                elif order['producttype'] == 'INTRADAY':
-                    order['producttype'] = 'MIS'
-                
-                elif order['exchange'] in ['NFO', 'MCX', 'BFO', 'CDS'] and order['producttype'] == 'CARRYFORWARD':
-                    order['producttype'] = 'NRML'
-            else:
-                logger.info(f"Symbol not found for token {symboltoken} and exchange {exchange}. Keeping original trading symbol.")
-                
+        # Resolve the symbols of the whole book in one lookup; products are
+        # only translated for rows whose symbol was found
+        found = resolve_symbols(order_data, 'symboltoken', 'exchange', 'tradingsymbol')
+        map_products(order_data, 'producttype', 'exchange', PRODUCT_RULES, mask=found)
+
     return order_data
 
 
@@ -65,73 +97,11 @@ def calculate_order_statistics(order_data):
     Returns:
     - A dictionary containing counts of different types of orders.
     """
-    # Initialize counters
-    total_buy_orders = total_sell_orders = 0
-    total_completed_orders = total_open_orders = total_rejected_orders = 0
-
-    if order_data:
-        for order in order_data:
-            # Count buy and sell orders
-            if order['transactiontype'] == 'BUY':
-                total_buy_orders += 1
-            elif order['transactiontype'] == 'SELL':
-                total_sell_orders += 1
-            
-            # Count orders based on their status
-            if order['status'] == 'complete':
-                total_completed_orders += 1
-            elif order['status'] == 'open':
-                total_open_orders += 1
-            elif order['status'] == 'rejected':
-                total_rejected_orders += 1
-
-    # Compile and return the statistics
-    return {
-        'total_buy_orders': total_buy_orders,
-        'total_sell_orders': total_sell_orders,
-        'total_completed_orders': total_completed_orders,
-        'total_open_orders': total_open_orders,
-        'total_rejected_orders': total_rejected_orders
-    }
+    return order_statistics(order_data, 'transactiontype', 'status', 'complete', 'open', 'rejected')
 
 
 def transform_order_data(orders):
-    # Directly handling a dictionary assuming it's the structure we expect
-    if isinstance(orders, dict):
-        # Convert the single dictionary into a list of one dictionary
-        orders = [orders]
-
-    transformed_orders = []
-    
-    for order in orders:
-        # Make sure each item is indeed a dictionary
-        if not isinstance(order, dict):
-            logger.warning(f"Warning: Expected a dict, but found a {type(order)}. Skipping this item.")
-            continue
-
-        ordertype = order.get("ordertype", "")
-        if ordertype == 'STOPLOSS_LIMIT':
-            ordertype = 'SL'
-        if ordertype == 'STOPLOSS_MARKET':
-            ordertype = 'SL-M'
-
-        transformed_order = {
-            "symbol": order.get("tradingsymbol", ""),
-            "exchange": order.get("exchange", ""),
-            "action": order.get("transactiontype", ""),
-            "quantity": order.get("quantity", 0),
-            "price": order.get("averageprice", 0.0),
-            "trigger_price": order.get("triggerprice", 0.0),
-            "pricetype": ordertype,
-            "product": order.get("producttype", ""),
-            "orderid": order.get("orderid", ""),
-            "order_status": order.get("status", ""),
-            "timestamp": order.get("updatetime", "")
-        }
-
-        transformed_orders.append(transformed_order)
-
-    return transformed_orders
+    return transform_rows(orders, ORDER_FIELDS)
 
 
 
@@ -158,49 +128,16 @@ def map_trade_data(trade_data):
 
 
     if trade_data:
-        for order in trade_data:
-            # Extract the instrument_token and exchange for the current order
-            symbol = order['tradingsymbol']
-            exchange = order['exchange']
-            
-            # Use the get_symbol function to fetch the symbol from the database
-            symbol_from_db = get_oa_symbol(symbol, exchange)
-            
-            # Check if a symbol was found; if so, update the trading_symbol in the current order
-            if symbol_from_db:
-                order['tradingsymbol'] = symbol_from_db
-                if (order['exchange'] == 'NSE' or order['exchange'] == 'BSE') and order['producttype'] == 'DELIVERY':
-                    order['producttype'] = 'CNC'
-                               
-                elif order['producttype'] == 'INTRADAY':
-                    order['producttype'] = 'MIS'
-                
-                elif order['exchange'] in ['NFO', 'MCX', 'BFO', 'CDS'] and order['producttype'] == 'CARRYFORWARD':
-                    order['producttype'] = 'NRML'
-            else:
-                logger.info(f"Unable to find the symbol {symbol} and exchange {exchange}. Keeping original trading symbol.")
-                
+        found = resolve_oa_symbols(trade_data, 'tradingsymbol', 'exchange')
+        map_products(trade_data, 'producttype', 'exchange', PRODUCT_RULES, mask=found)
+
     return trade_data
 
 
 
 
 def transform_tradebook_data(tradebook_data):
-    transformed_data = []
-    for trade in tradebook_data:
-        transformed_trade = {
-            "symbol": trade.get('tradingsymbol', ''),
-            "exchange": trade.get('exchange', ''),
-            "product": trade.get('producttype', ''),
-            "action": trade.get('transactiontype', ''),
-            "quantity": trade.get('quantity', 0),
-            "average_price": trade.get('fillprice', 0.0),
-            "trade_value": trade.get('tradevalue', 0),
-            "orderid": trade.get('orderid', ''),
-            "timestamp": trade.get('filltime', '')
-        }
-        transformed_data.append(transformed_trade)
-    return transformed_data
+    return transform_rows(tradebook_data, TRADE_FIELDS)
 
 
 def map_position_data(position_data):
@@ -208,19 +145,7 @@ def map_position_data(position_data):
 
 
 def transform_positions_data(positions_data):
-    transformed_data = []
-    for position in positions_data:
-        transformed_position = {
-            "symbol": position.get('tradingsymbol', ''),
-            "exchange": position.get('exchange', ''),
-            "product": position.get('producttype', ''),
-            "quantity": position.get('netqty', 0),
-            "average_price": position.get('avgnetprice', 0.0),
-            "ltp": position.get('ltp', 0.0),  
-            "pnl": position.get('pnl', 0.0),  
-        }
-        transformed_data.append(transformed_position)
-    return transformed_data
+    return transform_rows(positions_data, POSITION_FIELDS)
 
 def transform_holdings_data(holdings_data):
     transformed_data = []
@@ -14,8 +14,9 @@ import os
 # Add parent directory to path to allow imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../../'))
 
-from websocket_proxy.base_adapter import BaseBrokerWebSocketAdapter
+from websocket_proxy.base_adapter import BaseBrokerWebSocketAdapter, MODE_NAMES
 from websocket_proxy.mapping import SymbolMapper
+from utils.logging import HotPathLogger
 from .angel_mapping import AngelExchangeMapper, AngelCapabilityRegistry
 
 class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
@@ -24,6 +25,8 @@ class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
     def __init__(self):
         super().__init__()
         self.logger = logging.getLogger("angel_websocket")
+        # Rate limited per-topic/per-token logging for the tick path
+        self.hot_logger = HotPathLogger(self.logger)
         self.ws_client = None
         self.user_id = None
         self.broker_name = "angel"
@@ -188,6 +191,9 @@ class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
         
         # Store subscription for reconnection
         with self.lock:
+            self.subscription_registry.add(
+                (token, token_list[0]["exchangeType"]), symbol, exchange, mode
+            )
             self.subscriptions[correlation_id] = {
                 'symbol': symbol,
                 'exchange': exchange,
@@ -253,6 +259,7 @@ class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
         with self.lock:
             if correlation_id in self.subscriptions:
                 del self.subscriptions[correlation_id]
+            self.subscription_registry.remove((token, token_list[0]["exchangeType"]), mode)
         
         # Unsubscribe if connected
         if self.connected and self.ws_client:
@@ -303,12 +310,9 @@ class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
     def _on_data(self, wsapp, message) -> None:
         """Callback for market data from the WebSocket"""
         try:
-            # Debug log the raw message data to see what we're actually receiving
-            self.logger.info(f"RAW ANGEL DATA: Type: {type(message)}, Data: {message}")
-            
             # Check if we're getting binary data as per Angel's documentation
             if isinstance(message, bytes) or isinstance(message, bytearray):
-                self.logger.info(f"Received binary data of length: {len(message)}")
+                self.hot_logger.info('binary', "Received binary data of length: %s", len(message))
                 # We need to parse the binary data according to Angel's format
                 # For now, we'll log what we have and exit early
                 return
@@ -322,30 +326,23 @@ class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
             token = message.get('token')
             exchange_type = message.get('exchange_type')
             
-            self.logger.info(f"Processing message with token: {token}, exchange_type: {exchange_type}")
-            
-            # Find the subscription that matches this token
-            subscription = None
-            with self.lock:
-                for sub in self.subscriptions.values():
-                    if sub['token'] == token and AngelExchangeMapper.get_exchange_type(sub['brexchange']) == exchange_type:
-                        subscription = sub
-                        break
-            
-            if not subscription:
-                self.logger.warning(f"Received data for unsubscribed token: {token}")
+            # Find the subscription that matches this token (one dict lookup)
+            subscriptions = self.subscription_registry.get_all((token, exchange_type))
+            if not subscriptions:
+                self.hot_logger.warning(token, "Received data for unsubscribed token: %s", token)
                 return
             
-            # Create topic for ZeroMQ
-            symbol = subscription['symbol']
-            exchange = subscription['exchange']
-            mode = subscription['mode']
-            
             # Important: Always use the actual mode from the message rather than the subscription
             # This ensures data is published with the correct mode identifier
             actual_msg_mode = message.get('subscription_mode')
-            mode_str = {1: 'LTP', 2: 'QUOTE', 3: 'DEPTH'}[actual_msg_mode]  # Mode 3 is Snap Quote (includes depth data)
-            topic = f"{exchange}_{symbol}_{mode_str}"
+            subscription = next((sub for sub in subscriptions if sub.mode == actual_msg_mode), subscriptions[0])
+            
+            # Create topic for ZeroMQ
+            symbol = subscription.symbol
+            exchange = subscription.exchange
+            mode = subscription.mode
+            mode_str = MODE_NAMES[actual_msg_mode]  # Mode 3 is Snap Quote (includes depth data)
+            topic = subscription.topics[mode_str]
             
             # Normalize the data based on the actual message mode, not subscription mode
             market_data = self._normalize_market_data(message, actual_msg_mode)
@@ -357,8 +354,8 @@ class AngelWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 'mode': mode,
                 'timestamp': int(time.time() * 1000)  # Current timestamp in ms
             })
-            # Log the market data we're sendingAdd commentMore actions
-            self.logger.info(f"Publishing market data: {market_data}")
+            # Sampled per topic; formatted only when DEBUG is enabled
+            self.hot_logger.debug(topic, "Publishing market data to %s: %s (raw: %s)", topic, market_data, message)
             
             # Publish to ZeroMQ
             self.publish_market_data(topic, market_data)
@@ -11,75 +11,22 @@ import io
 import csv
 from datetime import datetime
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
 from utils.httpx_client import get_httpx_client
 from broker.compositedge.baseurl import MARKET_DATA_URL
+from database.master_contract_ingest import MasterContractLoader, build_xts_symbols
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 def download_csv_compositedge_data(output_path):
     logger.info("Downloading Master Contract CSV Files")
     exchange_segments = ["NSECM", "NSECD", "NSEFO", "BSECM", "BSEFO", "MCXFO"]
@@ -209,9 +156,7 @@ def process_compositedge_bse_csv(path):
     token_df['name'] = df['Name']
     token_df['exchange'] = df['ExchangeSegment'].map({
             "BSECM": "BSE"})
-    token_df['exchange'] = df.apply(
-    lambda row: "BSE_INDEX" if row['Series'] == "SPOT" else "BSE", axis=1
-    )
+    token_df['exchange'] = np.where(df['Series'] == "SPOT", "BSE_INDEX", "BSE")
     token_df['brexchange'] = df['ExchangeSegment']
     token_df['token'] = df['ExchangeInstrumentID']
     token_df['expiry'] = ''
@@ -238,13 +183,7 @@ def process_compositedge_nfo_csv(path):
 
     df["StrikePrice"] = pd.to_numeric(df["StrikePrice"], errors='coerce').fillna(1.0)
 
-    df["symbol"] = df.apply(
-        lambda row: f"{row['Name']}"
-                f"{row['ContractExpiration'].strftime('%d%b%y').upper()}"
-                f"{'' if row['OptionType'] == 1 else (str(int(float(row['StrikePrice']))) if float(row['StrikePrice']) == int(float(row['StrikePrice'])) else str(row['StrikePrice'])) if pd.notna(row['StrikePrice']) else ''}"
-                f"{'FUT' if row['OptionType'] == 1 else 'CE' if row['OptionType'] == 3 else 'PE'}",
-        axis=1
-        )
+    df["symbol"] = build_xts_symbols(df)
 
     # Create token_df with the relevant columns
     token_df = df[['symbol']].copy()
@@ -287,13 +226,7 @@ def process_compositedge_cds_csv(path):
     df["StrikePrice"] = pd.to_numeric(df["StrikePrice"], errors='coerce').fillna(1.0)
 
     
-    df["symbol"] = df.apply(
-        lambda row: f"{row['Name']}"
-                f"{row['ContractExpiration'].strftime('%d%b%y').upper()}"
-                f"{'' if row['OptionType'] == 1 else (str(int(float(row['StrikePrice']))) if float(row['StrikePrice']) == int(float(row['StrikePrice'])) else str(row['StrikePrice'])) if pd.notna(row['StrikePrice']) else ''}"
-                f"{'FUT' if row['OptionType'] == 1 else 'CE' if row['OptionType'] == 3 else 'PE'}",
-        axis=1
-        )
+    df["symbol"] = build_xts_symbols(df)
 
     # Generate symbols based on instrument type
     # df['symbol'] = df.apply(lambda x: 
@@ -318,8 +251,10 @@ def process_compositedge_cds_csv(path):
     token_df['expiry'] = df['ContractExpiration'].dt.strftime('%d-%b-%y').str.upper()
     token_df['strike'] = df['StrikePrice'].values
     token_df['lotsize'] = df['LotSize'].values
-    token_df['instrumenttype'] = token_df['symbol'].apply(
-       lambda x: 'FUT' if 'FUT' in x else ('PE' if 'PE' in x else 'CE'))
+    token_df['instrumenttype'] = np.select(
+        [token_df['symbol'].str.contains('FUT', regex=False, na=False),
+         token_df['symbol'].str.contains('PE', regex=False, na=False)],
+        ['FUT', 'PE'], 'CE')
     # token_df['instrumenttype'] = df['OptionType'].map({
     #        1: 'FUT',
     #        872604 : 'FUT',
@@ -346,13 +281,7 @@ def process_compositedge_bfo_csv(path):
 
     df["StrikePrice"] = pd.to_numeric(df["StrikePrice"], errors='coerce').fillna(1.0)
 
-    df["symbol"] = df.apply(
-        lambda row: f"{row['Name']}"
-                f"{row['ContractExpiration'].strftime('%d%b%y').upper()}"
-                f"{'' if row['OptionType'] == 1 else (str(int(float(row['StrikePrice']))) if float(row['StrikePrice']) == int(float(row['StrikePrice'])) else str(row['StrikePrice'])) if pd.notna(row['StrikePrice']) else ''}"
-                f"{'FUT' if row['OptionType'] == 1 else 'CE' if row['OptionType'] == 3 else 'PE'}",
-        axis=1
-        )
+    df["symbol"] = build_xts_symbols(df)
 
         
     token_df = df[['symbol']].copy()
@@ -393,13 +322,7 @@ def process_compositedge_mcx_csv(path):
     df['ContractExpiration'] = pd.to_datetime(df['ContractExpiration'])
     df["StrikePrice"] = pd.to_numeric(df["StrikePrice"], errors='coerce').fillna(1.0)
     
-    df["symbol"] = df.apply(
-        lambda row: f"{row['Name']}"
-                f"{row['ContractExpiration'].strftime('%d%b%y').upper()}"
-                f"{'' if row['OptionType'] == 1 else (str(int(float(row['StrikePrice']))) if float(row['StrikePrice']) == int(float(row['StrikePrice'])) else str(row['StrikePrice'])) if pd.notna(row['StrikePrice']) else ''}"
-                f"{'FUT' if row['OptionType'] == 1 else 'CE' if row['OptionType'] == 3 else 'PE'}",
-        axis=1
-        )
+    df["symbol"] = build_xts_symbols(df)
 
     
     # Create token_df with the relevant columns
@@ -471,25 +394,26 @@ def master_contract_download():
     output_path = 'tmp'
     try:
         download_csv_compositedge_data(output_path)
-        delete_symtoken_table()
+        loader = MasterContractLoader()
         token_df = process_compositedge_nse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_compositedge_bse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_compositedge_nfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_compositedge_cds_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_compositedge_mcx_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_compositedge_bfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
 
         # Fetch and Process Index Data
         index_data = fetch_index_list()
         if index_data:
             index_df = process_index_data(index_data)
-            copy_from_dataframe(index_df)
+            loader.add(index_df)
+        loader.commit()
         
         delete_compositedge_temp_data(output_path)
         
@@ -72,6 +72,13 @@ def get_api_response(endpoint, auth, method="GET", payload=''):
 def get_order_book(auth):
     return get_api_response("/v2/orders",auth)
 
+def get_order_history(orderid, auth):
+    """Current state of one order, in the same shape as get_order_book"""
+    order = get_api_response(f"/v2/orders/{orderid}",auth)
+    if isinstance(order, dict) and 'orderId' in order:
+        return [order]
+    return order
+
 def get_trade_book(auth):
     return get_api_response("/v2/trades",auth)
 
@@ -126,8 +133,9 @@ def place_order_api(data,auth):
     res.status = res.status_code
     response_data = json.loads(res.text)
     logger.debug(f"Place order response: {response_data}")
-    if response_data:
-        orderid = response_data['orderId']
+    if response_data and isinstance(response_data, dict):
+        # Error responses carry errorType/errorMessage instead of an orderId
+        orderid = response_data.get('orderId')
     else:
         orderid = None
     return res, response_data, orderid
@@ -351,7 +359,7 @@ def cancel_all_orders_api(data,auth):
     AUTH_TOKEN = auth
     order_book_response = get_order_book(AUTH_TOKEN)
     logger.debug(f"Order book for cancel all: {order_book_response}")
-    if order_book_response is None:
+    if not isinstance(order_book_response, list):
         return [], []  # Return empty lists indicating failure to retrieve the order book
 
     # Filter orders that are in 'open' or 'trigger_pending' state
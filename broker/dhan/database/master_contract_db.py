@@ -13,11 +13,10 @@ import gzip
 import io
 
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -25,66 +24,11 @@ logger = get_logger(__name__)
 
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.exception(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
-
-
-
 def download_csv_dhan_data(output_path):
 
     logger.info("Downloading Master Contract CSV Files")
@@ -112,63 +56,67 @@ def download_csv_dhan_data(output_path):
             logger.error(f"Failed to download {key} from {url}. Status code: {response.status_code}")
     
 
-def reformat_symbol(row):
-    symbol = row['SEM_CUSTOM_SYMBOL']
-    instrument_type = row['instrumenttype']
-    equity = row['SEM_INSTRUMENT_NAME']
-    expiry = row['expiry'].replace('-', '')
-    
-
-    if equity == 'EQUITY':
-        symbol = row['SEM_TRADING_SYMBOL']
-    elif equity == 'INDEX':
-        symbol = row['SEM_TRADING_SYMBOL']
-
-    elif instrument_type == 'FUT':
-        # For FUT, remove the spaces and append 'FUT' at the end
-        parts = symbol.split(' ')
-        if len(parts) == 3:  # Make sure the symbol has the correct format
-            symbol = f"{parts[0]}{expiry}{instrument_type}"
-        if len(parts) == 4:  # Make sure the symbol has the correct format
-            symbol = f"{parts[0]}{expiry}{instrument_type}"
-    elif instrument_type in ['CE', 'PE']:
-        # For CE/PE, rearrange the parts and remove spaces
-        parts = symbol.split(' ')
-        if len(parts) == 4:  # Make sure the symbol has the correct format
-            symbol = f"{parts[0]}{expiry}{parts[2]}{instrument_type}"
-        if len(parts) == 5:  # Make sure the symbol has the correct format
-            symbol = f"{parts[0]}{expiry}{parts[3]}{instrument_type}"
-    
-    else:
-        symbol = symbol  # No change for other instrument types
-
-    return symbol
-
-# Define the function to apply conditions
-def assign_values(row):
-    if row['SEM_EXM_EXCH_ID'] == 'NSE' and row['SEM_INSTRUMENT_NAME'] == 'EQUITY':
-        return 'NSE', 'NSE_EQ', 'EQ'
-    elif row['SEM_EXM_EXCH_ID'] == 'BSE' and row['SEM_INSTRUMENT_NAME'] == 'EQUITY':
-        return 'BSE', 'BSE_EQ', 'EQ'
-    elif row['SEM_EXM_EXCH_ID'] == 'NSE' and row['SEM_INSTRUMENT_NAME'] == 'INDEX':
-        return 'NSE_INDEX', 'IDX_I', 'INDEX'
-    elif row['SEM_EXM_EXCH_ID'] == 'BSE' and row['SEM_INSTRUMENT_NAME'] == 'INDEX':
-        return 'BSE_INDEX', 'IDX_I', 'INDEX'
-    elif row['SEM_EXM_EXCH_ID'] == 'MCX' and row['SEM_INSTRUMENT_NAME'] in ['FUTIDX','FUTCOM','OPTFUT']:
-        return 'MCX', 'MCX_COMM', row['SEM_OPTION_TYPE'] if 'OPT' in row['SEM_INSTRUMENT_NAME'] else 'FUT'
-    
-    elif row['SEM_EXM_EXCH_ID'] == 'NSE' and row['SEM_INSTRUMENT_NAME'] in ['FUTIDX', 'FUTSTK', 'OPTIDX', 'OPTSTK','OPTFUT']:
-        return 'NFO', 'NSE_FNO', row['SEM_OPTION_TYPE'] if 'OPT' in row['SEM_INSTRUMENT_NAME'] else 'FUT'
-    elif row['SEM_EXM_EXCH_ID'] == 'NSE' and row['SEM_INSTRUMENT_NAME'] in ['FUTCUR', 'OPTCUR']:
-        return 'CDS', 'NSE_CURRENCY', row['SEM_OPTION_TYPE'] if 'OPT' in row['SEM_INSTRUMENT_NAME'] else 'FUT'
-    
-    elif row['SEM_EXM_EXCH_ID'] == 'BSE' and row['SEM_INSTRUMENT_NAME'] in ['FUTIDX', 'FUTSTK','OPTIDX', 'OPTSTK']:
-        return 'BFO', 'BSE_FNO', row['SEM_OPTION_TYPE'] if 'OPT' in row['SEM_INSTRUMENT_NAME'] else 'FUT'
-    elif row['SEM_EXM_EXCH_ID'] == 'BSE' and row['SEM_INSTRUMENT_NAME'] in ['FUTCUR', 'OPTCUR']:
-        return 'BCD', 'BSE_CURRENCY', row['SEM_OPTION_TYPE'] if 'OPT' in row['SEM_INSTRUMENT_NAME'] else 'FUT'
-  
-    else:
-        return 'Unknown', 'Unknown', 'Unknown'
+def reformat_symbol(df):
+    """
+    Builds OpenAlgo symbols from Dhan's custom symbols, e.g.
+    'NIFTY 28 MAR FUT' -> 'NIFTY28MAR24FUT' and 'NIFTY 28 MAR 22000 CALL' -> 'NIFTY28MAR2422000CE'.
+    Equities and indices keep the trading symbol; anything else is left unchanged.
+    """
+    symbol = df['SEM_CUSTOM_SYMBOL']
+    instrument_type = df['instrumenttype'].astype(str)
+    equity = df['SEM_INSTRUMENT_NAME']
+    expiry = df['expiry'].str.replace('-', '', regex=False)
+
+    parts = symbol.str.split(' ')
+    part_count = parts.str.len()
+    base = parts.str[0] + expiry
+    is_option = instrument_type.isin(['CE', 'PE'])
+
+    conditions = [
+        equity.isin(['EQUITY', 'INDEX']),
+        (instrument_type == 'FUT') & part_count.isin([3, 4]),
+        is_option & (part_count == 4),
+        is_option & (part_count == 5),
+    ]
+    choices = [
+        df['SEM_TRADING_SYMBOL'],
+        base + 'FUT',
+        base + parts.str[2] + instrument_type,
+        base + parts.str[3] + instrument_type,
+    ]
+    return pd.Series(np.select(conditions, choices, symbol), index=df.index)
+
+# Exchange, broker exchange and instrument type for each (exchange id, instrument name) group
+SEGMENT_RULES = [
+    ('NSE', ['EQUITY'], 'NSE', 'NSE_EQ', 'EQ'),
+    ('BSE', ['EQUITY'], 'BSE', 'BSE_EQ', 'EQ'),
+    ('NSE', ['INDEX'], 'NSE_INDEX', 'IDX_I', 'INDEX'),
+    ('BSE', ['INDEX'], 'BSE_INDEX', 'IDX_I', 'INDEX'),
+    ('MCX', ['FUTIDX', 'FUTCOM', 'OPTFUT'], 'MCX', 'MCX_COMM', None),
+    ('NSE', ['FUTIDX', 'FUTSTK', 'OPTIDX', 'OPTSTK', 'OPTFUT'], 'NFO', 'NSE_FNO', None),
+    ('NSE', ['FUTCUR', 'OPTCUR'], 'CDS', 'NSE_CURRENCY', None),
+    ('BSE', ['FUTIDX', 'FUTSTK', 'OPTIDX', 'OPTSTK'], 'BFO', 'BSE_FNO', None),
+    ('BSE', ['FUTCUR', 'OPTCUR'], 'BCD', 'BSE_CURRENCY', None),
+]
+
+def assign_values(df):
+    """
+    Maps each row to its (exchange, brexchange, instrumenttype) using SEGMENT_RULES.
+    Derivatives take the option type for options and 'FUT' otherwise; unmatched rows are 'Unknown'.
+    """
+    exchange_id = df['SEM_EXM_EXCH_ID']
+    instrument = df['SEM_INSTRUMENT_NAME']
+    derivative_type = np.where(instrument.str.contains('OPT', regex=False, na=False), df['SEM_OPTION_TYPE'], 'FUT')
+
+    conditions = [(exchange_id == exch) & instrument.isin(names) for exch, names, *_ in SEGMENT_RULES]
+    exchange = np.select(conditions, [rule[2] for rule in SEGMENT_RULES], 'Unknown')
+    brexchange = np.select(conditions, [rule[3] for rule in SEGMENT_RULES], 'Unknown')
+    instrumenttype = np.select(
+        conditions,
+        [derivative_type if rule[4] is None else rule[4] for rule in SEGMENT_RULES],
+        'Unknown',
+    )
+    return exchange, brexchange, instrumenttype
 
 def process_dhan_csv(path):
     """
@@ -204,12 +152,11 @@ def process_dhan_csv(path):
 
 
     # Apply the function
-    df[['exchange', 'brexchange', 'instrumenttype']] = df.apply(assign_values, 
-                                                                axis=1, result_type='expand')
+    df['exchange'], df['brexchange'], df['instrumenttype'] = assign_values(df)
 
       
         
-    df['symbol'] = df.apply(reformat_symbol, axis=1)
+    df['symbol'] = reformat_symbol(df)
     df['symbol'] = df['symbol'].replace('INDIA VIX', 'INDIAVIX')
 
     # List of columns to remove
@@ -249,9 +196,10 @@ def master_contract_download():
     output_path = 'tmp'
     try:
         download_csv_dhan_data(output_path)
-        delete_symtoken_table()
+        loader = MasterContractLoader()
         token_df = process_dhan_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
         delete_dhan_temp_data(output_path)
         #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
         
@@ -1,10 +1,64 @@
 import json
-from database.token_db import get_symbol 
 from broker.dhan.mapping.transform_data import map_exchange
+from utils.book_mapping import (
+    Field, FieldMap, map_products, map_values, order_statistics, resolve_symbols, transform_rows
+)
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+PRODUCT_RULES = {
+    'CNC': ('CNC', ('NSE', 'BSE')),
+    'INTRADAY': ('MIS', None),
+    'MARGIN': ('NRML', ('NFO', 'MCX', 'BFO', 'CDS')),
+}
+
+ORDER_STATUS_MAP = {
+    'TRADED': 'complete',
+    'PENDING': 'open',
+    'REJECTED': 'rejected',
+    'CANCELLED': 'cancelled',
+}
+
+ORDER_TYPE_MAP = {
+    'STOP_LOSS': 'SL',
+    'STOP_LOSS_MARKET': 'SL-M',
+}
+
+ORDER_FIELDS = FieldMap({
+    "symbol": "tradingSymbol",
+    "exchange": "exchangeSegment",
+    "action": "transactionType",
+    "quantity": Field("quantity", 0),
+    "price": Field("price", 0.0),
+    "trigger_price": Field("triggerPrice", 0.0),
+    "pricetype": Field("orderType", values=ORDER_TYPE_MAP),
+    "product": "productType",
+    "orderid": "orderId",
+    "order_status": "orderStatus",
+    "timestamp": "updateTime",
+})
+
+TRADE_FIELDS = FieldMap({
+    "symbol": "tradingSymbol",
+    "exchange": "exchangeSegment",
+    "product": "productType",
+    "action": "transactionType",
+    "quantity": Field("tradedQuantity", 0),
+    "average_price": Field("tradedPrice", 0.0),
+    "trade_value": lambda trade: trade.get('tradedQuantity', 0) * trade.get('tradedPrice', 0.0),
+    "orderid": "orderId",
+    "timestamp": "updateTime",
+})
+
+POSITION_FIELDS = FieldMap({
+    "symbol": "tradingSymbol",
+    "exchange": "exchangeSegment",
+    "product": "productType",
+    "quantity": Field("netQty", 0),
+    "average_price": Field("costPrice", 0.0),
+})
+
 
 def map_order_data(order_data):
     """
@@ -30,28 +84,13 @@ def map_order_data(order_data):
 
     if order_data:
         for order in order_data:
-            # Extract the instrument_token and exchange for the current order
-            instrument_token = order['securityId']
-            exchange = map_exchange(order['exchangeSegment'])
-            order['exchangeSegment'] = exchange
-            
-            # Use the get_symbol function to fetch the symbol from the database
-            symbol_from_db = get_symbol(instrument_token, exchange)
-            
-            # Check if a symbol was found; if so, update the trading_symbol in the current order
-            if symbol_from_db:
-                order['tradingSymbol'] = symbol_from_db
-                if (order['exchangeSegment'] == 'NSE' or order['exchangeSegment'] == 'BSE') and order['productType'] == 'CNC':
-                    order['productType'] = 'CNC'
-                               
-                elif order['productType'] == 'INTRADAY':
-                    order['productType'] = 'MIS'
-                
-                elif order['exchangeSegment'] in ['NFO', 'MCX', 'BFO', 'CDS'] and order['productType'] == 'MARGIN':
-                    order['productType'] = 'NRML'
-            else:
-                logger.warning(f"Symbol not found for token {instrument_token} and exchange {exchange}. Keeping original trading symbol.")
-                
+            order['exchangeSegment'] = map_exchange(order['exchangeSegment'])
+
+        # Resolve the symbols of the whole book in one lookup; products are
+        # only translated for rows whose symbol was found
+        found = resolve_symbols(order_data, 'securityId', 'exchangeSegment', 'tradingSymbol')
+        map_products(order_data, 'productType', 'exchangeSegment', PRODUCT_RULES, mask=found)
+
     return order_data
 
 
@@ -66,119 +105,30 @@ def calculate_order_statistics(order_data):
     Returns:
     - A dictionary containing counts of different types of orders.
     """
-    # Initialize counters
-    total_buy_orders = total_sell_orders = 0
-    total_completed_orders = total_open_orders = total_rejected_orders = 0
+    statistics = order_statistics(order_data, 'transactionType', 'orderStatus', 'TRADED', 'PENDING', 'REJECTED')
 
+    # The order book is transformed after this, with statuses already in OpenAlgo format
     if order_data:
-        for order in order_data:
-            # Count buy and sell orders
-            if order['transactionType'] == 'BUY':
-                total_buy_orders += 1
-            elif order['transactionType'] == 'SELL':
-                total_sell_orders += 1
-            
-            # Count orders based on their status
-            if order['orderStatus'] == 'TRADED':
-                total_completed_orders += 1
-                order['orderStatus'] = 'complete'
-            elif order['orderStatus'] == 'PENDING':
-                total_open_orders += 1
-                order['orderStatus'] = 'open'
-            elif order['orderStatus'] == 'REJECTED':
-                total_rejected_orders += 1
-                order['orderStatus'] = 'rejected'
-            elif order['orderStatus'] == 'CANCELLED':
-                order['orderStatus'] = 'cancelled'
-
-    # Compile and return the statistics
-    return {
-        'total_buy_orders': total_buy_orders,
-        'total_sell_orders': total_sell_orders,
-        'total_completed_orders': total_completed_orders,
-        'total_open_orders': total_open_orders,
-        'total_rejected_orders': total_rejected_orders
-    }
-
+        map_values(order_data, 'orderStatus', ORDER_STATUS_MAP)
 
-def transform_order_data(orders):
-    # Directly handling a dictionary assuming it's the structure we expect
-    if isinstance(orders, dict):
-        # Convert the single dictionary into a list of one dictionary
-        orders = [orders]
-
-    transformed_orders = []
-    
-    for order in orders:
-        # Make sure each item is indeed a dictionary
-        if not isinstance(order, dict):
-            logger.warning(f"Warning: Expected a dict, but found a {type(order)}. Skipping this item.")
-            continue
-
-        if order['orderType'] == 'MARKET':
-                order['orderType'] = 'MARKET'
-        if order['orderType'] == 'LIMIT':
-                order['orderType'] = 'LIMIT'
-        if order['orderType'] == 'STOP_LOSS':
-                order['orderType'] = 'SL'
-        if order['orderType'] == 'STOP_LOSS_MARKET':
-                order['orderType'] = 'SL-M'
-
-
-        transformed_order = {
-            "symbol": order.get("tradingSymbol", ""),
-            "exchange": order.get("exchangeSegment", ""),
-            "action": order.get("transactionType", ""),
-            "quantity": order.get("quantity", 0),
-            "price": order.get("price", 0.0),
-            "trigger_price": order.get("triggerPrice", 0.0),
-            "pricetype": order.get("orderType", ""),
-            "product": order.get("productType", ""),
-            "orderid": order.get("orderId", ""),
-            "order_status": order.get("orderStatus", ""),
-            "timestamp": order.get("updateTime", "")
-        }
+    return statistics
 
-        transformed_orders.append(transformed_order)
 
-    return transformed_orders
+def transform_order_data(orders):
+    return transform_rows(orders, ORDER_FIELDS)
 
 def map_trade_data(trade_data):
     return map_order_data(trade_data)
 
 def transform_tradebook_data(tradebook_data):
-    transformed_data = []
-    for trade in tradebook_data:
-        transformed_trade = {
-            "symbol": trade.get('tradingSymbol', ''),
-            "exchange": trade.get('exchangeSegment', ''),
-            "product": trade.get('productType', ''),
-            "action": trade.get('transactionType', ''),
-            "quantity": trade.get('tradedQuantity', 0),
-            "average_price": trade.get('tradedPrice', 0.0),
-            "trade_value": trade.get('tradedQuantity', 0) * trade.get('tradedPrice', 0.0),
-            "orderid": trade.get('orderId', ''),
-            "timestamp": trade.get('updateTime', '')
-        }
-        transformed_data.append(transformed_trade)
-    return transformed_data
+    return transform_rows(tradebook_data, TRADE_FIELDS)
 
 def map_position_data(position_data):
     return map_order_data(position_data)
 
 
 def transform_positions_data(positions_data):
-    transformed_data = []
-    for position in positions_data:
-        transformed_position = {
-            "symbol": position.get('tradingSymbol', ''),
-            "exchange": position.get('exchangeSegment', ''),
-            "product": position.get('productType', ''),
-            "quantity": position.get('netQty', 0),
-            "average_price": position.get('costPrice', 0.0),
-        }
-        transformed_data.append(transformed_position)
-    return transformed_data
+    return transform_rows(positions_data, POSITION_FIELDS)
 
 def transform_holdings_data(holdings_data):
     transformed_data = []
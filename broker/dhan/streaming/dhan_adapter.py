@@ -16,9 +16,10 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 # Now import using relative paths from the project root
-from websocket_proxy.base_adapter import BaseBrokerWebSocketAdapter
+from websocket_proxy.base_adapter import BaseBrokerWebSocketAdapter, SubscriptionRegistry, default_topic
 from database.token_db import get_token
 from database.auth_db import get_auth_token
+from utils.logging import HotPathLogger
 
 # Import the WebSocket client
 from .dhan_websocket import DhanWebSocket
@@ -37,6 +38,8 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
         super().__init__()
         # Set a default logger name, will be updated in initialize()
         self.logger = logging.getLogger("websocket_adapter")
+        # Rate limited per-topic/per-token logging for the tick path
+        self.hot_logger = HotPathLogger(self.logger)
         self.ws_client = None
         self.user_id = None
         # broker_name will be set in initialize()
@@ -45,6 +48,8 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
         self.lock = threading.RLock()  # Changed to RLock for reentrant locking
         self.subscribed_symbols = {}  # {symbol: {exchange, token, mode}}
         self.token_to_symbol = {}  # {token: (symbol, exchange)}
+        # Tick path lookup: str(token) -> subscription with precomputed topics
+        self.subscription_registry = SubscriptionRegistry(self._generate_topic, self._map_data_exchange)
         
         # Authentication
         self.client_id = None
@@ -77,6 +82,7 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
         self.broker_name = broker_name.lower()  # Store broker name for later use
         # Update logger name based on broker name
         self.logger = logging.getLogger(f"{self.broker_name}_websocket_adapter")
+        self.hot_logger = HotPathLogger(self.logger)
         self.logger.info(f"Initializing {self.broker_name} WebSocket adapter")
         self.user_id = user_id
         
@@ -126,6 +132,9 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     on_error=self._on_error,
                     on_ticks=self._on_ticks
                 )
+                # Keep recording raw frames across reconnects
+                if self.recorder is not None and self.recorder.frame_file is not None:
+                    self.ws_client.on_frame = self.recorder.record_frame
             
             # Start WebSocket connection
             self.ws_client.start()
@@ -297,6 +306,13 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 # Store token mapping with both string and int keys for robustness
                 self.token_to_symbol[str(actual_token)] = (symbol, exchange)
                 self.token_to_symbol[int(actual_token)] = (symbol, exchange)
+                # Legacy (non-uppercased) topic is only published when it differs
+                legacy_topics = {
+                    mode_str: default_topic(symbol, exchange, mode_str).encode('utf-8')
+                    for mode_str in ('LTP', 'QUOTE', 'DEPTH')
+                }
+                self.subscription_registry.add(str(actual_token), symbol, exchange, mode, replace=True,
+                                               legacy_topics=legacy_topics)
                 
                 self.logger.info(f"📝 Stored token mapping: {actual_token} -> ({symbol}, {exchange})")
                 self.logger.info(f"📝 Current token_to_symbol: {self.token_to_symbol}")
@@ -410,6 +426,7 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     # The mapping will be cleaned up by the message handler when it sees
                     # the subscription is gone
                     del self.subscribed_symbols[symbol]
+                self.subscription_registry.remove(str(actual_token))
             
             self.logger.info(f"Unsubscribed from {exchange}:{symbol}")
             return {"status": "success", "message": f"Unsubscribed from {exchange}:{symbol}"}
@@ -502,94 +519,35 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 self.logger.warning("No ticks received in _on_ticks callback")
                 return
                 
-            self.logger.info(f"🎯 Received {len(ticks)} ticks from Dhan WebSocket")
-            
-            # Debug: Log raw tick data
-            for i, tick in enumerate(ticks):
-                self.logger.info(f"Raw tick {i+1}: {tick}")
+            self.hot_logger.debug('ticks', "🎯 Received %s ticks from Dhan WebSocket: %s", len(ticks), ticks)
             
             # Process each tick
+            registry = self.subscription_registry
             for tick in ticks:
                 token = tick.get("instrument_token") or tick.get("token")
                 if not token:
-                    self.logger.warning(f"Tick missing token: {tick}")
+                    self.hot_logger.warning('missing_token', "Tick missing token: %s", tick)
                     continue
-                    
-                # Find symbol from token and handle cleanup
-                with self.lock:
-                    # Debug: Show current token mappings
-                    self.logger.info(f"Looking up token {token} (type: {type(token).__name__})")
-                    self.logger.info(f"Current token_to_symbol mappings: {self.token_to_symbol}")
-                    self.logger.info(f"Current subscribed_symbols: {list(self.subscribed_symbols.keys())}")
-                    
-                    # Try direct lookup with both string and int formats for robustness
-                    symbol_exchange = self.token_to_symbol.get(str(token)) or self.token_to_symbol.get(int(token))
-                    
-                    if not symbol_exchange:
-                        # Enhanced debug info for token mapping
-                        token_keys = list(self.token_to_symbol.keys())
-                        token_types = [(k, type(k).__name__) for k in token_keys]
-                        self.logger.warning(f"❌ TOKEN MAPPING FAILURE: Received token {token} (type: {type(token).__name__}) not found")
-                        self.logger.warning(f"Available tokens: {token_types}")
-                        
-                        # Try more aggressive lookup methods
-                        for k, v in self.token_to_symbol.items():
-                            try:
-                                if int(k) == int(token):
-                                    self.logger.info(f"✅ Found match using int conversion: {k} -> {v}")
-                                    symbol_exchange = v
-                                    break
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if not symbol_exchange:
-                            self.logger.error(f"❌ CRITICAL: No symbol found for token {token}, skipping tick")
-                            continue  # Still no match, skip this tick
-                    
-                    # Check if this symbol is still subscribed
-                    symbol, exchange = symbol_exchange
-                    if symbol not in self.subscribed_symbols:
-                        # Symbol is no longer subscribed, clean up token mapping
-                        self.logger.info(f"Cleaning up token mapping for unsubscribed symbol {symbol}")
-                        try:
-                            del self.token_to_symbol[str(token)]
-                        except KeyError:
-                            pass
-                        try:
-                            del self.token_to_symbol[int(token)]
-                        except KeyError:
-                            pass
-                        continue  # Skip processing this tick
-                        
-                symbol, exchange = symbol_exchange
                 
-                # Add symbol and exchange to tick data
-                tick["symbol"] = symbol
-                
-                # Store Dhan's exchange code
-                dhan_exchange = tick.get("exchange")
+                # Single dict hit; topics and data exchange were computed at subscribe time.
+                # Unsubscribed tokens are dropped from the registry, so in-flight ticks are skipped here.
+                subscription = registry.get(str(token))
+                if subscription is None:
+                    self.logger.debug("No subscription for token %s, skipping tick", token)
+                    continue
                 
-                # Get original subscription exchange for topic generation
-                subscription_exchange = exchange
+                symbol = subscription.symbol
+                subscription_exchange = subscription.exchange
                 
-                # Convert to OpenAlgo format for data field
-                data_exchange = self._map_data_exchange(subscription_exchange)
+                # Add symbol and exchange to tick data
+                tick["symbol"] = symbol
                 
                 # Set the data exchange field in the tick
+                data_exchange = subscription.data_exchange
                 tick["exchange"] = data_exchange
                 
-                self.logger.info(f"Processing tick for {symbol}: price={tick.get('last_price')}, token={token}, exchange={subscription_exchange}")
-                
-                # Get mode from subscribed_symbols tracking
-                subscription = self.subscribed_symbols.get(symbol, {})
-                mode = subscription.get('mode', 1)  # Default to LTP mode
-                
-                # Map numeric mode to string format
-                mode_str = {
-                    1: 'LTP',
-                    2: 'QUOTE',
-                    3: 'DEPTH'
-                }.get(mode, 'LTP')
+                # Mode string from the subscription
+                mode_str = subscription.mode_str
                 
                 # Normalize tick format to OpenAlgo standard
                 normalized_tick = self._normalize_tick(tick)
@@ -600,33 +558,22 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     mode_str = 'QUOTE'
                 elif 'depth' in normalized_tick and isinstance(normalized_tick.get('depth', {}), dict):
                     mode_str = 'DEPTH'
-                self.logger.debug(f"Packet type {packet_type} mapped to mode {mode_str}")
                 
                 # Add mode to normalized tick for proper handling
                 normalized_tick['mode'] = mode_str
                 
-                # Generate topics using both formats for maximum compatibility
-                # Format 1: With broker name (for WebSocket server with broker filtering)
-                broker_topic = self._generate_topic(symbol, subscription_exchange, mode_str)
+                # Precomputed topics: broker topic and legacy topic for polling compatibility
+                broker_topic = subscription.topics[mode_str]
+                legacy_topic = subscription.extra['legacy_topics'][mode_str]
                 
-                # Format 2: Without broker name (for polling compatibility)
-                legacy_topic = f"{subscription_exchange}_{symbol}_{mode_str}"
+                # Sampled per topic; formatted only when DEBUG is enabled
+                self.hot_logger.debug(broker_topic, "Publishing to topic: %s (packet type %s, subscription exchange %s, data exchange %s): %s",
+                                      broker_topic, packet_type, subscription_exchange, data_exchange, normalized_tick)
                 
-                # Debug log to verify correct topic and data structure
-                self.logger.info(f"Publishing to topic: {broker_topic}")
-                self.logger.info(f"Publishing to legacy topic: {legacy_topic}")
-                self.logger.info(f"Data structure: {normalized_tick}")
-                self.logger.info(f"Subscription exchange: {subscription_exchange} -> Topic: {broker_topic}, Data exchange: {data_exchange}")
-                
-                # Publish to both topic formats for maximum compatibility
-                # Topic with broker name for filtering in WebSocket server
                 self.publish_market_data(broker_topic, normalized_tick)
-                # Legacy topic format for polling compatibility
-                self.publish_market_data(legacy_topic, normalized_tick)
-                
-                # Debug log for troubleshooting polling data issues
-                if mode_str.lower() == 'ltp':
-                    self.logger.debug(f"LTP Data should be available for polling: {subscription_exchange}:{symbol}")
+                # Legacy topic format for polling compatibility (skip when identical)
+                if legacy_topic != broker_topic:
+                    self.publish_market_data(legacy_topic, normalized_tick)
                 
         except Exception as e:
             self.logger.error(f"Error processing ticks: {e}")
@@ -680,9 +627,6 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
             Dict: Normalized tick data with consistent field names and formats
         """
         try:
-            # Debug log for troubleshooting
-            self.logger.debug(f"Raw tick data: {tick}")
-            
             # Ensure exchange is in OpenAlgo format
             exchange = tick.get("exchange")
             if exchange:
@@ -742,9 +686,6 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     buy_orders = depth_data.get("buy", [])
                     sell_orders = depth_data.get("sell", [])
                     
-                    # Debug log for depth data processing
-                    self.logger.info(f"Processing depth data for {normalized.get('symbol')}: buy_levels={len(buy_orders)}, sell_levels={len(sell_orders)}")
-                    
                     # Format depth data with validation
                     def format_levels(levels, side):
                         formatted = []
@@ -762,11 +703,9 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                                         "orders": orders,
                                         "level": i + 1
                                     })
-                                    self.logger.debug(f"Added {side} level {i+1}: price={price}, qty={quantity}, orders={orders}")
                             except Exception as e:
                                 self.logger.warning(f"Error formatting {side} level {i}: {e}")
                         
-                        self.logger.info(f"Formatted {len(formatted)} valid {side} levels")
                         return formatted
                     
                     buy_levels = format_levels(buy_orders, "buy")
@@ -791,17 +730,13 @@ class DhanWebSocketAdapter(BaseBrokerWebSocketAdapter):
                             normalized["ask"] = sell_levels[0]["price"]
                             normalized["ask_qty"] = sell_levels[0]["quantity"]
                         
-                        self.logger.info(f"✅ Depth data added to normalized tick for {normalized.get('symbol')}: {len(buy_levels)} buy, {len(sell_levels)} sell levels")
                     else:
-                        self.logger.warning(f"❌ No valid depth levels found for {normalized.get('symbol')}")
+                        self.hot_logger.warning(normalized.get('symbol'), "❌ No valid depth levels found for %s", normalized.get('symbol'))
                         
                 except Exception as e:
                     self.logger.error(f"Error processing depth data for {normalized.get('symbol')}: {e}")
                     # Continue without depth data if there's an error
-            else:
-                self.logger.debug(f"No depth data in tick for {normalized.get('symbol')}")
             
-            self.logger.debug(f"Normalized tick: {normalized}")
             return normalized
             
         except Exception as e:
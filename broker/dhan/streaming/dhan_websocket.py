@@ -14,11 +14,62 @@ import time
 import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Callable, Union
+import numpy as np
 
 import websockets
 
+from utils.logging import HotPathLogger
+from websocket_proxy.tick_batch import gather_records, view_records
+
 # Set up logging
 logger = logging.getLogger("dhan_websocket")
+# Rate limited logging for per-message paths, keyed by message type / token
+hot_logger = HotPathLogger(logger)
+
+# Precompiled packet layouts (little endian), decoded in place with unpack_from
+_HEADER = struct.Struct('<BHBI')
+_TICKER_PACKET = struct.Struct('<BHBIfI')
+_QUOTE_PACKET = struct.Struct('<BHBIfHIfIIIffff')
+_FULL_PACKET = struct.Struct('<BHBIfHIfIIIIIIffff')
+# 5 levels of bid qty, ask qty, bid orders, ask orders, bid price, ask price
+_FULL_DEPTH = struct.Struct('<' + 'IIHHff' * 5)
+_UINT32 = struct.Struct('<I')
+_DEPTH_LEVEL = struct.Struct('<fIH')
+_TOKEN_VALUE = struct.Struct('<BLL')
+_UINT64 = struct.Struct('<Q')
+
+# Exchange names used by the 5-level depth and ticker parsers
+_DEPTH_EXCHANGES = {1: "NSE", 2: "BSE", 3: "NFO", 4: "CDS", 5: "MCX"}
+_TICKER_EXCHANGES = {0: "IDX", **_DEPTH_EXCHANGES}
+
+# Raw quote packet (type 17) for batch decoding; ticker packets (type 15)
+# share the first 12 bytes and carry their timestamp at offset 12
+_RAW_QUOTE_DTYPE = np.dtype({
+    'names': ['message_type', 'exchange_code', 'instrument_token', 'last_price', 'last_quantity',
+              'last_trade_time', 'average_price', 'volume', 'total_sell_quantity',
+              'total_buy_quantity', 'open', 'close', 'high', 'low'],
+    'formats': ['u1', 'u1', '<u4', '<f4', '<u2', '<u4', '<f4', '<u4', '<u4', '<u4',
+                '<f4', '<f4', '<f4', '<f4'],
+    'offsets': [0, 3, 4, 8, 12, 14, 18, 22, 26, 30, 34, 38, 42, 46],
+    'itemsize': _QUOTE_PACKET.size,
+})
+
+# Columnar tick layout returned by DhanWebSocket.decode_frame_columnar
+TICK_DTYPE = np.dtype([
+    ('instrument_token', 'u4'), ('exchange_code', 'u1'), ('message_type', 'u1'),
+    ('last_price', 'f8'), ('last_quantity', 'i8'), ('last_trade_time', 'i8'),
+    ('average_price', 'f8'), ('volume', 'i8'), ('total_buy_quantity', 'i8'),
+    ('total_sell_quantity', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'),
+])
+
+
+def _utc_time(epoch_time):
+    """Converts EPOCH time to UTC time (as in the official Dhan client)."""
+    try:
+        return datetime.fromtimestamp(epoch_time).strftime('%H:%M:%S')
+    except:
+        return datetime.now().strftime('%H:%M:%S')
+
 
 class DhanWebSocket:
     """
@@ -85,6 +136,10 @@ class DhanWebSocket:
         self.on_disconnect = on_disconnect or (lambda: None)
         self.on_error = on_error or (lambda e: None)
         self.on_connect = on_connect or (lambda: None)
+        # Optional: receives the quote/ticker packets of each frame as a numpy TICK_DTYPE array
+        self.on_ticks_columnar: Optional[Callable[[np.ndarray], None]] = None
+        # Optional: receives each raw binary frame before it is parsed (session recording)
+        self.on_frame: Optional[Callable[[bytes], None]] = None
         
         # Connection state
         self.running = False
@@ -465,22 +520,14 @@ class DhanWebSocket:
             
             if isinstance(message, bytes):
                 self.binary_message_count += 1
-                # More detailed binary message logging
+                # Sampled per message type; formatted only when DEBUG is enabled
                 if len(message) > 0:
-                    msg_type = message[0]
-                    logger.info(f"📨 Received binary message #{self.binary_message_count} (type={msg_type}, size={len(message)} bytes, hex={message[:16].hex()})")
-                    
-                    # Log specific message types for debugging
-                    if msg_type == 5:  # Market depth message
-                        logger.info(f"🔍 DEPTH MESSAGE RECEIVED: size={len(message)}, full_hex={message.hex()}")
-                    elif msg_type == 15:  # LTP message
-                        logger.debug(f"📈 LTP message received: size={len(message)}")
-                    elif msg_type == 17:  # Quote message
-                        logger.debug(f"📊 Quote message received: size={len(message)}")
-                    else:
-                        logger.info(f"❓ Unknown message type {msg_type}: size={len(message)}")
+                    hot_logger.debug(message[0], "📨 Received binary message #%s (type=%s, size=%s bytes)",
+                                     self.binary_message_count, message[0], len(message))
                 else:
-                    logger.debug(f"Received empty binary message #{self.binary_message_count}")
+                    logger.debug("Received empty binary message #%s", self.binary_message_count)
+                if self.on_frame:
+                    self.on_frame(message)
                 await self._process_binary_packet(message)
                 return
                 
@@ -527,20 +574,27 @@ class DhanWebSocket:
                 logger.warning(f"Received invalid packet (too short): {len(packet_data)} bytes")
                 return
                 
+            # Columnar consumers get the quote/ticker packets of the frame in one pass
+            if self.on_ticks_columnar:
+                try:
+                    self.on_ticks_columnar(self.decode_frame_columnar(packet_data))
+                except Exception as e:
+                    logger.error(f"Error in on_ticks_columnar callback: {e}")
+                
             # Process all messages in the buffer (there may be multiple concatenated messages)
+            # Messages are memoryview slices of the frame, so no per-message copy is made
+            view = memoryview(packet_data)
+            size = len(view)
             offset = 0
             processed_messages = 0
             
-            while offset + 8 <= len(packet_data):  # Need at least header (8 bytes)
+            while offset + 8 <= size:  # Need at least header (8 bytes)
                 # Extract header information
-                msg_type, msg_length, exchange_code, token = struct.unpack('<BHBI', packet_data[offset:offset+8])
-                
-                # Debug header fields  
-                logger.info(f"📦 Binary packet header: type={msg_type}, length={msg_length}, exchange={exchange_code}, token={token} (0x{token:04x})")
+                msg_type, msg_length, exchange_code, token = _HEADER.unpack_from(view, offset)
                 
-                # Log all tokens for debugging
-                exchange_name = self.EXCHANGE_MAP.get(exchange_code, f"UNK_{exchange_code}")
-                logger.info(f"📦 Received message for {exchange_name} token {token}, type {msg_type}")
+                # Debug header fields (sampled per message type and token)
+                hot_logger.debug((msg_type, token), "📦 Binary packet header: type=%s, length=%s, exchange=%s, token=%s",
+                                 msg_type, msg_length, exchange_code, token)
                 
                 # Validate message length
                 if msg_type == 8:  # Full data packet
@@ -554,86 +608,73 @@ class DhanWebSocket:
                     logger.warning(f"Invalid message length in header: {msg_length} bytes at offset {offset}")
                     break  # Can't process further as boundaries are unknown
                     
-                if offset + msg_length > len(packet_data):
-                    logger.warning(f"Message truncated: need {msg_length} bytes but only {len(packet_data) - offset} available")
+                if offset + msg_length > size:
+                    logger.warning(f"Message truncated: need {msg_length} bytes but only {size - offset} available")
                     break  # Message is incomplete
                 
                 # Extract the complete message for this segment
-                message = packet_data[offset:offset+msg_length]
+                message = view[offset:offset+msg_length]
                 
                 # Process the message based on type
-                logger.debug(f"Processing message type {msg_type} for token {token}")
-                
-                # Special logging for 20-level depth messages
-                if msg_type in [41, 51]:
-                    logger.info(f"🎯 Received 20-level depth message type {msg_type} for token {token}")
-                
                 if msg_type == self.TYPE_TICKER:  # 15 - LTP data
                     ticks = self._parse_ticker_data(message)
                     if ticks and self.on_ticks:
-                        logger.info(f"Parsed LTP data for token {token}")
                         self.on_ticks(ticks)
                         
                 elif msg_type == self.TYPE_QUOTE:  # 17 - Quote/marketdata
                     tick = self._parse_quote_data(message)
                     if tick and self.on_ticks:
-                        logger.info(f"Parsed quote data for token {token}")
                         self.on_ticks([tick])
                         
                 elif msg_type == self.TYPE_DEPTH:  # 21 - Full market depth (5-level)
                     tick = self._parse_market_depth(message)
                     if tick and self.on_ticks:
-                        logger.info(f"Parsed 5-level market depth for token {token}")
                         self.on_ticks([tick])
                         
                 elif msg_type == self.TYPE_DEPTH_20_BID:  # 41 - 20-level bid data
-                    logger.info(f"🎯 Processing 20-level BID data for token {token}")
-                    self._handle_depth_20_bid(message)
+                    hot_logger.debug((msg_type, token), "🎯 Processing 20-level BID data for token %s", token)
+                    self._handle_depth_20_bid(bytes(message))
                     
                 elif msg_type == self.TYPE_DEPTH_20_ASK:  # 51 - 20-level ask data
-                    logger.info(f"🎯 Processing 20-level ASK data for token {token}")
-                    self._handle_depth_20_ask(message)
+                    hot_logger.debug((msg_type, token), "🎯 Processing 20-level ASK data for token %s", token)
+                    self._handle_depth_20_ask(bytes(message))
                         
                 elif msg_type == self.TYPE_OI:  # 9 - Open Interest
                     tick = self._parse_oi_data(message)
                     if tick and self.on_ticks:
-                        logger.info(f"Parsed OI data for token {token}")
                         self.on_ticks([tick])
                         
                 elif msg_type == self.TYPE_PREV_CLOSE:  # 10 - Previous close
                     tick = self._parse_prev_close(message)
                     if tick and self.on_ticks:
-                        logger.info(f"Parsed prev close for token {token}")
                         self.on_ticks([tick])
                         
                 elif msg_type == self.TYPE_MARKET_UPDATE:  # 4 - Market data update
                     tick = self._parse_market_update(message)
                     if tick and self.on_ticks:
-                        logger.info(f"Parsed market update for token {token}")
                         self.on_ticks([tick])
                         
                 elif msg_type == 8:  # Full data (ticker + depth)
                     tick = self._parse_full_data(message)
                     if tick and self.on_ticks:
-                        logger.info(f"Parsed full data for token {token}")
                         self.on_ticks([tick])
                         
                 elif msg_type == self.TYPE_DISCONNECT:  # 0 - Disconnect
                     logger.warning(f"Received disconnect message for token {token}")
-                    self._parse_disconnect(message)
+                    self._parse_disconnect(bytes(message))
                     
                 elif msg_type == self.TYPE_DEPTH_20_BID:  # 41 - 20-level bid data
-                    logger.info(f"🎯 Processing 20-level BID data for token {token}")
-                    self._handle_depth_20_bid(message)
+                    hot_logger.debug((msg_type, token), "🎯 Processing 20-level BID data for token %s", token)
+                    self._handle_depth_20_bid(bytes(message))
                     
                 elif msg_type == self.TYPE_DEPTH_20_ASK:  # 51 - 20-level ask data
-                    logger.info(f"🎯 Processing 20-level ASK data for token {token}")
-                    self._handle_depth_20_ask(message)
+                    hot_logger.debug((msg_type, token), "🎯 Processing 20-level ASK data for token %s", token)
+                    self._handle_depth_20_ask(bytes(message))
                     
                 else:
                     logger.warning(f"Unknown message type {msg_type} for token {token}")
                     # Try general parser as fallback
-                    tick = self._parse_dhan_binary_packet(message)
+                    tick = self._parse_dhan_binary_packet(bytes(message))
                     if tick:
                         ticks = [tick] if not isinstance(tick, list) else tick
                         if self.on_ticks and ticks:
@@ -644,7 +685,7 @@ class DhanWebSocket:
                 processed_messages += 1
             
             if processed_messages > 0:
-                logger.debug(f"Processed {processed_messages} messages from binary packet of {len(packet_data)} bytes")
+                logger.debug("Processed %s messages from binary packet of %s bytes", processed_messages, size)
             else:
                 logger.warning(f"Couldn't process any complete messages from binary packet of {len(packet_data)} bytes")
                 
@@ -654,6 +695,51 @@ class DhanWebSocket:
 
     
 
+    def decode_frame_columnar(self, packet_data) -> np.ndarray:
+        """
+        Decode the quote (17) and ticker (15) packets of a frame into a numpy
+        structured array (TICK_DTYPE) in one vectorized step.
+        
+        Only packet headers are walked in Python; the packet bodies are gathered
+        into one byte matrix and viewed through a structured dtype. Fields a
+        ticker packet does not carry are zero. Other packet types are skipped.
+        """
+        view = memoryview(packet_data)
+        size = len(view)
+        offsets = []
+        lengths = []
+        offset = 0
+        while offset + 8 <= size:
+            msg_type, msg_length, _, _ = _HEADER.unpack_from(view, offset)
+            if msg_length < 8 or offset + msg_length > size:
+                break
+            if msg_type == self.TYPE_QUOTE and msg_length >= _QUOTE_PACKET.size:
+                offsets.append(offset)
+                lengths.append(_QUOTE_PACKET.size)
+            elif msg_type == self.TYPE_TICKER and msg_length >= _TICKER_PACKET.size:
+                offsets.append(offset)
+                lengths.append(_TICKER_PACKET.size)
+            offset += msg_length
+        
+        records = gather_records(view, offsets, lengths, _QUOTE_PACKET.size)
+        raw = view_records(records, _RAW_QUOTE_DTYPE)
+        ticks = np.zeros(len(raw), dtype=TICK_DTYPE)
+        if not len(raw):
+            return ticks
+        
+        for name in ('instrument_token', 'exchange_code', 'message_type', 'last_price', 'last_quantity',
+                     'last_trade_time', 'average_price', 'volume', 'total_buy_quantity',
+                     'total_sell_quantity', 'open', 'high', 'low', 'close'):
+            ticks[name] = raw[name]
+        
+        # Ticker packets carry their timestamp where quotes have LTQ + LTT
+        is_ticker = raw['message_type'] == self.TYPE_TICKER
+        if is_ticker.any():
+            ticker_time = np.ascontiguousarray(records[is_ticker, 12:16]).view('<u4').reshape(-1)
+            ticks['last_trade_time'][is_ticker] = ticker_time
+            ticks['last_quantity'][is_ticker] = 0
+        return ticks
+
     def _parse_ticker_data(self, packet_data):
         """Parse ticker/LTP data (message type TYPE_TICKER = 15) - Based on official Dhan implementation"""
         try:
@@ -669,29 +755,10 @@ class DhanWebSocket:
             # I: security ID/token (4 bytes)
             # f: LTP price (4 bytes)
             # I: timestamp (4 bytes)
-            unpack_data = struct.unpack('<BHBIfI', packet_data[0:16])
-            
-            # Extract fields
-            exchange_id = unpack_data[2]  # Third field is exchange segment
-            token = unpack_data[3]        # Fourth field is security ID/token
-            ltp = unpack_data[4]          # Fifth field is LTP
-            timestamp = unpack_data[5]    # Sixth field is timestamp
+            _, _, exchange_id, token, ltp, timestamp = _TICKER_PACKET.unpack_from(packet_data)
             
             # Map exchange code to string name for compatibility
-            if exchange_id == 1:
-                exchange = "NSE"
-            elif exchange_id == 2:
-                exchange = "BSE"
-            elif exchange_id == 3:
-                exchange = "NFO"
-            elif exchange_id == 4:
-                exchange = "CDS"
-            elif exchange_id == 5:
-                exchange = "MCX"
-            elif exchange_id == 0:
-                exchange = "IDX"  # Index
-            else:
-                exchange = f"UNK_{exchange_id}"
+            exchange = _TICKER_EXCHANGES.get(exchange_id) or f"UNK_{exchange_id}"
             
             # Set default values for fields not in this packet
             last_quantity = 0
@@ -727,7 +794,7 @@ class DhanWebSocket:
                 'packet_type': 'ticker'
             }
             
-            logger.info(f"Parsed ticker data for token {token}, exchange_id {exchange_id}, LTP={ltp}")
+            logger.debug("Parsed ticker data for token %s, exchange_id %s, LTP=%s", token, exchange_id, ltp)
             return [tick]  # Return as list for consistency
         except Exception as e:
             logger.error(f"Error parsing ticker data: {e}, packet data: {packet_data.hex()}")
@@ -744,7 +811,8 @@ class DhanWebSocket:
         msg_type = struct.unpack('>B', packet_data[0:1])[0]
         
         # Log the binary packet for debugging
-        logger.debug(f"Binary packet received: type={msg_type}, size={len(packet_data)}, hex={packet_data.hex()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Binary packet received: type=%s, size=%s, hex=%s", msg_type, len(packet_data), packet_data.hex())
         
         try:
             if msg_type == 2:  # Ticker data
@@ -797,8 +865,7 @@ class DhanWebSocket:
             # Use the same format as official Dhan client process_quote
             # Format: <BHBIfHIfIIIffff
             try:
-                unpacked = struct.unpack('<BHBIfHIfIIIffff', packet_data[0:50])
-                logger.debug(f"Market update unpacked: {unpacked}")
+                unpacked = _QUOTE_PACKET.unpack_from(packet_data)
             except struct.error as e:
                 logger.error(f"Error unpacking market update data: {e}")
                 logger.error(f"Data length: {len(packet_data)}, expected at least 50 bytes")
@@ -825,25 +892,19 @@ class DhanWebSocket:
             low_price = round(unpacked[14], 2)
             close_price = round(unpacked[12], 2)
             
-            # Log raw and converted values for debugging
-            logger.debug(f"Raw OHLC Values - O:{unpacked[11]} H:{unpacked[13]} L:{unpacked[14]} C:{unpacked[12]}")
-            logger.debug(f"Converted OHLC Values - O:{open_price} H:{high_price} L:{low_price} C:{close_price}")
+            # Log converted values for debugging (formatted only when DEBUG is enabled)
+            logger.debug("Converted OHLC Values - O:%s H:%s L:%s C:%s", open_price, high_price, low_price, close_price)
             
-            # Helper function to convert timestamp like official Dhan client
-            def utc_time(epoch_time):
-                """Converts EPOCH time to UTC time."""
-                try:
-                    return datetime.fromtimestamp(epoch_time).strftime('%H:%M:%S')
-                except:
-                    return datetime.now().strftime('%H:%M:%S')
+            # Convert the trade time once, like the official Dhan client
+            trade_time = _utc_time(unpacked[6]) if unpacked[6] > 0 else None
             
             # Create tick format matching your expected output structure
             tick = {
                 'symbol': '',  # Will be set by calling code
                 'exchange': exch_name,
                 'token': unpacked[3],
-                'ltt': utc_time(unpacked[6]) if unpacked[6] > 0 else None,
-                'timestamp': utc_time(unpacked[6]) if unpacked[6] > 0 else None,
+                'ltt': trade_time,
+                'timestamp': trade_time,
                 'ltp': round(unpacked[4], 2),
                 'volume': unpacked[8],
                 'oi': 0,  # Not available in quote data
@@ -861,9 +922,9 @@ class DhanWebSocket:
                 'total_sell_quantity': unpacked[9]
             }
             
-            logger.debug(f"Parsed market update: Token={tick['token']} LTP={tick['ltp']} "
-                        f"OHLC=({tick['open']}/{tick['high']}/{tick['low']}/{tick['close']}) "
-                        f"Vol={tick['volume']}")
+            logger.debug("Parsed market update: Token=%s LTP=%s OHLC=(%s/%s/%s/%s) Vol=%s",
+                         tick['token'], tick['ltp'], tick['open'], tick['high'],
+                         tick['low'], tick['close'], tick['volume'])
             return tick
             
         except Exception as e:
@@ -879,57 +940,18 @@ class DhanWebSocket:
                 logger.warning(f"Market depth data too short: {len(packet_data)} bytes, need at least 162")
                 return None
                 
-            # Skip the first byte (message type)
-            data = packet_data[1:]
-            
-            # Unpack fields according to official client format
-            token = struct.unpack('<I', data[0:4])[0]
-            exchange_id = data[4]
-            if exchange_id == 1:
-                exchange = "NSE"
-            elif exchange_id == 2:
-                exchange = "BSE"
-            elif exchange_id == 3:
-                exchange = "NFO"
-            elif exchange_id == 4:
-                exchange = "CDS"
-            elif exchange_id == 5:
-                exchange = "MCX"
-            else:
-                exchange = f"UNK_{exchange_id}"
-            
-            # Parse buy and sell depth levels (5 levels each)
-            buy_depth = []
-            sell_depth = []
-            
-            # Parse buy depth (5 levels)
-            offset = 7  # Starting after token and exchange
-            for i in range(5):
-                price = struct.unpack('<f', data[offset:offset+4])[0]
-                offset += 4
-                quantity = struct.unpack('<I', data[offset:offset+4])[0]
-                offset += 4
-                orders = struct.unpack('<H', data[offset:offset+2])[0]
-                offset += 2
-                buy_depth.append({
-                    'price': price,
-                    'quantity': quantity,
-                    'orders': orders
-                })
+            # Unpack fields according to official client format (after the message type byte)
+            token = _UINT32.unpack_from(packet_data, 1)[0]
+            exchange_id = packet_data[5]
+            exchange = _DEPTH_EXCHANGES.get(exchange_id) or f"UNK_{exchange_id}"
             
-            # Parse sell depth (5 levels)
-            for i in range(5):
-                price = struct.unpack('<f', data[offset:offset+4])[0]
-                offset += 4
-                quantity = struct.unpack('<I', data[offset:offset+4])[0]
-                offset += 4
-                orders = struct.unpack('<H', data[offset:offset+2])[0]
-                offset += 2
-                sell_depth.append({
-                    'price': price,
-                    'quantity': quantity,
-                    'orders': orders
-                })
+            # Parse buy then sell depth (5 levels each, 10 bytes per level)
+            levels = [
+                dict(zip(('price', 'quantity', 'orders'), _DEPTH_LEVEL.unpack_from(packet_data, 8 + i * _DEPTH_LEVEL.size)))
+                for i in range(10)
+            ]
+            buy_depth = levels[:5]
+            sell_depth = levels[5:]
             
             # Create the tick data
             tick = {
@@ -944,7 +966,7 @@ class DhanWebSocket:
                 'packet_type': 'market_depth'
             }
             
-            logger.debug(f"Parsed market depth data for token {token}")
+            logger.debug("Parsed market depth data for token %s", token)
             return tick
         except Exception as e:
             logger.error(f"Error parsing market depth data: {e}")
@@ -989,7 +1011,8 @@ class DhanWebSocket:
         Format: <BHBIfHIfIIIIIIffff100s> from Dhan marketfeed documentation
         """
         # Debug the binary packet
-        logger.debug(f"Full data packet: {packet_data.hex()}, size: {len(packet_data)} bytes")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full data packet: %s, size: %s bytes", packet_data.hex(), len(packet_data))
         
         # Full packet must be exactly 162 bytes
         if len(packet_data) != 162:
@@ -1026,16 +1049,14 @@ class DhanWebSocket:
             # OHLC (16): open(4) + high(4) + low(4) + close(4)
             # Depth data (100): 5 levels * 20 bytes per level
             # Total: 162 bytes
-            packet_format = '<BHBIfHIfIIIIIIffff100s'
-            
             (
                 msg_type, msg_len, exchange_code, token, ltp, ltq,
                 timestamp, atp, volume, total_buy_qty, total_sell_qty,
                 oi_val, oi_high, oi_low, open_price, high_price,
-                low_price, close_price, depth_data
-            ) = struct.unpack(packet_format, packet_data)
+                low_price, close_price
+            ) = _FULL_PACKET.unpack_from(packet_data)
             
-            logger.debug(f"Full packet unpacked: msg_type={msg_type}, exchange={exchange_code}, token={token}, ltp={ltp}")
+            logger.debug("Full packet unpacked: msg_type=%s, exchange=%s, token=%s, ltp=%s", msg_type, exchange_code, token, ltp)
             
             # Get price scaling factor for this exchange
             price_scale = self._get_price_scale(exchange_code) # Dhan prices are scaled
@@ -1050,53 +1071,31 @@ class DhanWebSocket:
             atp = round(atp , 2) 
             
             # Debug exchange and packet info
-            logger.debug(f"Processing {exch_name} packet with price scale {price_scale}")
-            logger.debug(f"Header values: token={token}, ltp={ltp}, oi={oi_val}, ltq={ltq}, timestamp={timestamp}")
+            logger.debug("Processing %s packet with price scale %s", exch_name, price_scale)
+            logger.debug("Header values: token=%s, ltp=%s, oi=%s, ltq=%s, timestamp=%s", token, ltp, oi_val, ltq, timestamp)
             depth = {
                 'buy': [],
                 'sell': []
             }
             
-            # Each depth level is 20 bytes: <IIHHII> per level
+            # Each depth level is 20 bytes: <IIHHff> per level
             # I: bid quantity (4)
             # I: ask quantity (4)
             # H: bid orders (2)
             # H: ask orders (2)
-            # I: bid price (4)
-            # I: ask price (4)
-            packet_format = '<IIHHff'
-            packet_size = struct.calcsize(packet_format)
-            
-            # Debug raw depth data
-            logger.debug(f"Raw depth data ({len(depth_data)} bytes): {depth_data.hex()}")
+            # f: bid price (4)
+            # f: ask price (4)
+            levels = _FULL_DEPTH.unpack_from(packet_data, _FULL_PACKET.size)
             
             for i in range(5):  # 5 depth levels
-                offset = i * packet_size
-                end_offset = offset + packet_size
-                
-                if end_offset > len(depth_data):
-                    logger.error(f"Not enough data for level {i} (need {end_offset} bytes, have {len(depth_data)})")
-                    break
-                    
-                level_data = depth_data[offset:end_offset]
-                logger.debug(f"Level {i} raw bytes: {level_data.hex()}")
-                
-                try:
-                    bid_qty, ask_qty, bid_orders, ask_orders, bid_price, ask_price = struct.unpack(
-                        packet_format,
-                        level_data
-                    )
-                    logger.debug(f"Level {i} raw: qty={bid_qty}/{ask_qty} orders={bid_orders}/{ask_orders} price={bid_price}/{ask_price}")
-                except Exception as e:
-                    logger.error(f"Error unpacking depth level {i}: {e}, data: {level_data.hex()}")
-                    continue
+                bid_qty, ask_qty, bid_orders, ask_orders, bid_price, ask_price = levels[i * 6:i * 6 + 6]
                 
                 # Scale prices - all prices are integers that need to be scaled
                 
                 bid_price = round(bid_price , 2)
                 ask_price = round(ask_price , 2)
                 
-                logger.debug(f"Level {i} scaled: bid={bid_price}, ask={ask_price}")
+                logger.debug("Level %s scaled: bid=%s, ask=%s", i, bid_price, ask_price)
                 
                 # Add bid level if valid
                 if self._is_valid_price(bid_price * price_scale, exchange_code):
@@ -1105,7 +1104,7 @@ class DhanWebSocket:
                         'quantity': bid_qty,
                         'orders': bid_orders
                     })
-                    logger.debug(f"Added buy level {i}: price={bid_price}, qty={bid_qty}, orders={bid_orders}")
+                    logger.debug("Added buy level %s: price=%s, qty=%s, orders=%s", i, bid_price, bid_qty, bid_orders)
                 
                 # Add ask level if valid
                 if self._is_valid_price(ask_price * price_scale, exchange_code):
@@ -1114,7 +1113,7 @@ class DhanWebSocket:
                         'quantity': ask_qty,
                         'orders': ask_orders
                     })
-                    logger.debug(f"Added sell level {i}: price={ask_price}, qty={ask_qty}, orders={ask_orders}")
+                    logger.debug("Added sell level %s: price=%s, qty=%s, orders=%s", i, ask_price, ask_qty, ask_orders)
             
             tick = {
                 'instrument_token': token,
@@ -1137,7 +1136,7 @@ class DhanWebSocket:
                 'mode': 'depth'
             }
             
-            logger.debug(f"Parsed full data for token {tick['instrument_token']}: {len(depth['buy'])} buy levels, {len(depth['sell'])} sell levels")
+            logger.debug("Parsed full data for token %s: %s buy levels, %s sell levels", tick['instrument_token'], len(depth['buy']), len(depth['sell']))
             # Return full tick data with depth
             return tick if (depth['buy'] or depth['sell']) else None
             
@@ -1152,7 +1151,8 @@ class DhanWebSocket:
         Format based on Dhan's marketfeed client
         """
         # Debug the binary packet
-        logger.debug(f"OI data packet: {packet_data.hex()}, size: {len(packet_data)} bytes")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("OI data packet: %s, size: %s bytes", packet_data.hex(), len(packet_data))
         
         # Adjust minimum size
         if len(packet_data) < 13:  # At minimum need type(1) + token(4) + oi(4) + some timestamp
@@ -1161,8 +1161,8 @@ class DhanWebSocket:
             
         try:
             # Unpack binary data - format: type(1) + instrument_token(4) + oi(4) + timestamp(8)
-            msg_type, token, oi = struct.unpack('<BLL', packet_data[:9])
-            timestamp, = struct.unpack('<Q', packet_data[9:17])
+            msg_type, token, oi = _TOKEN_VALUE.unpack_from(packet_data)
+            timestamp, = _UINT64.unpack_from(packet_data, 9)
             
             tick = {
                 'token': token,
@@ -1291,9 +1291,6 @@ class DhanWebSocket:
                 logger.warning(f"Quote data too short: {len(packet_data)} bytes, need at least 50")
                 return None
                 
-            # Log raw packet data for debugging
-            logger.debug(f"Raw quote data (hex): {packet_data.hex()}")
-            
             # Unpack 50 bytes of quote data directly (don't skip first byte)
             # Format: <BHBIfHIfIIIffff (official Dhan format)
             # Breakdown exactly as in official Dhan client:
@@ -1314,8 +1311,7 @@ class DhanWebSocket:
             # f = 4 bytes (low)
             
             try:
-                unpacked = struct.unpack('<BHBIfHIfIIIffff', packet_data[0:50])
-                logger.debug(f"Unpacked data: {unpacked}")
+                unpacked = _QUOTE_PACKET.unpack_from(packet_data)
             except struct.error as e:
                 logger.error(f"Error unpacking quote data: {e}")
                 logger.error(f"Data length: {len(packet_data)}, expected at least 50 bytes")
@@ -1342,25 +1338,19 @@ class DhanWebSocket:
             low_price = round(unpacked[14], 2)
             close_price = round(unpacked[12], 2)
             
-            # Log raw and converted values for debugging
-            logger.debug(f"Raw OHLC Values - O:{unpacked[11]} H:{unpacked[13]} L:{unpacked[14]} C:{unpacked[12]}")
-            logger.debug(f"Converted OHLC Values - O:{open_price} H:{high_price} L:{low_price} C:{close_price}")
+            # Log converted values for debugging (formatted only when DEBUG is enabled)
+            logger.debug("Converted OHLC Values - O:%s H:%s L:%s C:%s", open_price, high_price, low_price, close_price)
             
-            # Helper function to convert timestamp like official Dhan client
-            def utc_time(epoch_time):
-                """Converts EPOCH time to UTC time."""
-                try:
-                    return datetime.fromtimestamp(epoch_time).strftime('%H:%M:%S')
-                except:
-                    return datetime.now().strftime('%H:%M:%S')
+            # Convert the trade time once, like the official Dhan client
+            trade_time = _utc_time(unpacked[6]) if unpacked[6] > 0 else None
             
             # Create tick format matching your expected output structure
             tick = {
                 'symbol': '',  # Will be set by calling code
                 'exchange': exch_name,
                 'token': unpacked[3],
-                'ltt': utc_time(unpacked[6]) if unpacked[6] > 0 else None,
-                'timestamp': utc_time(unpacked[6]) if unpacked[6] > 0 else None,
+                'ltt': trade_time,
+                'timestamp': trade_time,
                 'ltp': round(unpacked[4], 2),
                 'volume': unpacked[8],
                 'oi': 0,  # Not available in quote data
@@ -1378,9 +1368,9 @@ class DhanWebSocket:
                 'total_sell_quantity': unpacked[9]
             }
             
-            logger.debug(f"Parsed quote data: Token={tick['token']} LTP={tick['last_price']} "
-                        f"OHLC=({tick['open']}/{tick['high']}/{tick['low']}/{tick['close']}) "
-                        f"Vol={tick['volume']}")
+            logger.debug("Parsed quote data: Token=%s LTP=%s OHLC=(%s/%s/%s/%s) Vol=%s",
+                         tick['token'], tick['last_price'], tick['open'], tick['high'],
+                         tick['low'], tick['close'], tick['volume'])
             return tick
             
         except Exception as e:
@@ -1393,7 +1383,8 @@ class DhanWebSocket:
         Format based on Dhan's marketfeed client
         """
         # Debug the binary packet
-        logger.debug(f"Previous close packet: {packet_data.hex()}, size: {len(packet_data)} bytes")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Previous close packet: %s, size: %s bytes", packet_data.hex(), len(packet_data))
         
         # Adjust minimum size check
         if len(packet_data) < 13:  # At minimum we need type + token + prev_close + some timestamp
@@ -1402,11 +1393,11 @@ class DhanWebSocket:
             
         try:
             # Unpack binary data based on actual packet size
-            msg_type, token, prev_close = struct.unpack('<BLL', packet_data[:9])
+            msg_type, token, prev_close = _TOKEN_VALUE.unpack_from(packet_data)
             
             # Handle different timestamp formats based on packet size
             if len(packet_data) >= 17:  # Full 8-byte timestamp
-                timestamp, = struct.unpack('<Q', packet_data[9:17])
+                timestamp, = _UINT64.unpack_from(packet_data, 9)
             elif len(packet_data) >= 13:  # 4-byte timestamp
                 timestamp = int.from_bytes(packet_data[9:13], byteorder='little')
             else:
@@ -1430,7 +1421,8 @@ class DhanWebSocket:
         Format based on Dhan's marketfeed client
         """
         # Debug the binary packet
-        logger.debug(f"Status message packet: {packet_data.hex()}, size: {len(packet_data)} bytes")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Status message packet: %s, size: %s bytes", packet_data.hex(), len(packet_data))
         
         # Adjust minimum size
         if len(packet_data) < 13:  # At minimum need type(1) + token(4) + status(4) + some data
@@ -1439,8 +1431,8 @@ class DhanWebSocket:
             
         try:
             # Unpack binary data - format depends on Dhan's specification
-            msg_type, token, status_code = struct.unpack('<BLL', packet_data[:9])
-            timestamp, = struct.unpack('<Q', packet_data[9:17])
+            msg_type, token, status_code = _TOKEN_VALUE.unpack_from(packet_data)
+            timestamp, = _UINT64.unpack_from(packet_data, 9)
             
             tick = {
                 'token': token,
@@ -1,68 +1,23 @@
 import os
 import requests
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, engine
 from extensions import socketio
+from database.master_contract_ingest import (
+    MasterContractLoader, build_derivative_symbols, format_expiry, normalize_strike,
+    strip_series_suffix
+)
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-# Database setup
-DATABASE_URL = os.getenv('DATABASE_URL')
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-# Define SymToken table
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)
-    brsymbol = Column(String, nullable=False, index=True)
-    name = Column(String)
-    exchange = Column(String, index=True)
-    brexchange = Column(String, index=True)
-    token = Column(String, index=True)
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    data_dict = df.to_dict(orient='records')
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    try:
-        if filtered_data_dict:
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 # Firstock URLs for downloading symbol files
 firstock_urls = {
     "NSE": "https://openapi.thefirstock.com/NSESymbolDownload?ref=wikiconnect.thefirstock.com",
@@ -135,32 +90,18 @@ def process_firstock_nse_data(output_path):
     # Initialize symbol with brsymbol
     df['symbol'] = df['brsymbol']
 
-    # Apply transformation for OpenAlgo symbols
-    def get_openalgo_symbol(broker_symbol):
-        if '-EQ' in broker_symbol:
-            return broker_symbol.replace('-EQ', '')
-        elif '-BE' in broker_symbol:
-            return broker_symbol.replace('-BE', '')
-        else:
-            return broker_symbol
-
-    # Update the symbol column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
+    # OpenAlgo symbols drop the -EQ/-BE series suffix
+    df['symbol'] = strip_series_suffix(df['brsymbol'])
 
     # Set instrument type based on is_index flag and trading symbol
-    def get_instrument_type(row):
-        if row['is_index']:
-            return 'INDEX'
-        elif '-BE' in row['brsymbol']:
-            return 'BE'
-        else:
-            return 'EQ'
-
-    # Set instrument type
-    df['instrumenttype'] = df.apply(get_instrument_type, axis=1)
+    df['instrumenttype'] = np.select(
+        [df['is_index'], df['brsymbol'].str.contains('-BE', regex=False)],
+        ['INDEX', 'BE'],
+        default='EQ',
+    )
 
     # Define Exchange: 'NSE' for EQ and BE, 'NSE_INDEX' for indexes
-    df['exchange'] = df.apply(lambda row: 'NSE_INDEX' if row['instrumenttype'] == 'INDEX' else 'NSE', axis=1)
+    df['exchange'] = np.where(df['instrumenttype'] == 'INDEX', 'NSE_INDEX', 'NSE')
     df['brexchange'] = df['exchange']
 
     # Set empty columns for expiry and strike
@@ -208,46 +149,21 @@ def process_firstock_nfo_data(output_path):
     df['expiry'] = df['expiry'].fillna('')
     df['strike'] = df['strike'].fillna(-1)
 
-    # Format expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Set instrument type based on option type
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
-
-    # Format symbol based on instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(row['strike']) if float(row['strike']).is_integer() else row['strike']
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    # Format the symbol column based on the instrument type
+    df['symbol'] = build_derivative_symbols(df, all_options=True)
 
     # Set exchange
     df['exchange'] = 'NFO'
     df['brexchange'] = df['exchange']
 
-    # Handle strike prices
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))
-            else:
-                return float(strike)
-        except (ValueError, TypeError):
-            return -1
-
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Handle numeric values
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)
@@ -284,13 +200,6 @@ def process_firstock_bse_data(output_path):
     # Initialize symbol with brsymbol
     df['symbol'] = df['brsymbol']
 
-    # Apply transformation for OpenAlgo symbols (no special logic needed for BSE)
-    def get_openalgo_symbol(broker_symbol):
-        return broker_symbol
-
-    # Update the symbol column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
-
     # Set Exchange: 'BSE' for all rows
     df['exchange'] = 'BSE'
     df['brexchange'] = df['exchange']
@@ -343,46 +252,21 @@ def process_firstock_bfo_data(output_path):
     df['expiry'] = df['expiry'].fillna('')
     df['strike'] = df['strike'].fillna(-1)
 
-    # Format expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Set instrument type based on option type
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
-    # Format symbol based on instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(row['strike']) if float(row['strike']).is_integer() else row['strike']
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    # Format the symbol column based on the instrument type
+    df['symbol'] = build_derivative_symbols(df, all_options=True)
 
     # Set exchange
     df['exchange'] = 'BFO'
     df['brexchange'] = df['exchange']
 
-    # Handle strike prices
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))
-            else:
-                return float(strike)
-        except (ValueError, TypeError):
-            return -1
-
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Handle numeric values
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)
@@ -412,7 +296,7 @@ def master_contract_download():
         
         # Initialize database
         init_db()
-        delete_symtoken_table()
+        loader = MasterContractLoader()
         
         # Download data
         downloaded_files = download_firstock_data(output_path)
@@ -421,19 +305,21 @@ def master_contract_download():
             # Process each exchange
             if 'NSE_symbols.csv' in downloaded_files:
                 token_df = process_firstock_nse_data(output_path)
-                copy_from_dataframe(token_df)
+                loader.add(token_df)
             
             if 'BSE_symbols.csv' in downloaded_files:
                 token_df = process_firstock_bse_data(output_path)
-                copy_from_dataframe(token_df)
+                loader.add(token_df)
             
             if 'NFO_symbols.csv' in downloaded_files:
                 token_df = process_firstock_nfo_data(output_path)
-                copy_from_dataframe(token_df)
+                loader.add(token_df)
             
             if 'BFO_symbols.csv' in downloaded_files:
                 token_df = process_firstock_bfo_data(output_path)
-                copy_from_dataframe(token_df)
+                loader.add(token_df)
+            
+            loader.commit()
             
             # Clean up temporary files
             delete_firstock_temp_data(output_path)
@@ -2,6 +2,7 @@
 
 import os
 import pandas as pd
+import numpy as np
 import gzip
 import shutil
 from datetime import datetime
@@ -10,73 +11,19 @@ from datetime import datetime
 import httpx
 from utils.httpx_client import get_httpx_client
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
-
 def download_csv_5paisa_data(url, output_path):
     """
     Downloads a CSV file from the specified URL and saves it to the specified path using shared httpx client.
@@ -167,17 +114,12 @@ def process_5paisa_csv(path):
 
 
 
-    # Function to map Exch and ExchType to exchange names with additional conditions
-    def map_exchange(row):
-        if row['Exch'] == 'N' and row['ExchType'] == 'C':
-            return 'NSE_INDEX' if row['ScripCode'] > 999900 else 'NSE'
-        elif row['Exch'] == 'B' and row['ExchType'] == 'C':
-            return 'BSE_INDEX' if row['ScripCode'] > 999900 else 'BSE'
-        else:
-            return exchange_mapping.get((row['Exch'], row['ExchType']), 'Unknown')
-
-    # Apply the function to create the exchange column
-    df['exchange'] = df.apply(map_exchange, axis=1)
+    # Map Exch and ExchType to exchange names; cash scrip codes above 999900 are indices
+    pair_mapping = {exch + exch_type: name for (exch, exch_type), name in exchange_mapping.items()}
+    df['exchange'] = (df['Exch'].astype(str) + df['ExchType'].astype(str)).map(pair_mapping).fillna('Unknown')
+    is_index = df['ScripCode'] > 999900
+    df.loc[(df['exchange'] == 'NSE') & is_index, 'exchange'] = 'NSE_INDEX'
+    df.loc[(df['exchange'] == 'BSE') & is_index, 'exchange'] = 'BSE_INDEX'
 
     # Filter the DataFrame for Series 'EQ', 'BE', 'XX'
     filtered_df = df[df['Series'].isin(['EQ', 'BE', 'XX', '  '])].copy()
@@ -192,22 +134,8 @@ def process_5paisa_csv(path):
     # Format 'Expiry' to 'DD-MMM-YY'
     filtered_df['Expiry'] = filtered_df['Expiry'].dt.strftime('%d-%b-%y').str.upper()
 
-    # Function to format StrikeRate
-    def format_strike(strike):
-        # Convert strike to string first
-        strike_str = str(strike)
-        # Check if the string ends with '.0' and remove it
-        if strike_str.endswith('.0'):
-            # Remove the last two characters '.0'
-            return strike_str[:-2]
-        elif strike_str.endswith('.00'):
-            # Remove the last three characters '.00'
-            return strike_str[:-3]
-        # Return the original string if it does not end with '.0'
-        return strike_str
-
-    # Apply the function to the StrikeRate column
-    filtered_df['StrikeRate'] = filtered_df['StrikeRate'].apply(format_strike)
+    # Format StrikeRate, dropping a trailing '.0' or '.00'
+    filtered_df['StrikeRate'] = filtered_df['StrikeRate'].astype(str).str.replace(r'\.00?$', '', regex=True)
 
 
 
@@ -215,18 +143,15 @@ def process_5paisa_csv(path):
     filtered_df['Expiry1'] = filtered_df['Expiry'].astype(str).str.replace('-', '')
 
     # Apply the conditions
-    def create_trading_symbol(row):
-        if row['Series'] in ['BE', 'EQ']:
-            return row['SymbolRoot']
-        elif row['Series'] == 'XX':
-            return row['SymbolRoot'] + row['Expiry1'] + 'FUT'
-        elif row['Series'] == 'CE':
-            return row['SymbolRoot'] + row['Expiry1'] + str(row['StrikeRate']) + 'CE'
-        elif row['Series'] == 'PE':
-            return row['SymbolRoot'] + row['Expiry1'] + str(row['StrikeRate']) + 'PE'
-        return row['SymbolRoot'] 
-
-    filtered_df['TradingSymbol'] = filtered_df.apply(create_trading_symbol, axis=1)
+    root = filtered_df['SymbolRoot']
+    series = filtered_df['Series']
+    derivative = root + filtered_df['Expiry1']
+    option = derivative + filtered_df['StrikeRate'].astype(str)
+    filtered_df['TradingSymbol'] = np.select(
+        [series.isin(['BE', 'EQ']), series == 'XX', series == 'CE', series == 'PE'],
+        [root, derivative + 'FUT', option + 'CE', option + 'PE'],
+        root,
+    )
 
     # Create a new DataFrame in OpenAlgo format
     new_df = pd.DataFrame()
@@ -288,8 +213,9 @@ def master_contract_download():
         
         # Clear existing data and insert new data
         logger.info("Updating database with new symbols...")
-        delete_symtoken_table()  # Clear existing table
-        copy_from_dataframe(token_df)
+        loader = MasterContractLoader()
+        loader.add(token_df)
+        loader.commit()
         
         logger.info("Master contract download completed successfully")
         # Notify UI through Socket.IO
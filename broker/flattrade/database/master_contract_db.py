@@ -1,10 +1,13 @@
 import os
-import requests
+import shutil
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, engine
+from database.master_contract_ingest import (
+    MasterContractLoader, build_derivative_symbols, format_expiry, normalize_strike,
+    strip_series_suffix
+)
+from utils.contract_downloader import download_contract_files, mark_contract_loaded
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -16,31 +19,7 @@ except ImportError:
 
 
 
-# Database setup
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-# Define SymToken table
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
+DATABASE_URL = os.getenv('DATABASE_URL')
 
 def init_db():
     """Initialize the database and create tables"""
@@ -53,34 +32,6 @@ def init_db():
     
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info(f"No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 # Define the Flattrade URLs for downloading the symbol files
 flattrade_urls = {
     "NSE": "https://flattrade.s3.ap-south-1.amazonaws.com/scripmaster/NSE_Equity.csv",
@@ -95,34 +46,29 @@ flattrade_urls = {
 
 def download_csv_data(output_path):
     """
-    Downloads CSV files directly to the tmp folder.
+    Downloads the CSV files concurrently and copies them to the tmp folder.
+
+    Files are fetched conditionally (ETag/Last-Modified) and cached on disk.
+    When the contract already loaded in the database is unchanged nothing is
+    copied and the returned download has ``current`` set.
     """
     logger.info("Downloading CSV Data")
 
     if not os.path.exists(output_path):
         os.makedirs(output_path)
 
-    downloaded_files = []
-
-    for key, url in flattrade_urls.items():
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                logger.info(f"Successfully downloaded {key} from {url}")
-                output_file = os.path.join(output_path, f"{key}.csv")
-                with open(output_file, 'wb') as f:
-                    f.write(response.content)
-                downloaded_files.append(f"{key}.csv")
-            else:
-                logger.error(f"Failed to download {key} from {url}. Status code: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error downloading {key} from {url}: {e}")
+    download = download_contract_files('flattrade', flattrade_urls)
+    if download.current:
+        return download
+
+    for key, item in download.available_files().items():
+        shutil.copyfile(item.path, os.path.join(output_path, f"{key}.csv"))
 
     # Combine NFO and BFO files
     combine_nfo_files(output_path)
     combine_bfo_files(output_path)
 
-    return downloaded_files
+    return download
 
 # Placeholder functions for processing data
 
@@ -176,26 +122,12 @@ def process_flattrade_nse_data(output_path):
         df['symbol'] = df['brsymbol'].copy()  # Initialize 'symbol' with 'brsymbol'
         df['tick_size'] = 0.05  # Default tick size for NSE
 
-        # Apply transformation for OpenAlgo symbols
-        def get_openalgo_symbol(broker_symbol):
-            if pd.isna(broker_symbol) or not broker_symbol:  # Handle NaN and empty values
-                return broker_symbol  # Return as is, will be filtered out later
-            broker_symbol = str(broker_symbol)  # Convert to string to ensure string operations work
-            # Separate by hyphen and apply logic for EQ and BE
-            if '-EQ' in broker_symbol:
-                return broker_symbol.replace('-EQ', '')
-            elif '-BE' in broker_symbol:
-                return broker_symbol.replace('-BE', '')
-            else:
-                # For other symbols (including index), OpenAlgo symbol remains the same as broker symbol
-                return broker_symbol
-
-        # Update the 'symbol' column
-        df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
+        # OpenAlgo symbols drop the -EQ/-BE series suffix
+        df['symbol'] = strip_series_suffix(df['brsymbol'].astype(str))
 
         # Define Exchange: 'NSE' for EQ and BE, 'NSE_INDEX' for indexes
         df['instrumenttype'] = df['instrumenttype'].fillna('EQ')  # Fill NaN values with 'EQ'
-        df['exchange'] = df.apply(lambda row: 'NSE_INDEX' if row['instrumenttype'] == 'INDEX' else 'NSE', axis=1)
+        df['exchange'] = np.where(df['instrumenttype'] == 'INDEX', 'NSE_INDEX', 'NSE')
         df['brexchange'] = df['exchange']  # Broker exchange is the same as exchange
 
         # Set empty columns for 'expiry' and fill -1 for 'strike' where the data is missing
@@ -203,7 +135,7 @@ def process_flattrade_nse_data(output_path):
         df['strike'] = pd.to_numeric(df.get('strike', pd.Series([-1] * len(df))), errors='coerce').fillna(-1)
 
         # Ensure the instrument type is consistent
-        df['instrumenttype'] = df['instrumenttype'].apply(lambda x: 'EQ' if x in ['EQ', 'BE'] else x)
+        df['instrumenttype'] = df['instrumenttype'].replace('BE', 'EQ')
 
         # Handle missing or invalid numeric values in 'lotsize'
         df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(1).astype(int)  # Default lotsize to 1
@@ -272,47 +204,21 @@ def process_flattrade_nfo_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(float(row['strike'])) if float(row['strike']).is_integer() else float(row['strike'])
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df, all_options=True)
 
     # Define Exchange
     df['exchange'] = 'NFO'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Handle missing or invalid numeric values in 'lotsize'
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)  # Convert to int, default to 0
@@ -357,47 +263,21 @@ def process_flattrade_cds_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(float(row['strike'])) if float(row['strike']).is_integer() else float(row['strike'])
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df, all_options=True)
 
     # Define Exchange
     df['exchange'] = 'CDS'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Handle missing or invalid numeric values in 'lotsize'
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)  # Convert to int, default to 0
@@ -442,47 +322,21 @@ def process_flattrade_mcx_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(float(row['strike'])) if float(row['strike']).is_integer() else float(row['strike'])
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df, all_options=True)
 
     # Define Exchange
     df['exchange'] = 'MCX'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Handle missing or invalid numeric values in 'lotsize'
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)  # Convert to int, default to 0
@@ -524,13 +378,6 @@ def process_flattrade_bse_data(output_path):
     df['symbol'] = df['brsymbol']  # Initialize 'symbol' with 'brsymbol'
     df['tick_size'] = 0.05  # Default tick size for BSE
 
-    # Apply transformation for OpenAlgo symbols (no special logic needed here)
-    def get_openalgo_symbol(broker_symbol):
-        return broker_symbol
-
-    # Update the 'symbol' column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
-
     # Set Exchange: 'BSE' for all rows
     df['exchange'] = 'BSE'
     df['brexchange'] = df['exchange']
@@ -591,47 +438,21 @@ def process_flattrade_bfo_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(float(row['strike'])) if float(row['strike']).is_integer() else float(row['strike'])
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df, all_options=True)
 
     # Define Exchange
     df['exchange'] = 'BFO'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Handle missing or invalid numeric values in 'lotsize'
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)  # Convert to int, default to 0
@@ -677,22 +498,30 @@ def master_contract_download():
 
     output_path = 'tmp'
     try:
-        download_csv_data(output_path)
-        delete_symtoken_table()
+        download = download_csv_data(output_path)
+        if download.current:
+            logger.info("Flattrade master contract unchanged since last load, skipping reload")
+            if socketio:
+                return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
+            return
+
+        loader = MasterContractLoader()
         
         # Placeholders for processing different exchanges
         token_df = process_flattrade_nse_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_flattrade_bse_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_flattrade_nfo_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_flattrade_cds_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_flattrade_mcx_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_flattrade_bfo_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
+        mark_contract_loaded(download)
         
         delete_flattrade_temp_data(output_path)
         
@@ -3,9 +3,6 @@
 import os
 import pandas as pd
 import numpy as np
-import httpx
-from typing import List, Tuple, Optional, Dict, Any
-from utils.httpx_client import get_httpx_client
 import requests
 import gzip
 import shutil
@@ -16,11 +13,11 @@ import gzip
 import io
 
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader
+from utils.contract_downloader import download_contract_files, mark_contract_loaded
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -61,80 +58,25 @@ data_types = {
     "Reserved column3": str, 
 }
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.exception(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
-
+def download_csv_fyers_data(output_path: str):
+    """
+    Download the Fyers master contract CSV files concurrently.
 
+    Files are fetched conditionally (ETag/Last-Modified) and cached on disk.
+    When the contract already loaded in the database is unchanged nothing is
+    copied and the returned download has ``current`` set.
 
-def download_csv_fyers_data(output_path: str) -> Tuple[bool, List[str], Optional[str]]:
-    """
-    Download Fyers master contract CSV files using a shared HTTPX client with connection pooling.
-    
     Args:
         output_path (str): Directory path where the CSV files will be saved
-        
+
     Returns:
-        Tuple[bool, List[str], Optional[str]]: 
-            - bool: True if all downloads were successful, False otherwise
-            - List[str]: List of paths to downloaded files
-            - Optional[str]: Error message if any error occurred, None otherwise
+        ContractDownload: Per-file results of the download
     """
-    from utils.httpx_client import get_httpx_client
     logger.info("Downloading Master Contract CSV Files")
     
     # URLs of the CSV files to be downloaded
@@ -146,52 +88,26 @@ def download_csv_fyers_data(output_path: str) -> Tuple[bool, List[str], Optional
         "BSE_FO": "https://public.fyers.in/sym_details/BSE_FO.csv",
         "MCX_COM": "https://public.fyers.in/sym_details/MCX_COM.csv"
     }
+
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    download = download_contract_files('fyers', csv_urls)
+    if download.current:
+        return download
+
+    for key, item in download.available_files().items():
+        file_path = os.path.join(output_path, f"{key}.csv")
+        shutil.copyfile(item.path, file_path)
+        logger.info(f"Copied {key} to {file_path}")
+
+    return download
     
-    downloaded_files = []
-    errors = []
-    
-    # Get the shared HTTPX client with connection pooling
-    client = get_httpx_client()
-    
-    try:
-        for key, url in csv_urls.items():
-            try:
-                response = client.get(url, timeout=30.0)
-                response.raise_for_status()  # Raises an exception for 4XX/5XX responses
-                
-                file_path = os.path.join(output_path, f"{key}.csv")
-                with open(file_path, 'wb') as file:
-                    file.write(response.content)
-                downloaded_files.append(file_path)
-                logger.info(f"Successfully downloaded {key} to {file_path}")
-                
-            except httpx.HTTPStatusError as e:
-                error_msg = f"HTTP error occurred while downloading {key} from {url}: {e.response.status_code} {e.response.reason_phrase}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-            except httpx.RequestError as e:
-                error_msg = f"Request error occurred while downloading {key} from {url}: {e}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-            except Exception as e:
-                error_msg = f"Unexpected error downloading {key}: {e}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-    finally:
-        # Don't close the client as it's shared
-        pass
-    
-    # Determine success/failure based on whether we got all files
-    success = len(downloaded_files) == len(csv_urls)
-    error_msg = "; ".join(errors) if errors else None
-    
-    return success, downloaded_files, error_msg
-    
-def reformat_symbol_detail(s):
-    parts = s.split()  # Split the string into parts
+def reformat_symbol_detail(details):
+    parts = details.str.split()  # Split each string into parts
     # Reorder and format the parts to match the desired output
     # Assuming the format is consistent and always "Name DD Mon YY FUT"
-    return f"{parts[0]}{parts[3]}{parts[2].upper()}{parts[1]}{parts[4]}"
+    return parts.str[0] + parts.str[3] + parts.str[2].str.upper() + parts.str[1] + parts.str[4]
 
 def process_fyers_nse_csv(path):
     """
@@ -320,9 +236,10 @@ def process_fyers_nfo_csv(path):
 
 
     # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[df['Option type'] == 'XX', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
+    symbol_details = reformat_symbol_detail(df['Symbol Details'])
+    df.loc[df['Option type'] == 'XX', 'symbol'] = symbol_details
+    df.loc[df['Option type'] == 'CE', 'symbol'] = symbol_details+'CE'
+    df.loc[df['Option type'] == 'PE', 'symbol'] = symbol_details+'PE'
 
     # List of columns to remove
     columns_to_remove = [
@@ -367,9 +284,10 @@ def process_fyers_cds_csv(path):
 
 
     # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[df['Option type'] == 'XX', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
+    symbol_details = reformat_symbol_detail(df['Symbol Details'])
+    df.loc[df['Option type'] == 'XX', 'symbol'] = symbol_details
+    df.loc[df['Option type'] == 'CE', 'symbol'] = symbol_details+'CE'
+    df.loc[df['Option type'] == 'PE', 'symbol'] = symbol_details+'PE'
 
     # List of columns to remove
     columns_to_remove = [
@@ -414,9 +332,10 @@ def process_fyers_bfo_csv(path):
 
 
     # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[(df['Option type'] == 'XX') | df['Option type'].isna(), 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
+    symbol_details = reformat_symbol_detail(df['Symbol Details'])
+    df.loc[(df['Option type'] == 'XX') | df['Option type'].isna(), 'symbol'] = symbol_details
+    df.loc[df['Option type'] == 'CE', 'symbol'] = symbol_details+'CE'
+    df.loc[df['Option type'] == 'PE', 'symbol'] = symbol_details+'PE'
 
     # List of columns to remove
     columns_to_remove = [
@@ -461,9 +380,10 @@ def process_fyers_mcx_csv(path):
 
 
     # Apply the function to rows where 'Option type' is 'XX'
-    df.loc[df['Option type'] == 'XX', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)
-    df.loc[df['Option type'] == 'CE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'CE'
-    df.loc[df['Option type'] == 'PE', 'symbol'] = df['Symbol Details'].apply(lambda x: reformat_symbol_detail(x) if pd.notnull(x) else x)+'PE'
+    symbol_details = reformat_symbol_detail(df['Symbol Details'])
+    df.loc[df['Option type'] == 'XX', 'symbol'] = symbol_details
+    df.loc[df['Option type'] == 'CE', 'symbol'] = symbol_details+'CE'
+    df.loc[df['Option type'] == 'PE', 'symbol'] = symbol_details+'PE'
 
     # List of columns to remove
     columns_to_remove = [
@@ -505,20 +425,26 @@ def master_contract_download():
 
     output_path = 'tmp'
     try:
-        download_csv_fyers_data(output_path)
-        delete_symtoken_table()
+        download = download_csv_fyers_data(output_path)
+        if download.current:
+            logger.info("Fyers master contract unchanged since last load, skipping reload")
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
+
+        loader = MasterContractLoader()
         token_df = process_fyers_nse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_fyers_bse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_fyers_bfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_fyers_nfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_fyers_cds_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_fyers_mcx_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
+        mark_contract_loaded(download)
         delete_fyers_temp_data(output_path)
         #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
         
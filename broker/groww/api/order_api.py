@@ -3,7 +3,10 @@ import os
 import uuid
 import re
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from cachetools import TTLCache
 from database.auth_db import get_auth_token
 from database.token_db import get_token
 from database.token_db import get_br_symbol, get_oa_symbol, get_symbol
@@ -16,11 +19,12 @@ from broker.groww.mapping.transform_data import (
     # Constants
     VALIDITY_DAY, VALIDITY_IOC,
     EXCHANGE_NSE, EXCHANGE_BSE, 
-    SEGMENT_CASH, SEGMENT_FNO,
+    SEGMENT_CASH, SEGMENT_FNO, SEGMENT_CURRENCY, SEGMENT_COMMODITY,
     PRODUCT_CNC, PRODUCT_MIS, PRODUCT_NRML,
     ORDER_TYPE_MARKET, ORDER_TYPE_LIMIT, ORDER_TYPE_SL, ORDER_TYPE_SLM,
     TRANSACTION_TYPE_BUY, TRANSACTION_TYPE_SELL,
-    ORDER_STATUS_NEW, ORDER_STATUS_ACKED, ORDER_STATUS_APPROVED, ORDER_STATUS_CANCELLED
+    ORDER_STATUS_NEW, ORDER_STATUS_ACKED, ORDER_STATUS_APPROVED, ORDER_STATUS_CANCELLED,
+    ORDER_STATUS_EXECUTED, ORDER_STATUS_COMPLETED, ORDER_STATUS_REJECTED, ORDER_STATUS_FAILED
 )
 from utils.logging import get_logger
 
@@ -34,6 +38,93 @@ GROWW_MODIFY_ORDER_URL = f'{GROWW_BASE_URL}/v1/order/modify'
 GROWW_CANCEL_ORDER_URL = f'{GROWW_BASE_URL}/v1/order/cancel'
 GROWW_ORDER_TRADES_URL = f'{GROWW_BASE_URL}/v1/order/trades'
 
+ORDER_LIST_PAGE_SIZE = 25  # Maximum allowed by Groww API
+
+# Upper bound on concurrent per-order trade requests when building the tradebook
+GROWW_MAX_CONCURRENT_REQUESTS = 8
+
+TRADE_SEGMENT_MAP = {
+    'CASH': SEGMENT_CASH,
+    'FNO': SEGMENT_FNO,
+    'F&O': SEGMENT_FNO,
+    'OPTIONS': SEGMENT_FNO,
+    'FUTURES': SEGMENT_FNO,
+    'CURRENCY': SEGMENT_CURRENCY,
+    'COMMODITY': SEGMENT_COMMODITY
+}
+
+# Trades of orders in a final state no longer change, so they are fetched
+# once per session: (auth, order_id) -> (filled quantity, trades)
+TERMINAL_ORDER_STATUSES = {
+    ORDER_STATUS_EXECUTED, ORDER_STATUS_COMPLETED, ORDER_STATUS_CANCELLED,
+    ORDER_STATUS_REJECTED, ORDER_STATUS_FAILED, 'COMPLETE', 'FILLED'
+}
+terminal_order_trades = TTLCache(maxsize=4096, ttl=24 * 60 * 60)
+terminal_order_trades_lock = threading.Lock()
+
+def _fetch_segment_orders(client, headers, segment):
+    """Fetch every page of one segment's order list"""
+    segment_orders = []
+    page = 0
+    page_size = ORDER_LIST_PAGE_SIZE
+
+    logger.info(f"Fetching order book for segment {segment} with pagination (page_size={page_size})")
+
+    # Keep fetching until we get all orders for this segment
+    while True:
+        try:
+            # Build request URL with query parameters
+            params = {
+                'segment': segment,
+                'page': page,
+                'page_size': page_size
+            }
+
+            logger.debug(f"Making API request to {GROWW_ORDER_LIST_URL} with params: {params}")
+
+            # Make the API request
+            response = client.get(
+                GROWW_ORDER_LIST_URL,
+                headers=headers,
+                params=params
+            )
+
+            # Check for HTTP errors
+            response.raise_for_status()
+
+            # Parse the response
+            orders_data = response.json()
+            logger.debug(f"API Response status: {orders_data.get('status')}")
+
+            if orders_data.get('status') != 'SUCCESS' or not orders_data.get('payload', {}).get('order_list'):
+                logger.info(f"No orders found or empty response for segment {segment} on page {page}")
+                break
+
+            current_orders = orders_data['payload']['order_list']
+            logger.info(f"Retrieved {len(current_orders)} orders for segment {segment} from page {page}")
+
+            # Log details about first order for debugging
+            if current_orders and page == 0:
+                sample_order = current_orders[0]
+                logger.debug(f"Sample order fields: {list(sample_order.keys())}")
+                logger.debug(f"Sample order values: {sample_order}")
+
+            segment_orders.extend(current_orders)
+
+            # If we got less than page_size orders, we've reached the end for this segment
+            if len(current_orders) < page_size:
+                logger.info(f"Reached last page of orders for segment {segment} at page {page}")
+                break
+
+            page += 1
+
+        except Exception as e:
+            logger.error(f"Error in pagination loop for segment {segment} at page {page}: {str(e)}")
+            break
+
+    return segment_orders
+
+
 def direct_get_order_book(auth):
     """
     Get list of orders for the user using direct API calls instead of SDK
@@ -59,63 +150,10 @@ def direct_get_order_book(auth):
         all_orders = []
         segments = [SEGMENT_CASH, SEGMENT_FNO]  # Fetch from both segments
         
-        for segment in segments:
-            page = 0
-            page_size = 25  # Maximum allowed by Groww API
-            
-            logger.info(f"Fetching order book for segment {segment} with pagination (page_size={page_size})")
-            
-            # Keep fetching until we get all orders for this segment
-            while True:
-                try:
-                    # Build request URL with query parameters
-                    params = {
-                        'segment': segment,
-                        'page': page,
-                        'page_size': page_size
-                    }
-                    
-                    logger.debug(f"Making API request to {GROWW_ORDER_LIST_URL} with params: {params}")
-                    
-                    # Make the API request
-                    response = client.get(
-                        GROWW_ORDER_LIST_URL,
-                        headers=headers,
-                        params=params
-                    )
-                    
-                    # Check for HTTP errors
-                    response.raise_for_status()
-                    
-                    # Parse the response
-                    orders_data = response.json()
-                    logger.debug(f"API Response status: {orders_data.get('status')}")
-                    
-                    if orders_data.get('status') != 'SUCCESS' or not orders_data.get('payload', {}).get('order_list'):
-                        logger.info(f"No orders found or empty response for segment {segment} on page {page}")
-                        break
-                    
-                    current_orders = orders_data['payload']['order_list']
-                    logger.info(f"Retrieved {len(current_orders)} orders for segment {segment} from page {page}")
-                    
-                    # Log details about first order for debugging
-                    if current_orders and page == 0:
-                        sample_order = current_orders[0]
-                        logger.debug(f"Sample order fields: {list(sample_order.keys())}")
-                        logger.debug(f"Sample order values: {sample_order}")
-                    
-                    all_orders.extend(current_orders)
-                    
-                    # If we got less than page_size orders, we've reached the end for this segment
-                    if len(current_orders) < page_size:
-                        logger.info(f"Reached last page of orders for segment {segment} at page {page}")
-                        break
-                        
-                    page += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error in pagination loop for segment {segment} at page {page}: {str(e)}")
-                    break
+        # Segments are paged independently, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            for segment_orders in pool.map(lambda segment: _fetch_segment_orders(client, headers, segment), segments):
+                all_orders.extend(segment_orders)
         
         logger.info(f"Successfully fetched total of {len(all_orders)} orders using direct API")
         
@@ -177,7 +215,7 @@ def direct_get_order_book(auth):
                     # Approach 2: Database lookup by broker symbol
                     if not symbol_converted:
                         try:
-                            from broker.groww.database.master_contract_db import SymToken, db_session
+                            from database.symbol import SymToken, db_session
                             with db_session() as session:
                                 record = session.query(SymToken).filter(
                                     SymToken.brsymbol == groww_symbol,
@@ -290,6 +328,155 @@ def get_order_book(auth):
     logger.info("Using direct API implementation for get_order_book")
     return direct_get_order_book(auth)
 
+def _fetch_trades_for_order(potential_order, auth):
+    """
+    Fetch the trades of one executed order, falling back to a synthetic trade
+    built from the order when the trades API has none.
+
+    Returns:
+        tuple: (trades, True if the trades came from the trades API)
+    """
+    trades = []
+    from_api = False
+    order_id = potential_order['order_id']
+    raw_segment = potential_order['segment']
+
+    # Determine the correct segment based on order ID and segment info
+    if order_id.startswith("GLTFO"):
+        segment = SEGMENT_FNO
+        logger.info(f"Using FNO segment for order {order_id} based on order ID prefix")
+    else:
+        segment = TRADE_SEGMENT_MAP.get(raw_segment, SEGMENT_CASH)
+        logger.info(f"Using segment {segment} for order {order_id} (from {raw_segment})")
+
+    logger.info(f"Fetching trades for order {order_id} (segment: {segment})")
+
+    try:
+        # Use our new direct API function to get trades for this order
+        trades_result = get_order_trades(order_id, auth, segment)
+
+        if isinstance(trades_result, tuple) and len(trades_result) >= 1:
+            trades_data = trades_result[0]
+            logger.info(f"Trade result status for order {order_id}: {trades_data.get('status')}")
+
+            # Check if trades were found
+            if trades_data.get('status') == 'success' and 'trades' in trades_data:
+                if trades_data['trades']:
+                    trades.extend(trades_data['trades'])
+                    from_api = True
+                    logger.info(f"SUCCESS: Added {len(trades_data['trades'])} trades from order {order_id}")
+                else:
+                    logger.info(f"Order {order_id} has no trades despite being executed")
+
+                    # For executed orders with filled quantity but no trades, create a synthetic trade entry
+                    if potential_order.get('filled_quantity', 0) > 0:
+                        logger.info(f"Creating synthetic trade for executed order {order_id} with filled quantity")
+
+                        # Create a synthetic trade based on order details
+                        synthetic_trade = {
+                            'trade_id': f"synthetic_{order_id}",
+                            'order_id': order_id,
+                            'exchange_trade_id': '',
+                            'exchange_order_id': '',
+                            'symbol': potential_order.get('symbol', ''),
+                            'quantity': potential_order.get('filled_quantity', 0),
+                            'price': 0,  # We don't have this information
+                            'trade_status': 'EXECUTED',
+                            'exchange': '',
+                            'segment': raw_segment,
+                            'product': potential_order.get('product', 'MIS'),  # Default to MIS if not available
+                            'transaction_type': potential_order.get('transaction_type', 'BUY'),  # Use original transaction type when available
+                            'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                            'trade_date_time': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                            'settlement_number': '',
+                            'remarks': 'Synthetic trade created from executed order'
+                        }
+                        trades.append(synthetic_trade)
+                        logger.info(f"Added synthetic trade for order {order_id}")
+            # Check for special cases: 404 errors for FNO orders 
+            elif trades_data.get('status') == 'error' and segment == SEGMENT_FNO and trades_result[1] == 404:
+                # For FNO orders that return 404, create a synthetic trade
+                if potential_order.get('filled_quantity', 0) > 0:
+                    # Log the detailed information from potential_order for debugging
+                    logger.info(f"Creating synthetic trade for FNO order {order_id} due to 404 error")
+                    logger.info(f"Order details for synthetic trade: {json.dumps(potential_order, indent=2, default=str)}")
+                    logger.info(f"Transaction type found: {potential_order.get('transaction_type')}")
+
+                    # Create a synthetic trade
+                    synthetic_trade = {
+                        'trade_id': f"synthetic_fno_{order_id}",
+                        'order_id': order_id,
+                        'exchange_trade_id': '',
+                        'exchange_order_id': '',
+                        'symbol': potential_order.get('symbol', ''),
+                        'quantity': potential_order.get('filled_quantity', 0),
+                        'price': potential_order.get('price', 0),
+                        'trade_status': 'EXECUTED',
+                        'exchange': potential_order.get('exchange', ''),
+                        'segment': raw_segment,
+                        'product': potential_order.get('product', 'MIS'),  # Default to MIS if not available
+                        'transaction_type': potential_order.get('transaction_type', 'BUY'),  # Default to BUY if not available
+                        'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                        'trade_date_time': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                        'settlement_number': '',
+                        'remarks': 'Synthetic FNO trade created due to API limitation (404)'
+                    }
+                    trades.append(synthetic_trade)
+                    logger.info(f"Added synthetic FNO trade for order {order_id}")
+            else:
+                logger.warning(f"No trades found for order {order_id}: {trades_data.get('message', 'Unknown reason')}")
+
+                # Check for orders where we should create synthetic trades anyway
+                if potential_order.get('filled_quantity', 0) > 0 and potential_order.get('status', '').upper() in ['EXECUTED', 'COMPLETE', 'FILLED']:
+                    logger.info(f"Creating synthetic trade for executed order {order_id} despite API error")
+
+                    # Create a synthetic trade based on order details
+                    synthetic_trade = {
+                        'trade_id': f"synthetic_fallback_{order_id}",
+                        'order_id': order_id,
+                        'exchange_trade_id': '',
+                        'exchange_order_id': '',
+                        'symbol': potential_order.get('symbol', ''),
+                        'quantity': potential_order.get('filled_quantity', 0),
+                        'price': potential_order.get('price', 0),
+                        'trade_status': 'EXECUTED',
+                        'exchange': potential_order.get('exchange', ''),
+                        'segment': raw_segment,
+                        'product': potential_order.get('product', 'MIS'),  # Default to MIS if not available
+                        'transaction_type': potential_order.get('transaction_type', 'BUY'),  # Default to BUY if not available
+                        'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                        'trade_date_time': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                        'settlement_number': '',
+                        'remarks': 'Synthetic trade created for executed order (API error fallback)'
+                    }
+                    trades.append(synthetic_trade)
+                    logger.info(f"Added synthetic fallback trade for order {order_id}")
+        else:
+            logger.warning(f"Unexpected format for trades result for order {order_id}")
+    except Exception as e:
+        logger.error(f"Error fetching trades for order {order_id}: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+    return trades, from_api
+
+
+def _get_order_trades_cached(potential_order, auth):
+    """Trades of one order; trades of orders in a final state are fetched only once per session."""
+    key = (auth, potential_order['order_id'])
+    terminal = potential_order['status'] in TERMINAL_ORDER_STATUSES
+    if terminal:
+        with terminal_order_trades_lock:
+            cached = terminal_order_trades.get(key)
+        if cached is not None and cached[0] == potential_order['filled_quantity']:
+            return cached[1]
+
+    trades, from_api = _fetch_trades_for_order(potential_order, auth)
+    if terminal and from_api:
+        with terminal_order_trades_lock:
+            terminal_order_trades[key] = (potential_order['filled_quantity'], trades)
+    return trades
+
+
 def get_trade_book(auth):
     """
     Get list of all trades for the user using direct API calls
@@ -440,138 +627,13 @@ def get_trade_book(auth):
         
         logger.info(f"Found {len(potential_trade_orders)} potential orders with trades")
         
-        # Now fetch trades for each executed order
+        # Now fetch trades for each executed order, a bounded number at a time
         all_trades = []
-        segment_map = {
-            'CASH': SEGMENT_CASH,
-            'FNO': SEGMENT_FNO,
-            'F&O': SEGMENT_FNO,
-            'OPTIONS': SEGMENT_FNO,
-            'FUTURES': SEGMENT_FNO,
-            'CURRENCY': SEGMENT_CURRENCY,
-            'COMMODITY': SEGMENT_COMMODITY
-        }
-        
-        # Attempt to fetch trades for each potential order
-        for index, potential_order in enumerate(potential_trade_orders):
-            order_id = potential_order['order_id']
-            raw_segment = potential_order['segment']
-            
-            # Determine the correct segment based on order ID and segment info
-            if order_id.startswith("GLTFO"):
-                segment = SEGMENT_FNO
-                logger.info(f"Using FNO segment for order {order_id} based on order ID prefix")
-            else:
-                segment = segment_map.get(raw_segment, SEGMENT_CASH)
-                logger.info(f"Using segment {segment} for order {order_id} (from {raw_segment})")
-            
-            logger.info(f"Fetching trades for order {index+1}/{len(potential_trade_orders)}: {order_id} (segment: {segment})")
-            
-            try:
-                # Use our new direct API function to get trades for this order
-                trades_result = get_order_trades(order_id, auth, segment)
-                
-                if isinstance(trades_result, tuple) and len(trades_result) >= 1:
-                    trades_data = trades_result[0]
-                    logger.info(f"Trade result status for order {order_id}: {trades_data.get('status')}")
-                    
-                    # Check if trades were found
-                    if trades_data.get('status') == 'success' and 'trades' in trades_data:
-                        if trades_data['trades']:
-                            all_trades.extend(trades_data['trades'])
-                            logger.info(f"SUCCESS: Added {len(trades_data['trades'])} trades from order {order_id}")
-                        else:
-                            logger.info(f"Order {order_id} has no trades despite being executed")
-                            
-                            # For executed orders with filled quantity but no trades, create a synthetic trade entry
-                            if potential_order.get('filled_quantity', 0) > 0:
-                                logger.info(f"Creating synthetic trade for executed order {order_id} with filled quantity")
-                                
-                                # Create a synthetic trade based on order details
-                                synthetic_trade = {
-                                    'trade_id': f"synthetic_{order_id}",
-                                    'order_id': order_id,
-                                    'exchange_trade_id': '',
-                                    'exchange_order_id': '',
-                                    'symbol': potential_order.get('symbol', ''),
-                                    'quantity': potential_order.get('filled_quantity', 0),
-                                    'price': 0,  # We don't have this information
-                                    'trade_status': 'EXECUTED',
-                                    'exchange': '',
-                                    'segment': raw_segment,
-                                    'product': potential_order.get('product', 'MIS'),  # Default to MIS if not available
-                                    'transaction_type': potential_order.get('transaction_type', 'BUY'),  # Use original transaction type when available
-                                    'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                                    'trade_date_time': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                                    'settlement_number': '',
-                                    'remarks': 'Synthetic trade created from executed order'
-                                }
-                                all_trades.append(synthetic_trade)
-                                logger.info(f"Added synthetic trade for order {order_id}")
-                    # Check for special cases: 404 errors for FNO orders 
-                    elif trades_data.get('status') == 'error' and segment == SEGMENT_FNO and trades_result[1] == 404:
-                        # For FNO orders that return 404, create a synthetic trade
-                        if potential_order.get('filled_quantity', 0) > 0:
-                            # Log the detailed information from potential_order for debugging
-                            logger.info(f"Creating synthetic trade for FNO order {order_id} due to 404 error")
-                            logger.info(f"Order details for synthetic trade: {json.dumps(potential_order, indent=2, default=str)}")
-                            logger.info(f"Transaction type found: {potential_order.get('transaction_type')}")
-                            
-                            # Create a synthetic trade
-                            synthetic_trade = {
-                                'trade_id': f"synthetic_fno_{order_id}",
-                                'order_id': order_id,
-                                'exchange_trade_id': '',
-                                'exchange_order_id': '',
-                                'symbol': potential_order.get('symbol', ''),
-                                'quantity': potential_order.get('filled_quantity', 0),
-                                'price': potential_order.get('price', 0),
-                                'trade_status': 'EXECUTED',
-                                'exchange': potential_order.get('exchange', ''),
-                                'segment': raw_segment,
-                                'product': potential_order.get('product', 'MIS'),  # Default to MIS if not available
-                                'transaction_type': potential_order.get('transaction_type', 'BUY'),  # Default to BUY if not available
-                                'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                                'trade_date_time': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                                'settlement_number': '',
-                                'remarks': 'Synthetic FNO trade created due to API limitation (404)'
-                            }
-                            all_trades.append(synthetic_trade)
-                            logger.info(f"Added synthetic FNO trade for order {order_id}")
-                    else:
-                        logger.warning(f"No trades found for order {order_id}: {trades_data.get('message', 'Unknown reason')}")
-                        
-                        # Check for orders where we should create synthetic trades anyway
-                        if potential_order.get('filled_quantity', 0) > 0 and potential_order.get('status', '').upper() in ['EXECUTED', 'COMPLETE', 'FILLED']:
-                            logger.info(f"Creating synthetic trade for executed order {order_id} despite API error")
-                            
-                            # Create a synthetic trade based on order details
-                            synthetic_trade = {
-                                'trade_id': f"synthetic_fallback_{order_id}",
-                                'order_id': order_id,
-                                'exchange_trade_id': '',
-                                'exchange_order_id': '',
-                                'symbol': potential_order.get('symbol', ''),
-                                'quantity': potential_order.get('filled_quantity', 0),
-                                'price': potential_order.get('price', 0),
-                                'trade_status': 'EXECUTED',
-                                'exchange': potential_order.get('exchange', ''),
-                                'segment': raw_segment,
-                                'product': potential_order.get('product', 'MIS'),  # Default to MIS if not available
-                                'transaction_type': potential_order.get('transaction_type', 'BUY'),  # Default to BUY if not available
-                                'created_at': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                                'trade_date_time': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                                'settlement_number': '',
-                                'remarks': 'Synthetic trade created for executed order (API error fallback)'
-                            }
-                            all_trades.append(synthetic_trade)
-                            logger.info(f"Added synthetic fallback trade for order {order_id}")
-                else:
-                    logger.warning(f"Unexpected format for trades result for order {order_id}")
-            except Exception as e:
-                logger.error(f"Error fetching trades for order {order_id}: {e}")
-                import traceback
-                logger.error(f"Traceback: {traceback.format_exc()}")
+        if potential_trade_orders:
+            workers = min(GROWW_MAX_CONCURRENT_REQUESTS, len(potential_trade_orders))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for trades in pool.map(lambda order: _get_order_trades_cached(order, auth), potential_trade_orders):
+                    all_trades.extend(trades)
                 
         # Log summary of trade fetching
         if all_trades:
@@ -1179,7 +1241,7 @@ def direct_place_order_api(data, auth):
         quantity = int(data.get('quantity'))
         
         # First, try to look up the broker symbol (brsymbol) directly from the database
-        from broker.groww.database.master_contract_db import SymToken, db_session
+        from database.symbol import SymToken, db_session
         
         # Look up the symbol in the database
         with db_session() as session:
@@ -7,10 +7,9 @@ import httpx
 from io import StringIO
 from utils.httpx_client import get_httpx_client
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, db_session, engine
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader, format_strike
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -18,85 +17,11 @@ logger = get_logger(__name__)
 
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            logger.info(f"Inserting {len(filtered_data_dict)} new records into the database")
-            # Create a list of SymToken objects from the filtered data
-            symtoken_objects = []
-            for item in filtered_data_dict:
-                symtoken = SymToken(
-                    symbol=item.get('symbol', ''),
-                    brsymbol=item.get('brsymbol', ''),
-                    name=item.get('name', ''),
-                    exchange=item.get('exchange', ''),
-                    brexchange=item.get('brexchange', ''),
-                    token=item.get('token', ''),
-                    expiry=item.get('expiry', ''),
-                    strike=float(item.get('strike', 0)) if item.get('strike') else 0,
-                    lotsize=int(item.get('lotsize', 0)) if item.get('lotsize') else 0,
-                    instrumenttype=item.get('instrumenttype', ''),
-                    tick_size=float(item.get('tick_size', 0)) if item.get('tick_size') else 0
-                )
-                symtoken_objects.append(symtoken)
-            
-            # Add all objects and commit in one transaction
-            db_session.add_all(symtoken_objects)
-            db_session.commit()
-            logger.info(f"Successfully inserted {len(symtoken_objects)} records into the database")
-        else:
-            logger.info("No new records to insert")
-    except Exception as e:
-        db_session.rollback()
-        logger.error(f"Error during bulk insert: {e}")
-        raise
-
-
 # Functions for symbol format conversion between OpenAlgo and Groww formats
 def format_openalgo_to_groww_symbol(symbol, exchange):
     """
@@ -649,47 +574,25 @@ def process_groww_data(path):
         index_mask = (df['instrument_type'] == 'IDX') | (df['segment'] == 'IDX')
         df_mapped.loc[index_mask, 'instrumenttype'] = 'INDEX'
         
-        # Format the symbol for F&O (NFO) instruments to match OpenAlgo format
-        def format_fo_symbol(row):
-            # Skip non-FNO instruments or those with missing expiry
-            if row['brexchange'] != 'NSE' or pd.isna(row['expiry']) or row['expiry'] == '':
-                return row['symbol']
-                
-            # For segment='FNO', format according to OpenAlgo standard
-            if 'segment' in df.columns and df.loc[row.name, 'segment'] == 'FNO':
-                try:
-                    # Format expiry date (assuming yyyy-mm-dd format in input)
-                    expiry_date = pd.to_datetime(row['expiry'])
-                    expiry_str = expiry_date.strftime('%d%b%y').upper()
-                    
-                    # Get underlying symbol
-                    symbol = row['underlying'] if 'underlying' in row and not pd.isna(row['underlying']) else row['symbol'].split('-')[0] if '-' in row['symbol'] else row['symbol']
-                    
-                    # For futures
-                    if row['instrumenttype'] == 'FUT':
-                        return f"{symbol}{expiry_str}FUT"
-                    
-                    # For options
-                    elif row['instrumenttype'] == 'PE' or 'CE':
-                        # Determine strike price
-                        strike = str(int(row['strike'])) if not pd.isna(row['strike']) else '0'
-                        
-                        # Determine option type (CE/PE)
-                        option_type = ''
-                        if 'instrument_type' in df.columns:
-                            instrument_type = df.loc[row.name, 'instrument_type']
-                            option_type = 'CE' if instrument_type == 'CE' else 'PE' if instrument_type == 'PE' else ''
-                        
-                        if option_type:
-                            return f"{symbol}{expiry_str}{strike}{option_type}"
-                except Exception as e:
-                    logger.error(f"Error formatting F&O symbol: {e}")
-                    
-            # Return original symbol if formatting fails
-            return row['symbol']
-        
-        # Apply F&O symbol formatting
-        df_mapped['symbol'] = df_mapped.apply(format_fo_symbol, axis=1)
+        # Format the symbol for NSE F&O instruments to match OpenAlgo format
+        expiry_str = pd.to_datetime(df_mapped['expiry'], errors='coerce').dt.strftime('%d%b%y').str.upper()
+        fo_mask = (df_mapped['brexchange'] == 'NSE') & (df['segment'] == 'FNO') & expiry_str.notna()
+
+        # Use the underlying symbol, falling back to the trading symbol's prefix
+        underlying = df_mapped['symbol'].str.split('-').str[0]
+        if 'underlying' in df_mapped.columns:
+            underlying = df_mapped['underlying'].fillna(underlying)
+        base_symbol = underlying + expiry_str
+
+        # Futures get a FUT suffix, options their strike and CE/PE from Groww's instrument type
+        is_future = df_mapped['instrumenttype'] == 'FUT'
+        option_type = df['instrument_type'].where(df['instrument_type'].isin(['CE', 'PE']))
+        strike = format_strike(df_mapped['strike'], keep_fraction=False)
+        df_mapped['symbol'] = np.select(
+            [fo_mask & is_future, fo_mask & ~is_future & option_type.notna()],
+            [base_symbol + 'FUT', base_symbol + strike + option_type],
+            df_mapped['symbol'],
+        )
         
         logger.info(f"Processed {len(df_mapped)} instruments")
         return df_mapped
@@ -697,103 +600,6 @@ def process_groww_data(path):
     except Exception as e:
         logger.error(f"Error processing Groww instrument data: {e}")
         return pd.DataFrame()
-    
-    # Map instrument types to OpenAlgo standard types
-    instrument_type_map = {
-        'EQUITY': 'EQ',
-        'INDEX': 'INDEX',
-        'FUTURE': 'FUT',
-        'CALL': 'OPT',
-        'PUT': 'OPT',
-        'ETF': 'EQ',
-        'CURRENCY': 'CUR',
-        'COMMODITY': 'COM'
-    }
-    
-    # Apply instrument type mapping
-    all_instruments['instrumenttype'] = all_instruments['instrument_type'].map(instrument_type_map).fillna('EQ')
-    
-    # Map exchanges to OpenAlgo standard exchanges
-    exchange_map = {
-        'NSE': 'NSE',
-        'BSE': 'BSE',
-        'NFO': 'NFO',
-        'MCX': 'MCX',
-        'CDS': 'CDS'
-    }
-    
-    # Apply exchange mapping
-    all_instruments['exchange'] = all_instruments['brexchange'].map(exchange_map).fillna(all_instruments['brexchange'])
-    
-    # Special handling for indices
-    # Mark indices based on name patterns or specific flags in the data
-    index_patterns = ['NIFTY', 'SENSEX', 'BANKNIFTY', 'FINNIFTY', 'MIDCPNIFTY']
-    
-    for pattern in index_patterns:
-        index_mask = all_instruments['symbol'].str.contains(pattern, case=False, na=False)
-        all_instruments.loc[index_mask, 'instrumenttype'] = 'INDEX'
-        all_instruments.loc[index_mask, 'exchange'] = 'NSE_INDEX'
-    
-    # Format specific fields
-    all_instruments['expiry'] = all_instruments['expiry'].fillna('')
-    all_instruments['strike'] = pd.to_numeric(all_instruments['strike'].fillna(0), errors='coerce')
-    all_instruments['lotsize'] = pd.to_numeric(all_instruments['lotsize'].fillna(1), errors='coerce').astype(int)
-    all_instruments['tick_size'] = pd.to_numeric(all_instruments['tick_size'].fillna(0.05), errors='coerce')
-    
-    # Ensure brsymbol is not empty - use symbol if needed
-    all_instruments.loc[all_instruments['brsymbol'].isna() | (all_instruments['brsymbol'] == ''), 'brsymbol'] = \
-        all_instruments.loc[all_instruments['brsymbol'].isna() | (all_instruments['brsymbol'] == ''), 'symbol']
-    
-    # For F&O instruments, format the symbol in OpenAlgo format
-    fo_mask = all_instruments['exchange'] == 'NFO'
-    if fo_mask.any():
-        # Format F&O symbols according to OpenAlgo standard
-        def format_fo_symbol(row):
-            if pd.isna(row['expiry']) or row['expiry'] == '':
-                return row['symbol']
-                
-            # Format expiry date to standard format (e.g., 25MAY23)
-            try:
-                from datetime import datetime
-                expiry_date = pd.to_datetime(row['expiry'])
-                expiry_str = expiry_date.strftime('%d%b%y').upper()
-            except:
-                expiry_str = row['expiry']
-            
-            # For futures
-            if row['instrumenttype'] == 'FUT':
-                return f"{row['symbol']}{expiry_str}FUT"
-            
-            # For options
-            elif row['instrumenttype'] == 'OPT':
-                strike = str(int(row['strike'])) if not pd.isna(row['strike']) else '0'
-                option_type = 'CE' if 'option_type' in row and row['option_type'].upper() == 'CE' else 'PE'
-                return f"{row['symbol']}{expiry_str}{strike}{option_type}"
-            
-            return row['symbol']
-        
-        all_instruments.loc[fo_mask, 'symbol'] = all_instruments[fo_mask].apply(format_fo_symbol, axis=1)
-    
-    # Create final DataFrame with required columns
-    token_df = pd.DataFrame({
-        'symbol': all_instruments['symbol'],
-        'brsymbol': all_instruments['brsymbol'],
-        'name': all_instruments['name'],
-        'exchange': all_instruments['exchange'],
-        'brexchange': all_instruments['brexchange'],
-        'token': all_instruments['token'],
-        'expiry': all_instruments['expiry'],
-        'strike': all_instruments['strike'],
-        'lotsize': all_instruments['lotsize'],
-        'instrumenttype': all_instruments['instrumenttype'],
-        'tick_size': all_instruments['tick_size']
-    })
-    
-    # Remove duplicates
-    token_df = token_df.drop_duplicates(subset=['symbol', 'exchange'], keep='first')
-    
-    logger.info(f"Processed {len(token_df)} Groww instruments")
-    return token_df
 
 def delete_groww_temp_data(output_path):
     """Delete temporary files created during instrument data download"""
@@ -822,8 +628,8 @@ def master_contract_download():
         # Step 1: Download the instrument data
         download_groww_instrument_data(output_path)
         
-        # Step 2: Clear existing data
-        delete_symtoken_table()
+        # Step 2: Prepare the bulk loader
+        loader = MasterContractLoader()
         
         # Step 3: Process the downloaded data
         token_df = process_groww_data(output_path)
@@ -862,7 +668,8 @@ def master_contract_download():
         
         # Step 6: Insert into database
         logger.info(f"Inserting {len(token_df)} records into database")
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
         
         # Step 7: Cleanup
         delete_groww_temp_data(output_path)
@@ -106,7 +106,7 @@ def map_order_data(order_data):
         if openalgo_symbol == broker_symbol and ' ' in broker_symbol:
             try:
                 # Look up in database
-                from broker.groww.database.master_contract_db import SymToken, db_session
+                from database.symbol import SymToken, db_session
                 db_record = db_session.query(SymToken).filter_by(brsymbol=broker_symbol, brexchange=exchange).first()
                 if db_record and db_record.symbol:
                     openalgo_symbol = db_record.symbol
@@ -351,7 +351,7 @@ def transform_order_data(orders):
                 # First check if we already have the OpenAlgo symbol
                 if exchange == "NFO" and (broker_symbol.endswith('CE') or broker_symbol.endswith('PE')):
                     # Query the database to find the OpenAlgo symbol for this broker symbol
-                    from broker.groww.database.master_contract_db import SymToken, db_session
+                    from database.symbol import SymToken, db_session
                     with db_session() as session:
                         record = session.query(SymToken).filter(
                             SymToken.brsymbol == broker_symbol,
@@ -473,7 +473,7 @@ def transform_order_data(orders):
             
             # Last resort - try looking up the broker symbol directly from database
             try:
-                from broker.groww.database.master_contract_db import SymToken, db_session
+                from database.symbol import SymToken, db_session
                 with db_session() as session:
                     # Look for this symbol as a broker symbol (brsymbol) in the database
                     record = session.query(SymToken).filter(
@@ -566,7 +566,7 @@ def transform_tradebook_data(tradebook_data):
                 # For options/futures specifically, try database lookup
                 if exchange == "NFO" and (broker_symbol.endswith('CE') or broker_symbol.endswith('PE') or 'FUT' in broker_symbol):
                     # Query the database to find the OpenAlgo symbol for this broker symbol
-                    from broker.groww.database.master_contract_db import SymToken, db_session
+                    from database.symbol import SymToken, db_session
                     with db_session() as session:
                         record = session.query(SymToken).filter(
                             SymToken.brsymbol == broker_symbol,
@@ -745,7 +745,7 @@ def transform_positions_data(positions_data):
                 # For options/futures specifically, try database lookup
                 if exchange == "NFO" and (broker_symbol.endswith('CE') or broker_symbol.endswith('PE') or 'FUT' in broker_symbol):
                     # Query the database to find the OpenAlgo symbol for this broker symbol
-                    from broker.groww.database.master_contract_db import SymToken, db_session
+                    from database.symbol import SymToken, db_session
                     with db_session() as session:
                         record = session.query(SymToken).filter(
                             SymToken.brsymbol == broker_symbol,
@@ -14,6 +14,8 @@ EXCHANGE_BSE = "BSE"
 # Segment types
 SEGMENT_CASH = "CASH"
 SEGMENT_FNO = "FNO"
+SEGMENT_CURRENCY = "CURRENCY"
+SEGMENT_COMMODITY = "COMMODITY"
 
 
 # Product types
@@ -13,12 +13,11 @@ import gzip
 import io
 
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from database.auth_db import get_auth_token
 from database.user_db import find_user_by_username
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader, build_derivative_symbols, compact_expiry
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -26,63 +25,11 @@ logger = get_logger(__name__)
 
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 def download_csv_kotak_data(output_path):
 
     logger.info("Downloading Master Contract CSV Files")
@@ -207,15 +154,10 @@ def process_kotak_bse_csv(path):
 
     return token_df
 
-def combine_details(row):
-    base = f"{row['name']}{row['expiry'].replace('-', '')}"
-    if row['instrumenttype'] == 'FUT':
-        return f"{base}FUT"
-    elif row['instrumenttype'] in ['CE', 'PE']:
-        row['strike'] = int(row['strike']) if row['strike'].is_integer() else row['strike']
-        return f"{base}{row['strike']}{row['instrumenttype']}"
-    else:
-        return base
+def combine_details(df):
+    """Builds NAME + DDMMMYY + FUT for futures and NAME + DDMMMYY + STRIKE + CE/PE for options."""
+    base = df['name'].fillna('').astype(str) + compact_expiry(df['expiry'])
+    return build_derivative_symbols(df, default=base)
 
 def process_kotak_nfo_csv(path):
     """
@@ -239,7 +181,6 @@ def process_kotak_nfo_csv(path):
     tokensymbols['expiry'] = tokensymbols['expiry'].dt.strftime('%d-%b-%y').str.upper()
 
     tokensymbols['strike'] = df['dStrikePrice']/100
-    tokensymbols['strike'] = tokensymbols['strike'].apply(lambda x: int(x) if x.is_integer() else x)
     
     tokensymbols['lotsize'] = df['lLotSize']
     tokensymbols['tick_size'] = df['dTickSize']
@@ -251,7 +192,7 @@ def process_kotak_nfo_csv(path):
     tokensymbols['instrumenttype'] = df['pOptionType'].str.replace('XX','FUT')
     
     #pSymbolName  df['expiry']
-    tokensymbols['symbol'] = tokensymbols.apply(combine_details, axis=1)
+    tokensymbols['symbol'] = combine_details(tokensymbols)
     return tokensymbols
 
 def get_kotak_master_filepaths():
@@ -302,7 +243,6 @@ def process_kotak_cds_csv(path):
     tokensymbols['expiry'] = tokensymbols['expiry'].dt.strftime('%d-%b-%y').str.upper()
 
     tokensymbols['strike'] = df['dStrikePrice']/100
-    tokensymbols['strike'] = tokensymbols['strike'].apply(lambda x: int(x) if x.is_integer() else x)
     
     tokensymbols['lotsize'] = df['lLotSize']
     tokensymbols['tick_size'] = df['dTickSize']
@@ -316,7 +256,7 @@ def process_kotak_cds_csv(path):
     tokensymbols['instrumenttype'] = df['pOptionType'].str.replace('XX','FUT')
     
     #pSymbolName  df['expiry']
-    tokensymbols['symbol'] = tokensymbols.apply(combine_details, axis=1)
+    tokensymbols['symbol'] = combine_details(tokensymbols)
     return tokensymbols
 
 
@@ -343,7 +283,6 @@ def process_kotak_mcx_csv(path):
     tokensymbols['expiry'] = tokensymbols['expiry'].dt.strftime('%d-%b-%y').str.upper()
 
     tokensymbols['strike'] = df['dStrikePrice']/100
-    tokensymbols['strike'] = tokensymbols['strike'].apply(lambda x: int(x) if x.is_integer() else x)
     
     tokensymbols['lotsize'] = df['lLotSize']
     tokensymbols['tick_size'] = df['dTickSize']
@@ -357,7 +296,7 @@ def process_kotak_mcx_csv(path):
     tokensymbols['instrumenttype'] = df['pOptionType'].str.replace('XX','FUT')
     
     #pSymbolName  df['expiry']
-    tokensymbols['symbol'] = tokensymbols.apply(combine_details, axis=1)
+    tokensymbols['symbol'] = combine_details(tokensymbols)
     return tokensymbols
 
 
@@ -384,7 +323,6 @@ def process_kotak_bfo_csv(path):
     tokensymbols['expiry'] = tokensymbols['expiry'].dt.strftime('%d-%b-%y').str.upper()
 
     tokensymbols['strike'] = df['dStrikePrice']/100
-    tokensymbols['strike'] = tokensymbols['strike'].apply(lambda x: int(x) if x.is_integer() else x)
     
     tokensymbols['lotsize'] = df['lLotSize']
     tokensymbols['tick_size'] = df['dTickSize']
@@ -398,7 +336,7 @@ def process_kotak_bfo_csv(path):
     tokensymbols['instrumenttype'] = df['pOptionType'].str.replace('XX','FUT')
     
     #pSymbolName  df['expiry']
-    tokensymbols['symbol'] = tokensymbols.apply(combine_details, axis=1)
+    tokensymbols['symbol'] = combine_details(tokensymbols)
     return tokensymbols
 
 def delete_kotak_temp_data(output_path):
@@ -417,19 +355,20 @@ def master_contract_download():
     output_path = 'tmp'
     try:
         download_csv_kotak_data(output_path)
-        delete_symtoken_table()
+        loader = MasterContractLoader()
         token_df = process_kotak_nse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_kotak_nfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_kotak_bse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_kotak_cds_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_kotak_mcx_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_kotak_bfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
         delete_kotak_temp_data(output_path)
         #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
         
@@ -3,7 +3,7 @@ import os
 import urllib.parse
 import httpx
 from database.token_db import get_br_symbol, get_token
-from broker.paytm.database.master_contract_db import SymToken, db_session
+from database.symbol import SymToken, db_session
 import pandas as pd
 from datetime import datetime, timedelta
 from utils.httpx_client import get_httpx_client
@@ -5,10 +5,9 @@ import pandas as pd
 import numpy as np
 from utils.httpx_client import get_httpx_client
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader, format_strike
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -16,90 +15,11 @@ logger = get_logger(__name__)
 
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.debug("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            # Pre-validate records before insertion
-            invalid_records = []
-            valid_records = []
-            
-            for record in filtered_data_dict:
-                # Allow indices ("I") even if symbol is missing
-                if record.get('instrumenttype') == 'I':
-                    valid_records.append(record)
-                else:
-                    # Check if symbol exists and is not empty/null
-                    symbol = record.get('symbol')
-                    if not symbol or pd.isna(symbol) or str(symbol).strip() == '':
-                        invalid_records.append(record)
-                        logger.error(f"Schema validation failed for record: {record}")
-                        logger.debug("Symbol is missing, empty, or null")
-                    else:
-                        valid_records.append(record)
-            
-            if valid_records:
-                db_session.bulk_insert_mappings(SymToken, valid_records)
-                db_session.commit()
-                logger.info(f"Bulk insert completed successfully with {len(valid_records)} new records.")
-                
-            if invalid_records:
-                logger.warning(f"{len(invalid_records)} records failed schema validation and were skipped.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.exception(f"Error during bulk insert: {e}")
-        if hasattr(e, '__cause__'):
-            logger.error(f"Caused by: {e.__cause__}")
-        db_session.rollback()
-
-
-
-
 def download_csv_paytm_data(output_path):
 
     logger.info("Downloading Master Contract CSV Files")
@@ -134,76 +54,63 @@ def download_csv_paytm_data(output_path):
             logger.exception(f"Failed to download {key} from {url}. Error: {e}")
     
 
-def reformat_symbol(row):
-    # Use trading symbol as base instead of name
-    symbol = row['symbol']
-    instrument_type = row['instrument_type']
-    expiry = row['expiry_date'].replace('-', '').upper()
-    
-    # For equity instruments, use the symbol as is
-    if instrument_type in ['ES']:
-        return symbol
-
-    # For index instruments, use name without spaces and set it as both symbol and brsymbol
-    elif instrument_type in ['I']:
-        symbol = "".join(row['name'].split())
-        row['symbol'] = symbol  # Set the symbol in the row
-        return symbol
-    
-    # For futures
-    elif instrument_type in ['FUTSTK', 'FUTIDX']:
-        # Remove any spaces and standardize format
-        parts = row['name'].split(' ')
-        base_symbol = parts[0].strip()
-        return f"{base_symbol}{expiry}FUT"
-    
-    # For options
-    elif instrument_type in ['OPTIDX', 'OPTSTK']:
-        parts = row['name'].split(' ')
-        base_symbol = parts[0].strip()
-        
-        # Get strike price from the row directly instead of parsing from symbol
-        strike = str(int(float(row['strike_price'])))
-        
-        # Determine option type (CE/PE)
-        option_type = 'CE' if 'CALL' in row['name'].upper() else 'PE' if 'PUT' in row['name'].upper() else parts[-1]
-        
-        return f"{base_symbol}{expiry}{strike}{option_type}"
-    
-    # For any other instrument type, return symbol as is
-    else:
-        return symbol
-
-# Define the function to apply conditions
-def assign_values(row):
-    #Paytm Exchange Mappings are simply NSE and BSE. No other complications
-    # Handle equity segment
-    if row['exchange'] == 'NSE' and (row['instrument_type'] == 'ETF' or row['instrument_type'] == 'ES'):
-        return 'NSE', 'NSE', 'EQ'
-    elif row['exchange'] == 'BSE' and (row['instrument_type'] == 'ETF' or row['instrument_type'] == 'ES'):
-        return 'BSE', 'BSE', 'EQ'
-    
-    # Handle indices
-    elif row['exchange'] == 'NSE' and row['instrument_type'] == 'I':
-        return 'NSE_INDEX', 'NSE', 'INDEX'
-    elif row['exchange'] == 'BSE' and row['instrument_type'] == 'I':
-        return 'BSE_INDEX', 'BSE', 'INDEX'
-    
-    # Handle futures
-    elif row['exchange'] == 'NSE' and row['instrument_type'] in ['FUTIDX', 'FUTSTK']:
-        return 'NFO', 'NSE', 'FUT'
-    elif row['exchange'] == 'BSE' and row['instrument_type'] in ['FUTIDX', 'FUTSTK']:
-        return 'BFO', 'BSE', 'FUT'
-    
-    # Handle options
-    elif row['exchange'] == 'NSE' and row['instrument_type'] in ['OPTIDX', 'OPTSTK']:
-        return 'NFO', 'NSE', 'OPT'
-    elif row['exchange'] == 'BSE' and row['instrument_type'] in ['OPTIDX', 'OPTSTK']:
-        return 'BFO', 'BSE', 'OPT'
-    
-    # Handle unknown cases
-    else:
-        return 'Unknown', 'Unknown', 'Unknown'
+def reformat_symbol(df):
+    """
+    Builds OpenAlgo symbols: equities keep the trading symbol, indices use the
+    name without spaces, and derivatives are NAME + DDMMMYY + [STRIKE + CE/PE] or FUT.
+    Any other instrument type keeps the trading symbol.
+    """
+    symbol = df['symbol']
+    instrument_type = df['instrument_type']
+    expiry = df['expiry_date'].str.replace('-', '', regex=False).str.upper()
+    name = df['name'].astype(str)
+
+    # Derivatives use the first word of the name as the base symbol
+    parts = name.str.split(' ')
+    base_symbol = parts.str[0].str.strip() + expiry
+
+    # Option type from the name, falling back to its last word
+    upper_name = name.str.upper()
+    option_type = np.select(
+        [upper_name.str.contains('CALL', regex=False), upper_name.str.contains('PUT', regex=False)],
+        ['CE', 'PE'],
+        parts.str[-1],
+    )
+    strike = format_strike(df['strike_price'], keep_fraction=False)
+
+    conditions = [
+        instrument_type == 'ES',
+        instrument_type == 'I',
+        instrument_type.isin(['FUTSTK', 'FUTIDX']),
+        instrument_type.isin(['OPTIDX', 'OPTSTK']),
+    ]
+    choices = [
+        symbol,
+        name.str.replace(r'\s+', '', regex=True),
+        base_symbol + 'FUT',
+        base_symbol + strike + option_type,
+    ]
+    return pd.Series(np.select(conditions, choices, symbol), index=df.index)
+
+# Paytm exchange mappings are simply NSE and BSE: (exchange, instrument types, exchange, brexchange, instrumenttype)
+SEGMENT_RULES = [
+    ('NSE', ['ETF', 'ES'], 'NSE', 'NSE', 'EQ'),
+    ('BSE', ['ETF', 'ES'], 'BSE', 'BSE', 'EQ'),
+    ('NSE', ['I'], 'NSE_INDEX', 'NSE', 'INDEX'),
+    ('BSE', ['I'], 'BSE_INDEX', 'BSE', 'INDEX'),
+    ('NSE', ['FUTIDX', 'FUTSTK'], 'NFO', 'NSE', 'FUT'),
+    ('BSE', ['FUTIDX', 'FUTSTK'], 'BFO', 'BSE', 'FUT'),
+    ('NSE', ['OPTIDX', 'OPTSTK'], 'NFO', 'NSE', 'OPT'),
+    ('BSE', ['OPTIDX', 'OPTSTK'], 'BFO', 'BSE', 'OPT'),
+]
+
+def assign_values(df):
+    """Maps each row to its (exchange, brexchange, instrumenttype); unmatched rows are 'Unknown'."""
+    conditions = [(df['exchange'] == exch) & df['instrument_type'].isin(types) for exch, types, *_ in SEGMENT_RULES]
+    return tuple(
+        np.select(conditions, [rule[column] for rule in SEGMENT_RULES], 'Unknown')
+        for column in (2, 3, 4)
+    )
 
 def process_paytm_csv(path):
     """Processes the Paytm CSV file to fit the existing database schema and performs exchange name mapping."""
@@ -233,13 +140,13 @@ def process_paytm_csv(path):
     
     # For indices, set brsymbol to be the same as the formatted symbol
     indices_mask = df['instrument_type'] == 'I'
-    df.loc[indices_mask, 'brsymbol'] = df.loc[indices_mask, 'name'].apply(lambda x: "".join(x.split()))
+    df.loc[indices_mask, 'brsymbol'] = df.loc[indices_mask, 'name'].str.replace(r'\s+', '', regex=True)
 
     # Apply the function to get exchange mappings
-    df[['exchange', 'brexchange', 'instrumenttype']] = df.apply(assign_values, axis=1, result_type='expand')
+    df['exchange'], df['brexchange'], df['instrumenttype'] = assign_values(df)
 
     # Generate symbol field and ensure it's not null
-    df['symbol'] = df.apply(reformat_symbol, axis=1)
+    df['symbol'] = reformat_symbol(df)
     df['symbol'] = df['symbol'].fillna(df['brsymbol'])  # Use brsymbol as fallback if reformat_symbol returns None
 
     # Remove rows where symbol is still null
@@ -283,9 +190,10 @@ def master_contract_download():
     output_path = 'tmp'
     try:
         download_csv_paytm_data(output_path)
-        delete_symtoken_table()
+        loader = MasterContractLoader()
         token_df = process_paytm_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
         delete_paytm_temp_data(output_path)
         #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
         
@@ -3,7 +3,7 @@ import json
 import os
 import urllib.parse
 from database.token_db import get_br_symbol, get_oa_symbol
-from broker.pocketful.database.master_contract_db import SymToken, db_session
+from database.symbol import SymToken, db_session
 import pandas as pd
 from datetime import datetime, timedelta
 from broker.pocketful.api.pocketfulwebsocket import PocketfulSocket, get_ws_connection_status, get_snapquotedata
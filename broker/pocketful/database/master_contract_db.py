@@ -13,11 +13,10 @@ import zipfile
 import httpx
 from utils.httpx_client import get_httpx_client
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader, format_strike
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -59,66 +58,11 @@ data_types = {
     "Reserved column3": str, 
 }
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
-
-
-
 def download_csv_pocketful_data(output_path):
     """
     Downloads contract files from Pocketful API using httpx client with connection pooling
@@ -157,6 +101,20 @@ def reformat_symbol_detail(s):
     # Assuming the format is consistent and always "Name DD Mon YY FUT"
     return f"{parts[0]}{parts[3]}{parts[2].upper()}{parts[1]}{parts[4]}"
 
+def build_contract_symbols(df, name, strike_text):
+    """
+    Builds NAME + DDMMMYY + FUT for futures (option type XX) and
+    NAME + DDMMMYY + STRIKE + CE/PE for options; other rows keep the trading symbol.
+    """
+    expiry_str = df['Expiry Date'].dt.strftime('%d%b%y').str.upper().fillna('')
+    base = name.astype(str) + expiry_str
+    option_type = df['option_type']
+    return pd.Series(np.select(
+        [option_type == 'XX', option_type.isin(['CE', 'PE'])],
+        [base + 'FUT', base + strike_text + option_type.astype(str)],
+        df['trading_symbol'],
+    ), index=df.index)
+
 def process_pocketful_nse_csv(path):
     """
     Processes the pocketful CSV file to fit the existing database schema and performs exchange name mapping.
@@ -243,27 +201,8 @@ def process_pocketful_nfo_csv(path):
     # Convert 'expiry' column to datetime format
     df['Expiry Date'] = pd.to_datetime(df['expiry'], errors='coerce')
 
-    # Helper to format expiry as DDMMMYY (e.g., 26JUN25)
-    def format_expiry(expiry):
-        return expiry.strftime('%d%b%y').upper() if pd.notnull(expiry) else ''
-
-    def build_symbol(row):
-        try:
-            expiry_str = format_expiry(row['Expiry Date'])
-            if row['option_type'] == 'XX':
-                return f"{row['company_name']}{expiry_str}FUT"
-            elif row['option_type'] in ['CE', 'PE']:
-                strike = float(row['strike'])
-                strike_str = str(int(strike)) if strike.is_integer() else str(strike)
-                return f"{row['company_name']}{expiry_str}{strike_str}{row['option_type']}"
-            else:
-                return row['trading_symbol']
-        except Exception as e:
-            logger.error(f"Error building symbol: {row}, Error: {e}")
-            return row['trading_symbol']
-
     # Build the symbol column
-    df['symbol'] = df.apply(build_symbol, axis=1)
+    df['symbol'] = build_contract_symbols(df, df['company_name'], format_strike(df['strike']))
 
     # Create token_df with relevant columns
     token_df = df[['symbol']].copy()
@@ -299,31 +238,9 @@ def process_pocketful_bfo_csv(path):
     # Normalize Instrument Type to Option Type
     df.loc[df['instrument_name'].isin(['SF', 'IF']), 'option_type'] = 'XX'
 
-    # Helper to format expiry as DDMMMYY (e.g., 26JUN25)
-    def format_expiry(expiry):
-        return expiry.strftime('%d%b%y').upper() if pd.notnull(expiry) else ''
-
-    # Function to build symbol using known fields
-    def build_symbol(row):
-        try:
-            expiry_str = format_expiry(row['Expiry Date'])
-            company = row['company_name']
-            strike = str(row['strike']).replace('.', '')
-            option_type = row['option_type']
-
-            if option_type == 'XX':
-                return f"{company}{expiry_str}FUT"
-            elif option_type in ['CE', 'PE']:
-                strike_str = str(int(float(strike))) if float(strike).is_integer() else strike
-                return f"{company}{expiry_str}{strike_str}{option_type}"
-            else:
-                return row['trading_symbol']
-        except Exception as e:
-            logger.error(f"Error processing row: {row}, Error: {e}")
-            return row['trading_symbol']
-
-    # Apply symbol formatting to all types
-    df['symbol'] = df.apply(lambda row: build_symbol(row), axis=1)
+    # Apply symbol formatting to all types; BFO strikes drop their decimal point
+    strike = df['strike'].astype(str).str.replace('.', '', regex=False)
+    df['symbol'] = build_contract_symbols(df, df['company_name'], format_strike(strike))
 
     # Create token_df with required columns
     token_df = df[['symbol']].copy()
@@ -367,28 +284,8 @@ def process_pocketful_mcx_csv(path):
     # Normalize Instrument Type to Option Type
     df.loc[df['instrument_name'].isin(['FUTCOM', 'FUTIDX']), 'option_type'] = 'XX'
 
-    # Helper to format expiry as DDMMMYY (e.g., 26JUN25)
-    def format_expiry(expiry):
-        return expiry.strftime('%d%b%y').upper() if pd.notnull(expiry) else ''
-
-    # Define the function to reformat symbol details
-    def reformat_symbol_detail(row):
-        try:
-            expiry_str = format_expiry(row['Expiry Date'])
-            strike = float(row['strike'])
-            strike_str = str(int(strike)) if strike.is_integer() else str(strike)
-            if row['option_type'] == 'XX':
-                return f"{row['trading_symbol']}{expiry_str}FUT"
-            elif row['option_type'] in ['CE', 'PE']:
-                return f"{row['trading_symbol']}{expiry_str}{strike_str}{row['option_type']}"
-            else:
-                return row['trading_symbol']
-        except Exception as e:
-            logger.error(f"Error processing row: {row}, Error: {e}")
-            return row['trading_symbol']  # fallback to just the symbol
-
     # Apply the symbol formatting for all rows based on option_type
-    df['symbol'] = df.apply(reformat_symbol_detail, axis=1)
+    df['symbol'] = build_contract_symbols(df, df['trading_symbol'], format_strike(df['strike']))
 
     # Create token_df with required columns
     token_df = df[['symbol']].copy()
@@ -500,21 +397,22 @@ def master_contract_download():
     output_path = 'tmp'
     try:
         download_csv_pocketful_data(output_path)
-        delete_symtoken_table()
+        loader = MasterContractLoader()
         token_df = process_pocketful_nse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_pocketful_bse_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_pocketful_nfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         
         token_df = process_pocketful_mcx_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_pocketful_bfo_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         
         token_df = process_pocketful_indices_csv(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
         delete_pocketful_temp_data(output_path)
         
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
@@ -1,13 +1,14 @@
 import os
-import requests
 import zipfile
-import io
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, engine
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import (
+    MasterContractLoader, build_derivative_symbols, format_expiry, format_strike,
+    leading_name, normalize_strike, strip_series_suffix, suffix_instrument_type
+)
+from utils.contract_downloader import download_contract_files, mark_contract_loaded
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -15,64 +16,11 @@ logger = get_logger(__name__)
 
 
 
-# Database setup
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-# Define SymToken table
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 # Define the shoonya URLs for downloading the symbol files
 shoonya_urls = {
     "NSE": "https://api.shoonya.com/NSE_symbols.txt.zip",
@@ -85,7 +33,11 @@ shoonya_urls = {
 
 def download_and_unzip_shoonya_data(output_path):
     """
-    Downloads and unzips the shoonya text files to the tmp folder.
+    Downloads the shoonya zip files concurrently and unzips them to the tmp folder.
+
+    Files are fetched conditionally (ETag/Last-Modified) and cached on disk.
+    When the contract already loaded in the database is unchanged nothing is
+    extracted and the returned download has ``current`` set.
     """
     logger.info("Downloading and Unzipping shoonya Data")
 
@@ -93,27 +45,15 @@ def download_and_unzip_shoonya_data(output_path):
     if not os.path.exists(output_path):
         os.makedirs(output_path)
 
-    downloaded_files = []
-
-    # Iterate through the shoonya URLs and download/unzip files
-    for key, url in shoonya_urls.items():
-        try:
-            # Send GET request to download the zip file
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info(f"Successfully downloaded {{key}} from {url}")
-                
-                # Use in-memory file to handle the downloaded zip file
-                z = zipfile.ZipFile(io.BytesIO(response.content))
-                z.extractall(output_path)
-                downloaded_files.append(f"{key}.txt")
-            else:
-                logger.error(f"Failed to download {{key}} from {{url}}. Status code: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error downloading {{key}} from {{url}}: {e}")
-
-    return downloaded_files
+    download = download_contract_files('shoonya', shoonya_urls)
+    if download.current:
+        return download
+
+    for key, item in download.available_files().items():
+        with zipfile.ZipFile(item.path) as z:
+            z.extractall(output_path)
+
+    return download
 
 # Placeholder functions for processing data
 
@@ -134,22 +74,11 @@ def process_shoonya_nse_data(output_path):
     # Add missing columns to ensure DataFrame matches the database structure
     df['symbol'] = df['brsymbol']  # Initialize 'symbol' with 'brsymbol'
 
-    # Apply transformation for OpenAlgo symbols
-    def get_openalgo_symbol(broker_symbol):
-        # Separate by hyphen and apply logic for EQ and BE
-        if '-EQ' in broker_symbol:
-            return broker_symbol.replace('-EQ', '')
-        elif '-BE' in broker_symbol:
-            return broker_symbol.replace('-BE', '')
-        else:
-            # For other symbols (including index), OpenAlgo symbol remains the same as broker symbol
-            return broker_symbol
-
-    # Update the 'symbol' column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
+    # OpenAlgo symbols drop the -EQ/-BE series suffix
+    df['symbol'] = strip_series_suffix(df['brsymbol'])
 
     # Define Exchange: 'NSE' for EQ and BE, 'NSE_INDEX' for indexes
-    df['exchange'] = df.apply(lambda row: 'NSE_INDEX' if row['instrumenttype'] == 'INDEX' else 'NSE', axis=1)
+    df['exchange'] = np.where(df['instrumenttype'] == 'INDEX', 'NSE_INDEX', 'NSE')
     df['brexchange'] = df['exchange']  # Broker exchange is the same as exchange
 
     # Set empty columns for 'expiry' and fill -1 for 'strike' where the data is missing
@@ -157,7 +86,7 @@ def process_shoonya_nse_data(output_path):
     df['strike'] = -1  # Set default value -1 for strike price where missing
 
     # Ensure the instrument type is consistent
-    df['instrumenttype'] = df['instrumenttype'].apply(lambda x: 'EQ' if x in ['EQ', 'BE'] else x)
+    df['instrumenttype'] = df['instrumenttype'].replace('BE', 'EQ')
 
     # Handle missing or invalid numeric values in 'lotsize' and 'tick_size'
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)  # Convert to int, default to 0
@@ -197,47 +126,21 @@ def process_shoonya_nfo_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(row['strike']) if float(row['strike']).is_integer() else row['strike']
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df)
 
     # Define Exchange
     df['exchange'] = 'NFO'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Reorder the columns to match the database structure
     columns_to_keep = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
@@ -266,48 +169,24 @@ def process_shoonya_cds_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['instrumenttype'], axis=1)
+    df['instrumenttype'] = df['instrumenttype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Update instrumenttype to 'CE' or 'PE' based on the option type
-    df['instrumenttype'] = df.apply(lambda row: row['optiontype'] if row['instrumenttype'] == 'OPTCUR' else row['instrumenttype'], axis=1)
+    df['instrumenttype'] = df['instrumenttype'].where(df['instrumenttype'] != 'OPTCUR', df['optiontype'])
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            return f"{row['name']}{row['expiry']}{row['strike']}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df, strike_text=df['strike'].astype(str), all_options=True)
 
     # Define Exchange
     df['exchange'] = 'CDS'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Reorder the columns to match the database structure
     columns_to_keep = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
@@ -334,48 +213,24 @@ def process_shoonya_mcx_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['instrumenttype'], axis=1)
+    df['instrumenttype'] = df['instrumenttype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Update instrumenttype to 'CE' or 'PE' based on the option type
-    df['instrumenttype'] = df.apply(lambda row: row['optiontype'] if row['instrumenttype'] == 'OPTFUT' else row['instrumenttype'], axis=1)
+    df['instrumenttype'] = df['instrumenttype'].where(df['instrumenttype'] != 'OPTFUT', df['optiontype'])
 
     # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            return f"{row['name']}{row['expiry']}{row['strike']}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['symbol'] = build_derivative_symbols(df, strike_text=df['strike'].astype(str), all_options=True)
 
     # Define Exchange
     df['exchange'] = 'MCX'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
 
     # Reorder the columns to match the database structure
     columns_to_keep = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
@@ -405,13 +260,6 @@ def process_shoonya_bse_data(output_path):
     # Add missing columns to ensure DataFrame matches the database structure
     df['symbol'] = df['brsymbol']  # Initialize 'symbol' with 'brsymbol'
 
-    # Apply transformation for OpenAlgo symbols (no special logic needed here)
-    def get_openalgo_symbol(broker_symbol):
-        return broker_symbol
-
-    # Update the 'symbol' column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
-
     # Set Exchange: 'BSE' for all rows
     df['exchange'] = 'BSE'
     df['brexchange'] = df['exchange']  # Broker exchange is the same as exchange
@@ -452,63 +300,20 @@ def process_shoonya_bfo_data(output_path):
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
     df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DDMMMYY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d%b%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DDMMMYY
+    df['expiry'] = format_expiry(df['expiry'], '%d-%b-%Y')
 
     # Extract the 'name' from the 'TradingSymbol'
-    def extract_name(tradingsymbol):
-        import re
-        match = re.match(r'([A-Za-z]+)', tradingsymbol)
-        return match.group(1) if match else tradingsymbol
-
-    # Apply name extraction
-    df['name'] = df['brsymbol'].apply(extract_name)
+    df['name'] = leading_name(df['brsymbol'])
 
     # Extract the instrument type (CE, PE, FUT) from TradingSymbol
-    def extract_instrument_type(tradingsymbol):
-        if tradingsymbol.endswith('FUT'):
-            return 'FUT'
-        elif tradingsymbol.endswith('CE'):
-            return 'CE'
-        elif tradingsymbol.endswith('PE'):
-            return 'PE'
-        else:
-            return 'UNKNOWN'  # Handle cases where the suffix is not FUT, CE, or PE
-
-    # Apply instrument type extraction
-    df['instrumenttype'] = df['brsymbol'].apply(extract_instrument_type)
-
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    df['strike'] = df['strike'].apply(handle_strike_price)
-
-    # Format the symbol column based on the instrument type and correctly handle the strike price
-    def format_symbol(row):
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{row['expiry']}FUT"
-        else:
-            # Correctly format the strike price based on whether it's an integer or a float
-            formatted_strike = f"{int(row['strike'])}" if isinstance(row['strike'], int) else f"{row['strike']:.2f}".rstrip('0').rstrip('.')
-            return f"{row['name']}{row['expiry']}{formatted_strike}{row['instrumenttype']}"
-
-    # Apply the symbol format
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['instrumenttype'] = suffix_instrument_type(df['brsymbol'])
+
+    # Strike prices as numbers, -1 when missing or invalid
+    df['strike'] = normalize_strike(df['strike'])
+
+    # Format the symbol column based on the instrument type
+    df['symbol'] = build_derivative_symbols(df, strike_text=format_strike(df['strike'].round(2)), all_options=True)
 
     # Define Exchange and Broker Exchange
     df['exchange'] = 'BFO'
@@ -539,22 +344,28 @@ def master_contract_download():
 
     output_path = 'tmp'
     try:
-        download_and_unzip_shoonya_data(output_path)
-        delete_symtoken_table()
+        download = download_and_unzip_shoonya_data(output_path)
+        if download.current:
+            logger.info("shoonya master contract unchanged since last load, skipping reload")
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
+
+        loader = MasterContractLoader()
         
         # Placeholders for processing different exchanges
         token_df = process_shoonya_nse_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_shoonya_bse_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_shoonya_nfo_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_shoonya_cds_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_shoonya_mcx_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
         token_df = process_shoonya_bfo_data(output_path)
-        copy_from_dataframe(token_df)
+        loader.add(token_df)
+        loader.commit()
+        mark_contract_loaded(download)
         
         delete_shoonya_temp_data(output_path)
         
@@ -2,9 +2,8 @@ import os
 import httpx
 import pandas as pd
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, engine
+from database.master_contract_ingest import MasterContractLoader
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -17,31 +16,7 @@ except ImportError:
 # Create a shared httpx client for connection pooling
 client = httpx.Client(timeout=30.0)
 
-# Database setup
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-# Define SymToken table
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
+DATABASE_URL = os.getenv('DATABASE_URL')
 
 def init_db():
     """Initialize the database and create tables"""
@@ -54,34 +29,6 @@ def init_db():
     
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
 # Define Tradejini API endpoints
 TRADEJINI_BASE_URL = 'https://api.tradejini.com/v2'
 SCRIP_GROUPS_URL = f'{TRADEJINI_BASE_URL}/api/mkt-data/scrips/symbol-store'
@@ -458,8 +405,8 @@ def master_contract_download():
     logger.info("Starting Tradejini Master Contract Download")
     
     try:
-        # Delete existing data
-        delete_symtoken_table()
+        # Collect all scrip groups and swap them in at the end
+        loader = MasterContractLoader()
         
         # Get scrip groups
         scrip_groups = get_scrip_groups()
@@ -489,7 +436,7 @@ def master_contract_download():
                     
                     # Insert into database
                     if not df.empty:
-                        copy_from_dataframe(df)
+                        loader.add(df)
                         logger.info(f"Processed {len(df)} symbols for {group_name}")
                     else:
                         logger.info(f"No valid records found for {group_name}")
@@ -500,6 +447,8 @@ def master_contract_download():
                 logger.error(f"Error processing group {group_name}: {group_error}")
                 continue
         
+        loader.commit()
+        
         if socketio:
             socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully downloaded all contracts'})
         return True
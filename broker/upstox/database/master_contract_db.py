@@ -2,77 +2,24 @@
 
 import os
 import pandas as pd
+import numpy as np
 import requests
 import gzip
 import shutil
 
-from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from database.symbol import Base, SymToken, engine
 from extensions import socketio  # Import SocketIO
+from database.master_contract_ingest import MasterContractLoader
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your database path
-
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-Base = declarative_base()
-Base.query = db_session.query_property()
-
-class SymToken(Base):
-    __tablename__ = 'symtoken'
-    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
-    symbol = Column(String, nullable=False, index=True)  # Single column index
-    brsymbol = Column(String, nullable=False, index=True)  # Single column index
-    name = Column(String)
-    exchange = Column(String, index=True)  # Include this column in a composite index
-    brexchange = Column(String, index=True)  
-    token = Column(String, index=True)  # Indexed for performance
-    expiry = Column(String)
-    strike = Column(Float)
-    lotsize = Column(Integer)
-    instrumenttype = Column(String)
-    tick_size = Column(Float)
-
-    # Define a composite index on symbol and exchange columns
-    __table_args__ = (Index('idx_symbol_exchange', 'symbol', 'exchange'),)
 
 def init_db():
     logger.info("Initializing Master Contract DB")
     Base.metadata.create_all(bind=engine)
 
-def delete_symtoken_table():
-    logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
-    db_session.commit()
-
-def copy_from_dataframe(df):
-    logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
-    try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        db_session.rollback()
-
-
 def download_and_unzip_upstox_data(url, input_path, output_path):
     """
     Downloads the compressed JSON from Upstox, unzips it, and saves it to the specified path.
@@ -87,24 +34,25 @@ def download_and_unzip_upstox_data(url, input_path, output_path):
             shutil.copyfileobj(f_in, f_out)
 
 
-def reformat_symbol(row):
-    symbol = row['symbol']
-    instrument_type = row['instrumenttype']
-    
-    if instrument_type == 'FUT':
-        # For FUT, remove the spaces and append 'FUT' at the end
-        parts = symbol.split(' ')
-        if len(parts) == 5:  # Make sure the symbol has the correct format
-            symbol = parts[0] + parts[2] + parts[3] + parts[4] + parts[1]
-    elif instrument_type in ['CE', 'PE']:
-        # For CE/PE, rearrange the parts and remove spaces
-        parts = symbol.split(' ')
-        if len(parts) == 6:  # Make sure the symbol has the correct format
-            symbol = parts[0] + parts[3] + parts[4] + parts[5] + parts[1] + parts[2]
-    else:
-        symbol = symbol  # No change for other instrument types
-
-    return symbol
+def reformat_symbol(df):
+    """
+    Rearranges Upstox trading symbols into OpenAlgo format, e.g.
+    'NIFTY FUT 28 MAR 24' -> 'NIFTY28MAR24FUT' and 'NIFTY 22000 CE 28 MAR 24' -> 'NIFTY28MAR2422000CE'.
+    Symbols that do not have the expected number of parts are left unchanged.
+    """
+    symbol = df['symbol']
+    instrument_type = df['instrumenttype']
+    parts = symbol.str.split(' ')
+    part_count = parts.str.len()
+
+    futures = (instrument_type == 'FUT') & (part_count == 5)
+    options = instrument_type.isin(['CE', 'PE']) & (part_count == 6)
+    return pd.Series(np.select(
+        [futures, options],
+        [parts.str[0] + parts.str[2] + parts.str[3] + parts.str[4] + parts.str[1],
+         parts.str[0] + parts.str[3] + parts.str[4] + parts.str[5] + parts.str[1] + parts.str[2]],
+        symbol,
+    ), index=df.index)
 
 
 def process_upstox_json(path):
@@ -151,7 +99,7 @@ def process_upstox_json(path):
     })
 
     df['brsymbol'] =  df['symbol']
-    df['symbol'] = df.apply(reformat_symbol, axis=1)
+    df['symbol'] = reformat_symbol(df)
     df['brexchange'] = segment_copy
     
     df['symbol'] = df['symbol'].replace({'INDIA VIX': 'INDIAVIX'})
@@ -191,8 +139,9 @@ def master_contract_download():
         
         #token_df = token_df.drop_duplicates(subset='symbol', keep='first')
 
-        delete_symtoken_table()  # Consider the implications of this action
-        copy_from_dataframe(token_df)
+        loader = MasterContractLoader()
+        loader.add(token_df)
+        loader.commit()
                 
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
@@ -2,7 +2,7 @@ import json
 import os
 import urllib.parse
 from database.token_db import get_br_symbol, get_oa_symbol
-from broker.zerodha.database.master_contract_db import SymToken, db_session
+from database.symbol import SymToken, db_session
 import pandas as pd
 from datetime import datetime, timedelta
 from utils.httpx_client import get_httpx_client
@@ -55,7 +55,8 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
     if method.upper() == 'GET' and '?' in endpoint:
         # Extract query params from endpoint
         path, query = endpoint.split('?', 1)
-        params = dict(urllib.parse.parse_qsl(query))
+        # A list keeps repeated keys (/quote?i=...&i=...)
+        params = urllib.parse.parse_qsl(query)
         endpoint = path
     
     url = f"{base_url}{endpoint}"
@@ -128,6 +129,23 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
             
         raise ZerodhaAPIError(f"API request failed: {error_msg}")
 
+# Kite's /quote endpoint takes at most 500 instruments per call
+QUOTE_BATCH_SIZE = 500
+
+def format_quote(quote):
+    """Convert a Kite quote into OpenAlgo's quote fields"""
+    return {
+        'ask': quote.get('depth', {}).get('sell', [{}])[0].get('price', 0),
+        'bid': quote.get('depth', {}).get('buy', [{}])[0].get('price', 0),
+        'high': quote.get('ohlc', {}).get('high', 0),
+        'low': quote.get('ohlc', {}).get('low', 0),
+        'ltp': quote.get('last_price', 0),
+        'open': quote.get('ohlc', {}).get('open', 0),
+        'prev_close': quote.get('ohlc', {}).get('close', 0),
+        'volume': quote.get('volume', 0),
+        'oi': quote.get('oi', 0)
+    }
+
 class BrokerData:
     def __init__(self, auth_token):
         """Initialize Zerodha data handler with authentication token"""
@@ -228,17 +246,7 @@ class BrokerData:
                 raise ZerodhaAPIError("No quote data found")
             
             # Return quote data
-            return {
-                'ask': quote.get('depth', {}).get('sell', [{}])[0].get('price', 0),
-                'bid': quote.get('depth', {}).get('buy', [{}])[0].get('price', 0),
-                'high': quote.get('ohlc', {}).get('high', 0),
-                'low': quote.get('ohlc', {}).get('low', 0),
-                'ltp': quote.get('last_price', 0),
-                'open': quote.get('ohlc', {}).get('open', 0),
-                'prev_close': quote.get('ohlc', {}).get('close', 0),
-                'volume': quote.get('volume', 0),
-                'oi': quote.get('oi', 0)
-            }
+            return format_quote(quote)
             
         except ZerodhaPermissionError as e:
             logger.exception(f"Permission error fetching quotes: {e}")
@@ -247,6 +255,42 @@ class BrokerData:
             logger.exception(f"Error fetching quotes: {e}")
             raise ZerodhaAPIError(f"Error fetching quotes: {e}")
 
+    def get_multiquotes(self, instruments: list) -> dict:
+        """
+        Get real-time quotes for several symbols, up to 500 per /quote call
+        Args:
+            instruments: List of {'symbol': ..., 'exchange': ...} dicts
+        Returns:
+            dict: "EXCHANGE:SYMBOL" -> quote data, None for symbols without a quote
+        """
+        quotes = {f"{item['exchange']}:{item['symbol']}": None for item in instruments}
+        # Kite instrument key -> OpenAlgo key
+        keys = {}
+        for item in instruments:
+            br_symbol = get_br_symbol(item['symbol'], item['exchange'])
+            if not br_symbol:
+                logger.warning(f"No broker symbol for {item['exchange']}:{item['symbol']}")
+                continue
+            exchange = {'NSE_INDEX': 'NSE', 'BSE_INDEX': 'BSE'}.get(item['exchange'], item['exchange'])
+            keys[f"{exchange}:{br_symbol}"] = f"{item['exchange']}:{item['symbol']}"
+
+        kite_keys = list(keys)
+        try:
+            for start in range(0, len(kite_keys), QUOTE_BATCH_SIZE):
+                batch = kite_keys[start:start + QUOTE_BATCH_SIZE]
+                query = urllib.parse.urlencode([('i', key) for key in batch])
+                data = get_api_response(f"/quote?{query}", self.auth_token).get('data') or {}
+                for key in batch:
+                    if data.get(key):
+                        quotes[keys[key]] = format_quote(data[key])
+            return quotes
+        except ZerodhaPermissionError as e:
+            logger.exception(f"Permission error fetching quotes: {e}")
+            raise
+        except (ZerodhaAPIError, Exception) as e:
+            logger.exception(f"Error fetching quotes: {e}")
+            raise ZerodhaAPIError(f"Error fetching quotes: {e}")
+
     def get_history(self, symbol: str, exchange: str, timeframe: str, from_date: str, to_date: str) -> pd.DataFrame:
         """
         Get historical data for given symbol and timeframe
@@ -86,6 +86,13 @@ def get_api_response(endpoint, auth, method="GET", payload=None):
 def get_order_book(auth):
     return get_api_response("/orders",auth)
 
+def get_order_history(orderid, auth):
+    """Latest state of one order, in the same shape as get_order_book"""
+    order_history = get_api_response(f"/orders/{orderid}",auth)
+    if order_history.get('data'):
+        order_history['data'] = order_history['data'][-1:]
+    return order_history
+
 def get_trade_book(auth):
     return get_api_response("/trades",auth)
 
@@ -233,7 +240,7 @@ def place_smartorder_api(data,auth):
             return res, response, orderid
         else:
             logger.info("No action required or invalid quantity")
-            response_data = {"status": "success", "message": "No action required"}
+            response_data = {"status": "success", "message": "No action needed. Position size matches current position"}
             return res, response_data, orderid
             
     except Exception as e:
@@ -1,9 +1,52 @@
 import json
-from database.token_db import get_symbol , get_oa_symbol
+from utils.book_mapping import Field, FieldMap, order_statistics, resolve_oa_symbols, transform_rows
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+ORDER_STATUS_MAP = {
+    "COMPLETE": "complete",
+    "REJECTED": "rejected",
+    "TRIGGER PENDING": "trigger pending",
+    "OPEN": "open",
+    "CANCELLED": "cancelled",
+}
+
+ORDER_FIELDS = FieldMap({
+    "symbol": "tradingsymbol",
+    "exchange": "exchange",
+    "action": "transaction_type",
+    "quantity": Field("quantity", 0),
+    "price": Field("price", 0.0),
+    "trigger_price": Field("trigger_price", 0.0),
+    "pricetype": "order_type",
+    "product": "product",
+    "orderid": "order_id",
+    "order_status": Field("status", values=ORDER_STATUS_MAP),
+    "timestamp": "order_timestamp",
+})
+
+TRADE_FIELDS = FieldMap({
+    "symbol": Field("tradingsymbol", None),
+    "exchange": "exchange",
+    "product": "product",
+    "action": "transaction_type",
+    "quantity": Field("quantity", 0),
+    "average_price": Field("average_price", 0.0),
+    "trade_value": lambda trade: trade.get('quantity', 0) * trade.get('average_price', 0.0),
+    "orderid": "order_id",
+    "timestamp": "order_timestamp",
+})
+
+POSITION_FIELDS = FieldMap({
+    "symbol": "tradingsymbol",
+    "exchange": "exchange",
+    "product": "product",
+    "quantity": Field("quantity", '0'),
+    # Ensure average_price is treated as a float, then format to a string with 2 decimal places
+    "average_price": lambda position: "{:.2f}".format(float(position.get('average_price', 0.0))),
+})
+
 
 def map_order_data(order_data):
     """
@@ -28,18 +71,9 @@ def map_order_data(order_data):
     #logger.info(f"{order_data}")
 
     if order_data:
-        for order in order_data:
-            # Extract the instrument_token and exchange for the current order
-            exchange = order['exchange']
-            symbol = order['tradingsymbol']
-       
-            
-            # Check if a symbol was found; if so, update the trading_symbol in the current order
-            if symbol:
-                order['tradingsymbol'] = get_oa_symbol(symbol=symbol,exchange=exchange)
-            else:
-                logger.info(f"{symbol} and exchange {exchange} not found. Keeping original trading symbol.")
-                
+        # Resolve the symbols of the whole book in one lookup
+        resolve_oa_symbols(order_data, 'tradingsymbol', 'exchange')
+
     return order_data
 
 
@@ -54,99 +88,17 @@ def calculate_order_statistics(order_data):
     Returns:
     - A dictionary containing counts of different types of orders.
     """
-    # Initialize counters
-    total_buy_orders = total_sell_orders = 0
-    total_completed_orders = total_open_orders = total_rejected_orders = 0
-
-    if order_data:
-        for order in order_data:
-            # Count buy and sell orders
-            if order['transaction_type'] == 'BUY':
-                total_buy_orders += 1
-            elif order['transaction_type'] == 'SELL':
-                total_sell_orders += 1
-            
-            # Count orders based on their status
-            if order['status'] == 'COMPLETE':
-                total_completed_orders += 1
-            elif order['status'] == 'OPEN':
-                total_open_orders += 1
-            elif order['status'] == 'REJECTED':
-                total_rejected_orders += 1
-
-    # Compile and return the statistics
-    return {
-        'total_buy_orders': total_buy_orders,
-        'total_sell_orders': total_sell_orders,
-        'total_completed_orders': total_completed_orders,
-        'total_open_orders': total_open_orders,
-        'total_rejected_orders': total_rejected_orders
-    }
+    return order_statistics(order_data, 'transaction_type', 'status', 'COMPLETE', 'OPEN', 'REJECTED')
 
 
 def transform_order_data(orders):
-    # Directly handling a dictionary assuming it's the structure we expect
-    if isinstance(orders, dict):
-        # Convert the single dictionary into a list of one dictionary
-        orders = [orders]
-
-    transformed_orders = []
-    
-    for order in orders:
-        # Make sure each item is indeed a dictionary
-        if not isinstance(order, dict):
-            logger.warning(f"Warning: Expected a dict, but found a {type(order)}. Skipping this item.")
-            continue
-
-        if(order.get("status", "")=="COMPLETE"):
-            order_status = "complete"
-        if(order.get("status", "")=="REJECTED"):
-            order_status = "rejected"
-        if(order.get("status", "")=="TRIGGER PENDING"):
-            order_status = "trigger pending"
-        if(order.get("status", "")=="OPEN"):
-            order_status = "open"
-        if(order.get("status", "")=="CANCELLED"):
-            order_status = "cancelled"
-
-        transformed_order = {
-            "symbol": order.get("tradingsymbol", ""),
-            "exchange": order.get("exchange", ""),
-            "action": order.get("transaction_type", ""),
-            "quantity": order.get("quantity", 0),
-            "price": order.get("price", 0.0),
-            "trigger_price": order.get("trigger_price", 0.0),
-            "pricetype": order.get("order_type", ""),
-            "product": order.get("product", ""),
-            "orderid": order.get("order_id", ""),
-            "order_status": order_status,
-            "timestamp": order.get("order_timestamp", "")
-        }
-
-        transformed_orders.append(transformed_order)
-
-    return transformed_orders
+    return transform_rows(orders, ORDER_FIELDS)
 
 def map_trade_data(trade_data):
     return map_order_data(trade_data)
 
 def transform_tradebook_data(tradebook_data):
-    transformed_data = []
-    for trade in tradebook_data:
-     
-        transformed_trade = {
-            "symbol": trade.get('tradingsymbol'),
-            "exchange": trade.get('exchange', ''),
-            "product": trade.get('product', ''),
-            "action": trade.get('transaction_type', ''),
-            "quantity": trade.get('quantity', 0),
-            "average_price": trade.get('average_price', 0.0),
-            "trade_value": trade.get('quantity', 0) * trade.get('average_price', 0.0),
-            "orderid": trade.get('order_id', ''),
-            "timestamp": trade.get('order_timestamp', '')
-        }
-        transformed_data.append(transformed_trade)
-    return transformed_data
+    return transform_rows(tradebook_data, TRADE_FIELDS)
 
 def map_position_data(position_data):
     """
@@ -171,37 +123,13 @@ def map_position_data(position_data):
     #logger.info(f"{order_data}")
 
     if position_data:
-        for position in position_data:
-            # Extract the instrument_token and exchange for the current order
-            exchange = position['exchange']
-            symbol = position['tradingsymbol']
-       
-            
-            # Check if a symbol was found; if so, update the trading_symbol in the current order
-            if symbol:
-                position['tradingsymbol'] = get_oa_symbol(symbol=symbol,exchange=exchange)
-            else:
-                logger.info(f"{symbol} and exchange {exchange} not found. Keeping original trading symbol.")
-                
+        resolve_oa_symbols(position_data, 'tradingsymbol', 'exchange')
+
     return position_data
     
 
 def transform_positions_data(positions_data):
-    transformed_data = [] 
-
-    for position in positions_data:
-        # Ensure average_price is treated as a float, then format to a string with 2 decimal places
-        average_price_formatted = "{:.2f}".format(float(position.get('average_price', 0.0)))
-
-        transformed_position = {
-            "symbol": position.get('tradingsymbol', ''),
-            "exchange": position.get('exchange', ''),
-            "product": position.get('product', ''),
-            "quantity": position.get('quantity', '0'),
-            "average_price": average_price_formatted,
-        }
-        transformed_data.append(transformed_position)
-    return transformed_data
+    return transform_rows(positions_data, POSITION_FIELDS)
 
 def transform_holdings_data(holdings_data):
     transformed_data = []
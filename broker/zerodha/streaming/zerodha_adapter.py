@@ -1,4 +1,4 @@
-from utils.logging import get_logger
+from utils.logging import get_logger, get_hot_path_logger
 
 logger = get_logger(__name__)
 
@@ -13,7 +13,7 @@ import threading
 import time
 from typing import Dict, List, Optional, Set, Any, Callable
 
-from websocket_proxy.base_adapter import BaseBrokerWebSocketAdapter
+from websocket_proxy.base_adapter import BaseBrokerWebSocketAdapter, SubscriptionRegistry
 from database.token_db import get_token
 from database.auth_db import get_auth_token
 
@@ -25,11 +25,16 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
     Fixed Zerodha-specific implementation of the WebSocket adapter.
     Properly implements OpenAlgo WebSocket proxy interface with correct topic formatting.
     """
+
+    # OpenAlgo mode -> mode string placed in published ticks
+    TICK_MODES = {1: 'ltp', 2: 'quote', 3: 'full'}
     
     def __init__(self):
         """Initialize the Zerodha WebSocket adapter"""
         super().__init__()
         self.logger = get_logger("zerodha_websocket")
+        # Rate limited per-topic/per-token logging for the tick path
+        self.hot_logger = get_hot_path_logger("zerodha_websocket")
         self.ws_client = None
         self.user_id = None
         self.broker_name = "zerodha"
@@ -38,6 +43,8 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
         self.lock = threading.Lock()
         self.subscribed_symbols = {}  # {symbol: {exchange, token, mode}}
         self.token_to_symbol = {}  # {token: (symbol, exchange)}
+        # Tick path lookup: token -> subscription with precomputed topics
+        self.subscription_registry = SubscriptionRegistry(self._generate_topic, self._map_data_exchange)
         
         # Authentication
         self.api_key = None
@@ -161,6 +168,7 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     # Reset subscriptions tracking
                     self.subscribed_symbols.clear()
                     self.token_to_symbol.clear()
+                    self.subscription_registry.clear()
                 
                 # Always clean up ZMQ resources to ensure proper cleanup
                 self.cleanup_zmq()
@@ -243,6 +251,9 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     'mapped_exchange': subscription_exchange  # Mapped exchange for data matching
                 }
                 self.token_to_symbol[token] = (symbol, exchange)
+                # Zerodha streams one mode per token, so the latest subscription wins
+                self.subscription_registry.add(token, symbol, exchange, mode, replace=True,
+                                               tick_mode=self.TICK_MODES.get(mode, 'ltp'))
             
             self.logger.info(f"✅ Subscribed to {exchange}:{symbol} (token: {token}, mode: {zerodha_mode})")
             return {'status': 'success', 'message': f'Subscribed to {symbol}'}
@@ -280,6 +291,7 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 # Remove from tracking
                 del self.subscribed_symbols[key]
                 self.token_to_symbol.pop(token, None)
+                self.subscription_registry.remove(token)
             
             self.logger.info(f"✅ Unsubscribed from {exchange}:{symbol}")
             return {'status': 'success', 'message': f'Unsubscribed from {symbol}'}
@@ -333,61 +345,31 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
             return
         
         try:
+            registry = self.subscription_registry
             for tick in ticks:
+                token = tick.get('instrument_token')
+                # Single dict hit; topic, mode and exchange were computed at subscribe time
+                subscription = registry.get(token)
+                if subscription is None:
+                    self.hot_logger.warning(token, "No subscription info found for token: %s", token)
+                    continue
+                
                 transformed_tick = self._transform_tick(tick)
-                if transformed_tick:
-                    symbol = transformed_tick['symbol']
-                    token = tick.get('instrument_token')
-                    subscription_mode = 'ltp'  # Default
-                    subscription_exchange = None
-                    
-                    # Get subscription info to determine mode and exchange
-                    with self.lock:
-                        for key, sub_info in self.subscribed_symbols.items():
-                            if sub_info['token'] == token:
-                                # Map OpenAlgo mode to string
-                                mode_num = sub_info['mode']
-                                if mode_num == 1:
-                                    subscription_mode = 'ltp'
-                                elif mode_num == 2:
-                                    subscription_mode = 'quote'
-                                elif mode_num == 3:
-                                    subscription_mode = 'full'
-                                subscription_exchange = sub_info['exchange']
-                                break
-                    
-                    if not subscription_exchange:
-                        self.logger.warning(f"No subscription info found for token: {token}")
-                        continue
-                    
-                    # Override the tick mode with subscription mode
-                    transformed_tick['mode'] = subscription_mode
-                    
-                    # Map mode to string format
-                    mode_str = {
-                        'ltp': 'LTP',
-                        'quote': 'QUOTE', 
-                        'full': 'DEPTH'
-                    }.get(subscription_mode, 'LTP')
-                    
-                    # ✅ Set the data exchange field (always include, never remove)
-                    data_exchange = self._map_data_exchange(subscription_exchange)
-                    transformed_tick['exchange'] = data_exchange
-                    
-                    # ✅ Generate topic using dedicated function
-                    topic = self._generate_topic(symbol, subscription_exchange, mode_str)
-                    
-                    # Debug log to verify correct topic and data structure
-                    self.logger.info(f"📊 Publishing to topic: {topic}")
-                    self.logger.info(f"📊 Data structure: {transformed_tick}")
-                    self.logger.info(f"📊 Subscription exchange: {subscription_exchange} -> Topic: {topic}, Data exchange: {data_exchange}")
-                    
-                    # Publish to ZeroMQ exactly like Angel adapter
-                    self.publish_market_data(topic, transformed_tick)
-                    
-                    # Debug log for troubleshooting polling data issues
-                    if subscription_mode == 'ltp':
-                        self.logger.debug(f"📊 LTP Data should be available for polling: {subscription_exchange}:{symbol}")
+                if not transformed_tick:
+                    continue
+                
+                # Override the tick mode with subscription mode
+                transformed_tick['mode'] = subscription.extra['tick_mode']
+                
+                # ✅ Set the data exchange field (always include, never remove)
+                transformed_tick['exchange'] = subscription.data_exchange
+                
+                # Sampled per topic; formatted only when DEBUG is enabled
+                self.hot_logger.debug(subscription.topic, "📊 Publishing to topic: %s (subscription exchange %s, data exchange %s): %s",
+                                      subscription.topic, subscription.exchange, subscription.data_exchange, transformed_tick)
+                
+                # Publish to ZeroMQ exactly like Angel adapter
+                self.publish_market_data(subscription.topic, transformed_tick)
                     
         except Exception as e:
             self.logger.error(f"Error handling ticks: {e}")
@@ -807,6 +789,7 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                     self.reconnect_attempts = 0
                     self.subscribed_symbols.clear()
                     self.token_to_symbol.clear()
+                    self.subscription_registry.clear()
                     self.logger.info("WebSocket client stopped and references cleared")
                 
             # Clean up ZeroMQ resources
@@ -843,6 +826,7 @@ class ZerodhaWebSocketAdapter(BaseBrokerWebSocketAdapter):
                 # Clear subscription records
                 self.subscribed_symbols.clear()
                 self.token_to_symbol.clear()
+                self.subscription_registry.clear()
             
             # Clean up ZMQ resources using base class method
             self.cleanup_zmq()
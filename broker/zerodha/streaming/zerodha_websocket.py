@@ -13,10 +13,39 @@ import struct
 import threading
 import time
 from typing import Dict, List, Optional, Callable, Any, Set
+import numpy as np
 import websockets.client
 import websockets.exceptions
 from datetime import datetime
 
+from websocket_proxy.tick_batch import gather_records, view_records
+
+# Precompiled packet layouts (big endian), decoded in place with unpack_from
+_UINT16 = struct.Struct('>H')
+_LTP_PACKET = struct.Struct('>Ii')
+_QUOTE_PACKET = struct.Struct('>11i')
+_FULL_EXTENSION = struct.Struct('>5i')
+# 10 depth entries of quantity, price, orders and 2 bytes padding
+_DEPTH_BOOK = struct.Struct('>' + 'iih2x' * 10)
+
+# Raw packet layout for batch decoding (first 64 bytes of a full packet)
+_RAW_DTYPE = np.dtype([
+    ('instrument_token', '>u4'), ('last_price', '>i4'), ('last_traded_quantity', '>i4'),
+    ('average_price', '>i4'), ('volume', '>i4'), ('total_buy_quantity', '>i4'),
+    ('total_sell_quantity', '>i4'), ('open', '>i4'), ('high', '>i4'), ('low', '>i4'),
+    ('close', '>i4'), ('last_traded_timestamp', '>i4'), ('open_interest', '>i4'),
+    ('oi_day_high', '>i4'), ('oi_day_low', '>i4'), ('exchange_timestamp', '>i4'),
+])
+
+# Columnar tick layout returned by ZerodhaWebSocket.decode_frame_columnar
+TICK_DTYPE = np.dtype([
+    ('instrument_token', 'u4'), ('last_price', 'f8'), ('last_traded_quantity', 'i8'),
+    ('average_price', 'f8'), ('volume', 'i8'), ('total_buy_quantity', 'i8'),
+    ('total_sell_quantity', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'),
+    ('close', 'f8'), ('last_traded_timestamp', 'i8'), ('open_interest', 'i8'),
+    ('exchange_timestamp', 'i8'), ('packet_length', 'u2'),
+])
+
 class ZerodhaWebSocket:
     """
     Fixed WebSocket client for Zerodha's market data streaming API.
@@ -56,6 +85,10 @@ class ZerodhaWebSocket:
         self.max_reconnect_delay = 60
         
         # Callback handlers
+        # Optional: receives each frame as a numpy TICK_DTYPE array
+        self.on_ticks_columnar: Optional[Callable[[np.ndarray], None]] = None
+        # Optional: receives each raw binary frame before it is parsed (session recording)
+        self.on_frame: Optional[Callable[[bytes], None]] = None
         self.on_connect = None
         self.on_disconnect = None
         self.on_error = None
@@ -539,6 +572,16 @@ class ZerodhaWebSocket:
                     self.logger.debug("💓 Heartbeat received")
                     return
                 
+                if self.on_frame:
+                    self.on_frame(message)
+                
+                # Columnar consumers get the whole frame decoded in one pass
+                if self.on_ticks_columnar:
+                    try:
+                        self.on_ticks_columnar(self.decode_frame_columnar(message))
+                    except Exception as e:
+                        self.logger.error(f"❌ Error in on_ticks_columnar callback: {e}")
+                
                 # Parse binary data
                 ticks = self._parse_binary_message(message)
                 if ticks:
@@ -580,139 +623,114 @@ class ZerodhaWebSocket:
         except Exception as e:
             self.logger.error(f"❌ Error processing message: {e}")
     
+    def _packet_offsets(self, view: memoryview) -> List[tuple]:
+        """Return (offset, length) for every complete packet in a frame"""
+        size = len(view)
+        if size < 4:
+            return []
+        
+        # Header: first 2 bytes = number of packets, then (length, packet) pairs
+        num_packets = _UINT16.unpack_from(view, 0)[0]
+        packets = []
+        offset = 2
+        for _ in range(num_packets):
+            if offset + 2 > size:
+                break
+            packet_length = _UINT16.unpack_from(view, offset)[0]
+            offset += 2
+            if offset + packet_length > size:
+                break
+            packets.append((offset, packet_length))
+            offset += packet_length
+        return packets
+    
     def _parse_binary_message(self, data: bytes) -> List[Dict]:
         """Parse binary message according to Zerodha specification"""
         try:
-            if len(data) < 4:
-                return []
-            
-            # Parse header: first 2 bytes = number of packets
-            num_packets = struct.unpack('>H', data[0:2])[0]
-            
-            packets = []
-            offset = 2
-            
-            for packet_idx in range(num_packets):
-                if offset + 2 > len(data):
-                    break
-                
-                # Next 2 bytes: packet length
-                packet_length = struct.unpack('>H', data[offset:offset+2])[0]
-                offset += 2
-                
-                if offset + packet_length > len(data):
-                    break
-                
-                # Extract and parse packet
-                packet_data = data[offset:offset+packet_length]
-                tick = self._parse_packet(packet_data)
+            view = memoryview(data)
+            ticks = []
+            for offset, packet_length in self._packet_offsets(view):
+                tick = self._parse_packet(view, offset, packet_length)
                 if tick:
-                    packets.append(tick)
-                
-                offset += packet_length
-            
-            return packets
+                    ticks.append(tick)
+            return ticks
             
         except Exception as e:
             self.logger.error(f"❌ Error parsing binary message: {e}")
             return []
     
-    def _parse_packet(self, packet: bytes) -> Optional[Dict]:
+    def _parse_packet(self, view, offset: int = 0, length: Optional[int] = None) -> Optional[Dict]:
         """
-        Parse individual packet with improved error handling.
-        ✅ ENHANCED: Adds exchange information to tick data.
+        Parse one packet in place with precompiled structs (no slicing).
+        
+        Args:
+            view: Frame buffer (memoryview or bytes)
+            offset: Packet start within the buffer
+            length: Packet length (defaults to the rest of the buffer)
         """
         try:
-            if len(packet) < 8:
+            if length is None:
+                length = len(view) - offset
+            if length < 8:
                 return None
             
-            # Extract instrument token and last price
-            instrument_token = struct.unpack('>I', packet[0:4])[0]
-            last_price_paise = struct.unpack('>i', packet[4:8])[0]
-            last_price = last_price_paise / 100.0
-            
             # Determine mode based on packet length
-            if len(packet) == 8:
+            if length >= 44:
+                fields = _QUOTE_PACKET.unpack_from(view, offset)
+                instrument_token = fields[0]
+                last_price = fields[1] / 100.0
+            else:
+                instrument_token, last_price_paise = _LTP_PACKET.unpack_from(view, offset)
+                last_price = last_price_paise / 100.0
+            
+            if length == 8:
                 mode = self.MODE_LTP
-            elif len(packet) == 44:
+            elif length == 44:
                 mode = self.MODE_QUOTE
-            elif len(packet) >= 184:
+            elif length >= 184:
                 mode = self.MODE_FULL
             else:
                 mode = self.mode_map.get(instrument_token, self.MODE_QUOTE)
             
-            # ✅ NEW: Get exchange information for this token
-            exchange = None
-            with self.lock:
-                exchange = self.token_exchange_map.get(instrument_token)
-            
             # Basic tick structure
             tick = {
                 'instrument_token': instrument_token,
-                'last_traded_price': last_price,
                 'last_price': last_price,
                 'mode': mode,
                 'timestamp': int(time.time() * 1000)
             }
             
-            # ✅ NEW: Add exchange information if available
+            # ✅ Add exchange information if available (dict reads are atomic, no lock needed)
+            exchange = self.token_exchange_map.get(instrument_token)
             if exchange:
-                tick['source_exchange'] = exchange  # Add source exchange from mapping
-            
-            # Parse additional fields for quote mode (44 bytes)
-            if len(packet) >= 44:
-                try:
-                    # Only unpack exactly 44 bytes for quote mode
-                    fields = struct.unpack('>11i', packet[0:44])  # 11 integers * 4 bytes = 44 bytes
-                    
-                    tick.update({
-                        'instrument_token': fields[0],
-                        'last_traded_price': fields[1] / 100.0,
-                        'last_price': fields[1] / 100.0,
-                        'last_traded_quantity': fields[2],
-                        'average_traded_price': fields[3] / 100.0,
-                        'average_price': fields[3] / 100.0,
-                        'volume_traded': fields[4],
-                        'volume': fields[4],
-                        'total_buy_quantity': fields[5],
-                        'total_sell_quantity': fields[6],
-                        'open_price': fields[7] / 100.0,
-                        'high_price': fields[8] / 100.0,
-                        'low_price': fields[9] / 100.0,
-                        'close_price': fields[10] / 100.0,
-                        'ohlc': {
-                            'open': fields[7] / 100.0,
-                            'high': fields[8] / 100.0,
-                            'low': fields[9] / 100.0,
-                            'close': fields[10] / 100.0
-                        }
-                    })
-                except struct.error as e:
-                    self.logger.debug(f"⚠️ Quote parsing issue (packet length: {len(packet)}): {e}")
-                    # Fallback - just use LTP data
-                    pass
+                tick['source_exchange'] = exchange
+            
+            # Quote fields (44 bytes)
+            if length >= 44:
+                tick['last_traded_quantity'] = fields[2]
+                tick['average_price'] = fields[3] / 100.0
+                tick['volume'] = fields[4]
+                tick['total_buy_quantity'] = fields[5]
+                tick['total_sell_quantity'] = fields[6]
+                tick['ohlc'] = {
+                    'open': fields[7] / 100.0,
+                    'high': fields[8] / 100.0,
+                    'low': fields[9] / 100.0,
+                    'close': fields[10] / 100.0
+                }
             
-            # Parse full mode fields if available (64+ bytes)
-            if len(packet) >= 64:
-                try:
-                    extended_fields = struct.unpack('>iiiii', packet[44:64])
-                    tick.update({
-                        'last_traded_timestamp': extended_fields[0],
-                        'open_interest': extended_fields[1],
-                        'oi': extended_fields[1],
-                        'exchange_timestamp': extended_fields[4]
-                    })
-                except struct.error:
-                    pass
+            # Full mode fields (64+ bytes)
+            if length >= 64:
+                last_trade_time, open_interest, _, _, exchange_timestamp = _FULL_EXTENSION.unpack_from(view, offset + 44)
+                tick['last_traded_timestamp'] = last_trade_time
+                tick['open_interest'] = open_interest
+                tick['exchange_timestamp'] = exchange_timestamp
             
-            # Parse market depth for full mode (184+ bytes)
-            if len(packet) >= 184:
-                try:
-                    depth = self._parse_market_depth(packet[64:184])
-                    if depth:
-                        tick['depth'] = depth
-                except Exception:
-                    pass
+            # Market depth for full mode (184+ bytes)
+            if length >= 184:
+                depth = self._parse_market_depth(view, offset + 64)
+                if depth:
+                    tick['depth'] = depth
             
             return tick
             
@@ -720,44 +738,60 @@ class ZerodhaWebSocket:
             self.logger.error(f"❌ Error parsing packet: {e}")
             return None
     
-    def _parse_market_depth(self, depth_data: bytes) -> Optional[Dict]:
-        """Parse market depth data"""
+    def _parse_market_depth(self, view, offset: int = 0) -> Optional[Dict]:
+        """Parse the 5 buy + 5 sell depth entries (12 bytes each) starting at offset"""
         try:
-            if len(depth_data) < 120:
+            if len(view) - offset < 120:
                 return None
             
-            depth = {'buy': [], 'sell': []}
-            
-            # Parse buy side (first 5 entries)
-            for i in range(5):
-                offset = i * 12
-                if offset + 10 <= len(depth_data):
-                    quantity, price, orders = struct.unpack('>iih', depth_data[offset:offset+10])
-                    if price > 0:  # Only add valid prices
-                        depth['buy'].append({
-                            'quantity': quantity,
-                            'price': price / 100.0,
-                            'orders': orders
-                        })
-            
-            # Parse sell side (next 5 entries)
-            for i in range(5):
-                offset = 60 + (i * 12)
-                if offset + 10 <= len(depth_data):
-                    quantity, price, orders = struct.unpack('>iih', depth_data[offset:offset+10])
-                    if price > 0:  # Only add valid prices
-                        depth['sell'].append({
-                            'quantity': quantity,
-                            'price': price / 100.0,
-                            'orders': orders
-                        })
-            
-            return depth if (depth['buy'] or depth['sell']) else None
+            levels = _DEPTH_BOOK.unpack_from(view, offset)
+            buy = []
+            sell = []
+            # Each entry unpacks to (quantity, price, orders), padding is skipped
+            for i in range(0, 30, 3):
+                price = levels[i + 1]
+                if price > 0:  # Only add valid prices
+                    (buy if i < 15 else sell).append({
+                        'quantity': levels[i],
+                        'price': price / 100.0,
+                        'orders': levels[i + 2]
+                    })
+            
+            return {'buy': buy, 'sell': sell} if (buy or sell) else None
             
         except Exception as e:
             self.logger.error(f"❌ Error parsing market depth: {e}")
             return None
     
+    def decode_frame_columnar(self, data: bytes) -> np.ndarray:
+        """
+        Decode a whole frame into a numpy structured array (TICK_DTYPE).
+        
+        All packets are gathered into one byte matrix and decoded in a single
+        vectorized step. Fields a packet does not carry (e.g. quote fields of
+        an LTP packet) are zero. Market depth is not included.
+        """
+        view = memoryview(data)
+        packets = self._packet_offsets(view)
+        if not packets:
+            return np.zeros(0, dtype=TICK_DTYPE)
+        
+        offsets, lengths = zip(*packets)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        # Index packets shorter than 44 bytes only have a comparable LTP
+        gather_lengths = np.where(lengths >= 44, lengths, np.minimum(lengths, 8))
+        raw = view_records(gather_records(view, offsets, gather_lengths, _RAW_DTYPE.itemsize), _RAW_DTYPE)
+        
+        ticks = np.zeros(len(raw), dtype=TICK_DTYPE)
+        ticks['instrument_token'] = raw['instrument_token']
+        ticks['packet_length'] = lengths
+        for name in ('last_price', 'average_price', 'open', 'high', 'low', 'close'):
+            ticks[name] = raw[name] / 100.0
+        for name in ('last_traded_quantity', 'volume', 'total_buy_quantity', 'total_sell_quantity',
+                     'last_traded_timestamp', 'open_interest', 'exchange_timestamp'):
+            ticks[name] = raw[name]
+        return ticks
+    
     def is_connected(self) -> bool:
         """Check if WebSocket is connected"""
         return self.connected and self._is_websocket_open()
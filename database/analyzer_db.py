@@ -2,12 +2,15 @@
 
 import os
 import json
-from sqlalchemy import create_engine, Column, Integer, DateTime, Text, String
-from sqlalchemy.orm import scoped_session, sessionmaker
+import threading
+import time
+from collections import Counter, deque
+from sqlalchemy import Column, Integer, DateTime, Text, String, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+from database.db_engine import get_engine, get_session, log_writer
+from datetime import datetime, timedelta
 import pytz
 from utils.logging import get_logger
 
@@ -15,17 +18,22 @@ logger = get_logger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+engine = get_engine(DATABASE_URL)
 
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
+# Window covered by the analyzer stats, and the width of one stats bucket
+STATS_WINDOW_SECONDS = 24 * 60 * 60
+STATS_BUCKET_SECONDS = 5 * 60
+
+# Windows of the request rate and recent rate limit error counts
+REQUEST_RATE_WINDOW_SECONDS = 60
+RATE_LIMIT_WINDOW_SECONDS = 5 * 60
+
+ISSUE_TYPES = ('rate_limit', 'invalid_symbol', 'missing_quantity', 'invalid_exchange', 'other')
+
 class AnalyzerLog(Base):
     __tablename__ = 'analyzer_logs'
     id = Column(Integer, primary_key=True)
@@ -51,13 +59,187 @@ class AnalyzerLog(Base):
             'created_at': self.created_at.astimezone(pytz.UTC).isoformat()
         }
 
+class AnalyzerCounter(Base):
+    __tablename__ = 'analyzer_counters'
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
 def init_db():
-    """Initialize the analyzer table"""
+    """Initialize the analyzer tables"""
     logger.info("Initializing Analyzer Table")
     Base.metadata.create_all(bind=engine)
 
-# Executor for asynchronous tasks
-executor = ThreadPoolExecutor(2)
+def reserve_counter_block(name, size, initial=None):
+    """
+    Advance a counter row by ``size`` and return its new value.
+
+    The caller owns the values ``(new - size, new]``. The update and read run
+    in one transaction, so processes sharing the database never get the same
+    block. ``initial`` is called for the starting value when the row does not
+    exist yet.
+    """
+    table = AnalyzerCounter.__table__
+    for attempt in range(2):
+        try:
+            with engine.begin() as conn:
+                updated = conn.execute(
+                    update(table).where(table.c.name == name).values(value=table.c.value + size)
+                ).rowcount
+                if not updated:
+                    start = initial() if initial is not None else 0
+                    conn.execute(insert(table).values(name=name, value=start + size))
+                return conn.execute(select(table.c.value).where(table.c.name == name)).scalar_one()
+        except IntegrityError:
+            # Another process created the row first; update it instead
+            if attempt:
+                raise
+
+def classify_issue(message):
+    """Issue type of an analyzer error message"""
+    message = message.lower()
+    if 'rate limit' in message:
+        return 'rate_limit'
+    if 'invalid symbol' in message:
+        return 'invalid_symbol'
+    if 'quantity' in message:
+        return 'missing_quantity'
+    if 'exchange' in message:
+        return 'invalid_exchange'
+    return 'other'
+
+class _StatsBucket:
+    __slots__ = ('total', 'sources', 'symbols', 'issues')
+
+    def __init__(self):
+        self.total = 0
+        self.sources = Counter()
+        self.symbols = set()
+        self.issues = Counter()
+
+class AnalyzerStats:
+    """
+    Running analyzer request counters.
+
+    Requests are counted as they are logged, in buckets of
+    STATS_BUCKET_SECONDS covering the last STATS_WINDOW_SECONDS, so stats are
+    read without scanning the log. The counters are seeded once from the
+    logs of the window on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._buckets = {}
+        self._requests = deque()
+        self._rate_limited = deque()
+
+    def record(self, request_data, response_data, timestamp=None):
+        """Count one logged request"""
+        with self._lock:
+            self._ensure_loaded()
+            self._add(request_data, response_data, timestamp if timestamp is not None else time.time())
+
+    def _add(self, request_data, response_data, timestamp):
+        request_data = request_data if isinstance(request_data, dict) else {}
+        response_data = response_data if isinstance(response_data, dict) else {}
+
+        bucket_key = int(timestamp // STATS_BUCKET_SECONDS)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = _StatsBucket()
+        bucket.total += 1
+        bucket.sources[request_data.get('strategy', 'Unknown')] += 1
+        if 'symbol' in request_data:
+            bucket.symbols.add(request_data['symbol'])
+
+        rate_limited = False
+        if response_data.get('status') == 'error':
+            issue = classify_issue(str(response_data.get('message', '')))
+            bucket.issues[issue] += 1
+            rate_limited = issue == 'rate_limit'
+
+        self._requests.append(timestamp)
+        if rate_limited:
+            self._rate_limited.append(timestamp)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            ist = pytz.timezone('Asia/Kolkata')
+            cutoff = datetime.now(ist) - timedelta(seconds=STATS_WINDOW_SECONDS)
+            rows = db_session.query(
+                AnalyzerLog.request_data, AnalyzerLog.response_data, AnalyzerLog.created_at
+            ).filter(AnalyzerLog.created_at >= cutoff).order_by(AnalyzerLog.created_at, AnalyzerLog.id).all()
+        except Exception as e:
+            logger.error(f"Error loading analyzer stats: {e}")
+            return
+        finally:
+            db_session.remove()
+
+        for request_json, response_json, created_at in rows:
+            try:
+                if created_at.tzinfo is None:
+                    created_at = ist.localize(created_at)
+                self._add(json.loads(request_json), json.loads(response_json), created_at.timestamp())
+            except Exception as e:
+                logger.error(f"Error processing request: {str(e)}")
+        logger.info(f"Loaded analyzer stats from {len(rows)} logged requests")
+
+    def _prune(self, now):
+        oldest_bucket = int((now - STATS_WINDOW_SECONDS) // STATS_BUCKET_SECONDS)
+        for key in [key for key in self._buckets if key < oldest_bucket]:
+            del self._buckets[key]
+        for timestamps, window in ((self._requests, REQUEST_RATE_WINDOW_SECONDS),
+                                   (self._rate_limited, RATE_LIMIT_WINDOW_SECONDS)):
+            cutoff = now - window
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+    def recent_requests(self):
+        """Requests logged in the last REQUEST_RATE_WINDOW_SECONDS"""
+        with self._lock:
+            self._ensure_loaded()
+            self._prune(time.time())
+            return len(self._requests)
+
+    def recent_rate_limits(self):
+        """Rate limit errors logged in the last RATE_LIMIT_WINDOW_SECONDS"""
+        with self._lock:
+            self._ensure_loaded()
+            self._prune(time.time())
+            return len(self._rate_limited)
+
+    def snapshot(self):
+        """Stats of the requests logged in the window"""
+        with self._lock:
+            self._ensure_loaded()
+            self._prune(time.time())
+            total = 0
+            sources = Counter()
+            symbols = set()
+            issues = Counter()
+            for bucket in self._buckets.values():
+                total += bucket.total
+                sources.update(bucket.sources)
+                symbols |= bucket.symbols
+                issues.update(bucket.issues)
+
+        return {
+            'total_requests': total,
+            'sources': dict(sources),
+            'symbols': list(symbols),
+            'issues': {
+                'total': sum(issues.values()),
+                'by_type': {issue: issues[issue] for issue in ISSUE_TYPES}
+            }
+        }
+
+analyzer_stats = AnalyzerStats()
+
+# Log rows are queued on the shared log writer, which batches them into one transaction
+executor = log_writer
 
 def async_log_analyzer(request_data, response_data, api_type='placeorder'):
     """Asynchronously log analyzer request"""
@@ -70,16 +252,12 @@ def async_log_analyzer(request_data, response_data, api_type='placeorder'):
         ist = pytz.timezone('Asia/Kolkata')
         now_ist = datetime.now(ist)
 
-        analyzer_log = AnalyzerLog(
-            api_type=api_type,
-            request_data=request_json,
-            response_data=response_json,
-            created_at=now_ist
-        )
-        db_session.add(analyzer_log)
-        db_session.commit()
+        log_writer.insert(AnalyzerLog.__table__, {
+            'api_type': api_type,
+            'request_data': request_json,
+            'response_data': response_json,
+            'created_at': now_ist
+        }, engine)
+        analyzer_stats.record(request_data, response_data)
     except Exception as e:
         logger.error(f"Error saving analyzer log: {e}")
-        db_session.rollback()
-    finally:
-        db_session.remove()
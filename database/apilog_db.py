@@ -2,11 +2,10 @@
 
 import os
 import json
-from sqlalchemy import create_engine, Column, Integer, DateTime, Text
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Index, Integer, DateTime, String, Text, bindparam, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from concurrent.futures import ThreadPoolExecutor
+from database.db_engine import get_engine, get_session, log_writer
 from datetime import datetime
 import pytz
 from utils.logging import get_logger
@@ -16,17 +15,24 @@ logger = get_logger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_URL')  # Replace with your SQLite path
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+engine = get_engine(DATABASE_URL)
 
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
+# Full-text index over the JSON payloads (SQLite FTS5, kept in sync by triggers)
+ORDER_LOG_FTS_TABLE = 'order_logs_fts'
+
+# Request/response fields copied into indexed columns when a log is written
+EXTRACTED_FIELDS = ('symbol', 'exchange', 'strategy', 'action', 'orderid', 'status')
+
+# Rows per transaction when backfilling extracted fields of existing logs
+BACKFILL_BATCH_SIZE = 5000
+
+# Whether the FTS index exists, checked on first search
+_fts_enabled = None
+
 class OrderLog(Base):
     __tablename__ = 'order_logs'
     id = Column(Integer, primary_key=True)
@@ -34,15 +40,163 @@ class OrderLog(Base):
     request_data = Column(Text, nullable=False)
     response_data = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), default=func.now())
+    # Extracted from request_data/response_data at write time
+    symbol = Column(String(100))
+    exchange = Column(String(20))
+    strategy = Column(String(255))
+    action = Column(String(10))
+    orderid = Column(String(100))
+    status = Column(String(20))
+
+    __table_args__ = (
+        Index('idx_order_logs_created_at', 'created_at'),
+        Index('idx_order_logs_api_type_created_at', 'api_type', 'created_at'),
+        Index('idx_order_logs_symbol_created_at', 'symbol', 'created_at'),
+        Index('idx_order_logs_strategy_created_at', 'strategy', 'created_at'),
+        Index('idx_order_logs_orderid', 'orderid'),
+    )
+
+def extract_log_fields(request_data, response_data):
+    """Pick the indexed columns out of a request/response pair"""
+    request_data = request_data if isinstance(request_data, dict) else {}
+    response_data = response_data if isinstance(response_data, dict) else {}
+    values = {
+        'symbol': request_data.get('symbol'),
+        'exchange': request_data.get('exchange'),
+        'strategy': request_data.get('strategy'),
+        'action': request_data.get('action'),
+        'orderid': request_data.get('orderid') or response_data.get('orderid'),
+        'status': response_data.get('status'),
+    }
+    return {key: str(value) if value is not None else None for key, value in values.items()}
+
+def fts_enabled():
+    """True when the full-text index exists (SQLite with FTS5)"""
+    global _fts_enabled
+    if _fts_enabled is None:
+        try:
+            _fts_enabled = engine.dialect.name == 'sqlite' and inspect(engine).has_table(ORDER_LOG_FTS_TABLE)
+        except Exception as e:
+            logger.error(f"Error checking order log search index: {e}")
+            _fts_enabled = False
+    return _fts_enabled
+
+def _add_missing_columns():
+    """Add the extracted columns to an existing order_logs table; True if any were added"""
+    existing = {column['name'] for column in inspect(engine).get_columns(OrderLog.__tablename__)}
+    missing = [column for column in OrderLog.__table__.columns if column.name not in existing]
+    if not missing:
+        return False
+    with engine.begin() as conn:
+        for column in missing:
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f'ALTER TABLE {OrderLog.__tablename__} ADD COLUMN {column.name} {column_type}'))
+    logger.info(f"Added order log columns: {', '.join(column.name for column in missing)}")
+    return True
+
+def backfill_log_fields(batch_size=BACKFILL_BATCH_SIZE):
+    """Fill the extracted columns of logs written before they existed"""
+    table = OrderLog.__table__
+    last_id = 0
+    updated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                table.select()
+                .with_only_columns(table.c.id, table.c.request_data, table.c.response_data)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            params = []
+            for row in rows:
+                try:
+                    fields = extract_log_fields(json.loads(row.request_data), json.loads(row.response_data))
+                except (TypeError, ValueError):
+                    continue
+                params.append({'row_id': row.id, **{f'new_{key}': value for key, value in fields.items()}})
+            if params:
+                conn.execute(
+                    table.update()
+                    .where(table.c.id == bindparam('row_id'))
+                    .values({field: bindparam(f'new_{field}') for field in EXTRACTED_FIELDS}),
+                    params
+                )
+            updated += len(params)
+            last_id = rows[-1].id
+    logger.info(f"Backfilled extracted fields of {updated} order logs")
+
+def _create_fts_index():
+    """Create the FTS5 index and its sync triggers (SQLite only)"""
+    if engine.dialect.name != 'sqlite':
+        return
+    try:
+        with engine.begin() as conn:
+            if inspect(conn).has_table(ORDER_LOG_FTS_TABLE):
+                return
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {ORDER_LOG_FTS_TABLE} USING fts5("
+                "api_type, request_data, response_data, content='order_logs', content_rowid='id')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER order_logs_fts_insert AFTER INSERT ON order_logs BEGIN "
+                f"INSERT INTO {ORDER_LOG_FTS_TABLE}(rowid, api_type, request_data, response_data) "
+                "VALUES (new.id, new.api_type, new.request_data, new.response_data); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER order_logs_fts_delete AFTER DELETE ON order_logs BEGIN "
+                f"INSERT INTO {ORDER_LOG_FTS_TABLE}({ORDER_LOG_FTS_TABLE}, rowid, api_type, request_data, response_data) "
+                "VALUES ('delete', old.id, old.api_type, old.request_data, old.response_data); END"
+            ))
+            # Index the logs written before the index existed
+            conn.execute(text(f"INSERT INTO {ORDER_LOG_FTS_TABLE}({ORDER_LOG_FTS_TABLE}) VALUES ('rebuild')"))
+        logger.info("Created order log search index")
+    except Exception as e:
+        # SQLite builds without FTS5 fall back to LIKE search
+        logger.warning(f"Order log search index not available: {e}")
+
+def search_filter(search_query):
+    """
+    Filter clause for a free-text log search.
+
+    Uses the FTS index where available: every word must match the start of
+    a token in the API type or the request/response payloads. Otherwise falls
+    back to a substring match.
+    """
+    if fts_enabled():
+        # Quote each word so FTS operators in user input are taken literally
+        terms = ['"' + term.replace('"', '') + '"*' for term in search_query.split() if term.replace('"', '')]
+        if terms:
+            match = text(
+                f"SELECT rowid FROM {ORDER_LOG_FTS_TABLE} WHERE {ORDER_LOG_FTS_TABLE} MATCH :match"
+            ).bindparams(match=' '.join(terms))
+            return OrderLog.id.in_(match)
+
+    search = f"%{search_query}%"
+    return (
+        (OrderLog.api_type.ilike(search)) |
+        (OrderLog.request_data.ilike(search)) |
+        (OrderLog.response_data.ilike(search))
+    )
 
 def init_db():
+    global _fts_enabled
     logger.info("Initializing API Log DB")
+    table_existed = inspect(engine).has_table(OrderLog.__tablename__)
     Base.metadata.create_all(bind=engine)
+    if table_existed and _add_missing_columns():
+        for index in OrderLog.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+        backfill_log_fields()
+    _create_fts_index()
+    _fts_enabled = None
 
 
 
-# Executor for asynchronous tasks
-executor = ThreadPoolExecutor(2)
+# Log rows are queued on the shared log writer, which batches them into one transaction
+executor = log_writer
 
 def async_log_order(api_type,request_data, response_data):
     try:
@@ -54,10 +208,12 @@ def async_log_order(api_type,request_data, response_data):
         ist = pytz.timezone('Asia/Kolkata')
         now_ist = datetime.now(ist)
 
-        order_log = OrderLog(api_type=api_type,request_data=request_json, response_data=response_json, created_at=now_ist)
-        db_session.add(order_log)
-        db_session.commit()
+        log_writer.insert(OrderLog.__table__, {
+            'api_type': api_type,
+            'request_data': request_json,
+            'response_data': response_json,
+            'created_at': now_ist,
+            **extract_log_fields(request_data, response_data)
+        }, engine)
     except Exception as e:
         logger.error(f"Error saving order log: {e}")
-    finally:
-        db_session.remove()
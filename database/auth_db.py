@@ -2,17 +2,21 @@
 
 import os
 import base64
-from sqlalchemy import create_engine, UniqueConstraint
-from sqlalchemy.orm import scoped_session, sessionmaker
+import hashlib
+import threading
+from typing import NamedTuple, Optional
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean  
 from sqlalchemy.sql import func
+from database.db_engine import get_engine, get_session
 from cachetools import TTLCache
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from database.webhook_context import invalidate_user_contexts
 from utils.logging import get_logger
 
 # Initialize logger
@@ -36,24 +40,34 @@ def get_encryption_key():
     key = base64.urlsafe_b64encode(kdf.derive(PEPPER.encode()))
     return Fernet(key)
 
-# Initialize Fernet cipher
-fernet = get_encryption_key()
+# Fernet cipher, derived on first use (PBKDF2 with 100k iterations is slow at import time)
+_fernet = None
+_fernet_lock = threading.Lock()
+
+def get_fernet():
+    """Get the Fernet cipher, deriving the key on first use"""
+    global _fernet
+    if _fernet is None:
+        with _fernet_lock:
+            if _fernet is None:
+                _fernet = get_encryption_key()
+    return _fernet
 
 # Define a cache for the auth tokens with a 30-second TTL
 auth_cache = TTLCache(maxsize=1024, ttl=30)
 # Define a separate cache for feed tokens with a 30-second TTL
 feed_token_cache = TTLCache(maxsize=1024, ttl=30)
-# Define a cache for broker names with a 5-minute TTL (longer since broker rarely changes)
-broker_cache = TTLCache(maxsize=1024, ttl=3000)
+# Resolved API key contexts (user, broker, decrypted tokens), keyed by a hash of the key.
+# Cleared for a user by upsert_auth (login, logout/revocation) and upsert_api_key (rotation),
+# the TTL only bounds staleness across processes.
+auth_context_cache = TTLCache(maxsize=1024, ttl=3600)
+auth_context_lock = threading.Lock()
+# Bumped on invalidation so a lookup racing with a login/logout is not cached
+auth_context_generation = 0
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+engine = get_engine(DATABASE_URL)
 
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
@@ -67,6 +81,13 @@ class Auth(Base):
     user_id = Column(String(255), nullable=True)  # Add user_id column
     is_revoked = Column(Boolean, default=False)
 
+class AuthContext(NamedTuple):
+    """Everything the service layer needs for a verified API key"""
+    user_id: str
+    broker: str
+    auth_token: str
+    feed_token: Optional[str]
+
 class ApiKeys(Base):
     __tablename__ = 'api_keys'
     id = Column(Integer, primary_key=True)
@@ -83,14 +104,14 @@ def encrypt_token(token):
     """Encrypt auth token"""
     if not token:
         return ''
-    return fernet.encrypt(token.encode()).decode()
+    return get_fernet().encrypt(token.encode()).decode()
 
 def decrypt_token(encrypted_token):
     """Decrypt auth token"""
     if not encrypted_token:
         return ''
     try:
-        return fernet.decrypt(encrypted_token.encode()).decode()
+        return get_fernet().decrypt(encrypted_token.encode()).decode()
     except Exception as e:
         logger.error(f"Error decrypting token: {e}")
         return None
@@ -111,6 +132,7 @@ def upsert_auth(name, auth_token, broker, feed_token=None, user_id=None, revoke=
         auth_obj = Auth(name=name, auth=encrypted_token, feed_token=encrypted_feed_token, broker=broker, user_id=user_id, is_revoked=revoke)
         db_session.add(auth_obj)
     db_session.commit()
+    invalidate_auth_context(name)
     return auth_obj.id
 
 def get_auth_token(name):
@@ -192,6 +214,10 @@ def upsert_api_key(user_id, api_key):
         )
         db_session.add(api_key_obj)
     db_session.commit()
+    # Contexts resolved from the old key must not outlive it
+    invalidate_auth_context(user_id)
+    # Webhook contexts hold the decrypted key
+    invalidate_user_contexts(user_id)
     return api_key_obj.id
 
 def get_api_key(user_id):
@@ -234,48 +260,70 @@ def verify_api_key(provided_api_key):
         logger.error(f"Error verifying API key: {e}")
         return None
 
-def get_broker_name(provided_api_key):
-    """Get only the broker name for a valid API key with caching"""
-    # Check if broker name is in cache
-    if provided_api_key in broker_cache:
-        return broker_cache[provided_api_key]
-    
-    # Not in cache, need to look it up
+def _api_key_digest(provided_api_key):
+    """Cache key for an API key, so raw keys are not kept in memory"""
+    return hashlib.sha256(provided_api_key.encode()).hexdigest()
+
+def invalidate_auth_context(user_id):
+    """Drop cached API key contexts and auth/feed tokens of a user"""
+    global auth_context_generation
+    with auth_context_lock:
+        auth_context_generation += 1
+        for digest, context in list(auth_context_cache.items()):
+            if context.user_id == user_id:
+                auth_context_cache.pop(digest, None)
+    auth_cache.pop(f"auth-{user_id}", None)
+    feed_token_cache.pop(f"feed-{user_id}", None)
+
+def get_auth_context(provided_api_key):
+    """
+    Get the user, broker and decrypted tokens for a valid API key.
+
+    The Argon2 verify, Auth lookup and decrypts run once per key; later
+    calls are served from auth_context_cache until the user logs in or out
+    again or the key is rotated. Returns None for invalid or revoked keys.
+    """
+    if not provided_api_key:
+        return None
+    digest = _api_key_digest(provided_api_key)
+    with auth_context_lock:
+        context = auth_context_cache.get(digest)
+        generation = auth_context_generation
+    if context is not None:
+        return context
+
     user_id = verify_api_key(provided_api_key)
-    
-    if user_id:
-        try:
-            auth_obj = Auth.query.filter_by(name=user_id).first()
-            if auth_obj and not auth_obj.is_revoked:
-                # Cache the broker name
-                broker_cache[provided_api_key] = auth_obj.broker
-                return auth_obj.broker
-            else:
-                logger.warning(f"No valid broker found for user_id '{user_id}'.")
-                return None
-        except Exception as e:
-            logger.error(f"Error while querying the database for broker name: {e}")
+    if not user_id:
+        return None
+    try:
+        auth_obj = Auth.query.filter_by(name=user_id).first()
+        if not auth_obj or auth_obj.is_revoked:
+            logger.warning(f"No valid auth token or broker found for user_id '{user_id}'.")
+            return None
+        auth_token = decrypt_token(auth_obj.auth)
+        if auth_token is None:
             return None
-    return None
+        feed_token = decrypt_token(auth_obj.feed_token) if auth_obj.feed_token else None
+        context = AuthContext(user_id, auth_obj.broker, auth_token, feed_token)
+    except Exception as e:
+        logger.error(f"Error while querying the database for auth token and broker: {e}")
+        return None
+
+    with auth_context_lock:
+        if generation == auth_context_generation:
+            auth_context_cache[digest] = context
+    return context
+
+def get_broker_name(provided_api_key):
+    """Get only the broker name for a valid API key with caching"""
+    context = get_auth_context(provided_api_key)
+    return context.broker if context else None
 
 def get_auth_token_broker(provided_api_key, include_feed_token=False):
     """Get auth token, feed token (optional) and broker for a valid API key"""
-    user_id = verify_api_key(provided_api_key)
-    
-    if user_id:
-        try:
-            auth_obj = Auth.query.filter_by(name=user_id).first()
-            if auth_obj and not auth_obj.is_revoked:
-                decrypted_token = decrypt_token(auth_obj.auth)
-                if include_feed_token:
-                    decrypted_feed_token = decrypt_token(auth_obj.feed_token) if auth_obj.feed_token else None
-                    return decrypted_token, decrypted_feed_token, auth_obj.broker
-                return decrypted_token, auth_obj.broker
-            else:
-                logger.warning(f"No valid auth token or broker found for user_id '{user_id}'.")
-                return (None, None, None) if include_feed_token else (None, None)
-        except Exception as e:
-            logger.error(f"Error while querying the database for auth token and broker: {e}")
-            return (None, None, None) if include_feed_token else (None, None)
-    else:
+    context = get_auth_context(provided_api_key)
+    if context is None:
         return (None, None, None) if include_feed_token else (None, None)
+    if include_feed_token:
+        return context.auth_token, context.feed_token, context.broker
+    return context.auth_token, context.broker
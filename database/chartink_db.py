@@ -1,22 +1,20 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime, Time
-from sqlalchemy.orm import scoped_session, sessionmaker, relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Time
+from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from database.db_engine import get_engine, get_session
 import os
 import logging
+from database.auth_db import get_api_key_for_tradingview
+from database.webhook_context import WebhookContext, WebhookContextCache, snapshot_row
 
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+engine = get_engine(DATABASE_URL)
 
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
@@ -74,6 +72,7 @@ def create_strategy(name, webhook_id, user_id, is_intraday=True, start_time=None
         )
         db_session.add(strategy)
         db_session.commit()
+        webhook_contexts.invalidate(strategy_id=strategy.id)
         return strategy
     except Exception as e:
         logger.error(f"Error creating strategy: {str(e)}")
@@ -119,6 +118,7 @@ def delete_strategy(strategy_id):
         if strategy:
             db_session.delete(strategy)
             db_session.commit()
+            webhook_contexts.invalidate(strategy_id=strategy_id)
             return True
         return False
     except Exception as e:
@@ -133,6 +133,7 @@ def toggle_strategy(strategy_id):
         if strategy:
             strategy.is_active = not strategy.is_active
             db_session.commit()
+            webhook_contexts.invalidate(strategy_id=strategy_id)
             return strategy
         return None
     except Exception as e:
@@ -152,6 +153,7 @@ def update_strategy_times(strategy_id, start_time=None, end_time=None, squareoff
             if squareoff_time is not None:
                 strategy.squareoff_time = squareoff_time
             db_session.commit()
+            webhook_contexts.invalidate(strategy_id=strategy_id)
             return strategy
         return None
     except Exception as e:
@@ -171,6 +173,7 @@ def add_symbol_mapping(strategy_id, chartink_symbol, exchange, quantity, product
         )
         db_session.add(mapping)
         db_session.commit()
+        webhook_contexts.invalidate(strategy_id=strategy_id)
         return mapping
     except Exception as e:
         logger.error(f"Error adding symbol mapping: {str(e)}")
@@ -190,6 +193,7 @@ def bulk_add_symbol_mappings(strategy_id, mappings):
             )
             db_session.add(mapping)
         db_session.commit()
+        webhook_contexts.invalidate(strategy_id=strategy_id)
         return True
     except Exception as e:
         logger.error(f"Error bulk adding symbol mappings: {str(e)}")
@@ -209,11 +213,36 @@ def delete_symbol_mapping(mapping_id):
     try:
         mapping = ChartinkSymbolMapping.query.get(mapping_id)
         if mapping:
+            strategy_id = mapping.strategy_id
             db_session.delete(mapping)
             db_session.commit()
+            webhook_contexts.invalidate(strategy_id=strategy_id)
             return True
         return False
     except Exception as e:
         logger.error(f"Error deleting symbol mapping {mapping_id}: {str(e)}")
         db_session.rollback()
         return False
+
+def load_webhook_context(webhook_id):
+    """Resolve the strategy, symbol mappings and API key behind a webhook"""
+    try:
+        strategy = ChartinkStrategy.query.filter_by(webhook_id=webhook_id).first()
+        if not strategy:
+            return None
+        mappings = {
+            m.chartink_symbol: snapshot_row(m)
+            for m in ChartinkSymbolMapping.query.filter_by(strategy_id=strategy.id).all()
+        }
+        api_key = get_api_key_for_tradingview(strategy.user_id)
+        return WebhookContext(snapshot_row(strategy), mappings, api_key)
+    except Exception as e:
+        logger.error(f"Error loading webhook context for {webhook_id}: {str(e)}")
+        return None
+
+# Resolved webhook contexts, invalidated by the strategy and mapping writes above
+webhook_contexts = WebhookContextCache(load_webhook_context)
+
+def get_webhook_context(webhook_id):
+    """Get the cached context for a webhook ID, None if the webhook does not exist"""
+    return webhook_contexts.get(webhook_id)
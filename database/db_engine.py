@@ -0,0 +1,302 @@
+# database/db_engine.py
+"""
+Shared SQLAlchemy engines, sessions and the log writer.
+
+Every database module gets its engine and session from here instead of
+creating its own pool, so all modules talking to the same database share
+one set of connections.
+
+For a SQLite file database each URL gets two engines:
+- a reader engine with a large pool; in WAL mode readers never block on
+  the writer
+- a writer engine with a single connection, so writes from all modules
+  queue in-process instead of retrying on SQLite's file lock
+
+Sessions route statements on their own: queries go to the reader, and once
+a session flushes or executes an INSERT/UPDATE/DELETE the rest of its
+transaction stays on the writer. Other databases use one engine for both.
+
+Log tables (order, analyzer and traffic logs) are written by a single
+background thread that batches queued rows into one transaction.
+"""
+
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 268435456),   # 256 MB
+    ('cache_size', -16000),     # 16 MB per connection
+    ('busy_timeout', 10000),    # ms, for writers in other processes
+    ('temp_store', 'MEMORY'),
+)
+
+# Pool settings used for every database before the engines were shared
+POOL_SIZE = 50
+MAX_OVERFLOW = 100
+POOL_TIMEOUT = 10
+
+# Seconds a write waits for the SQLite writer connection
+WRITER_POOL_TIMEOUT = 30
+
+LOG_BATCH_SIZE = 500
+
+
+class DatabaseEngines(NamedTuple):
+    reader: Engine
+    writer: Engine
+
+
+_engines: Dict[str, DatabaseEngines] = {}
+_sessions: Dict[str, scoped_session] = {}
+_lock = threading.Lock()
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return (parsed.get_backend_name() == 'sqlite'
+            and parsed.database not in (None, '', ':memory:')
+            and 'mode=memory' not in str(parsed))
+
+
+def _create_engines(url: str) -> DatabaseEngines:
+    if make_url(url).get_backend_name() == 'sqlite' and not _is_sqlite_file(url):
+        # In-memory databases live in a single connection
+        engine = create_engine(url)
+        return DatabaseEngines(engine, engine)
+
+    if not _is_sqlite_file(url):
+        engine = create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                               pool_timeout=POOL_TIMEOUT)
+        return DatabaseEngines(engine, engine)
+
+    path = make_url(url).database
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    reader = create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                           pool_timeout=POOL_TIMEOUT)
+    writer = create_engine(url, pool_size=1, max_overflow=0, pool_timeout=WRITER_POOL_TIMEOUT)
+    for engine in (reader, writer):
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return DatabaseEngines(reader, writer)
+
+
+def get_engines(url: Optional[str] = None) -> DatabaseEngines:
+    """Reader and writer engines of a database (default: DATABASE_URL)."""
+    url = url or os.getenv('DATABASE_URL')
+    engines = _engines.get(url)
+    if engines is None:
+        with _lock:
+            engines = _engines.get(url)
+            if engines is None:
+                engines = _engines[url] = _create_engines(url)
+    return engines
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """
+    The engine to write with (and to run DDL and bulk loads on).
+    Plain queries should go through a session, which uses the reader.
+    """
+    return get_engines(url).writer
+
+
+def get_reader_engine(url: Optional[str] = None) -> Engine:
+    """The engine for read-only queries."""
+    return get_engines(url).reader
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip()[:6].upper().startswith(('SELECT', 'WITH'))
+    return False
+
+
+class RoutingSession(Session):
+    """Session that reads from the reader engine and writes through the writer."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        engines = self.info['engines']
+        if engines.reader is engines.writer:
+            return engines.writer
+        if self.info.get('writing') or self._flushing or _is_write(clause):
+            # Keep the rest of the transaction on the writer, so it sees its own changes
+            self.info['writing'] = True
+            return engines.writer
+        return engines.reader
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('writing', None)
+
+
+def get_session_factory(url: Optional[str] = None) -> sessionmaker:
+    """A sessionmaker for the database, for code that manages its own sessions."""
+    engines = get_engines(url)
+    return sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False,
+                        bind=engines.writer, info={'engines': engines})
+
+
+def get_session(url: Optional[str] = None) -> scoped_session:
+    """The thread-local session shared by every module using the database."""
+    url = url or os.getenv('DATABASE_URL')
+    session = _sessions.get(url)
+    if session is None:
+        factory = get_session_factory(url)
+        with _lock:
+            session = _sessions.get(url)
+            if session is None:
+                session = _sessions[url] = scoped_session(factory)
+    return session
+
+
+def remove_sessions(exception=None) -> None:
+    """
+    Close the current thread's session on every database.
+
+    Registered as the app's teardown: the sessions are shared by all modules,
+    so a request that leaves one open would keep the SQLite writer's single
+    connection checked out for the rest of the thread's life.
+    """
+    for session in list(_sessions.values()):
+        session.remove()
+
+
+class LogWriter:
+    """
+    Single background thread that writes log rows.
+
+    Rows queued with :meth:`insert` are batched (up to ``batch_size`` queued
+    items at a time) into one transaction per database. :meth:`submit` takes
+    a callable like ``ThreadPoolExecutor.submit`` does, so log helpers can
+    serialize their payload off the request thread before queueing the row.
+    """
+
+    def __init__(self, batch_size: int = LOG_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._rows = None       # Rows of the batch being written (worker thread only)
+        self._flushed = []      # Flush events to set once the batch is written
+
+    def _put(self, task):
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                    self._thread.start()
+        self._queue.put(task)
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Run ``fn`` on the writer thread."""
+        future = Future()
+
+        def task():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._put(task)
+        return future
+
+    def insert(self, table, values: Dict[str, Any], engine: Optional[Engine] = None) -> None:
+        """Queue a row for ``table``; every row of a table must have the same keys."""
+        engine = engine if engine is not None else get_engine()
+        if self._rows is not None and threading.current_thread() is self._thread:
+            self._rows.append((engine, table, values))
+        else:
+            self._put(partial(self._collect, engine, table, values))
+
+    def _collect(self, engine, table, values):
+        self._rows.append((engine, table, values))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written."""
+        done = threading.Event()
+        self._put(partial(self._flushed.append, done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5) -> None:
+        """Write what is queued and stop the thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            tasks = [self._queue.get()]
+            while len(tasks) < self.batch_size:
+                try:
+                    tasks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._rows = []
+            for task in tasks:
+                if task is None:
+                    stop = True
+                    continue
+                try:
+                    task()
+                except Exception as e:
+                    logger.error(f"Error in log writer task: {e}")
+            rows, self._rows = self._rows, None
+            self._write(rows)
+
+            for done in self._flushed:
+                done.set()
+            self._flushed.clear()
+
+    @staticmethod
+    def _write(rows):
+        batches = {}
+        for engine, table, values in rows:
+            batches.setdefault(engine, {}).setdefault(table, []).append(values)
+        for engine, tables in batches.items():
+            try:
+                with engine.begin() as conn:
+                    for table, values in tables.items():
+                        conn.execute(table.insert(), values)
+            except Exception as e:
+                count = sum(len(values) for values in tables.values())
+                logger.error(f"Error writing {count} log rows: {e}")
+
+
+log_writer = LogWriter()
+atexit.register(log_writer.close)
@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from database.db_engine import get_engine, get_session
 import os
 import logging
 from datetime import datetime
@@ -9,16 +9,11 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 # Use a separate database for latency logs
-LATENCY_DATABASE_URL = 'sqlite:///db/latency.db'
+LATENCY_DATABASE_URL = os.getenv('LATENCY_DATABASE_URL', 'sqlite:///db/latency.db')
 
-latency_engine = create_engine(
-    LATENCY_DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+latency_engine = get_engine(LATENCY_DATABASE_URL)
 
-latency_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=latency_engine))
+latency_session = get_session(LATENCY_DATABASE_URL)
 LatencyBase = declarative_base()
 LatencyBase.query = latency_session.query_property()
 
@@ -88,6 +83,11 @@ class OrderLatency(LatencyBase):
             logger.error(f"Error getting recent latency logs: {str(e)}")
             return []
 
+    @staticmethod
+    def iter_logs(batch_size=500):
+        """Iterate over all latency logs, newest first, fetching them in batches"""
+        return OrderLatency.query.order_by(OrderLatency.timestamp.desc()).yield_per(batch_size)
+
     @staticmethod
     def get_latency_stats():
         """Get latency statistics"""
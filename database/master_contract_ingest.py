@@ -0,0 +1,583 @@
+"""
+Shared master contract ingestion engine.
+
+Broker ``master_contract_db`` modules build a normalized DataFrame per exchange
+file and feed it to a :class:`MasterContractLoader`. When symtoken is already
+populated the loader diffs the new contract against it by (token, exchange)
+and applies only the adds, removes and changes in one transaction. An empty
+table (or a mostly new contract) is bulk loaded into a staging table with
+``executemany``, indexed afterwards and swapped in atomically. Either way
+readers see the previous contract or the new one and never an empty table.
+
+The module also hosts vectorized symbol formatting helpers that replace the
+row-wise ``df.apply(..., axis=1)`` formatters used by broker modules.
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from database.symbol import SymToken, engine as symbol_engine
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SYMTOKEN_TABLE = SymToken.__tablename__
+STAGING_TABLE = f'{SYMTOKEN_TABLE}_staging'
+
+# Columns written to symtoken, in insert order
+CONTRACT_COLUMNS = [
+    'symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token',
+    'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size'
+]
+
+# Defaults used when a broker frame does not provide a column
+COLUMN_DEFAULTS = {
+    'name': '',
+    'exchange': None,
+    'brexchange': '',
+    'expiry': '',
+    'strike': 0.0,
+    'lotsize': 1,
+    'instrumenttype': '',
+    'tick_size': 0.05,
+}
+
+# Rows sent to the driver per executemany call
+INSERT_BATCH_SIZE = 20000
+
+# Above this fraction of touched rows a staged full reload is cheaper than a diff
+FULL_RELOAD_RATIO = 0.5
+
+INDEX_SYMBOL_REPLACEMENTS = {
+    'NIFTY 50': 'NIFTY',
+    'NIFTY NEXT 50': 'NIFTYNXT50',
+    'NIFTY FIN SERVICE': 'FINNIFTY',
+    'NIFTY BANK': 'BANKNIFTY',
+    'NIFTY MID SELECT': 'MIDCPNIFTY',
+    'INDIA VIX': 'INDIAVIX',
+    'SNSX50': 'SENSEX50',
+}
+
+
+# ---------------------------------------------------------------------------
+# Vectorized symbol formatting helpers
+# ---------------------------------------------------------------------------
+
+def compact_expiry(expiry: pd.Series) -> pd.Series:
+    """Convert expiries like ``28-MAR-24`` into ``28MAR24``."""
+    return expiry.fillna('').astype(str).str.replace('-', '', regex=False)
+
+
+def format_expiry(expiry: pd.Series, input_format: Optional[str] = None,
+                  output_format: str = '%d%b%y') -> pd.Series:
+    """
+    Parse and reformat an expiry column in one pass.
+
+    Unparseable or missing values become empty strings.
+    """
+    parsed = pd.to_datetime(expiry, format=input_format, errors='coerce')
+    return parsed.dt.strftime(output_format).str.upper().fillna('')
+
+
+def format_strike(strike: pd.Series, keep_fraction: bool = True) -> pd.Series:
+    """
+    Render strike prices for use inside a symbol.
+
+    Integral strikes drop their decimal part (``22000.0`` -> ``22000``). With
+    ``keep_fraction=False`` fractional strikes are truncated as well.
+    """
+    values = pd.to_numeric(strike, errors='coerce').fillna(0)
+    if not keep_fraction:
+        return values.astype('int64').astype(str)
+    return values.astype(str).str.replace(r'\.0$', '', regex=True)
+
+
+def normalize_strike(strike: pd.Series, default: float = -1) -> pd.Series:
+    """Coerce a strike column to floats, using ``default`` for bad values."""
+    return pd.to_numeric(strike, errors='coerce').fillna(default).astype(float)
+
+
+def build_derivative_symbols(df: pd.DataFrame, name_col: str = 'name',
+                             expiry_col: str = 'expiry', strike_col: str = 'strike',
+                             type_col: str = 'instrumenttype',
+                             keep_fraction: bool = True,
+                             default: Optional[pd.Series] = None,
+                             strike_text: Optional[pd.Series] = None,
+                             all_options: bool = False) -> pd.Series:
+    """
+    Build OpenAlgo futures and options symbols column-wise.
+
+    Futures:  NAME + EXPIRY + 'FUT'            e.g. BANKNIFTY24APR24FUT
+    Options:  NAME + EXPIRY + STRIKE + CE/PE   e.g. NIFTY28MAR2420800CE
+
+    Rows that are neither FUT nor CE/PE keep the value from ``default``
+    (the existing ``symbol`` column when present). With ``all_options`` every
+    non-FUT row is formatted as an option instead. ``strike_text`` replaces
+    the rendered strike column for brokers that format strikes differently.
+    """
+    if default is None:
+        default = df['symbol'] if 'symbol' in df.columns else pd.Series('', index=df.index)
+    instrument = df[type_col]
+    base = df[name_col].fillna('').astype(str) + compact_expiry(df[expiry_col])
+    if strike_text is None:
+        strike_text = format_strike(df[strike_col], keep_fraction=keep_fraction)
+
+    is_fut = instrument == 'FUT'
+    is_opt = ~is_fut if all_options else instrument.isin(['CE', 'PE'])
+    symbols = np.where(is_fut, base + 'FUT',
+                       np.where(is_opt, base + strike_text + instrument.astype(str), default))
+    return pd.Series(symbols, index=df.index)
+
+
+def build_xts_symbols(df: pd.DataFrame) -> pd.Series:
+    """
+    Build OpenAlgo symbols from an XTS master (``Name``, ``ContractExpiration``,
+    ``StrikePrice``, ``OptionType``), where option type 1 is a future, 3 a call
+    and anything else a put.
+    """
+    option_type = df['OptionType']
+    is_fut = option_type == 1
+    expiry = df['ContractExpiration'].dt.strftime('%d%b%y').str.upper()
+    strike = np.where(is_fut, '', format_strike(df['StrikePrice']))
+    kind = np.select([is_fut, option_type == 3], ['FUT', 'CE'], 'PE')
+    return df['Name'].astype(str) + expiry + strike + kind
+
+
+def strip_series_suffix(symbol: pd.Series, suffixes=('-EQ', '-BE')) -> pd.Series:
+    """
+    Drop the equity series from broker symbols (``SBIN-EQ`` -> ``SBIN``).
+
+    Only the first suffix found in a symbol is removed; symbols without one
+    (indices, for example) are returned unchanged.
+    """
+    result = symbol.copy()
+    pending = symbol.notna()
+    for suffix in suffixes:
+        found = pending & symbol.str.contains(suffix, regex=False, na=False)
+        result[found] = symbol[found].str.replace(suffix, '', regex=False)
+        pending &= ~found
+    return result
+
+
+def suffix_instrument_type(symbol: pd.Series, types=('FUT', 'CE', 'PE'),
+                           default: str = 'UNKNOWN') -> pd.Series:
+    """Instrument type from the end of a trading symbol (``...24APR24FUT`` -> ``FUT``)."""
+    conditions = [symbol.str.endswith(suffix, na=False) for suffix in types]
+    return pd.Series(np.select(conditions, list(types), default), index=symbol.index)
+
+
+def leading_name(symbol: pd.Series) -> pd.Series:
+    """Leading letters of a trading symbol (``SENSEX24APRFUT`` -> ``SENSEX``)."""
+    return symbol.str.extract(r'^([A-Za-z]+)', expand=False).fillna(symbol)
+
+
+def replace_index_symbols(symbol: pd.Series, replacements: Optional[dict] = None) -> pd.Series:
+    """Map broker index names (``NIFTY 50``) to OpenAlgo symbols (``NIFTY``)."""
+    return symbol.replace(replacements or INDEX_SYMBOL_REPLACEMENTS)
+
+
+# ---------------------------------------------------------------------------
+# Normalization and bulk load
+# ---------------------------------------------------------------------------
+
+def normalize_contract_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a frame with exactly :data:`CONTRACT_COLUMNS` and database-ready dtypes.
+
+    Missing optional columns are filled with defaults, numeric columns are
+    coerced and duplicate (token, exchange) pairs are dropped keeping the
+    first occurrence.
+    """
+    df = df.copy()
+    for column in CONTRACT_COLUMNS:
+        if column not in df.columns:
+            if column in ('symbol', 'brsymbol', 'token'):
+                raise ValueError(f"Master contract frame is missing required column '{column}'")
+            df[column] = COLUMN_DEFAULTS[column]
+
+    df = df[CONTRACT_COLUMNS]
+    df['token'] = df['token'].astype(str)
+    df['strike'] = pd.to_numeric(df['strike'], errors='coerce')
+    df['tick_size'] = pd.to_numeric(df['tick_size'], errors='coerce')
+    df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(1).astype('int64')
+    df = df[df['symbol'].notna() & df['brsymbol'].notna()]
+    return df.drop_duplicates(subset=['token', 'exchange'], keep='first')
+
+
+def _placeholder(paramstyle: str, position: int) -> str:
+    if paramstyle == 'qmark':
+        return '?'
+    if paramstyle == 'numeric':
+        return f':{position}'
+    return '%s'
+
+
+def _iter_row_batches(df: pd.DataFrame, batch_size: int) -> Iterable[List[tuple]]:
+    """Yield lists of plain Python tuples with NaN converted to None."""
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield list(chunk.itertuples(index=False, name=None))
+
+
+@dataclass
+class ContractDiff:
+    """Row-level changes applied to symtoken, keyed by (token, exchange)."""
+    added: pd.DataFrame
+    removed: pd.DataFrame
+    changed: pd.DataFrame
+    previous: pd.DataFrame
+    full_reload: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        return self.added.empty and self.removed.empty and self.changed.empty
+
+    def summary(self) -> str:
+        if self.full_reload:
+            return f"full reload of {len(self.added)} rows"
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+    def affected_rows(self) -> pd.DataFrame:
+        """Old and new versions of every row touched by the diff."""
+        return pd.concat([self.added, self.removed, self.changed, self.previous],
+                         ignore_index=True)
+
+
+# Callbacks notified with a ContractDiff after symtoken changes
+_contract_listeners: List[Callable[[ContractDiff], None]] = []
+
+
+def register_contract_listener(callback: Callable[[ContractDiff], None]) -> None:
+    """Register a callback for derived caches/indexes built from symtoken."""
+    if callback not in _contract_listeners:
+        _contract_listeners.append(callback)
+
+
+class MasterContractLoader:
+    """
+    Collects per-exchange contract frames and applies them in one transaction.
+
+    Usage::
+
+        loader = MasterContractLoader()
+        loader.add(process_nse(path))
+        loader.add(process_nfo(path))
+        loader.commit()
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else symbol_engine
+        self.frames: List[pd.DataFrame] = []
+
+    def add(self, df: Optional[pd.DataFrame]) -> None:
+        """Queue a processed broker frame for loading."""
+        if df is None or df.empty:
+            return
+        self.frames.append(df)
+
+    def build_frame(self) -> pd.DataFrame:
+        """Concatenate and normalize all queued frames."""
+        if not self.frames:
+            return pd.DataFrame(columns=CONTRACT_COLUMNS)
+        return normalize_contract_frame(pd.concat(self.frames, ignore_index=True))
+
+    def commit(self) -> int:
+        """
+        Apply all queued frames to the symtoken table.
+
+        Only added, removed and changed rows are written when the table is
+        already populated; an empty table gets a bulk load.
+
+        Returns:
+            Number of rows in the new contract
+        """
+        df = self.build_frame()
+        if df.empty:
+            logger.warning("Master contract load skipped: no rows to insert")
+            return 0
+
+        apply_contract_dataframe(df, engine=self.engine)
+        self.frames = []
+        return len(df)
+
+
+def _staging_ddl(dialect) -> str:
+    """CREATE TABLE statement for the index-free staging table."""
+    metadata = MetaData()
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key,
+               nullable=column.nullable)
+        for column in SymToken.__table__.columns
+    ]
+    return str(CreateTable(Table(STAGING_TABLE, metadata, *columns)).compile(dialect=dialect))
+
+
+def _index_ddl(dialect) -> List[str]:
+    """CREATE INDEX statements for the live symtoken table."""
+    return [
+        str(CreateIndex(index).compile(dialect=dialect))
+        for index in sorted(SymToken.__table__.indexes, key=lambda idx: idx.name)
+    ]
+
+
+def _placeholders(dialect, count: int) -> List[str]:
+    return [_placeholder(dialect.paramstyle, position) for position in range(1, count + 1)]
+
+
+@contextmanager
+def _write_transaction(engine):
+    """
+    Yield a DBAPI cursor inside a single write transaction.
+
+    SQLite's driver only opens transactions implicitly before DML, so the
+    transaction is started explicitly to keep DDL and DML atomic together.
+    """
+    raw = engine.raw_connection()
+    is_sqlite = engine.dialect.name == 'sqlite'
+    driver_connection = raw.driver_connection
+    previous_isolation = None
+    try:
+        if is_sqlite:
+            previous_isolation = driver_connection.isolation_level
+            driver_connection.isolation_level = None
+        cursor = raw.cursor()
+        if is_sqlite:
+            cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+            if is_sqlite:
+                cursor.execute('COMMIT')
+            else:
+                raw.commit()
+        except Exception:
+            try:
+                if is_sqlite:
+                    cursor.execute('ROLLBACK')
+                else:
+                    raw.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cursor.close()
+    finally:
+        if is_sqlite:
+            driver_connection.isolation_level = previous_isolation
+        raw.close()
+
+
+def _full_load(cursor, df: pd.DataFrame, dialect, batch_size: int) -> None:
+    """Fill a staging table, rename it over symtoken and build indexes."""
+    columns = ', '.join(CONTRACT_COLUMNS)
+    placeholders = ', '.join(_placeholders(dialect, len(CONTRACT_COLUMNS)))
+    insert_sql = f'INSERT INTO {STAGING_TABLE} ({columns}) VALUES ({placeholders})'
+
+    cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+    cursor.execute(_staging_ddl(dialect))
+    for rows in _iter_row_batches(df, batch_size):
+        cursor.executemany(insert_sql, rows)
+
+    cursor.execute(f'DROP TABLE IF EXISTS {SYMTOKEN_TABLE}')
+    cursor.execute(f'ALTER TABLE {STAGING_TABLE} RENAME TO {SYMTOKEN_TABLE}')
+    for statement in _index_ddl(dialect):
+        cursor.execute(statement)
+
+
+def load_contract_dataframe(df: pd.DataFrame, engine=None,
+                            batch_size: int = INSERT_BATCH_SIZE) -> int:
+    """
+    Bulk load a normalized contract frame and atomically replace symtoken.
+
+    Everything runs in one database transaction: the staging table is created
+    and filled with ``executemany``, the live table is dropped, the staging
+    table is renamed into place and the indexes are built last.
+
+    Returns:
+        Number of rows loaded
+    """
+    engine = engine if engine is not None else symbol_engine
+    started = time.perf_counter()
+    try:
+        with _write_transaction(engine) as cursor:
+            _full_load(cursor, df, engine.dialect, batch_size)
+    except Exception:
+        logger.exception("Master contract bulk load failed, keeping previous contract")
+        raise
+
+    _invalidate_symbol_caches()
+    _notify_listeners(ContractDiff(added=df, removed=_empty_contract(),
+                                   changed=_empty_contract(), previous=_empty_contract(),
+                                   full_reload=True))
+    elapsed = time.perf_counter() - started
+    logger.info(f"Master contract loaded: {len(df)} rows in {elapsed:.2f}s")
+    return len(df)
+
+
+def _empty_contract() -> pd.DataFrame:
+    return pd.DataFrame(columns=CONTRACT_COLUMNS)
+
+
+def _read_existing(cursor) -> Optional[pd.DataFrame]:
+    """Read the live symtoken rows, or None if the table does not exist."""
+    try:
+        cursor.execute(f'SELECT id, {", ".join(CONTRACT_COLUMNS)} FROM {SYMTOKEN_TABLE}')
+    except Exception:
+        return None
+    rows = cursor.fetchall()
+    existing = pd.DataFrame.from_records(rows, columns=['id'] + CONTRACT_COLUMNS)
+    existing['token'] = existing['token'].astype(str)
+    return existing
+
+
+def _values_differ(left: pd.Series, right: pd.Series) -> pd.Series:
+    """Element-wise inequality that treats two missing values as equal."""
+    if left.dtype.kind in 'if' or right.dtype.kind in 'if':
+        left = pd.to_numeric(left, errors='coerce')
+        right = pd.to_numeric(right, errors='coerce')
+    both_missing = left.isna() & right.isna()
+    return ~((left == right) | both_missing)
+
+
+def compute_contract_diff(existing: pd.DataFrame, df: pd.DataFrame) -> ContractDiff:
+    """
+    Diff the live table against a new normalized contract by (token, exchange).
+
+    Returns added rows, removed rows (with ``id``), changed rows (new values
+    with the ``id`` of the row they replace) and the previous versions of the
+    changed rows.
+    """
+    key = ['token', 'exchange']
+    duplicates = existing[existing.duplicated(subset=key, keep='first')]
+    existing = existing.drop_duplicates(subset=key, keep='first')
+
+    merged = existing.merge(df, on=key, how='outer', suffixes=('_old', ''), indicator=True, sort=False)
+
+    added = merged.loc[merged['_merge'] == 'right_only', CONTRACT_COLUMNS]
+
+    removed_mask = merged['_merge'] == 'left_only'
+    removed = merged.loc[removed_mask, ['id'] + key + [f'{c}_old' for c in CONTRACT_COLUMNS if c not in key]]
+    removed = removed.rename(columns={f'{c}_old': c for c in CONTRACT_COLUMNS})
+    removed = pd.concat([removed, duplicates], ignore_index=True)
+
+    both = merged[merged['_merge'] == 'both']
+    value_columns = [c for c in CONTRACT_COLUMNS if c not in key]
+    differs = pd.Series(False, index=both.index)
+    for column in value_columns:
+        differs |= _values_differ(both[f'{column}_old'], both[column])
+    changed_rows = both[differs]
+    changed = changed_rows[['id'] + CONTRACT_COLUMNS]
+    previous = changed_rows[['id'] + key + [f'{c}_old' for c in value_columns]]
+    previous = previous.rename(columns={f'{c}_old': c for c in value_columns})
+
+    return ContractDiff(added=added, removed=removed, changed=changed, previous=previous)
+
+
+def _apply_diff(cursor, diff: ContractDiff, dialect, batch_size: int) -> None:
+    """Write a ContractDiff with batched executemany statements."""
+    marks = _placeholders(dialect, len(CONTRACT_COLUMNS) + 1)
+
+    if not diff.removed.empty:
+        delete_sql = f'DELETE FROM {SYMTOKEN_TABLE} WHERE id = {marks[0]}'
+        for rows in _iter_row_batches(diff.removed[['id']].astype('int64'), batch_size):
+            cursor.executemany(delete_sql, rows)
+
+    if not diff.changed.empty:
+        assignments = ', '.join(f'{c} = {marks[i]}' for i, c in enumerate(CONTRACT_COLUMNS))
+        update_sql = (f'UPDATE {SYMTOKEN_TABLE} SET {assignments} '
+                      f'WHERE id = {marks[len(CONTRACT_COLUMNS)]}')
+        changed = diff.changed[CONTRACT_COLUMNS].copy()
+        changed['id'] = diff.changed['id'].astype('int64')
+        for rows in _iter_row_batches(changed, batch_size):
+            cursor.executemany(update_sql, rows)
+
+    if not diff.added.empty:
+        insert_sql = (f'INSERT INTO {SYMTOKEN_TABLE} ({", ".join(CONTRACT_COLUMNS)}) '
+                      f'VALUES ({", ".join(marks[:len(CONTRACT_COLUMNS)])})')
+        for rows in _iter_row_batches(diff.added[CONTRACT_COLUMNS], batch_size):
+            cursor.executemany(insert_sql, rows)
+
+
+def apply_contract_dataframe(df: pd.DataFrame, engine=None,
+                             batch_size: int = INSERT_BATCH_SIZE) -> ContractDiff:
+    """
+    Bring symtoken in line with a normalized contract frame.
+
+    When the table already holds rows, the adds, removes and changes keyed by
+    (token, exchange) are applied in a single transaction so lookups keep
+    working throughout. If the table is missing or empty, or more than
+    :data:`FULL_RELOAD_RATIO` of the rows changed, a staged bulk load is used
+    instead. Cached lookups are invalidated only for the affected keys.
+
+    Returns:
+        The ContractDiff that was applied
+    """
+    engine = engine if engine is not None else symbol_engine
+    started = time.perf_counter()
+    try:
+        with _write_transaction(engine) as cursor:
+            existing = _read_existing(cursor)
+            if existing is None or existing.empty:
+                diff = None
+            else:
+                diff = compute_contract_diff(existing, df)
+                touched = len(diff.added) + len(diff.removed) + len(diff.changed)
+                if touched > FULL_RELOAD_RATIO * max(len(existing), 1):
+                    logger.info(f"Master contract diff touches {touched} of {len(existing)} rows, "
+                                "using a full reload")
+                    diff = None
+
+            if diff is None:
+                _full_load(cursor, df, engine.dialect, batch_size)
+            elif not diff.is_empty:
+                _apply_diff(cursor, diff, engine.dialect, batch_size)
+    except Exception:
+        logger.exception("Master contract update failed, keeping previous contract")
+        raise
+
+    if diff is None:
+        diff = ContractDiff(added=df, removed=_empty_contract(), changed=_empty_contract(),
+                            previous=_empty_contract(), full_reload=True)
+        _invalidate_symbol_caches()
+    else:
+        _invalidate_symbol_caches(diff.affected_rows())
+
+    if not diff.is_empty:
+        _notify_listeners(diff)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Master contract applied: {diff.summary()} in {elapsed:.2f}s")
+    return diff
+
+
+def _invalidate_symbol_caches(rows: Optional[pd.DataFrame] = None) -> None:
+    """
+    Drop cached symbol/token lookups that may refer to the old contract.
+
+    With ``rows`` only the cache entries for those rows are dropped,
+    otherwise the whole cache is cleared.
+    """
+    try:
+        from database.token_db import token_cache, invalidate_symbol_cache
+        if rows is None:
+            token_cache.clear()
+        else:
+            invalidate_symbol_cache(
+                rows[['symbol', 'brsymbol', 'token', 'exchange']].itertuples(index=False, name=None)
+            )
+    except Exception as e:
+        logger.debug(f"Could not invalidate token cache: {e}")
+
+
+def _notify_listeners(diff: ContractDiff) -> None:
+    for callback in list(_contract_listeners):
+        try:
+            callback(diff)
+        except Exception as e:
+            logger.error(f"Master contract listener {callback!r} failed: {e}")
@@ -1,7 +1,7 @@
 import os
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, text
+from sqlalchemy import Column, String, DateTime, Boolean, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from database.db_engine import get_engine, get_session_factory
 from datetime import datetime
 import logging
 
@@ -10,12 +10,9 @@ logger = logging.getLogger(__name__)
 # Get the database path from environment variable or use default
 DB_PATH = os.getenv('DATABASE_URL', 'sqlite:///db/openalgo.db')
 
-# Ensure the directory exists
-os.makedirs(os.path.dirname(DB_PATH.replace('sqlite:///', '')), exist_ok=True)
-
-# Create the engine and session
-engine = create_engine(DB_PATH, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create the engine and session (the engine creates the database directory)
+engine = get_engine(DB_PATH)
+SessionLocal = get_session_factory(DB_PATH)
 
 Base = declarative_base()
 
@@ -0,0 +1,237 @@
+"""
+In-memory option chain index built from the symtoken table.
+
+Layout: (exchange, underlying) -> expiry -> OptionExpiry, where each
+OptionExpiry holds a sorted strike array with the CE/PE token, symbol and lot
+size aligned to it. Strike selection becomes a dictionary lookup plus a
+binary search instead of an ``ilike`` scan over symtoken.
+
+When the master contract loader reports a change, only the underlyings
+touched by it are reloaded; a full reload (or a diff touching more than
+INCREMENTAL_UPDATE_LIMIT underlyings) rebuilds the whole index. The index is
+built lazily on first use if the process started with a loaded table.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database.symbol import SymToken
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Exchanges that carry exchange traded options
+OPTION_EXCHANGES = ('NFO', 'BFO', 'MCX', 'CDS', 'BCD')
+
+# Above this many underlyings in one diff a full rebuild is cheaper
+INCREMENTAL_UPDATE_LIMIT = 500
+
+
+@dataclass
+class OptionExpiry:
+    """Strike ladder for one underlying and expiry."""
+    expiry: str
+    strikes: np.ndarray
+    ce_token: np.ndarray
+    ce_symbol: np.ndarray
+    pe_token: np.ndarray
+    pe_symbol: np.ndarray
+    lotsize: np.ndarray
+
+    def atm_index(self, spot_price: Optional[float]) -> int:
+        """
+        Index of the strike closest to ``spot_price``. Without a spot price the
+        middle strike is returned; callers must flag the ATM as estimated.
+        """
+        if spot_price is None or len(self.strikes) == 0:
+            return len(self.strikes) // 2
+        position = int(np.searchsorted(self.strikes, spot_price))
+        if position >= len(self.strikes):
+            return len(self.strikes) - 1
+        if position > 0 and spot_price - self.strikes[position - 1] <= self.strikes[position] - spot_price:
+            return position - 1
+        return position
+
+    def window(self, atm_index: int, strike_count: int) -> slice:
+        """Slice of ``strike_count`` strikes either side of ``atm_index``."""
+        start = max(atm_index - strike_count, 0)
+        return slice(start, min(atm_index + strike_count + 1, len(self.strikes)))
+
+
+def expiry_key(expiry: Optional[str]) -> str:
+    """Normalize an expiry (28-MAR-24, 28-MAR-2024, 28MAR24) to DDMMMYY."""
+    if not expiry:
+        return ''
+    text = str(expiry).strip().upper()
+    parsed = pd.to_datetime(text, format='mixed', dayfirst=True, errors='coerce')
+    if pd.isna(parsed):
+        return text.replace('-', '')
+    return parsed.strftime('%d%b%y').upper()
+
+
+_index: Optional[Dict[Tuple[str, str], Dict[str, OptionExpiry]]] = None
+_index_lock = threading.Lock()
+
+
+def _load_option_rows(names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    query = SymToken.query.with_entities(
+        SymToken.exchange, SymToken.name, SymToken.expiry, SymToken.strike,
+        SymToken.symbol, SymToken.token, SymToken.lotsize
+    ).filter(
+        SymToken.exchange.in_(OPTION_EXCHANGES),
+        (SymToken.symbol.like('%CE') | SymToken.symbol.like('%PE'))
+    )
+    if names is not None:
+        query = query.filter(SymToken.name.in_(list(names)))
+    return pd.DataFrame.from_records(
+        query.all(), columns=['exchange', 'name', 'expiry', 'strike', 'symbol', 'token', 'lotsize']
+    )
+
+
+def build_option_chain_index() -> Dict[Tuple[str, str], Dict[str, OptionExpiry]]:
+    """Build the full index from symtoken."""
+    index = _build_index(_load_option_rows())
+    logger.info(f"Option chain index built: {len(index)} underlyings")
+    return index
+
+
+def _build_index(df: pd.DataFrame) -> Dict[Tuple[str, str], Dict[str, OptionExpiry]]:
+    """Index entries for every underlying in ``df``."""
+    index: Dict[Tuple[str, str], Dict[str, OptionExpiry]] = {}
+    if df.empty:
+        return index
+
+    df = df[df['strike'].notna() & (df['strike'] > 0) & df['name'].notna()].copy()
+    df['option_type'] = df['symbol'].str[-2:]
+    unique_expiries = pd.Series(df['expiry'].dropna().unique())
+    key_map = dict(zip(unique_expiries, unique_expiries.map(expiry_key)))
+    df['expiry_key'] = df['expiry'].map(key_map).fillna('')
+
+    calls = df[df['option_type'] == 'CE']
+    puts = df[df['option_type'] == 'PE']
+    key = ['exchange', 'name', 'expiry_key', 'strike']
+    chain = calls.merge(puts, on=key, how='outer', suffixes=('_ce', '_pe'))
+    chain = chain.drop_duplicates(subset=key).sort_values(key)
+    chain['lotsize'] = chain['lotsize_ce'].fillna(chain['lotsize_pe']).fillna(0).astype('int64')
+    chain['expiry'] = chain['expiry_ce'].fillna(chain['expiry_pe'])
+    # Strikes listed on one side only keep None for the missing leg
+    leg_columns = ['token_ce', 'symbol_ce', 'token_pe', 'symbol_pe']
+    chain[leg_columns] = chain[leg_columns].astype(object).where(chain[leg_columns].notna(), None)
+
+    for (exchange, name, expiry), group in chain.groupby(['exchange', 'name', 'expiry_key'], sort=False):
+        index.setdefault((exchange, name.upper()), {})[expiry] = OptionExpiry(
+            expiry=group['expiry'].iloc[0],
+            strikes=group['strike'].to_numpy(dtype=float),
+            ce_token=group['token_ce'].to_numpy(dtype=object),
+            ce_symbol=group['symbol_ce'].to_numpy(dtype=object),
+            pe_token=group['token_pe'].to_numpy(dtype=object),
+            pe_symbol=group['symbol_pe'].to_numpy(dtype=object),
+            lotsize=group['lotsize'].to_numpy(),
+        )
+    return index
+
+
+def _affected_underlyings(diff) -> Set[Tuple[str, str]]:
+    """(exchange, name) of every option row added, removed or changed by ``diff``."""
+    rows = diff.affected_rows()
+    if rows.empty:
+        return set()
+    is_option = (rows['exchange'].isin(OPTION_EXCHANGES) & rows['name'].notna()
+                 & rows['symbol'].str.endswith(('CE', 'PE'), na=False))
+    rows = rows[is_option]
+    return set(zip(rows['exchange'], rows['name']))
+
+
+def update_option_chain_index(index: Dict[Tuple[str, str], Dict[str, OptionExpiry]],
+                              underlyings: Set[Tuple[str, str]]
+                              ) -> Dict[Tuple[str, str], Dict[str, OptionExpiry]]:
+    """
+    Return a copy of ``index`` with the given (exchange, name) underlyings
+    reloaded from symtoken; underlyings with no options left are dropped.
+    """
+    keys = {(exchange, name.upper()) for exchange, name in underlyings}
+    df = _load_option_rows({name for _, name in underlyings})
+    if not df.empty:
+        row_keys = pd.Series(list(zip(df['exchange'], df['name'].fillna('').str.upper())), index=df.index)
+        df = df[row_keys.isin(keys)]
+
+    updated = {key: expiries for key, expiries in index.items() if key not in keys}
+    updated.update(_build_index(df))
+    return updated
+
+
+def get_option_chain_index() -> Dict[Tuple[str, str], Dict[str, OptionExpiry]]:
+    """Return the index, building it on first use."""
+    global _index
+    index = _index
+    if index is not None:
+        return index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = build_option_chain_index()
+            except Exception as e:
+                logger.error(f"Error building option chain index: {e}")
+                return {}
+        return _index
+
+
+def invalidate_option_chain_index() -> None:
+    """Drop the index so the next lookup rebuilds it."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def get_expiries(underlying: str, exchange: str) -> List[str]:
+    """Expiry keys for an underlying, nearest first."""
+    expiries = get_option_chain_index().get((exchange, underlying.upper()), {})
+    return sorted(expiries, key=lambda key: pd.to_datetime(key, format='%d%b%y', errors='coerce'))
+
+
+def get_option_expiry(underlying: str, exchange: str,
+                      expiry: Optional[str] = None) -> Optional[OptionExpiry]:
+    """
+    Strike ladder for an underlying and expiry.
+
+    Args:
+        underlying: Underlying name (e.g. NIFTY)
+        exchange: Option exchange (e.g. NFO)
+        expiry: Expiry in any common format; nearest expiry if omitted
+    """
+    expiries = get_option_chain_index().get((exchange, underlying.upper()))
+    if not expiries:
+        return None
+    if expiry:
+        return expiries.get(expiry_key(expiry))
+    ordered = get_expiries(underlying, exchange)
+    return expiries[ordered[0]] if ordered else None
+
+
+def _on_contract_change(diff) -> None:
+    """Bring the index up to date right after a master contract load."""
+    global _index
+    if diff.is_empty:
+        return
+    current = _index
+    underlyings = set() if diff.full_reload else _affected_underlyings(diff)
+    if current is None or diff.full_reload or len(underlyings) > INCREMENTAL_UPDATE_LIMIT:
+        index = build_option_chain_index()
+    elif underlyings:
+        index = update_option_chain_index(current, underlyings)
+        logger.info(f"Option chain index updated for {len(underlyings)} underlyings")
+    else:
+        return
+    with _index_lock:
+        _index = index
+
+
+try:
+    from database.master_contract_ingest import register_contract_listener
+    register_contract_listener(_on_contract_change)
+except ImportError:
+    pass
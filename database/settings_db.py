@@ -1,8 +1,9 @@
 # database/settings_db.py
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, MetaData
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Integer, String, Boolean, MetaData
 from sqlalchemy.ext.declarative import declarative_base
+from cachetools import TTLCache
+from database.db_engine import get_engine, get_session
 import os
 from utils.logging import get_logger
 
@@ -10,17 +11,16 @@ logger = get_logger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+engine = get_engine(DATABASE_URL)
 
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
+# Analyze mode is read on every order request. Cached briefly: set_analyze_mode
+# updates this process at once, other workers pick the change up within the TTL
+_analyze_mode_cache = TTLCache(maxsize=1, ttl=1)
+
 class Settings(Base):
     __tablename__ = 'settings'
     id = Column(Integer, primary_key=True)
@@ -42,12 +42,18 @@ def init_db():
 
 def get_analyze_mode():
     """Get current analyze mode setting"""
-    settings = Settings.query.first()
+    mode = _analyze_mode_cache.get('analyze_mode')
+    if mode is not None:
+        return mode
+    # populate_existing: another process may have changed the row since this session loaded it
+    settings = Settings.query.populate_existing().first()
     if not settings:
         settings = Settings(analyze_mode=False)  # Default to Live Mode
         db_session.add(settings)
         db_session.commit()
-    return settings.analyze_mode
+    mode = bool(settings.analyze_mode)
+    _analyze_mode_cache['analyze_mode'] = mode
+    return mode
 
 def set_analyze_mode(mode: bool):
     """Set analyze mode setting"""
@@ -58,3 +64,4 @@ def set_analyze_mode(mode: bool):
     else:
         settings.analyze_mode = mode
     db_session.commit()
+    _analyze_mode_cache['analyze_mode'] = bool(mode)
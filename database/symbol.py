@@ -1,15 +1,15 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index, or_, and_
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Integer, String, Float, Sequence, Index, or_, and_
 from sqlalchemy.ext.declarative import declarative_base
+from database.db_engine import get_engine, get_session
 from typing import List
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_URL')
-engine = create_engine(DATABASE_URL)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+engine = get_engine(DATABASE_URL)
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
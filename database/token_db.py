@@ -4,8 +4,12 @@ from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
-# Define a cache for the tokens, symbols with a max size and a 3600-second TTL
-token_cache = TTLCache(maxsize=1024, ttl=3600)
+# Define a cache for the tokens, symbols with a max size and a 3600-second TTL.
+# Sized to hold a full F&O order book so remapping it does not go back to the database.
+token_cache = TTLCache(maxsize=20000, ttl=3600)
+
+# Keys per IN (...) query in bulk lookups, well below SQLite's bound parameter limit
+BULK_QUERY_CHUNK = 500
 
 def get_token(symbol, exchange):
     """
@@ -101,6 +105,23 @@ def get_oa_symbol_dbquery(symbol, exchange):
         logger.error(f"Error while querying the database: {e}")
         return None
 
+def invalidate_symbol_cache(entries):
+    """
+    Drops cached lookups for specific contract rows.
+
+    Args:
+        entries: Iterable of (symbol, brsymbol, token, exchange) tuples
+    """
+    for symbol, brsymbol, token, exchange in entries:
+        for cache_key in (
+            f"{symbol}-{exchange}",
+            f"{token}-{exchange}",
+            f"oa{brsymbol}-{exchange}",
+            f"br{symbol}-{exchange}",
+            f"brex-{symbol}-{exchange}",
+        ):
+            token_cache.pop(cache_key, None)
+
 def get_symbol_count():
     """
     Get the total count of symbols in the database.
@@ -171,4 +192,66 @@ def get_brexchange_dbquery(symbol, exchange):
             return None
     except Exception as e:
         logger.error(f"Error while querying the database: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def _bulk_lookup(pairs, cache_prefix, key_column, value_column):
+    """
+    Resolves many (key, exchange) pairs at once: cache hits first, then one
+    IN (...) query per exchange and chunk for the rest.
+
+    Returns:
+        dict mapping (str(key), exchange) to the value; pairs not found are absent
+    """
+    result = {}
+    missing = {}
+    for key, exchange in {(str(key), exchange) for key, exchange in pairs}:
+        try:
+            result[(key, exchange)] = token_cache[f"{cache_prefix}{key}-{exchange}"]
+        except KeyError:
+            missing.setdefault(exchange, []).append(key)
+
+    for exchange, keys in missing.items():
+        for start in range(0, len(keys), BULK_QUERY_CHUNK):
+            chunk = keys[start:start + BULK_QUERY_CHUNK]
+            try:
+                rows = (SymToken.query
+                        .with_entities(key_column, value_column)
+                        .filter(SymToken.exchange == exchange, key_column.in_(chunk))
+                        .order_by(SymToken.id)
+                        .all())
+            except Exception as e:
+                logger.error(f"Error while querying the database: {e}")
+                continue
+            for key, value in rows:
+                # Keep the first match, as the single lookups do
+                if (key, exchange) not in result:
+                    result[(key, exchange)] = value
+                    token_cache[f"{cache_prefix}{key}-{exchange}"] = value
+    return result
+
+
+def get_symbols_bulk(pairs):
+    """
+    Bulk version of get_symbol.
+
+    Args:
+        pairs: Iterable of (token, exchange) tuples
+
+    Returns:
+        dict mapping (str(token), exchange) to the OpenAlgo symbol
+    """
+    return _bulk_lookup(pairs, '', SymToken.token, SymToken.symbol)
+
+
+def get_oa_symbols_bulk(pairs):
+    """
+    Bulk version of get_oa_symbol.
+
+    Args:
+        pairs: Iterable of (broker symbol, exchange) tuples
+
+    Returns:
+        dict mapping (broker symbol, exchange) to the OpenAlgo symbol
+    """
+    return _bulk_lookup(pairs, 'oa', SymToken.brsymbol, SymToken.symbol)
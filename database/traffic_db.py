@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from database.db_engine import get_engine, get_session, log_writer
 import os
 import logging
 from datetime import datetime
@@ -9,16 +9,11 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 # Use a separate database for logs
-LOGS_DATABASE_URL = 'sqlite:///db/logs.db'
+LOGS_DATABASE_URL = os.getenv('LOGS_DATABASE_URL', 'sqlite:///db/logs.db')
 
-logs_engine = create_engine(
-    LOGS_DATABASE_URL,
-    pool_size=50,
-    max_overflow=100,
-    pool_timeout=10
-)
+logs_engine = get_engine(LOGS_DATABASE_URL)
 
-logs_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=logs_engine))
+logs_session = get_session(LOGS_DATABASE_URL)
 LogBase = declarative_base()
 LogBase.query = logs_session.query_property()
 
@@ -39,24 +34,21 @@ class TrafficLog(LogBase):
 
     @staticmethod
     def log_request(client_ip, method, path, status_code, duration_ms, host=None, error=None, user_id=None):
-        """Log a request to the database"""
+        """Queue a request log row on the shared log writer"""
         try:
-            log = TrafficLog(
-                client_ip=client_ip,
-                method=method,
-                path=path,
-                status_code=status_code,
-                duration_ms=duration_ms,
-                host=host,
-                error=error,
-                user_id=user_id
-            )
-            logs_session.add(log)
-            logs_session.commit()
+            log_writer.insert(TrafficLog.__table__, {
+                'client_ip': client_ip,
+                'method': method,
+                'path': path,
+                'status_code': status_code,
+                'duration_ms': duration_ms,
+                'host': host,
+                'error': error,
+                'user_id': user_id
+            }, logs_engine)
             return True
         except Exception as e:
             logger.error(f"Error logging traffic: {str(e)}")
-            logs_session.rollback()
             return False
 
     @staticmethod
@@ -68,6 +60,11 @@ class TrafficLog(LogBase):
             logger.error(f"Error getting recent logs: {str(e)}")
             return []
 
+    @staticmethod
+    def iter_logs(batch_size=500):
+        """Iterate over all traffic logs, newest first, fetching them in batches"""
+        return TrafficLog.query.order_by(TrafficLog.timestamp.desc()).yield_per(batch_size)
+
     @staticmethod
     def get_stats():
         """Get basic traffic statistics"""
@@ -1,10 +1,10 @@
 # database/user_db.py
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Boolean
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Column, Integer, String, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.exc import IntegrityError
+from database.db_engine import get_engine, get_session
 from cachetools import TTLCache
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
@@ -21,8 +21,8 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 PASSWORD_PEPPER = os.getenv('API_KEY_PEPPER')  # We'll use the same pepper for consistency
 
 # Engine and session setup
-engine = create_engine(DATABASE_URL, echo=False)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+engine = get_engine(DATABASE_URL)
+db_session = get_session(DATABASE_URL)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
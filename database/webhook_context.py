@@ -0,0 +1,102 @@
+"""
+Cache of resolved webhook strategy contexts.
+
+A TradingView or Chartink webhook needs the strategy, its symbol mappings, the
+user's decrypted API key and the strategy's time windows. Scanners fire many
+alerts at once for the same webhook, so the resolved context is cached per
+webhook_id and rebuilt only after the strategy, its mappings or the user's API
+key change. Contexts hold plain snapshots of the rows, so they are safe to
+share across threads and sessions.
+"""
+
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# All caches, so API key changes can invalidate every platform's contexts
+_caches = []
+
+
+def snapshot_row(row):
+    """Copy a model row's column values into a detached namespace."""
+    return SimpleNamespace(**{column.name: getattr(row, column.name) for column in row.__table__.columns})
+
+
+def parse_time(value):
+    """Parse an HH:MM strategy time, None if unset or invalid."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except ValueError:
+        return None
+
+
+class WebhookContext:
+    """Everything a webhook needs to turn an alert into orders."""
+
+    __slots__ = ('strategy', 'mappings', 'api_key', 'start_time', 'end_time', 'squareoff_time')
+
+    def __init__(self, strategy, mappings, api_key):
+        self.strategy = strategy
+        self.mappings = mappings  # symbol -> mapping snapshot
+        self.api_key = api_key
+        self.start_time = parse_time(strategy.start_time)
+        self.end_time = parse_time(strategy.end_time)
+        self.squareoff_time = parse_time(strategy.squareoff_time)
+
+
+class WebhookContextCache:
+    """
+    Thread-safe webhook_id -> WebhookContext cache.
+
+    Args:
+        loader: Callable taking a webhook_id and returning a WebhookContext,
+            or None if the webhook does not exist (misses are not cached,
+            nor are contexts without an API key, which may be a failed lookup)
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._contexts = {}
+        self._lock = threading.Lock()
+        # Bumped on invalidation so a load racing with a change is not cached
+        self._generation = 0
+        _caches.append(self)
+
+    def get(self, webhook_id):
+        context = self._contexts.get(webhook_id)
+        if context is not None:
+            return context
+        generation = self._generation
+        context = self._loader(webhook_id)
+        if context is not None and context.api_key:
+            with self._lock:
+                if generation == self._generation:
+                    self._contexts[webhook_id] = context
+        return context
+
+    def invalidate(self, strategy_id=None, user_id=None):
+        """Drop contexts of a strategy or of all of a user's strategies."""
+        with self._lock:
+            self._generation += 1
+            stale = [
+                webhook_id for webhook_id, context in self._contexts.items()
+                if context.strategy.id == strategy_id or context.strategy.user_id == user_id
+            ]
+            for webhook_id in stale:
+                del self._contexts[webhook_id]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._contexts.clear()
+
+
+def invalidate_user_contexts(user_id):
+    """Drop every cached context of a user (e.g. after the API key changes)."""
+    for cache in _caches:
+        cache.invalidate(user_id=user_id)
@@ -1,10 +1,19 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 class QuotesSchema(Schema):
     apikey = fields.Str(required=True)
     symbol = fields.Str(required=True)  # Single symbol
     exchange = fields.Str(required=True)  # Exchange (e.g., NSE, BSE)
 
+class OptionChainSchema(Schema):
+    apikey = fields.Str(required=True)
+    underlying = fields.Str(required=True)  # Underlying name (e.g., NIFTY)
+    exchange = fields.Str(required=True, validate=validate.OneOf(['NFO', 'BFO', 'MCX', 'CDS', 'BCD']))
+    expiry = fields.Str(load_default=None)  # e.g. 28MAR24, nearest expiry if omitted
+    strike_count = fields.Int(load_default=10, validate=validate.Range(min=1, max=100))
+    spot_price = fields.Float(load_default=None)
+    include_quotes = fields.Bool(load_default=False)
+
 class HistorySchema(Schema):
     apikey = fields.Str(required=True)
     symbol = fields.Str(required=True)
@@ -13,6 +22,9 @@ class HistorySchema(Schema):
     start_date = fields.Str(required=True)  # YYYY-MM-DD
     end_date = fields.Str(required=True)    # YYYY-MM-DD
     # OI is now always included by default for F&O exchanges
+    # Optional streamed response format: json (default), columnar, csv, arrow
+    format = fields.Str(required=False, load_default='json',
+                        validate=validate.OneOf(['json', 'columnar', 'csv', 'arrow']))
 
 class DepthSchema(Schema):
     apikey = fields.Str(required=True)
@@ -1,12 +1,13 @@
 from flask_restx import Namespace, Resource
-from flask import request, jsonify, make_response
+from flask import request, jsonify, make_response, Response, stream_with_context
 from marshmallow import ValidationError
 from limiter import limiter
 import os
 import traceback
 
 from .data_schemas import HistorySchema
-from services.history_service import get_history
+from services.history_service import get_history, get_history_dataframe
+from utils.columnar import stream_dataframe
 from utils.logging import get_logger
 
 API_RATE_LIMIT = os.getenv("API_RATE_LIMIT", "10 per second")
@@ -33,6 +34,13 @@ class History(Resource):
             interval = history_data['interval']
             start_date = history_data['start_date']
             end_date = history_data['end_date']
+            response_format = history_data['format']
+
+            # Opt-in columnar formats are streamed straight from the DataFrame
+            if response_format != 'json':
+                return self._columnar_response(
+                    symbol, exchange, interval, start_date, end_date, api_key, response_format
+                )
             
             # Call the service function to get historical data with API key
             success, response_data, status_code = get_history(
@@ -57,3 +65,32 @@ class History(Resource):
                 'status': 'error',
                 'message': 'An unexpected error occurred'
             }), 500)
+
+    @staticmethod
+    def _columnar_response(symbol, exchange, interval, start_date, end_date, api_key, response_format):
+        """Stream historical data as columnar JSON, CSV or Arrow IPC"""
+        success, result, status_code = get_history_dataframe(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            start_date=start_date,
+            end_date=end_date,
+            api_key=api_key
+        )
+        if not success:
+            return make_response(jsonify(result), status_code)
+
+        try:
+            generator, mimetype = stream_dataframe(result, response_format)
+        except ValueError as e:
+            return make_response(jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400)
+
+        response = Response(stream_with_context(generator), mimetype=mimetype)
+        if response_format == 'csv':
+            response.headers['Content-Disposition'] = (
+                f'attachment; filename={exchange}_{symbol}_{interval}.csv'
+            )
+        return response
@@ -0,0 +1,52 @@
+from flask_restx import Namespace, Resource
+from flask import request, jsonify, make_response
+from marshmallow import ValidationError
+from limiter import limiter
+import os
+
+from .data_schemas import OptionChainSchema
+from services.option_chain_service import get_option_chain
+from utils.logging import get_logger
+
+API_RATE_LIMIT = os.getenv("API_RATE_LIMIT", "10 per second")
+api = Namespace('optionchain', description='Option Chain API')
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Initialize schema
+option_chain_schema = OptionChainSchema()
+
+@api.route('/', strict_slashes=False)
+class OptionChain(Resource):
+    @limiter.limit(API_RATE_LIMIT)
+    def post(self):
+        """Get the strike window around ATM for an underlying and expiry"""
+        try:
+            # Validate request data
+            chain_data = option_chain_schema.load(request.json)
+
+            # Call the service function to get the option chain with API key
+            success, response_data, status_code = get_option_chain(
+                underlying=chain_data['underlying'],
+                exchange=chain_data['exchange'],
+                expiry=chain_data['expiry'],
+                strike_count=chain_data['strike_count'],
+                spot_price=chain_data['spot_price'],
+                include_quotes=chain_data['include_quotes'],
+                api_key=chain_data['apikey']
+            )
+
+            return make_response(jsonify(response_data), status_code)
+
+        except ValidationError as err:
+            return make_response(jsonify({
+                'status': 'error',
+                'message': err.messages
+            }), 400)
+        except Exception as e:
+            logger.exception(f"Unexpected error in optionchain endpoint: {e}")
+            return make_response(jsonify({
+                'status': 'error',
+                'message': 'An unexpected error occurred'
+            }), 500)
@@ -1,15 +1,14 @@
 from flask_restx import Namespace, Resource, fields
-from flask import request, jsonify, make_response, Response
+from flask import request, jsonify, make_response, Response, stream_with_context
 from marshmallow import ValidationError
 from database.auth_db import get_auth_token_broker
 from limiter import limiter
 import os
-import importlib
 import pandas as pd
-from datetime import datetime, timezone
-import pytz
 
 from .data_schemas import TickerSchema
+from utils.columnar import ARROW_UNAVAILABLE, arrow_available, stream_dataframe, stream_ticker_text
+from utils.broker_registry import get_broker
 from utils.logging import get_logger
 
 API_RATE_LIMIT = os.getenv("API_RATE_LIMIT", "10 per second")
@@ -21,15 +20,6 @@ logger = get_logger(__name__)
 # Initialize schema
 ticker_schema = TickerSchema()
 
-def import_broker_module(broker_name):
-    try:
-        module_path = f'broker.{broker_name}.api.data'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.exception(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 class TextResponse(Response):
     """Custom Response class that supports both text and JSON properties"""
     @property
@@ -40,22 +30,6 @@ class TextResponse(Response):
     def json(self, value):
         self._json = value
 
-def convert_timestamp(timestamp, interval):
-    """Convert timestamp to appropriate format based on interval"""
-    # Convert timestamp to datetime in UTC
-    dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-    
-    # Convert to IST
-    ist = pytz.timezone('Asia/Kolkata')
-    dt_ist = dt.astimezone(ist)
-    
-    # For daily data: just return the date
-    if interval.upper() == 'D':
-        return dt_ist.strftime('%Y-%m-%d')
-    
-    # For intraday: return date and time separately
-    return dt_ist.strftime('%Y-%m-%d'), dt_ist.strftime('%H:%M:%S')
-
 @api.route('/<string:symbol>')
 @api.doc(params={
     'symbol': 'Stock symbol with exchange (e.g., NSE:ZOMATO)',
@@ -65,7 +39,7 @@ def convert_timestamp(timestamp, interval):
     'adjusted': 'Adjust for splits (true/false)',
     'sort': 'Sort order (asc/desc)',
     'apikey': 'API Key for authentication',
-    'format': 'Response format (json/txt). Default: json'
+    'format': 'Response format (json/txt/columnar/csv/arrow). Default: json'
 })
 class Ticker(Resource):
     @limiter.limit(API_RATE_LIMIT)
@@ -102,6 +76,12 @@ class Ticker(Resource):
             history_schema = HistorySchema()
             history_data = history_schema.load(ticker_data)
 
+            if response_format == 'arrow' and not arrow_available():
+                return make_response(jsonify({
+                    'status': 'error',
+                    'message': ARROW_UNAVAILABLE
+                }), 400)
+
             api_key = history_data['apikey']
             AUTH_TOKEN, broker = get_auth_token_broker(api_key)
             if AUTH_TOKEN is None:
@@ -115,8 +95,8 @@ class Ticker(Resource):
                     'message': 'Invalid openalgo apikey'
                 }), 403)
 
-            broker_module = import_broker_module(broker)
-            if broker_module is None:
+            broker_plugin = get_broker(broker)
+            if broker_plugin is None or broker_plugin.function('BrokerData') is None:
                 if response_format == 'txt':
                     response = TextResponse('Broker-specific module not found\n')
                     response.content_type = 'text/plain'
@@ -129,7 +109,7 @@ class Ticker(Resource):
 
             try:
                 # Initialize broker's data handler
-                data_handler = broker_module.BrokerData(AUTH_TOKEN)
+                data_handler = broker_plugin.create_data_handler(AUTH_TOKEN)
                 df = data_handler.get_history(
                     history_data['symbol'],
                     history_data['exchange'],
@@ -143,29 +123,19 @@ class Ticker(Resource):
 
                 # Format the response based on the format parameter
                 if response_format == 'txt':
-                    # Convert timestamps to datetime format
-                    text_output = []
-                    interval = history_data['interval']
+                    # Vectorized timestamp conversion, streamed in row chunks
                     symbol_with_exchange = f"{history_data['exchange']}:{history_data['symbol']}"
-                    
-                    for _, row in df.iterrows():
-                        # Convert timestamp based on interval
-                        timestamp = convert_timestamp(row['timestamp'], interval)
-                        # Convert volume to integer by removing decimal point
-                        volume = int(row['volume'])
-                        if interval.upper() == 'D':
-                            # Daily format: Ticker,Date_YMD,Open,High,Low,Close,Volume
-                            text_output.append(f"{symbol_with_exchange},{timestamp},{row['open']},{row['high']},{row['low']},{row['close']},{volume}")
-                        else:
-                            # Intraday format: Ticker,Date_YMD,Time,Open,High,Low,Close,Volume
-                            date, time = timestamp
-                            text_output.append(f"{symbol_with_exchange},{date},{time},{row['open']},{row['high']},{row['low']},{row['close']},{volume}")
-                    
+                    text_output = stream_ticker_text(df, symbol_with_exchange, history_data['interval'])
+
                     # Create plain text response
-                    response = TextResponse('\n'.join(text_output))
+                    response = TextResponse(stream_with_context(text_output))
                     response.content_type = 'text/plain'
                     response.json = {'request_id': f"ticker_{symbol}_{history_data['interval']}"}
                     return response
+                elif response_format in ('columnar', 'csv', 'arrow'):
+                    # Opt-in columnar formats are streamed straight from the DataFrame
+                    generator, mimetype = stream_dataframe(df, response_format)
+                    return Response(stream_with_context(generator), mimetype=mimetype)
                 else:
                     # Return JSON format
                     return make_response(jsonify({
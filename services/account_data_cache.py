@@ -0,0 +1,82 @@
+"""
+Request coalescing for account data (orderbook, positionbook, tradebook,
+holdings and funds).
+
+Strategies and dashboards often ask for the same book of the same account
+at the same moment. Identical requests share one in-flight broker call and
+its mapped response, and a successful response is reused for
+ACCOUNT_DATA_CACHE_MS milliseconds. Order placement, modification and
+cancellation drop the account's cached responses, so the next request sees
+the change.
+
+Cached responses are shared between callers and must not be modified.
+"""
+
+import os
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+from cachetools import TTLCache
+
+from utils.single_flight import SingleFlight
+
+ACCOUNT_DATA_CACHE_TTL = float(os.getenv('ACCOUNT_DATA_CACHE_MS', '500')) / 1000
+
+
+class AccountDataCache:
+    """(resource, broker, auth token) -> service response, with single-flight loading."""
+
+    def __init__(self, ttl: float = ACCOUNT_DATA_CACHE_TTL, maxsize: int = 1024):
+        self.ttl = ttl
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        # Bumped per account by order actions; loads started earlier are neither cached nor joined
+        self._generations: Dict[Tuple[str, str], int] = {}
+
+    def get(self, resource: str, broker: str, auth_token: str,
+            loader: Callable[..., Tuple[bool, Dict[str, Any], int]], *args: Any) -> Tuple[bool, Dict[str, Any], int]:
+        key = (resource, broker, auth_token)
+        with self._lock:
+            if self._responses is not None:
+                response = self._responses.get(key)
+                if response is not None:
+                    return response
+            generation = self._generations.get((broker, auth_token), 0)
+        return self._flights.do((key, generation), self._load, key, generation, loader, args)
+
+    def _load(self, key, generation, loader, args):
+        response = loader(*args)
+        if response[0] and self._responses is not None:
+            with self._lock:
+                if self._generations.get(key[1:], 0) == generation:
+                    self._responses[key] = response
+        return response
+
+    def invalidate(self, broker: str, auth_token: str) -> None:
+        """Drop every cached response of the account."""
+        account = (broker, auth_token)
+        with self._lock:
+            self._generations[account] = self._generations.get(account, 0) + 1
+            if self._responses is not None:
+                for key in [key for key in self._responses.keys() if key[1:] == account]:
+                    self._responses.pop(key, None)
+
+
+account_data_cache = AccountDataCache()
+
+
+def coalesced(resource: str):
+    """Route a ``get_<resource>_with_auth(auth_token, broker)`` service call through the cache."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(auth_token: str, broker: str):
+            return account_data_cache.get(resource, broker, auth_token, fn, auth_token, broker)
+        return wrapper
+    return decorator
+
+
+def invalidate_account_data(broker: str, auth_token: str) -> None:
+    """Called after an order action: drop the account's cached books."""
+    account_data_cache.invalidate(broker, auth_token)
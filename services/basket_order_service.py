@@ -1,4 +1,3 @@
-import importlib
 import traceback
 import copy
 from typing import Tuple, Dict, Any, Optional, List, Union
@@ -7,7 +6,7 @@ from database.apilog_db import async_log_order, executor as log_executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
-from utils.api_analyzer import analyze_request, generate_order_id
+from utils.api_analyzer import analyze_request
 from utils.constants import (
     VALID_EXCHANGES,
     VALID_ACTIONS,
@@ -16,6 +15,9 @@ from utils.constants import (
     REQUIRED_ORDER_FIELDS
 )
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.account_data_cache import invalidate_account_data
+from services.paper_exchange import paper_exchange, paper_quote
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
@@ -55,24 +57,6 @@ def emit_analyzer_error(request_data: Dict[str, Any], error_message: str) -> Dic
     
     return error_response
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific order API module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.order_api'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def validate_order(order_data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     """
     Validate individual order data
@@ -198,6 +182,7 @@ def process_basket_order_with_auth(
     if get_analyze_mode():
         analyze_results = []
         total_orders = len(basket_data['orders'])
+        quote = paper_quote(auth_token, broker)
         
         for i, order in enumerate(basket_data['orders']):
             # Add common fields from basket order
@@ -221,7 +206,7 @@ def process_basket_order_with_auth(
                 analyze_results.append({
                     'symbol': order.get('symbol', 'Unknown'),
                     'status': 'success',
-                    'orderid': generate_order_id(),
+                    'orderid': paper_exchange.place_order(broker, auth_token, order, quote)['orderid'],
                     'batch_order': True,
                     'is_last_order': i == total_orders - 1
                 })
@@ -254,7 +239,7 @@ def process_basket_order_with_auth(
         return True, response_data, 200
 
     # Live mode - process actual orders
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'order')
     if broker_module is None:
         error_response = {
             'status': 'error',
@@ -315,6 +300,9 @@ def process_basket_order_with_auth(
             if result:
                 results.append(result)
 
+    # The orders change the account's books
+    invalidate_account_data(broker, auth_token)
+
     # Sort results to maintain order consistency
     results.sort(key=lambda x: 0 if x.get('action', '').upper() == 'BUY' else 1)
 
@@ -1,4 +1,3 @@
-import importlib
 import traceback
 import copy
 from typing import Tuple, Dict, Any, Optional
@@ -8,6 +7,10 @@ from database.apilog_db import async_log_order, executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
+from services.account_data_cache import invalidate_account_data
+from services.paper_exchange import paper_exchange
+from services.order_state_store import order_state_store
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
@@ -47,24 +50,6 @@ def emit_analyzer_error(request_data: Dict[str, Any], error_message: str) -> Dic
     
     return error_response
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific order API module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.order_api'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def cancel_order_with_auth(
     orderid: str,
     auth_token: str,
@@ -96,11 +81,19 @@ def cancel_order_with_auth(
         analyzer_request = order_request_data.copy()
         analyzer_request['api_type'] = 'cancelorder'
         
-        response_data = {
-            'mode': 'analyze',
-            'orderid': orderid,
-            'status': 'success'
-        }
+        try:
+            paper_exchange.cancel_order(broker, auth_token, orderid)
+            response_data = {
+                'mode': 'analyze',
+                'orderid': orderid,
+                'status': 'success'
+            }
+        except ValueError as e:
+            response_data = {
+                'mode': 'analyze',
+                'status': 'error',
+                'message': str(e)
+            }
         
         # Log to analyzer database with complete request and response
         executor.submit(async_log_analyzer, analyzer_request, response_data, 'cancelorder')
@@ -113,7 +106,7 @@ def cancel_order_with_auth(
         
         return True, response_data, 200
 
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'order')
     if broker_module is None:
         error_response = {
             'status': 'error',
@@ -134,6 +127,10 @@ def cancel_order_with_auth(
         }
         executor.submit(async_log_order, 'cancelorder', original_data, error_response)
         return False, error_response, 500
+    finally:
+        # The action changes the account's books and the order's state
+        invalidate_account_data(broker, auth_token)
+        order_state_store.invalidate(broker, auth_token, orderid)
 
     if status_code == 200:
         socketio.emit('cancel_order_event', {
@@ -1,30 +1,12 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker, Auth, db_session, verify_api_key
+from utils.broker_registry import get_broker
 from utils.logging import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific data module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.data'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def get_depth_with_auth(
     auth_token: str, 
     feed_token: Optional[str], 
@@ -50,28 +32,15 @@ def get_depth_with_auth(
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_module = import_broker_module(broker)
-    if broker_module is None:
+    broker_plugin = get_broker(broker)
+    if broker_plugin is None or broker_plugin.function('BrokerData') is None:
         return False, {
             'status': 'error',
             'message': 'Broker-specific module not found'
         }, 404
 
     try:
-        # Initialize broker's data handler based on broker's requirements
-        if hasattr(broker_module.BrokerData.__init__, '__code__'):
-            # Check number of parameters the broker's __init__ accepts
-            param_count = broker_module.BrokerData.__init__.__code__.co_argcount
-            if param_count > 3:  # More than self, auth_token, and feed_token
-                data_handler = broker_module.BrokerData(auth_token, feed_token, user_id)
-            elif param_count > 2:  # More than self and auth_token
-                data_handler = broker_module.BrokerData(auth_token, feed_token)
-            else:
-                data_handler = broker_module.BrokerData(auth_token)
-        else:
-            # Fallback to just auth token if we can't inspect
-            data_handler = broker_module.BrokerData(auth_token)
-            
+        data_handler = broker_plugin.create_data_handler(auth_token, feed_token, user_id)
         depth = data_handler.get_depth(symbol, exchange)
         
         if depth is None:
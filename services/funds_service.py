@@ -1,30 +1,24 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, Union
 from database.auth_db import get_auth_token_broker
+from database.settings_db import get_analyze_mode
+from services.account_data_cache import coalesced
+from services.paper_exchange import paper_exchange
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific funds module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.funds'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
+def get_paper_funds(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
+    """Funds of the analyze mode paper account."""
+    return True, {
+        'mode': 'analyze',
+        'status': 'success',
+        'data': paper_exchange.funds(broker, auth_token)
+    }, 200
 
+@coalesced('funds')
 def get_funds_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get account funds and margin details from the broker using provided auth token.
@@ -39,7 +33,7 @@ def get_funds_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, A
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'funds')
     if broker_module is None:
         return False, {
             'status': 'error',
@@ -86,10 +80,14 @@ def get_funds(api_key: Optional[str] = None, auth_token: Optional[str] = None, b
                 'status': 'error',
                 'message': 'Invalid openalgo apikey'
             }, 403
+        if get_analyze_mode():
+            return get_paper_funds(AUTH_TOKEN, broker_name)
         return get_funds_with_auth(AUTH_TOKEN, broker_name)
     
     # Case 2: Direct internal call with auth_token and broker
     elif auth_token and broker:
+        if get_analyze_mode():
+            return get_paper_funds(auth_token, broker)
         return get_funds_with_auth(auth_token, broker)
     
     # Case 3: Invalid parameters
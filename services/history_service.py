@@ -1,30 +1,69 @@
-import importlib
 import traceback
 import pandas as pd
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from utils.broker_registry import get_broker
 from utils.logging import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
+def fetch_history_dataframe(
+    auth_token: str,
+    feed_token: Optional[str],
+    broker: str,
+    symbol: str,
+    exchange: str,
+    interval: str,
+    start_date: str,
+    end_date: str
+) -> Tuple[bool, Union[pd.DataFrame, Dict[str, Any]], int]:
     """
-    Dynamically import the broker-specific data module.
-    
-    Args:
-        broker_name: Name of the broker
-        
+    Fetch historical data from the broker as a DataFrame.
+
+    Callers that stream columnar responses use this directly so the candles
+    are never converted into per-row dicts.
+
     Returns:
-        The imported module or None if import fails
+        Tuple containing:
+        - Success status (bool)
+        - DataFrame on success, error response dict on failure
+        - HTTP status code (int)
     """
+    broker_plugin = get_broker(broker)
+    if broker_plugin is None or broker_plugin.function('BrokerData') is None:
+        return False, {
+            'status': 'error',
+            'message': 'Broker-specific module not found'
+        }, 404
+
     try:
-        module_path = f'broker.{broker_name}.api.data'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
+        data_handler = broker_plugin.create_data_handler(auth_token, feed_token)
+
+        # Call the broker's get_history method
+        df = data_handler.get_history(
+            symbol,
+            exchange,
+            interval,
+            start_date,
+            end_date
+        )
+        
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError("Invalid data format returned from broker")
+            
+        # Ensure all responses include 'oi' field, set to 0 if not present
+        if 'oi' not in df.columns:
+            df['oi'] = 0
+            
+        return True, df, 200
+    except Exception as e:
+        logger.error(f"Error in broker_module.get_history: {e}")
+        traceback.print_exc()
+        return False, {
+            'status': 'error',
+            'message': str(e)
+        }, 500
 
 def get_history_with_auth(
     auth_token: str, 
@@ -48,7 +87,6 @@ def get_history_with_auth(
         interval: Time interval (e.g., 1m, 5m, 15m, 1h, 1d)
         start_date: Start date in YYYY-MM-DD format
         end_date: End date in YYYY-MM-DD format
-        include_oi: Whether to include Open Interest data (if supported by broker)
         
     Returns:
         Tuple containing:
@@ -56,53 +94,43 @@ def get_history_with_auth(
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_module = import_broker_module(broker)
-    if broker_module is None:
-        return False, {
-            'status': 'error',
-            'message': 'Broker-specific module not found'
-        }, 404
+    success, result, status_code = fetch_history_dataframe(
+        auth_token, feed_token, broker, symbol, exchange, interval, start_date, end_date
+    )
+    if not success:
+        return False, result, status_code
 
-    try:
-        # Initialize broker's data handler based on broker's requirements
-        if hasattr(broker_module.BrokerData.__init__, '__code__'):
-            # Check number of parameters the broker's __init__ accepts
-            param_count = broker_module.BrokerData.__init__.__code__.co_argcount
-            if param_count > 2:  # More than self and auth_token
-                data_handler = broker_module.BrokerData(auth_token, feed_token)
-            else:
-                data_handler = broker_module.BrokerData(auth_token)
-        else:
-            # Fallback to just auth token if we can't inspect
-            data_handler = broker_module.BrokerData(auth_token)
+    return True, {
+        'status': 'success',
+        'data': result.to_dict(orient='records')
+    }, 200
 
-        # Call the broker's get_history method
-        df = data_handler.get_history(
-            symbol,
-            exchange,
-            interval,
-            start_date,
-            end_date
-        )
-        
-        if not isinstance(df, pd.DataFrame):
-            raise ValueError("Invalid data format returned from broker")
-            
-        # Ensure all responses include 'oi' field, set to 0 if not present
-        if 'oi' not in df.columns:
-            df['oi'] = 0
-            
-        return True, {
-            'status': 'success',
-            'data': df.to_dict(orient='records')
-        }, 200
-    except Exception as e:
-        logger.error(f"Error in broker_module.get_history: {e}")
-        traceback.print_exc()
+def get_history_dataframe(
+    symbol: str,
+    exchange: str,
+    interval: str,
+    start_date: str,
+    end_date: str,
+    api_key: str
+) -> Tuple[bool, Union[pd.DataFrame, Dict[str, Any]], int]:
+    """
+    Get historical data for a symbol as a DataFrame using an OpenAlgo API key.
+
+    Returns:
+        Tuple containing:
+        - Success status (bool)
+        - DataFrame on success, error response dict on failure
+        - HTTP status code (int)
+    """
+    AUTH_TOKEN, FEED_TOKEN, broker_name = get_auth_token_broker(api_key, include_feed_token=True)
+    if AUTH_TOKEN is None:
         return False, {
             'status': 'error',
-            'message': str(e)
-        }, 500
+            'message': 'Invalid openalgo apikey'
+        }, 403
+    return fetch_history_dataframe(
+        AUTH_TOKEN, FEED_TOKEN, broker_name, symbol, exchange, interval, start_date, end_date
+    )
 
 def get_history(
     symbol: str, 
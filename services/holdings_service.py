@@ -1,7 +1,8 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from services.account_data_cache import coalesced
+from utils.broker_registry import get_broker_functions
 from utils.logging import get_logger
 
 # Initialize logger
@@ -34,31 +35,7 @@ def format_statistics(stats):
         }
     return stats
 
-def import_broker_module(broker_name: str) -> Optional[Dict[str, Any]]:
-    """
-    Dynamically import the broker-specific holdings modules.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        Dictionary of broker functions or None if import fails
-    """
-    try:
-        # Import API module
-        api_module = importlib.import_module(f'broker.{broker_name}.api.order_api')
-        # Import mapping module
-        mapping_module = importlib.import_module(f'broker.{broker_name}.mapping.order_data')
-        return {
-            'get_holdings': getattr(api_module, 'get_holdings'),
-            'map_portfolio_data': getattr(mapping_module, 'map_portfolio_data'),
-            'calculate_portfolio_statistics': getattr(mapping_module, 'calculate_portfolio_statistics'),
-            'transform_holdings_data': getattr(mapping_module, 'transform_holdings_data')
-        }
-    except (ImportError, AttributeError) as error:
-        logger.error(f"Error importing broker modules: {error}")
-        return None
-
+@coalesced('holdings')
 def get_holdings_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get holdings details using provided auth token.
@@ -73,7 +50,7 @@ def get_holdings_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_funcs = import_broker_module(broker)
+    broker_funcs = get_broker_functions(broker, ['get_holdings', 'map_portfolio_data', 'calculate_portfolio_statistics', 'transform_holdings_data'])
     if broker_funcs is None:
         return False, {
             'status': 'error',
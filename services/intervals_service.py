@@ -1,30 +1,12 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from utils.broker_registry import get_broker
 from utils.logging import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific data module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.data'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def get_intervals_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get supported intervals for the broker using provided auth token.
@@ -39,8 +21,8 @@ def get_intervals_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[st
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_module = import_broker_module(broker)
-    if broker_module is None:
+    broker_plugin = get_broker(broker)
+    if broker_plugin is None or broker_plugin.function('BrokerData') is None:
         return False, {
             'status': 'error',
             'message': 'Broker-specific module not found'
@@ -48,7 +30,7 @@ def get_intervals_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[st
 
     try:
         # Initialize broker's data handler
-        data_handler = broker_module.BrokerData(auth_token)
+        data_handler = broker_plugin.create_data_handler(auth_token)
         
         # Get supported intervals from the timeframe map
         intervals = {
@@ -1,4 +1,3 @@
-import importlib
 import traceback
 import copy
 from typing import Tuple, Dict, Any, Optional
@@ -9,6 +8,10 @@ from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
 from utils.api_analyzer import analyze_request
+from services.account_data_cache import invalidate_account_data
+from services.paper_exchange import paper_exchange, paper_quote
+from services.order_state_store import order_state_store
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
@@ -48,24 +51,6 @@ def emit_analyzer_error(request_data: Dict[str, Any], error_message: str) -> Dic
     
     return error_response
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific order API module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.order_api'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def modify_order_with_auth(
     order_data: Dict[str, Any],
     auth_token: str,
@@ -100,11 +85,20 @@ def modify_order_with_auth(
         analyzer_request['api_type'] = 'modifyorder'
         
         if analysis.get('status') == 'success':
-            response_data = {
-                'mode': 'analyze',
-                'orderid': order_data['orderid'],
-                'status': 'success'
-            }
+            try:
+                paper_exchange.modify_order(broker, auth_token, order_data['orderid'], order_data,
+                                            paper_quote(auth_token, broker))
+                response_data = {
+                    'mode': 'analyze',
+                    'orderid': order_data['orderid'],
+                    'status': 'success'
+                }
+            except ValueError as e:
+                response_data = {
+                    'mode': 'analyze',
+                    'status': 'error',
+                    'message': str(e)
+                }
         else:
             response_data = {
                 'mode': 'analyze',
@@ -121,9 +115,11 @@ def modify_order_with_auth(
             'response': response_data
         })
         
+        if response_data['status'] == 'error':
+            return False, response_data, 400
         return True, response_data, 200
 
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'order')
     if broker_module is None:
         error_response = {
             'status': 'error',
@@ -144,6 +140,10 @@ def modify_order_with_auth(
         }
         executor.submit(async_log_order, 'modifyorder', original_data, error_response)
         return False, error_response, 500
+    finally:
+        # The action changes the account's books and the order's state
+        invalidate_account_data(broker, auth_token)
+        order_state_store.invalidate(broker, auth_token, order_data['orderid'])
 
     if status_code == 200:
         response_data = {
@@ -1,6 +1,5 @@
 import traceback
 import copy
-import requests
 from typing import Tuple, Dict, Any, Optional
 
 from database.auth_db import get_auth_token_broker
@@ -8,6 +7,8 @@ from database.apilog_db import async_log_order, executor as log_executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
+from services.paper_exchange import paper_exchange
+from services.positionbook_service import get_positionbook_with_auth
 from utils.logging import get_logger
 
 # Initialize logger
@@ -72,10 +73,12 @@ def get_open_position_with_auth(
     if 'apikey' in request_data:
         request_data.pop('apikey', None)
     
-    # If in analyze mode, return simulated response
+    # If in analyze mode, return the paper position
     if get_analyze_mode():
         response_data = {
-            'quantity': 0,
+            'quantity': paper_exchange.open_position(
+                broker, auth_token, position_data['symbol'], position_data['exchange'], position_data['product']
+            ),
             'status': 'success'
         }
 
@@ -96,31 +99,15 @@ def get_open_position_with_auth(
 
     # Live mode - get position from positionbook
     try:
-        # For internal service calls, we'll use the positionbook service directly
-        # But for now, we'll maintain compatibility by using the API endpoint
-        
-        # Prepare positionbook request with just apikey
-        positionbook_request = {'apikey': position_data.get('apikey')}
-        
-        # Make request to positionbook API
-        positionbook_response = requests.post('http://127.0.0.1:5000/api/v1/positionbook', json=positionbook_request)
-        
-        if positionbook_response.status_code != 200:
-            error_response = {
-                'status': 'error',
-                'message': 'Failed to fetch positionbook'
-            }
-            log_executor.submit(async_log_order, 'openposition', original_data, error_response)
-            return False, error_response, positionbook_response.status_code
+        success, positionbook_data, status_code = get_positionbook_with_auth(auth_token, broker)
 
-        positionbook_data = positionbook_response.json()
-        if positionbook_data.get('status') != 'success':
+        if not success:
             error_response = {
                 'status': 'error',
-                'message': positionbook_data.get('message', 'Error fetching positionbook')
+                'message': positionbook_data.get('message', 'Failed to fetch positionbook')
             }
             log_executor.submit(async_log_order, 'openposition', original_data, error_response)
-            return False, error_response, 500
+            return False, error_response, status_code
 
         # Find the specific position
         position_found = None
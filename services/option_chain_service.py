@@ -0,0 +1,186 @@
+from typing import Tuple, Dict, Any, List, Optional
+
+from database.auth_db import get_auth_token_broker
+from database.option_chain_db import get_expiries, get_option_expiry
+from services.quotes_service import get_quotes_with_auth, get_multiple_quotes_with_auth
+from utils.logging import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Underlyings quoted on the index segments rather than the cash segment
+NSE_INDEX_UNDERLYINGS = {'NIFTY', 'BANKNIFTY', 'FINNIFTY', 'MIDCPNIFTY', 'NIFTYNXT50'}
+BSE_INDEX_UNDERLYINGS = {'SENSEX', 'BANKEX', 'SENSEX50'}
+
+
+def get_underlying_exchange(underlying: str, exchange: str) -> Optional[str]:
+    """Exchange to quote the underlying on, or None if it has no cash/index quote."""
+    if exchange == 'NFO':
+        return 'NSE_INDEX' if underlying in NSE_INDEX_UNDERLYINGS else 'NSE'
+    if exchange == 'BFO':
+        return 'BSE_INDEX' if underlying in BSE_INDEX_UNDERLYINGS else 'BSE'
+    return None
+
+
+def _spot_price(auth_token: str, feed_token: Optional[str], broker: str,
+                underlying: str, exchange: str) -> Optional[float]:
+    underlying_exchange = get_underlying_exchange(underlying, exchange)
+    if underlying_exchange is None:
+        return None
+    success, response, _ = get_quotes_with_auth(auth_token, feed_token, broker,
+                                                underlying, underlying_exchange)
+    if not success:
+        logger.warning(f"Could not fetch spot for {underlying_exchange}:{underlying}: {response.get('message')}")
+        return None
+    ltp = response['data'].get('ltp')
+    return float(ltp) if ltp else None
+
+
+def build_chain_rows(chain, window: slice, atm_index: int) -> List[Dict[str, Any]]:
+    """Convert a strike window of an OptionExpiry into response rows."""
+    rows = []
+    for i in range(window.start, window.stop):
+        row = {
+            'strike': float(chain.strikes[i]),
+            'lotsize': int(chain.lotsize[i]),
+            'atm': i == atm_index,
+            'ce': None,
+            'pe': None,
+        }
+        if chain.ce_symbol[i] is not None:
+            row['ce'] = {'symbol': chain.ce_symbol[i], 'token': chain.ce_token[i]}
+        if chain.pe_symbol[i] is not None:
+            row['pe'] = {'symbol': chain.pe_symbol[i], 'token': chain.pe_token[i]}
+        rows.append(row)
+    return rows
+
+
+def get_option_chain_with_auth(auth_token: str, feed_token: Optional[str], broker: str,
+                               underlying: str, exchange: str, expiry: Optional[str] = None,
+                               strike_count: int = 10, spot_price: Optional[float] = None,
+                               include_quotes: bool = False) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get a strike window around ATM for an underlying and expiry.
+
+    Args:
+        auth_token: Authentication token for the broker API
+        feed_token: Feed token for market data (if required by broker)
+        broker: Name of the broker
+        underlying: Underlying name (e.g. NIFTY)
+        exchange: Option exchange (e.g. NFO, BFO)
+        expiry: Expiry date (e.g. 28MAR24); nearest expiry if omitted
+        strike_count: Number of strikes either side of ATM
+        spot_price: Spot price used to locate ATM; fetched if omitted
+        include_quotes: Fill in CE/PE quotes with one batched call
+
+    Returns:
+        Tuple containing:
+        - Success status (bool)
+        - Response data (dict)
+        - HTTP status code (int)
+    """
+    underlying = underlying.upper()
+    chain = get_option_expiry(underlying, exchange, expiry)
+    if chain is None:
+        return False, {
+            'status': 'error',
+            'message': f'No option chain found for {underlying} on {exchange}'
+                       + (f' expiring {expiry}' if expiry else '')
+        }, 404
+
+    if spot_price is None:
+        spot_price = _spot_price(auth_token, feed_token, broker, underlying, exchange)
+
+    atm_index = chain.atm_index(spot_price)
+    window = chain.window(atm_index, strike_count)
+    rows = build_chain_rows(chain, window, atm_index)
+
+    if include_quotes:
+        instruments = [
+            {'symbol': leg['symbol'], 'exchange': exchange}
+            for row in rows for leg in (row['ce'], row['pe']) if leg
+        ]
+        success, response, status_code = get_multiple_quotes_with_auth(
+            auth_token, feed_token, broker, instruments
+        )
+        if not success:
+            return False, response, status_code
+        quotes = response['data']
+        for row in rows:
+            for leg in (row['ce'], row['pe']):
+                if leg:
+                    leg['quote'] = quotes.get(f"{exchange}:{leg['symbol']}")
+
+    data = {
+        'underlying': underlying,
+        'exchange': exchange,
+        'expiry': chain.expiry,
+        'expiries': get_expiries(underlying, exchange),
+        'spot_price': spot_price,
+        'atm_strike': float(chain.strikes[atm_index]) if len(chain.strikes) else None,
+        # Without a spot price the middle strike stands in for ATM
+        'atm_estimated': spot_price is None,
+        'chain': rows
+    }
+    response = {'status': 'success', 'data': data}
+    if spot_price is None:
+        response['message'] = 'Spot price unavailable; atm_strike is the middle strike of the chain'
+    return True, response, 200
+
+
+def get_option_chain(
+    underlying: str,
+    exchange: str,
+    expiry: Optional[str] = None,
+    strike_count: int = 10,
+    spot_price: Optional[float] = None,
+    include_quotes: bool = False,
+    api_key: Optional[str] = None,
+    auth_token: Optional[str] = None,
+    feed_token: Optional[str] = None,
+    broker: Optional[str] = None
+) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get the option chain for an underlying.
+    Supports both API-based authentication and direct internal calls.
+
+    Args:
+        underlying: Underlying name (e.g. NIFTY)
+        exchange: Option exchange (e.g. NFO, BFO)
+        expiry: Expiry date; nearest expiry if omitted
+        strike_count: Number of strikes either side of ATM
+        spot_price: Spot price used to locate ATM; fetched if omitted
+        include_quotes: Fill in CE/PE quotes
+        api_key: OpenAlgo API key (for API-based calls)
+        auth_token: Direct broker authentication token (for internal calls)
+        feed_token: Direct broker feed token (for internal calls)
+        broker: Direct broker name (for internal calls)
+
+    Returns:
+        Tuple containing:
+        - Success status (bool)
+        - Response data (dict)
+        - HTTP status code (int)
+    """
+    # Case 1: API-based authentication
+    if api_key and not (auth_token and broker):
+        AUTH_TOKEN, FEED_TOKEN, broker_name = get_auth_token_broker(api_key, include_feed_token=True)
+        if AUTH_TOKEN is None:
+            return False, {
+                'status': 'error',
+                'message': 'Invalid openalgo apikey'
+            }, 403
+        return get_option_chain_with_auth(AUTH_TOKEN, FEED_TOKEN, broker_name, underlying, exchange,
+                                          expiry, strike_count, spot_price, include_quotes)
+
+    # Case 2: Direct internal call with auth_token and broker
+    elif auth_token and broker:
+        return get_option_chain_with_auth(auth_token, feed_token, broker, underlying, exchange,
+                                          expiry, strike_count, spot_price, include_quotes)
+
+    # Case 3: Invalid parameters
+    else:
+        return False, {
+            'status': 'error',
+            'message': 'Either api_key or both auth_token and broker must be provided'
+        }, 400
@@ -0,0 +1,93 @@
+"""
+In-process store of order states.
+
+Orders are kept per broker session (broker and auth token) and keyed by
+order ID. The store is filled from every orderbook fetch, from single-order
+lookups and, for brokers that stream order updates, from
+:meth:`OrderStateStore.update_order`. Order status polls are answered from
+memory where possible:
+- orders in a final state (complete, rejected, cancelled) no longer change
+  and are always served from the store
+- other orders are served while their state is younger than
+  OPEN_ORDER_MAX_AGE seconds
+"""
+
+import threading
+from time import monotonic
+from typing import Any, Dict, Iterable, Optional
+
+from cachetools import TTLCache
+
+from utils.single_flight import SingleFlight
+
+TERMINAL_STATUSES = frozenset({'complete', 'rejected', 'cancelled'})
+
+# Seconds an open order's state is served without asking the broker again
+OPEN_ORDER_MAX_AGE = 1.0
+
+# Broker sessions last a trading day; idle accounts are dropped after that
+ACCOUNT_TTL = 24 * 60 * 60
+
+
+def is_terminal(order: Dict[str, Any]) -> bool:
+    return str(order.get('order_status', '')).lower() in TERMINAL_STATUSES
+
+
+class OrderStateStore:
+    """Thread-safe (broker, auth token) -> order ID -> order state store."""
+
+    def __init__(self, max_age: float = OPEN_ORDER_MAX_AGE, max_accounts: int = 256):
+        self.max_age = max_age
+        self._accounts = TTLCache(maxsize=max_accounts, ttl=ACCOUNT_TTL)
+        self._lock = threading.Lock()
+        # Coalesces concurrent broker fetches made to fill the store
+        self.flights = SingleFlight()
+
+    def update_orders(self, broker: str, auth_token: str, orders: Iterable[Dict[str, Any]]) -> None:
+        """Store orders in OpenAlgo format (as returned by the orderbook service)."""
+        now = monotonic()
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            if account is None:
+                account = self._accounts[(broker, auth_token)] = {}
+            for order in orders:
+                orderid = str(order.get('orderid', ''))
+                if not orderid:
+                    continue
+                current = account.get(orderid)
+                # A fetch that started before an order finished must not revive it
+                if current is not None and is_terminal(current[0]) and not is_terminal(order):
+                    continue
+                account[orderid] = (order, now)
+
+    def update_order(self, broker: str, auth_token: str, order: Dict[str, Any]) -> None:
+        """Store a single order, e.g. from a broker order-update stream."""
+        self.update_orders(broker, auth_token, [order])
+
+    def get(self, broker: str, auth_token: str, orderid: Any,
+            max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The stored order if it is final or fresh enough, otherwise None."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            entry = account.get(str(orderid)) if account else None
+        if entry is None:
+            return None
+        order, updated_at = entry
+        max_age = self.max_age if max_age is None else max_age
+        if is_terminal(order) or monotonic() - updated_at < max_age:
+            return dict(order)
+        return None
+
+    def invalidate(self, broker: str, auth_token: str, orderid: Optional[Any] = None) -> None:
+        """Forget one order, or all orders of the account."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            if account is None:
+                return
+            if orderid is None:
+                account.clear()
+            else:
+                account.pop(str(orderid), None)
+
+
+order_state_store = OrderStateStore()
@@ -1,7 +1,11 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from database.settings_db import get_analyze_mode
+from services.order_state_store import order_state_store
+from services.account_data_cache import coalesced
+from services.paper_exchange import paper_exchange, paper_quote
+from utils.broker_registry import get_broker_function, get_broker_functions
 from utils.logging import get_logger
 
 # Initialize logger
@@ -34,31 +38,20 @@ def format_statistics(stats):
         }
     return stats
 
-def import_broker_module(broker_name: str) -> Optional[Dict[str, Any]]:
-    """
-    Dynamically import the broker-specific order modules.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        Dictionary of broker functions or None if import fails
-    """
-    try:
-        # Import API module
-        api_module = importlib.import_module(f'broker.{broker_name}.api.order_api')
-        # Import mapping module
-        mapping_module = importlib.import_module(f'broker.{broker_name}.mapping.order_data')
-        return {
-            'get_order_book': getattr(api_module, 'get_order_book'),
-            'map_order_data': getattr(mapping_module, 'map_order_data'),
-            'calculate_order_statistics': getattr(mapping_module, 'calculate_order_statistics'),
-            'transform_order_data': getattr(mapping_module, 'transform_order_data')
+def get_paper_orderbook(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
+    """Order book of the analyze mode paper account."""
+    paper_exchange.refresh_prices(broker, auth_token, paper_quote(auth_token, broker))
+    book = paper_exchange.orderbook(broker, auth_token)
+    return True, {
+        'mode': 'analyze',
+        'status': 'success',
+        'data': {
+            'orders': format_order_data(book['orders']),
+            'statistics': format_statistics(book['statistics'])
         }
-    except (ImportError, AttributeError) as error:
-        logger.error(f"Error importing broker modules: {error}")
-        return None
+    }, 200
 
+@coalesced('orderbook')
 def get_orderbook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get order book details using provided auth token.
@@ -73,7 +66,7 @@ def get_orderbook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[st
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_funcs = import_broker_module(broker)
+    broker_funcs = get_broker_functions(broker, ['get_order_book', 'map_order_data', 'calculate_order_statistics', 'transform_order_data'])
     if broker_funcs is None:
         return False, {
             'status': 'error',
@@ -98,6 +91,7 @@ def get_orderbook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[st
         # Format numeric values to 2 decimal places
         formatted_orders = format_order_data(order_data)
         formatted_stats = format_statistics(order_stats)
+        order_state_store.update_orders(broker, auth_token, formatted_orders)
         
         return True, {
             'status': 'success',
@@ -114,6 +108,79 @@ def get_orderbook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[st
             'message': str(e)
         }, 500
 
+def fetch_order_with_auth(auth_token: str, broker: str, orderid: str) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Fetch a single order through the broker's order history endpoint
+    and add it to the order state store.
+
+    Returns:
+        Tuple of success, response data with the order list and HTTP status code
+    """
+    broker_funcs = get_broker_functions(broker, ['get_order_history', 'map_order_data', 'transform_order_data'])
+    if broker_funcs is None:
+        return False, {
+            'status': 'error',
+            'message': 'Broker-specific module not found'
+        }, 404
+
+    order_data = broker_funcs['get_order_history'](orderid, auth_token)
+    if isinstance(order_data, dict) and order_data.get('status') == 'error':
+        return False, {
+            'status': 'error',
+            'message': order_data.get('message', 'Error fetching order data')
+        }, 500
+
+    order_data = broker_funcs['map_order_data'](order_data=order_data)
+    formatted_orders = format_order_data(broker_funcs['transform_order_data'](order_data))
+    order_state_store.update_orders(broker, auth_token, formatted_orders)
+    return True, {
+        'status': 'success',
+        'data': {'orders': formatted_orders}
+    }, 200
+
+def get_order_state_with_auth(auth_token: str, broker: str, orderid: Any) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get the current state of one order.
+
+    Answered from the order state store when the order is final or was
+    refreshed recently. Otherwise the order is fetched through the broker's
+    order history endpoint, or with the full orderbook for brokers without
+    one. Concurrent polls for the same account share one broker request
+    (the orderbook through the account data cache).
+
+    Returns:
+        Tuple containing:
+        - Success status (bool)
+        - Response data (dict)
+        - HTTP status code (int)
+    """
+    orderid = str(orderid)
+    order = order_state_store.get(broker, auth_token, orderid)
+    if order is not None:
+        return True, {'status': 'success', 'data': order}, 200
+
+    success = False
+    if get_broker_function(broker, 'get_order_history') is not None:
+        try:
+            success, response_data, status_code = order_state_store.flights.do(
+                ('order', broker, auth_token, orderid), fetch_order_with_auth, auth_token, broker, orderid
+            )
+        except Exception as e:
+            logger.warning(f"Order history lookup failed for {orderid}, using the orderbook: {e}")
+    if not success:
+        success, response_data, status_code = get_orderbook_with_auth(auth_token, broker)
+        if not success:
+            return False, response_data, status_code
+
+    # Just fetched, so any age is fine
+    order = order_state_store.get(broker, auth_token, orderid, max_age=float('inf'))
+    if order is None:
+        return False, {
+            'status': 'error',
+            'message': f'Order {orderid} not found'
+        }, 404
+    return True, {'status': 'success', 'data': order}, 200
+
 def get_orderbook(
     api_key: Optional[str] = None, 
     auth_token: Optional[str] = None, 
@@ -142,10 +209,14 @@ def get_orderbook(
                 'status': 'error',
                 'message': 'Invalid openalgo apikey'
             }, 403
+        if get_analyze_mode():
+            return get_paper_orderbook(AUTH_TOKEN, broker_name)
         return get_orderbook_with_auth(AUTH_TOKEN, broker_name)
     
     # Case 2: Direct internal call with auth_token and broker
     elif auth_token and broker:
+        if get_analyze_mode():
+            return get_paper_orderbook(auth_token, broker)
         return get_orderbook_with_auth(auth_token, broker)
     
     # Case 3: Invalid parameters
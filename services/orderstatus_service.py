@@ -1,6 +1,5 @@
 import traceback
 import copy
-import requests
 from typing import Tuple, Dict, Any, Optional
 
 from database.auth_db import get_auth_token_broker
@@ -8,6 +7,8 @@ from database.apilog_db import async_log_order, executor as log_executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
+from services.orderbook_service import get_order_state_with_auth
+from services.paper_exchange import paper_exchange, paper_quote
 from utils.logging import get_logger
 
 # Initialize logger
@@ -72,25 +73,21 @@ def get_order_status_with_auth(
     if 'apikey' in request_data:
         request_data.pop('apikey', None)
     
-    # If in analyze mode, return simulated response
+    # If in analyze mode, return the paper order
     if get_analyze_mode():
-        response_data = {
-            'mode': 'analyze',
-            'status': 'success',
-            'data': {
-                'action': 'BUY',
-                'exchange': 'NSE',
-                'order_status': 'COMPLETE',
-                'orderid': status_data['orderid'],
-                'price': 100.0,
-                'pricetype': 'MARKET',
-                'product': 'MIS',
-                'quantity': 10,
-                'symbol': 'SBIN',
-                'timestamp': '09-Dec-2024 10:00:00',
-                'trigger_price': 0
+        order = paper_exchange.get_order(broker, auth_token, status_data['orderid'], paper_quote(auth_token, broker))
+        if order is not None:
+            response_data = {
+                'mode': 'analyze',
+                'status': 'success',
+                'data': order
+            }
+        else:
+            response_data = {
+                'mode': 'analyze',
+                'status': 'error',
+                'message': f"Order {status_data['orderid']} not found"
             }
-        }
 
         # Store complete request data without apikey
         analyzer_request = request_data.copy()
@@ -107,54 +104,20 @@ def get_order_status_with_auth(
         
         return True, response_data, 200
 
-    # Live mode - get order status from orderbook
+    # Live mode - get order status from the order state store
     try:
-        # For internal service calls, we'll use the orderbook service directly
-        # But for now, we'll maintain compatibility by using the API endpoint
-        
-        # Prepare orderbook request with just apikey
-        orderbook_request = {'apikey': status_data.get('apikey')}
-        
-        # Make request to orderbook API
-        orderbook_response = requests.post('http://127.0.0.1:5000/api/v1/orderbook', json=orderbook_request)
-        
-        if orderbook_response.status_code != 200:
-            error_response = {
-                'status': 'error',
-                'message': 'Failed to fetch orderbook'
-            }
-            log_executor.submit(async_log_order, 'orderstatus', original_data, error_response)
-            return False, error_response, orderbook_response.status_code
-
-        orderbook_data = orderbook_response.json()
-        if orderbook_data.get('status') != 'success':
-            error_response = {
-                'status': 'error',
-                'message': orderbook_data.get('message', 'Error fetching orderbook')
-            }
-            log_executor.submit(async_log_order, 'orderstatus', original_data, error_response)
-            return False, error_response, 500
+        success, response_data, status_code = get_order_state_with_auth(
+            auth_token, broker, status_data['orderid']
+        )
 
-        # Find the specific order in the orderbook
-        order_found = None
-        for order in orderbook_data['data']['orders']:
-            if str(order.get('orderid')) == str(status_data['orderid']):
-                order_found = order
-                break
-
-        if not order_found:
+        if not success:
             error_response = {
                 'status': 'error',
-                'message': f'Order {status_data["orderid"]} not found'
+                'message': response_data.get('message', 'Error fetching order status')
             }
             log_executor.submit(async_log_order, 'orderstatus', original_data, error_response)
-            return False, error_response, 404
+            return False, error_response, status_code
 
-        # Return the found order
-        response_data = {
-            'status': 'success',
-            'data': order_found
-        }
         log_executor.submit(async_log_order, 'orderstatus', request_data, response_data)
 
         return True, response_data, 200
@@ -0,0 +1,667 @@
+"""
+In-memory paper exchange for analyze mode.
+
+Analyze mode used to validate an order and hand back a made-up order ID;
+the books never changed. The paper exchange keeps an order book, trades,
+positions and funds per broker session (broker and auth token) and fills
+the orders against market prices:
+
+- MARKET orders fill at the last traded price
+- LIMIT orders fill at the last price when marketable on arrival, otherwise
+  rest until the price crosses the limit and fill at the limit price
+- SL orders become LIMIT orders and SL-M orders MARKET orders once the last
+  price reaches the trigger price
+
+Prices come from live ticks (:meth:`PaperExchange.on_tick`, fed by the
+WebSocket proxy's ZeroMQ stream), from candles (:meth:`PaperExchange.on_candle`)
+and, when no recent tick is known for a symbol, from a quote callable given
+by the caller. Resting orders are kept per symbol in price-ordered heaps, so
+a tick only touches the orders it fills.
+
+Orders fill in full. Margin is blocked at PAPER_PRODUCT_MARGIN of the order
+value for orders that add to a position.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+from datetime import datetime
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.api_analyzer import generate_order_id
+from utils.constants import DEFAULT_PRICE_TYPE, DEFAULT_PRODUCT_TYPE
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Funds every paper account starts with
+PAPER_CAPITAL = float(os.getenv('PAPER_TRADING_CAPITAL', '10000000'))
+
+# Share of the order value blocked as margin, per product
+PAPER_PRODUCT_MARGIN = {'MIS': 0.2, 'NRML': 0.2, 'CNC': 1.0}
+
+# Seconds a price is used before a quote callable is asked for a fresh one
+PAPER_PRICE_MAX_AGE = float(os.getenv('PAPER_PRICE_MAX_AGE', '1.0'))
+
+# Cancelled or modified heap entries tolerated before a book side is rebuilt
+STALE_ENTRY_LIMIT = 1024
+
+OPEN = 'open'
+TRIGGER_PENDING = 'trigger pending'
+COMPLETE = 'complete'
+CANCELLED = 'cancelled'
+REJECTED = 'rejected'
+
+ACTIVE_STATUSES = frozenset({OPEN, TRIGGER_PENDING})
+
+TIMESTAMP_FORMAT = '%d-%b-%Y %H:%M:%S'
+
+Quote = Callable[[str, str], Optional[float]]
+
+
+class PaperOrder:
+    __slots__ = ('orderid', 'account', 'symbol', 'exchange', 'action', 'quantity', 'price', 'trigger_price',
+                 'pricetype', 'product', 'strategy', 'status', 'average_price', 'margin', 'message',
+                 'timestamp', 'seq')
+
+    def __init__(self, orderid, account, symbol, exchange, action, quantity, price, trigger_price,
+                 pricetype, product, strategy):
+        self.orderid = orderid
+        self.account = account
+        self.symbol = symbol
+        self.exchange = exchange
+        self.action = action
+        self.quantity = quantity
+        self.price = price
+        self.trigger_price = trigger_price
+        self.pricetype = pricetype
+        self.product = product
+        self.strategy = strategy
+        self.status = OPEN
+        self.average_price = 0.0
+        self.margin = 0.0
+        self.message = ''
+        self.timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        # Heap entries carry the seq they were pushed with; older entries are stale
+        self.seq = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'action': self.action,
+            'exchange': self.exchange,
+            'order_status': self.status,
+            'orderid': self.orderid,
+            'price': self.average_price if self.status == COMPLETE else self.price,
+            'pricetype': self.pricetype,
+            'product': self.product,
+            'quantity': self.quantity,
+            'symbol': self.symbol,
+            'timestamp': self.timestamp,
+            'trigger_price': self.trigger_price
+        }
+
+
+class PaperPosition:
+    __slots__ = ('quantity', 'average_price', 'realized', 'margin')
+
+    def __init__(self):
+        self.quantity = 0
+        self.average_price = 0.0
+        self.realized = 0.0
+        self.margin = 0.0
+
+
+class PaperAccount:
+    """Orders, trades, positions and funds of one broker session."""
+
+    def __init__(self, capital: float):
+        self.capital = capital
+        self.orders: Dict[str, PaperOrder] = {}
+        self.trades: List[Dict[str, Any]] = []
+        # (symbol, exchange, product) -> position
+        self.positions: Dict[Tuple[str, str, str], PaperPosition] = {}
+        self.realized = 0.0
+        self.used_margin = 0.0
+
+
+class SymbolBook:
+    """Resting orders of one symbol, ordered by the price that fills them."""
+
+    __slots__ = ('buys', 'sells', 'buy_stops', 'sell_stops', 'waiting', 'stale')
+
+    def __init__(self):
+        # (-limit, seq, order): the highest bid fills first
+        self.buys = []
+        # (limit, seq, order)
+        self.sells = []
+        # (trigger, seq, order): triggered when the price rises to the trigger
+        self.buy_stops = []
+        # (-trigger, seq, order): triggered when the price falls to the trigger
+        self.sell_stops = []
+        # MARKET orders placed before any price was known
+        self.waiting = []
+        self.stale = 0
+
+
+def _number(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+class PaperExchange:
+    """Thread-safe paper order matching, positions and funds per (broker, auth token)."""
+
+    def __init__(self, capital: float = PAPER_CAPITAL, price_max_age: float = PAPER_PRICE_MAX_AGE):
+        self.capital = capital
+        self.price_max_age = price_max_age
+        self._lock = threading.RLock()
+        self._accounts: Dict[Tuple[str, str], PaperAccount] = {}
+        self._books: Dict[Tuple[str, str], SymbolBook] = {}
+        # (exchange, symbol) -> (last price, monotonic time it was seen)
+        self._prices: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._seq = itertools.count(1)
+
+    # Market data
+
+    def on_tick(self, exchange: str, symbol: str, ltp: Any) -> None:
+        """Record a last traded price and fill the orders it reaches."""
+        price = _number(ltp)
+        if price <= 0:
+            return
+        key = (exchange, symbol)
+        with self._lock:
+            self._prices[key] = (price, monotonic())
+            book = self._books.get(key)
+            if book is not None:
+                self._match(book, price)
+
+    def on_candle(self, exchange: str, symbol: str, open_: Any, high: Any, low: Any, close: Any) -> None:
+        """Replay a candle as the ticks open, low, high, close (open, high, low, close for a red candle)."""
+        if _number(close) >= _number(open_):
+            path = (open_, low, high, close)
+        else:
+            path = (open_, high, low, close)
+        for price in path:
+            self.on_tick(exchange, symbol, price)
+
+    def on_candles(self, exchange: str, symbol: str, candles: Any) -> None:
+        """Replay stored candles, e.g. a history DataFrame with open/high/low/close columns."""
+        for candle in zip(candles['open'], candles['high'], candles['low'], candles['close']):
+            self.on_candle(exchange, symbol, *candle)
+
+    def last_price(self, exchange: str, symbol: str) -> Optional[float]:
+        entry = self._prices.get((exchange, symbol))
+        return entry[0] if entry else None
+
+    def _refresh_price(self, exchange: str, symbol: str, quote: Optional[Quote]) -> None:
+        """Ask ``quote`` for a price when the known one is missing or older than price_max_age."""
+        if quote is None:
+            return
+        entry = self._prices.get((exchange, symbol))
+        if entry is not None and monotonic() - entry[1] < self.price_max_age:
+            return
+        try:
+            ltp = quote(symbol, exchange)
+        except Exception as e:
+            logger.warning(f"Paper price lookup failed for {exchange}:{symbol}: {e}")
+            return
+        if ltp:
+            self.on_tick(exchange, symbol, ltp)
+
+    # Orders
+
+    def place_order(self, broker: str, auth_token: str, order_data: Dict[str, Any],
+                    quote: Optional[Quote] = None) -> Dict[str, Any]:
+        """
+        Accept an order in OpenAlgo format and fill it if the market allows.
+
+        Like a broker, an order that fails the margin check is still given
+        an order ID; it shows up as rejected in the order book.
+        """
+        symbol = order_data['symbol']
+        exchange = order_data['exchange']
+        self._refresh_price(exchange, symbol, quote)
+        orderid = generate_order_id()
+        with self._lock:
+            account = self._account(broker, auth_token)
+            order = PaperOrder(
+                orderid, account, symbol, exchange, str(order_data['action']).upper(),
+                int(_number(order_data.get('quantity'))),
+                _number(order_data.get('price')), _number(order_data.get('trigger_price')),
+                order_data.get('pricetype') or DEFAULT_PRICE_TYPE,
+                order_data.get('product') or DEFAULT_PRODUCT_TYPE,
+                order_data.get('strategy', '')
+            )
+            account.orders[orderid] = order
+            self._submit(order)
+            return order.to_dict()
+
+    def place_smart_order(self, broker: str, auth_token: str, order_data: Dict[str, Any],
+                          quote: Optional[Quote] = None) -> Optional[Dict[str, Any]]:
+        """
+        Place the order that brings the position to ``position_size``,
+        following the brokers' place_smartorder_api rules.
+
+        Returns:
+            The placed order, or None when the position already matches
+        """
+        position_size = int(_number(order_data.get('position_size')))
+        current = self.open_position(broker, auth_token, order_data['symbol'], order_data['exchange'],
+                                     order_data.get('product') or DEFAULT_PRODUCT_TYPE)
+        if position_size == 0 and current == 0 and int(_number(order_data.get('quantity'))):
+            return self.place_order(broker, auth_token, order_data, quote)
+        if position_size == current:
+            return None
+        difference = position_size - current
+        return self.place_order(broker, auth_token, {
+            **order_data, 'action': 'BUY' if difference > 0 else 'SELL', 'quantity': abs(difference)
+        }, quote)
+
+    def modify_order(self, broker: str, auth_token: str, orderid: Any, changes: Dict[str, Any],
+                     quote: Optional[Quote] = None) -> Dict[str, Any]:
+        """
+        Change the quantity, price, trigger price or price type of an open order.
+
+        If the new terms are rejected (e.g. insufficient funds) the order is
+        left open on its old terms, with its margin still reserved.
+
+        Raises:
+            ValueError: If the order does not exist, is no longer open or
+                the new terms are rejected
+        """
+        order = self._find_active(broker, auth_token, orderid, 'modified')
+        self._refresh_price(order.exchange, order.symbol, quote)
+        with self._lock:
+            order = self._find_active(broker, auth_token, orderid, 'modified')
+            previous = (order.quantity, order.price, order.trigger_price, order.pricetype,
+                        order.status, order.margin)
+            book = self._books[(order.exchange, order.symbol)]
+            self._release(order)
+            book.stale += 1
+            if changes.get('quantity') not in (None, ''):
+                order.quantity = int(_number(changes['quantity']))
+            for field in ('price', 'trigger_price'):
+                if changes.get(field) not in (None, ''):
+                    setattr(order, field, _number(changes[field]))
+            if changes.get('pricetype'):
+                order.pricetype = changes['pricetype']
+            order.status = OPEN
+            self._submit(order)
+            if order.status == REJECTED:
+                message = order.message
+                # Rejected before a new seq was taken, so the old book entry is valid again
+                (order.quantity, order.price, order.trigger_price, order.pricetype,
+                 order.status, order.margin) = previous
+                order.message = ''
+                order.account.used_margin += order.margin
+                book.stale -= 1
+                raise ValueError(f'Order {orderid} not modified: {message}')
+            return order.to_dict()
+
+    def cancel_order(self, broker: str, auth_token: str, orderid: Any) -> Dict[str, Any]:
+        """
+        Cancel an open order.
+
+        Raises:
+            ValueError: If the order does not exist or is no longer open
+        """
+        with self._lock:
+            order = self._find_active(broker, auth_token, orderid, 'cancelled')
+            self._cancel(order)
+            return order.to_dict()
+
+    def cancel_all_orders(self, broker: str, auth_token: str) -> List[str]:
+        """Cancel every open order of the account; returns the cancelled order IDs."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            if account is None:
+                return []
+            cancelled = []
+            for order in account.orders.values():
+                if order.status in ACTIVE_STATUSES:
+                    self._cancel(order)
+                    cancelled.append(order.orderid)
+            return cancelled
+
+    def close_positions(self, broker: str, auth_token: str, strategy: str = '',
+                        quote: Optional[Quote] = None) -> List[Dict[str, Any]]:
+        """Square off every open position with a MARKET order; returns the exit orders."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            open_positions = [
+                (key, position.quantity) for key, position in account.positions.items() if position.quantity
+            ] if account is not None else []
+        return [
+            self.place_order(broker, auth_token, {
+                'symbol': symbol, 'exchange': exchange, 'product': product, 'strategy': strategy,
+                'action': 'SELL' if quantity > 0 else 'BUY', 'quantity': abs(quantity), 'pricetype': 'MARKET'
+            }, quote)
+            for (symbol, exchange, product), quantity in open_positions
+        ]
+
+    def refresh_prices(self, broker: str, auth_token: str, quote: Optional[Quote]) -> None:
+        """Refresh stale prices of the symbols with open orders, so resting orders can fill."""
+        if quote is None:
+            return
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            symbols = {
+                (order.exchange, order.symbol) for order in account.orders.values() if order.status in ACTIVE_STATUSES
+            } if account is not None else set()
+        for exchange, symbol in symbols:
+            self._refresh_price(exchange, symbol, quote)
+
+    # Books
+
+    def get_order(self, broker: str, auth_token: str, orderid: Any,
+                  quote: Optional[Quote] = None) -> Optional[Dict[str, Any]]:
+        """One order; an open order's symbol price is refreshed first, so it can fill."""
+        order = self._find(broker, auth_token, orderid)
+        if order is None:
+            return None
+        if order.status in ACTIVE_STATUSES:
+            self._refresh_price(order.exchange, order.symbol, quote)
+        with self._lock:
+            return order.to_dict()
+
+    def orderbook(self, broker: str, auth_token: str) -> Dict[str, Any]:
+        """Orders and order statistics in the orderbook service format."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            orders = [order.to_dict() for order in account.orders.values()] if account is not None else []
+        statistics = {
+            'total_buy_orders': 0,
+            'total_sell_orders': 0,
+            'total_completed_orders': 0,
+            'total_open_orders': 0,
+            'total_rejected_orders': 0
+        }
+        for order in orders:
+            statistics['total_buy_orders' if order['action'] == 'BUY' else 'total_sell_orders'] += 1
+            if order['order_status'] == COMPLETE:
+                statistics['total_completed_orders'] += 1
+            elif order['order_status'] in ACTIVE_STATUSES:
+                statistics['total_open_orders'] += 1
+            elif order['order_status'] == REJECTED:
+                statistics['total_rejected_orders'] += 1
+        return {'orders': orders, 'statistics': statistics}
+
+    def tradebook(self, broker: str, auth_token: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            return [dict(trade) for trade in account.trades] if account is not None else []
+
+    def positionbook(self, broker: str, auth_token: str) -> List[Dict[str, Any]]:
+        """Positions with their last price and P&L (realized plus marked to market)."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            if account is None:
+                return []
+            positions = []
+            for (symbol, exchange, product), position in account.positions.items():
+                ltp = self.last_price(exchange, symbol) or position.average_price
+                positions.append({
+                    'symbol': symbol,
+                    'exchange': exchange,
+                    'product': product,
+                    'quantity': position.quantity,
+                    'average_price': position.average_price,
+                    'ltp': ltp,
+                    'pnl': position.realized + (ltp - position.average_price) * position.quantity
+                })
+            return positions
+
+    def open_position(self, broker: str, auth_token: str, symbol: str, exchange: str, product: str) -> int:
+        """Net quantity of one position."""
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            position = account.positions.get((symbol, exchange, product)) if account is not None else None
+            return position.quantity if position is not None else 0
+
+    def funds(self, broker: str, auth_token: str) -> Dict[str, str]:
+        """Funds in the funds service format."""
+        with self._lock:
+            account = self._account(broker, auth_token)
+            unrealized = 0.0
+            for (symbol, exchange, _), position in account.positions.items():
+                if position.quantity:
+                    ltp = self.last_price(exchange, symbol) or position.average_price
+                    unrealized += (ltp - position.average_price) * position.quantity
+            # Clamp rounding drift left over after margin is released
+            used_margin = max(account.used_margin, 0.0)
+            return {
+                'availablecash': "{:.2f}".format(account.capital + account.realized - used_margin),
+                'collateral': "{:.2f}".format(0),
+                'm2munrealized': "{:.2f}".format(unrealized),
+                'm2mrealized': "{:.2f}".format(account.realized),
+                'utiliseddebits': "{:.2f}".format(used_margin)
+            }
+
+    def reset(self, broker: Optional[str] = None, auth_token: Optional[str] = None) -> None:
+        """Drop one account (or every account and price) and start afresh."""
+        with self._lock:
+            if broker is None:
+                self._accounts.clear()
+                self._books.clear()
+                self._prices.clear()
+                return
+            account = self._accounts.pop((broker, auth_token), None)
+            if account is not None:
+                for order in account.orders.values():
+                    if order.status in ACTIVE_STATUSES:
+                        order.status = CANCELLED
+                        self._books[(order.exchange, order.symbol)].stale += 1
+
+    # Matching (called with the lock held)
+
+    def _account(self, broker, auth_token) -> PaperAccount:
+        account = self._accounts.get((broker, auth_token))
+        if account is None:
+            account = self._accounts[(broker, auth_token)] = PaperAccount(self.capital)
+        return account
+
+    def _find(self, broker, auth_token, orderid) -> Optional[PaperOrder]:
+        with self._lock:
+            account = self._accounts.get((broker, auth_token))
+            return account.orders.get(str(orderid)) if account is not None else None
+
+    def _find_active(self, broker, auth_token, orderid, action) -> PaperOrder:
+        order = self._find(broker, auth_token, orderid)
+        if order is None:
+            raise ValueError(f'Order {orderid} not found')
+        if order.status not in ACTIVE_STATUSES:
+            raise ValueError(f'Order {orderid} is {order.status} and cannot be {action}')
+        return order
+
+    def _submit(self, order: PaperOrder) -> None:
+        """Check margin, then fill the order or rest it in its symbol's book."""
+        if order.quantity <= 0 or order.action not in ('BUY', 'SELL'):
+            self._reject(order, 'Invalid quantity or action')
+            return
+
+        ltp = self.last_price(order.exchange, order.symbol)
+        reference = order.price if order.pricetype in ('LIMIT', 'SL') else (
+            order.trigger_price if order.pricetype == 'SL-M' else ltp or 0.0)
+        if order.pricetype in ('LIMIT', 'SL') and order.price <= 0:
+            self._reject(order, 'Price is required for LIMIT and SL orders')
+            return
+        if order.pricetype in ('SL', 'SL-M') and order.trigger_price <= 0:
+            self._reject(order, 'Trigger price is required for SL and SL-M orders')
+            return
+
+        account = order.account
+        margin = self._added_exposure(order) * reference * PAPER_PRODUCT_MARGIN.get(order.product, 1.0)
+        if margin > account.capital + account.realized - account.used_margin:
+            self._reject(order, 'Insufficient funds')
+            return
+        order.margin = margin
+        account.used_margin += margin
+
+        key = (order.exchange, order.symbol)
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = SymbolBook()
+        order.seq = next(self._seq)
+        buy = order.action == 'BUY'
+
+        if order.pricetype in ('SL', 'SL-M'):
+            if ltp is not None and (ltp >= order.trigger_price if buy else ltp <= order.trigger_price):
+                self._trigger(book, order, ltp)
+            else:
+                order.status = TRIGGER_PENDING
+                if buy:
+                    heapq.heappush(book.buy_stops, (order.trigger_price, order.seq, order))
+                else:
+                    heapq.heappush(book.sell_stops, (-order.trigger_price, order.seq, order))
+        elif order.pricetype == 'LIMIT':
+            self._rest_limit(book, order, ltp)
+        elif ltp is not None:
+            self._fill(order, ltp)
+        else:
+            book.waiting.append((order.seq, order))
+
+    def _added_exposure(self, order: PaperOrder) -> int:
+        """Part of the order quantity that increases the position (needs margin)."""
+        position = order.account.positions.get((order.symbol, order.exchange, order.product))
+        current = position.quantity if position is not None else 0
+        signed = order.quantity if order.action == 'BUY' else -order.quantity
+        return max(0, abs(current + signed) - abs(current))
+
+    def _rest_limit(self, book: SymbolBook, order: PaperOrder, ltp: Optional[float]) -> None:
+        order.status = OPEN
+        if order.action == 'BUY':
+            if ltp is not None and ltp <= order.price:
+                self._fill(order, ltp)
+            else:
+                heapq.heappush(book.buys, (-order.price, order.seq, order))
+        else:
+            if ltp is not None and ltp >= order.price:
+                self._fill(order, ltp)
+            else:
+                heapq.heappush(book.sells, (order.price, order.seq, order))
+
+    def _trigger(self, book: SymbolBook, order: PaperOrder, ltp: float) -> None:
+        if order.pricetype == 'SL-M':
+            self._fill(order, ltp)
+        else:
+            order.seq = next(self._seq)
+            self._rest_limit(book, order, ltp)
+
+    def _match(self, book: SymbolBook, ltp: float) -> None:
+        if book.waiting:
+            waiting, book.waiting = book.waiting, []
+            for seq, order in waiting:
+                if order.seq == seq and order.status == OPEN:
+                    self._fill(order, ltp)
+
+        # Stops first: a triggered SL order may fill at this same price
+        stops = book.buy_stops
+        while stops and stops[0][0] <= ltp:
+            _, seq, order = heapq.heappop(stops)
+            if order.seq == seq and order.status == TRIGGER_PENDING:
+                self._trigger(book, order, ltp)
+        stops = book.sell_stops
+        while stops and -stops[0][0] >= ltp:
+            _, seq, order = heapq.heappop(stops)
+            if order.seq == seq and order.status == TRIGGER_PENDING:
+                self._trigger(book, order, ltp)
+
+        limits = book.buys
+        while limits and -limits[0][0] >= ltp:
+            _, seq, order = heapq.heappop(limits)
+            if order.seq == seq and order.status == OPEN:
+                self._fill(order, order.price)
+        limits = book.sells
+        while limits and limits[0][0] <= ltp:
+            _, seq, order = heapq.heappop(limits)
+            if order.seq == seq and order.status == OPEN:
+                self._fill(order, order.price)
+
+        if book.stale > STALE_ENTRY_LIMIT:
+            self._compact(book)
+
+    def _compact(self, book: SymbolBook) -> None:
+        """Drop heap entries of cancelled, modified and filled orders."""
+        for side, status in (('buys', OPEN), ('sells', OPEN),
+                             ('buy_stops', TRIGGER_PENDING), ('sell_stops', TRIGGER_PENDING)):
+            entries = [entry for entry in getattr(book, side)
+                       if entry[2].seq == entry[1] and entry[2].status == status]
+            heapq.heapify(entries)
+            setattr(book, side, entries)
+        book.waiting = [entry for entry in book.waiting if entry[1].seq == entry[0] and entry[1].status == OPEN]
+        book.stale = 0
+
+    def _fill(self, order: PaperOrder, price: float) -> None:
+        account = order.account
+        self._release(order)
+        order.status = COMPLETE
+        order.average_price = price
+
+        key = (order.symbol, order.exchange, order.product)
+        position = account.positions.get(key)
+        if position is None:
+            position = account.positions[key] = PaperPosition()
+        signed = order.quantity if order.action == 'BUY' else -order.quantity
+        current = position.quantity
+        updated = current + signed
+        if current == 0 or (current > 0) == (signed > 0):
+            position.average_price = (abs(current) * position.average_price + order.quantity * price) / abs(updated)
+        else:
+            closed = min(abs(current), order.quantity)
+            realized = closed * (price - position.average_price) * (1 if current > 0 else -1)
+            position.realized += realized
+            account.realized += realized
+            if updated == 0:
+                position.average_price = 0.0
+            elif (updated > 0) != (current > 0):
+                # Reversed through zero: the rest opens a new position at this price
+                position.average_price = price
+        position.quantity = updated
+
+        margin = abs(updated) * position.average_price * PAPER_PRODUCT_MARGIN.get(order.product, 1.0)
+        account.used_margin += margin - position.margin
+        position.margin = margin
+
+        account.trades.append({
+            'symbol': order.symbol,
+            'exchange': order.exchange,
+            'product': order.product,
+            'action': order.action,
+            'quantity': order.quantity,
+            'average_price': price,
+            'trade_value': order.quantity * price,
+            'orderid': order.orderid,
+            'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT)
+        })
+
+    def _release(self, order: PaperOrder) -> None:
+        order.account.used_margin -= order.margin
+        order.margin = 0.0
+
+    def _cancel(self, order: PaperOrder) -> None:
+        self._release(order)
+        order.status = CANCELLED
+        self._books[(order.exchange, order.symbol)].stale += 1
+
+    def _reject(self, order: PaperOrder, message: str) -> None:
+        order.status = REJECTED
+        order.message = message
+
+
+paper_exchange = PaperExchange()
+
+
+def paper_quote(auth_token: str, broker: str) -> Quote:
+    """Quote callable that asks the broker for a symbol's last price."""
+    def quote(symbol: str, exchange: str) -> Optional[float]:
+        # Imported here: the quotes service pulls in the broker data modules
+        from services.quotes_service import get_quotes_with_auth
+        success, response, _ = get_quotes_with_auth(auth_token, None, broker, symbol, exchange)
+        if success and isinstance(response.get('data'), dict):
+            return _number(response['data'].get('ltp')) or None
+        return None
+    return quote
@@ -1,4 +1,3 @@
-import importlib
 import traceback
 import copy
 from typing import Tuple, Dict, Any, Optional, List, Union
@@ -7,7 +6,7 @@ from database.apilog_db import async_log_order, executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
-from utils.api_analyzer import analyze_request, generate_order_id
+from utils.api_analyzer import analyze_request
 from utils.constants import (
     VALID_EXCHANGES,
     VALID_ACTIONS,
@@ -16,6 +15,9 @@ from utils.constants import (
     REQUIRED_ORDER_FIELDS
 )
 from restx_api.schemas import OrderSchema
+from services.account_data_cache import invalidate_account_data
+from services.paper_exchange import paper_exchange, paper_quote
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
@@ -24,24 +26,6 @@ logger = get_logger(__name__)
 # Initialize schema
 order_schema = OrderSchema()
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific order API module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.order_api'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def emit_analyzer_error(request_data: Dict[str, Any], error_message: str) -> Dict[str, Any]:
     """
     Helper function to emit analyzer error events
@@ -153,9 +137,11 @@ def place_order_with_auth(
         analyzer_request['api_type'] = 'placeorder'
         
         if analysis.get('status') == 'success':
+            # Fill against the paper exchange
+            order = paper_exchange.place_order(broker, auth_token, order_data, paper_quote(auth_token, broker))
             response_data = {
                 'mode': 'analyze',
-                'orderid': generate_order_id(),
+                'orderid': order['orderid'],
                 'status': 'success'
             }
         else:
@@ -177,7 +163,7 @@ def place_order_with_auth(
         return True, response_data, 200
 
     # If not in analyze mode, proceed with actual order placement
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'order')
     if broker_module is None:
         error_response = {
             'status': 'error',
@@ -198,6 +184,9 @@ def place_order_with_auth(
         }
         executor.submit(async_log_order, 'placeorder', original_data, error_response)
         return False, error_response, 500
+    finally:
+        # The action changes the account's books
+        invalidate_account_data(broker, auth_token)
 
     if res.status == 200:
         socketio.emit('order_event', {
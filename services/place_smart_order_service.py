@@ -1,4 +1,3 @@
-import importlib
 import traceback
 import copy
 import time
@@ -9,7 +8,7 @@ from database.apilog_db import async_log_order, executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
-from utils.api_analyzer import analyze_request, generate_order_id
+from utils.api_analyzer import analyze_request
 from utils.constants import (
     VALID_EXCHANGES,
     VALID_ACTIONS,
@@ -17,6 +16,9 @@ from utils.constants import (
     VALID_PRODUCT_TYPES,
     REQUIRED_SMART_ORDER_FIELDS
 )
+from services.account_data_cache import invalidate_account_data
+from services.paper_exchange import paper_exchange, paper_quote
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
@@ -59,24 +61,6 @@ def emit_analyzer_error(request_data: Dict[str, Any], error_message: str) -> Dic
     
     return error_response
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific order API module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.order_api'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def validate_smart_order(order_data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     """
     Validate smart order data
@@ -159,11 +143,20 @@ def place_smart_order_with_auth(
         analyzer_request['api_type'] = 'placesmartorder'
         
         if analysis.get('status') == 'success':
-            response_data = {
-                'mode': 'analyze',
-                'orderid': generate_order_id(),
-                'status': 'success'
-            }
+            # Trade the paper position towards position_size
+            order = paper_exchange.place_smart_order(broker, auth_token, order_data, paper_quote(auth_token, broker))
+            if order is None:
+                response_data = {
+                    'mode': 'analyze',
+                    'status': 'success',
+                    'message': 'Positions Already Matched. No Action needed.'
+                }
+            else:
+                response_data = {
+                    'mode': 'analyze',
+                    'orderid': order['orderid'],
+                    'status': 'success'
+                }
         else:
             response_data = {
                 'mode': 'analyze',
@@ -183,7 +176,7 @@ def place_smart_order_with_auth(
         return True, response_data, 200
 
     # Live Mode - Proceed with actual order placement
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'order')
     if broker_module is None:
         error_response = {
             'status': 'error',
@@ -232,6 +225,9 @@ def place_smart_order_with_auth(
         }
         executor.submit(async_log_order, 'placesmartorder', original_data, error_response)
         return False, error_response, 500
+    finally:
+        # The action changes the account's books
+        invalidate_account_data(broker, auth_token)
 
     # Add delay if needed
     try:
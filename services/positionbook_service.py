@@ -1,7 +1,10 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from database.settings_db import get_analyze_mode
+from services.account_data_cache import coalesced
+from services.paper_exchange import paper_exchange
+from utils.broker_registry import get_broker_functions
 from utils.logging import get_logger
 
 # Initialize logger
@@ -25,30 +28,15 @@ def format_position_data(position_data):
         ]
     return position_data
 
-def import_broker_module(broker_name: str) -> Optional[Dict[str, Any]]:
-    """
-    Dynamically import the broker-specific positionbook modules.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        Dictionary of broker functions or None if import fails
-    """
-    try:
-        # Import API module
-        api_module = importlib.import_module(f'broker.{broker_name}.api.order_api')
-        # Import mapping module
-        mapping_module = importlib.import_module(f'broker.{broker_name}.mapping.order_data')
-        return {
-            'get_positions': getattr(api_module, 'get_positions'),
-            'map_position_data': getattr(mapping_module, 'map_position_data'),
-            'transform_positions_data': getattr(mapping_module, 'transform_positions_data')
-        }
-    except (ImportError, AttributeError) as error:
-        logger.error(f"Error importing broker modules: {error}")
-        return None
+def get_paper_positionbook(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
+    """Position book of the analyze mode paper account."""
+    return True, {
+        'mode': 'analyze',
+        'status': 'success',
+        'data': format_position_data(paper_exchange.positionbook(broker, auth_token))
+    }, 200
 
+@coalesced('positionbook')
 def get_positionbook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get position book details using provided auth token.
@@ -63,7 +51,7 @@ def get_positionbook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_funcs = import_broker_module(broker)
+    broker_funcs = get_broker_functions(broker, ['get_positions', 'map_position_data', 'transform_positions_data'])
     if broker_funcs is None:
         return False, {
             'status': 'error',
@@ -127,10 +115,14 @@ def get_positionbook(
                 'status': 'error',
                 'message': 'Invalid openalgo apikey'
             }, 403
+        if get_analyze_mode():
+            return get_paper_positionbook(AUTH_TOKEN, broker_name)
         return get_positionbook_with_auth(AUTH_TOKEN, broker_name)
     
     # Case 2: Direct internal call with auth_token and broker
     elif auth_token and broker:
+        if get_analyze_mode():
+            return get_paper_positionbook(auth_token, broker)
         return get_positionbook_with_auth(auth_token, broker)
     
     # Case 3: Invalid parameters
@@ -1,29 +1,41 @@
-import importlib
+import os
+import threading
+import time
 import traceback
-from typing import Tuple, Dict, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Dict, Any, List, Optional, Union
 from database.auth_db import get_auth_token_broker
+from utils.broker_registry import get_broker
 from utils.logging import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific data module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.data'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
+# Upper bound on parallel quote requests when a broker has no multi-quote API
+MAX_QUOTE_WORKERS = int(os.getenv('MAX_QUOTE_WORKERS', '8'))
+# Without a multi-quote API each symbol is one broker call: cap the symbols per
+# request and pace the calls to stay inside the brokers' quote rate limits
+MAX_QUOTE_INSTRUMENTS = int(os.getenv('MAX_QUOTE_INSTRUMENTS', '100'))
+QUOTE_REQUESTS_PER_SECOND = float(os.getenv('QUOTE_REQUESTS_PER_SECOND', '10'))
+
+
+class _RequestPacer:
+    """Spaces calls made from several threads to at most ``rate`` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
 
 def get_quotes_with_auth(auth_token: str, feed_token: Optional[str], broker: str, symbol: str, exchange: str) -> Tuple[bool, Dict[str, Any], int]:
     """
@@ -42,26 +54,15 @@ def get_quotes_with_auth(auth_token: str, feed_token: Optional[str], broker: str
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_module = import_broker_module(broker)
-    if broker_module is None:
+    broker_plugin = get_broker(broker)
+    if broker_plugin is None or broker_plugin.function('BrokerData') is None:
         return False, {
             'status': 'error',
             'message': 'Broker-specific module not found'
         }, 404
 
     try:
-        # Initialize broker's data handler based on broker's requirements
-        if hasattr(broker_module.BrokerData.__init__, '__code__'):
-            # Check number of parameters the broker's __init__ accepts
-            param_count = broker_module.BrokerData.__init__.__code__.co_argcount
-            if param_count > 2:  # More than self and auth_token
-                data_handler = broker_module.BrokerData(auth_token, feed_token)
-            else:
-                data_handler = broker_module.BrokerData(auth_token)
-        else:
-            # Fallback to just auth token if we can't inspect
-            data_handler = broker_module.BrokerData(auth_token)
-            
+        data_handler = broker_plugin.create_data_handler(auth_token, feed_token)
         quotes = data_handler.get_quotes(symbol, exchange)
         
         if quotes is None:
@@ -128,3 +129,75 @@ def get_quotes(
             'status': 'error',
             'message': 'Either api_key or both auth_token and broker must be provided'
         }, 400
+
+def get_multiple_quotes_with_auth(auth_token: str, feed_token: Optional[str], broker: str,
+                                  instruments: List[Dict[str, str]]) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get quotes for several symbols in one call.
+
+    Uses the broker's ``get_multiquotes`` when available, otherwise fetches
+    up to MAX_QUOTE_INSTRUMENTS quotes concurrently with a bounded thread
+    pool, paced to QUOTE_REQUESTS_PER_SECOND.
+
+    Args:
+        auth_token: Authentication token for the broker API
+        feed_token: Feed token for market data (if required by broker)
+        broker: Name of the broker
+        instruments: List of {'symbol': ..., 'exchange': ...} dicts
+
+    Returns:
+        Tuple of (success, response, status code). On success ``data`` maps
+        "EXCHANGE:SYMBOL" to the quote dict (None if that quote failed).
+    """
+    broker_plugin = get_broker(broker)
+    if broker_plugin is None or broker_plugin.function('BrokerData') is None:
+        return False, {
+            'status': 'error',
+            'message': 'Broker-specific module not found'
+        }, 404
+
+    try:
+        data_handler = broker_plugin.create_data_handler(auth_token, feed_token)
+
+        if hasattr(data_handler, 'get_multiquotes'):
+            quotes = data_handler.get_multiquotes(instruments)
+            return True, {
+                'status': 'success',
+                'data': quotes
+            }, 200
+
+        if len(instruments) > MAX_QUOTE_INSTRUMENTS:
+            return False, {
+                'status': 'error',
+                'message': f'Too many symbols ({len(instruments)}); {broker} quotes are fetched one '
+                           f'by one, up to {MAX_QUOTE_INSTRUMENTS} per request'
+            }, 400
+
+        pacer = _RequestPacer(QUOTE_REQUESTS_PER_SECOND)
+
+        def fetch(instrument):
+            pacer.wait()
+            try:
+                return data_handler.get_quotes(instrument['symbol'], instrument['exchange'])
+            except Exception as e:
+                logger.warning(f"Quote failed for {instrument['exchange']}:{instrument['symbol']}: {e}")
+                return None
+
+        workers = max(1, min(MAX_QUOTE_WORKERS, len(instruments)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fetch, instruments))
+
+        return True, {
+            'status': 'success',
+            'data': {
+                f"{instrument['exchange']}:{instrument['symbol']}": quote
+                for instrument, quote in zip(instruments, results)
+            }
+        }, 200
+    except Exception as e:
+        logger.error(f"Error fetching multiple quotes: {e}")
+        traceback.print_exc()
+        return False, {
+            'status': 'error',
+            'message': str(e)
+        }, 500
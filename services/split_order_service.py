@@ -1,4 +1,3 @@
-import importlib
 import traceback
 import copy
 from typing import Tuple, Dict, Any, Optional, List
@@ -9,7 +8,7 @@ from database.apilog_db import async_log_order, executor as log_executor
 from database.settings_db import get_analyze_mode
 from database.analyzer_db import async_log_analyzer
 from extensions import socketio
-from utils.api_analyzer import analyze_request, generate_order_id
+from utils.api_analyzer import analyze_request
 from utils.constants import (
     VALID_EXCHANGES,
     VALID_ACTIONS,
@@ -17,6 +16,9 @@ from utils.constants import (
     VALID_PRODUCT_TYPES,
     REQUIRED_ORDER_FIELDS
 )
+from services.account_data_cache import invalidate_account_data
+from services.paper_exchange import paper_exchange, paper_quote
+from utils.broker_registry import get_broker_module
 from utils.logging import get_logger
 
 # Initialize logger
@@ -59,24 +61,6 @@ def emit_analyzer_error(request_data: Dict[str, Any], error_message: str) -> Dic
     
     return error_response
 
-def import_broker_module(broker_name: str) -> Optional[Any]:
-    """
-    Dynamically import the broker-specific order API module.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        The imported module or None if import fails
-    """
-    try:
-        module_path = f'broker.{broker_name}.api.order_api'
-        broker_module = importlib.import_module(module_path)
-        return broker_module
-    except ImportError as error:
-        logger.error(f"Error importing broker module '{module_path}': {error}")
-        return None
-
 def place_single_order(
     order_data: Dict[str, Any], 
     broker_module: Any, 
@@ -204,6 +188,7 @@ def split_order_with_auth(
     # If in analyze mode, analyze each order
     if get_analyze_mode():
         analyze_results = []
+        quote = paper_quote(auth_token, broker)
         
         # Analyze full-size orders
         for i in range(num_full_orders):
@@ -218,7 +203,7 @@ def split_order_with_auth(
                     'order_num': i + 1,
                     'quantity': split_size,
                     'status': 'success',
-                    'orderid': generate_order_id()
+                    'orderid': paper_exchange.place_order(broker, auth_token, order_data, quote)['orderid']
                 })
             else:
                 analyze_results.append({
@@ -240,7 +225,7 @@ def split_order_with_auth(
                     'order_num': num_full_orders + 1,
                     'quantity': remaining_qty,
                     'status': 'success',
-                    'orderid': generate_order_id()
+                    'orderid': paper_exchange.place_order(broker, auth_token, order_data, quote)['orderid']
                 })
             else:
                 analyze_results.append({
@@ -274,7 +259,7 @@ def split_order_with_auth(
         return True, response_data, 200
 
     # Live mode - process actual orders
-    broker_module = import_broker_module(broker)
+    broker_module = get_broker_module(broker, 'order')
     if broker_module is None:
         error_response = {
             'status': 'error',
@@ -326,6 +311,9 @@ def split_order_with_auth(
             result = future.result()
             results.append(result)
 
+        # The orders change the account's books
+        invalidate_account_data(broker, auth_token)
+
         # Sort results by order_num to maintain order in response
         results.sort(key=lambda x: x['order_num'])
 
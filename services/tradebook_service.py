@@ -1,7 +1,10 @@
-import importlib
 import traceback
 from typing import Tuple, Dict, Any, Optional, List, Union
 from database.auth_db import get_auth_token_broker
+from database.settings_db import get_analyze_mode
+from services.account_data_cache import coalesced
+from services.paper_exchange import paper_exchange
+from utils.broker_registry import get_broker_functions
 from utils.logging import get_logger
 
 # Initialize logger
@@ -25,30 +28,15 @@ def format_trade_data(trade_data):
         ]
     return trade_data
 
-def import_broker_module(broker_name: str) -> Optional[Dict[str, Any]]:
-    """
-    Dynamically import the broker-specific tradebook modules.
-    
-    Args:
-        broker_name: Name of the broker
-        
-    Returns:
-        Dictionary of broker functions or None if import fails
-    """
-    try:
-        # Import API module
-        api_module = importlib.import_module(f'broker.{broker_name}.api.order_api')
-        # Import mapping module
-        mapping_module = importlib.import_module(f'broker.{broker_name}.mapping.order_data')
-        return {
-            'get_trade_book': getattr(api_module, 'get_trade_book'),
-            'map_trade_data': getattr(mapping_module, 'map_trade_data'),
-            'transform_tradebook_data': getattr(mapping_module, 'transform_tradebook_data')
-        }
-    except (ImportError, AttributeError) as error:
-        logger.error(f"Error importing broker modules: {error}")
-        return None
+def get_paper_tradebook(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
+    """Trade book of the analyze mode paper account."""
+    return True, {
+        'mode': 'analyze',
+        'status': 'success',
+        'data': format_trade_data(paper_exchange.tradebook(broker, auth_token))
+    }, 200
 
+@coalesced('tradebook')
 def get_tradebook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get trade book details using provided auth token.
@@ -63,7 +51,7 @@ def get_tradebook_with_auth(auth_token: str, broker: str) -> Tuple[bool, Dict[st
         - Response data (dict)
         - HTTP status code (int)
     """
-    broker_funcs = import_broker_module(broker)
+    broker_funcs = get_broker_functions(broker, ['get_trade_book', 'map_trade_data', 'transform_tradebook_data'])
     if broker_funcs is None:
         return False, {
             'status': 'error',
@@ -127,10 +115,14 @@ def get_tradebook(
                 'status': 'error',
                 'message': 'Invalid openalgo apikey'
             }, 403
+        if get_analyze_mode():
+            return get_paper_tradebook(AUTH_TOKEN, broker_name)
         return get_tradebook_with_auth(AUTH_TOKEN, broker_name)
     
     # Case 2: Direct internal call with auth_token and broker
     elif auth_token and broker:
+        if get_analyze_mode():
+            return get_paper_tradebook(auth_token, broker)
         return get_tradebook_with_auth(auth_token, broker)
     
     # Case 3: Invalid parameters
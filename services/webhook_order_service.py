@@ -0,0 +1,176 @@
+"""
+In-process dispatcher for webhook orders.
+
+The TradingView strategy and Chartink webhooks queue orders here instead of
+posting them back to our own REST API. Each source has its own worker thread,
+so a slow broker call for one source does not hold up the others. Workers
+place orders by calling the order services directly and sleep on a condition
+variable until an order is queued or a rate limit window opens, so there is
+no polling.
+
+Rate limits are kept per source (one per webhook blueprint), as each
+blueprint enforced them before:
+- placeorder: up to 10 orders per second
+- placesmartorder: 1 order per second, holding back the source's other orders
+"""
+
+import os
+import threading
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from marshmallow import ValidationError
+
+from database.apilog_db import async_log_order, executor
+from database.settings_db import get_analyze_mode
+from restx_api.schemas import SmartOrderSchema
+from services.place_order_service import place_order
+from services.place_smart_order_service import emit_analyzer_error, place_smart_order
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SMART_ORDER_DELAY = os.getenv('SMART_ORDER_DELAY', '0.5')
+
+# Per-source limits, matching the former webhook queue processors
+REGULAR_ORDERS_PER_SECOND = 10
+SMART_ORDER_INTERVAL = 1.0
+
+smart_order_schema = SmartOrderSchema()
+
+
+def _place_regular_order(payload: Dict[str, Any]) -> Tuple[bool, Dict[str, Any], int]:
+    order_data = dict(payload)
+    return place_order(order_data=order_data, api_key=order_data.get('apikey'))
+
+
+def _place_smart_order(payload: Dict[str, Any]) -> Tuple[bool, Dict[str, Any], int]:
+    try:
+        order_data = smart_order_schema.load(payload)
+    except ValidationError as err:
+        # Logged like the placesmartorder endpoint logs validation failures
+        error_message = str(err.messages)
+        if get_analyze_mode():
+            return False, emit_analyzer_error(payload, error_message), 400
+        error_response = {'status': 'error', 'message': error_message}
+        executor.submit(async_log_order, 'placesmartorder', payload, error_response)
+        return False, error_response, 400
+    api_key = order_data.pop('apikey', None)
+    return place_smart_order(order_data=order_data, api_key=api_key,
+                             smart_order_delay=SMART_ORDER_DELAY)
+
+
+class _SourceQueue:
+    """Pending orders and rate limit state for one webhook source."""
+
+    def __init__(self):
+        self.regular = deque()
+        self.smart = deque()
+        self.regular_sent = deque(maxlen=REGULAR_ORDERS_PER_SECOND)
+        self.blocked_until = 0.0
+        self.worker = None
+
+    def next_order(self, now: float) -> Tuple[Optional[str], Optional[Dict[str, Any]], float]:
+        """
+        Pop the next order allowed at ``now``.
+
+        Returns:
+            (endpoint, payload, 0) when an order is ready, otherwise
+            (None, None, seconds until one may be ready or -1 if idle)
+        """
+        if not self.smart and not self.regular:
+            return None, None, -1
+        if now < self.blocked_until:
+            return None, None, self.blocked_until - now
+
+        # Smart orders go first, as in the former processors
+        if self.smart:
+            self.blocked_until = now + SMART_ORDER_INTERVAL
+            return 'placesmartorder', self.smart.popleft(), 0
+
+        while self.regular_sent and now - self.regular_sent[0] > 1:
+            self.regular_sent.popleft()
+        if len(self.regular_sent) < REGULAR_ORDERS_PER_SECOND:
+            self.regular_sent.append(now)
+            return 'placeorder', self.regular.popleft(), 0
+        return None, None, 1 - (now - self.regular_sent[0])
+
+
+class WebhookOrderDispatcher:
+    """Places queued webhook orders through the order services, one worker thread per source."""
+
+    def __init__(self, handlers: Optional[Dict[str, Callable]] = None):
+        self.handlers = handlers or {
+            'placeorder': _place_regular_order,
+            'placesmartorder': _place_smart_order,
+        }
+        self._sources: Dict[str, _SourceQueue] = {}
+        self._condition = threading.Condition()
+        self._running = True
+
+    def queue_order(self, source: str, endpoint: str, payload: Dict[str, Any]) -> None:
+        """Queue an order for ``endpoint`` (placeorder or placesmartorder) and wake the worker."""
+        with self._condition:
+            pending = self._sources.get(source)
+            if pending is None:
+                pending = self._sources[source] = _SourceQueue()
+            if endpoint == 'placesmartorder':
+                pending.smart.append(payload)
+            else:
+                pending.regular.append(payload)
+            self._running = True
+            if pending.worker is None:
+                pending.worker = threading.Thread(target=self._run, args=(pending,),
+                                                  name=f'webhook-order-{source}', daemon=True)
+                pending.worker.start()
+            # Workers share the condition; each checks only its own source
+            self._condition.notify_all()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their orders in flight; pending orders stay queued."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+            workers = [pending.worker for pending in self._sources.values() if pending.worker is not None]
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(timeout)
+
+    def _next_order(self, pending: _SourceQueue) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Block until an order of this source may be placed; (None, None) once stopped."""
+        with self._condition:
+            while self._running:
+                endpoint, payload, delay = pending.next_order(monotonic())
+                if endpoint is not None:
+                    return endpoint, payload
+                self._condition.wait(delay if delay >= 0 else None)
+            pending.worker = None
+            return None, None
+
+    def _run(self, pending: _SourceQueue):
+        while True:
+            endpoint, payload = self._next_order(pending)
+            if endpoint is None:
+                break
+            self._dispatch(endpoint, payload)
+
+    def _dispatch(self, endpoint: str, payload: Dict[str, Any]) -> None:
+        kind = 'Smart' if endpoint == 'placesmartorder' else 'Regular'
+        try:
+            success, response, _ = self.handlers[endpoint](payload)
+            if success:
+                logger.info(f'{kind} order placed for {payload.get("symbol")} in strategy {payload.get("strategy")}')
+            else:
+                logger.error(f'Error placing {kind.lower()} order for {payload.get("symbol")}: {response.get("message")}')
+        except Exception as e:
+            logger.exception(f'Error placing {kind.lower()} order: {str(e)}')
+
+
+# Shared by the strategy and chartink webhooks
+dispatcher = WebhookOrderDispatcher()
+
+
+def queue_order(source: str, endpoint: str, payload: Dict[str, Any]) -> None:
+    """Queue a webhook order on the shared dispatcher."""
+    dispatcher.queue_order(source, endpoint, payload)
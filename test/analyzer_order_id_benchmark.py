@@ -0,0 +1,143 @@
+"""
+Analyzer Order ID Benchmark
+
+Times sandbox order ID generation and analyzer stats as the analyzer log
+grows, comparing the previous implementation (a LIKE scan of analyzer_logs
+per order ID, and a JSON parse of every row of the last 24 hours per stats
+call) with the in-memory sequence and incremental stats.
+
+Also generates IDs from several threads at once and checks they are unique.
+
+Usage:
+    python test/analyzer_order_id_benchmark.py --sizes 10000 50000 200000 --ids 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Point the database modules at throwaway SQLite files before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'analyzer.db')}"
+os.environ['LATENCY_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'latency.db')}"
+os.environ['LOGS_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'logs.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+
+from database import analyzer_db
+from database.analyzer_db import AnalyzerLog, AnalyzerStats
+from utils import api_analyzer
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def seed_logs(start, count):
+    now = datetime.now(IST)
+    rows = []
+    for i in range(start, start + count):
+        request = {'apikey': 'x' * 64, 'strategy': f'strategy{i % 5}', 'symbol': f'SYM{i % 50}',
+                   'exchange': 'NSE', 'action': 'BUY', 'quantity': '1', 'pricetype': 'MARKET', 'product': 'MIS'}
+        if i % 10:
+            response = {'mode': 'analyze', 'orderid': f'251019{i % 99999 + 1:05d}', 'status': 'success'}
+        else:
+            response = {'mode': 'analyze', 'message': 'Invalid symbol', 'status': 'error'}
+        rows.append({'api_type': 'placeorder', 'request_data': json.dumps(request),
+                     'response_data': json.dumps(response),
+                     'created_at': now - timedelta(seconds=(i * 7) % 86000)})
+    with analyzer_db.engine.begin() as conn:
+        conn.execute(AnalyzerLog.__table__.insert(), rows)
+
+
+def legacy_generate_order_id(state):
+    """Previous generate_order_id: look up the last logged order ID for every new ID"""
+    last_order = AnalyzerLog.query.filter(
+        AnalyzerLog.response_data.like('%"orderid": "%"')
+    ).order_by(AnalyzerLog.created_at.desc()).first()
+    if last_order:
+        last_orderid = json.loads(last_order.response_data).get('orderid', '')
+        if len(last_orderid) >= 5:
+            state['sequence'] = int(last_orderid[-5:])
+    state['sequence'] = state['sequence'] % 99999 + 1
+    return f"{datetime.now().strftime('%y%m%d')}{state['sequence']:05d}"
+
+
+def legacy_stats():
+    """Previous get_analyzer_stats: parse every logged request of the last 24 hours"""
+    cutoff = datetime.now(IST) - timedelta(hours=24)
+    sources, symbols, errors = {}, set(), 0
+    for req in AnalyzerLog.query.filter(AnalyzerLog.created_at >= cutoff).all():
+        request_data = json.loads(req.request_data)
+        response_data = json.loads(req.response_data)
+        source = request_data.get('strategy', 'Unknown')
+        sources[source] = sources.get(source, 0) + 1
+        if 'symbol' in request_data:
+            symbols.add(request_data['symbol'])
+        if response_data.get('status') == 'error':
+            errors += 1
+    return len(sources), len(symbols), errors
+
+
+def per_call_ms(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = (time.perf_counter() - start) * 1000 / calls
+    analyzer_db.db_session.remove()
+    return elapsed
+
+
+def check_concurrent_ids(threads, per_thread):
+    ids = []
+    lock = threading.Lock()
+
+    def worker():
+        generated = [api_analyzer.generate_order_id() for _ in range(per_thread)]
+        with lock:
+            ids.extend(generated)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return len(ids), len(set(ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyzer order ID generation and stats')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000],
+                        help='Analyzer log sizes to measure at')
+    parser.add_argument('--ids', type=int, default=200, help='Order IDs generated per measurement')
+    parser.add_argument('--threads', type=int, default=8, help='Threads for the uniqueness check')
+    args = parser.parse_args()
+
+    analyzer_db.init_db()
+    legacy_state = {'sequence': 0}
+
+    print(f"{'Log rows':>10}{'Old ID ms':>12}{'New ID ms':>12}{'Old stats ms':>15}{'New stats ms':>15}")
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed_logs(seeded, size - seeded)
+        seeded = size
+        old_id = per_call_ms(lambda: legacy_generate_order_id(legacy_state), args.ids)
+        new_id = per_call_ms(api_analyzer.generate_order_id, args.ids)
+        old_stats = per_call_ms(legacy_stats, 3)
+        # A fresh instance, seeded from the log on its first call like after a restart
+        stats = AnalyzerStats()
+        stats.snapshot()
+        new_stats = per_call_ms(stats.snapshot, 100)
+        print(f"{size:>10}{old_id:>12.3f}{new_id:>12.4f}{old_stats:>15.1f}{new_stats:>15.3f}")
+
+    total, unique = check_concurrent_ids(args.threads, args.ids)
+    print(f"Concurrent IDs: {total} generated by {args.threads} threads, {unique} unique")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Order Book Mapping Benchmark
+
+Maps synthetic F&O order books through the broker order book pipeline
+(map_order_data -> calculate_order_statistics -> transform_order_data)
+and compares it with the previous row-by-row mapping, which resolved every
+row's symbol with its own get_symbol/get_oa_symbol call.
+
+Runs for Zerodha (symbol lookup by broker symbol), Angel and Dhan (lookup by
+token), each with a cold symbol cache and a warm one, and checks that both
+paths produce the same rows.
+
+Usage:
+    python test/book_mapping_benchmark.py --rows 5000 --repeat 5
+"""
+
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+
+# Point the database modules at a throwaway SQLite file before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'books.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broker.angel.mapping import order_data as angel
+from broker.dhan.mapping import order_data as dhan
+from broker.dhan.mapping.transform_data import map_exchange
+from broker.zerodha.mapping import order_data as zerodha
+from database import symbol
+from database.symbol import SymToken
+from database.token_db import get_oa_symbol, get_symbol, token_cache
+
+F_AND_O = ('NFO', 'BFO', 'MCX')
+DHAN_SEGMENTS = {'NFO': 'NSE_FNO', 'BFO': 'BSE_FNO', 'MCX': 'MCX_COMM'}
+
+
+def contract(i):
+    exchange = F_AND_O[i % len(F_AND_O)]
+    return {
+        'symbol': f'NIFTY25JAN{20000 + i}CE', 'brsymbol': f'NIFTY25JAN{20000 + i}CE-BR', 'token': str(100000 + i),
+        'exchange': exchange, 'status': ('COMPLETE', 'OPEN', 'REJECTED', 'CANCELLED')[i % 4],
+        'action': 'BUY' if i % 3 else 'SELL',
+    }
+
+
+def seed_symbols(rows):
+    symbol.Base.metadata.create_all(bind=symbol.engine)
+    with symbol.engine.begin() as conn:
+        conn.execute(SymToken.__table__.insert(), [
+            {'symbol': c['symbol'], 'brsymbol': c['brsymbol'], 'name': 'NIFTY', 'exchange': c['exchange'],
+             'brexchange': c['exchange'], 'token': c['token'], 'expiry': '30-JAN-25', 'strike': 20000.0,
+             'lotsize': 75, 'instrumenttype': 'CE', 'tick_size': 0.05}
+            for c in map(contract, range(rows))
+        ])
+
+
+def zerodha_book(rows):
+    return {'data': [
+        {'tradingsymbol': c['brsymbol'], 'exchange': c['exchange'], 'transaction_type': c['action'],
+         'quantity': 75, 'price': 101.5, 'trigger_price': 0, 'order_type': 'LIMIT', 'product': 'NRML',
+         'order_id': str(i), 'status': c['status'], 'order_timestamp': '2025-01-20 09:15:00'}
+        for i, c in enumerate(map(contract, range(rows)))
+    ]}
+
+
+def angel_book(rows):
+    status = {'COMPLETE': 'complete', 'OPEN': 'open', 'REJECTED': 'rejected', 'CANCELLED': 'cancelled'}
+    return {'data': [
+        {'tradingsymbol': c['brsymbol'], 'symboltoken': c['token'], 'exchange': c['exchange'],
+         'transactiontype': c['action'], 'quantity': 75, 'averageprice': 101.5, 'triggerprice': 0,
+         'ordertype': 'STOPLOSS_LIMIT' if i % 5 == 0 else 'LIMIT', 'producttype': 'CARRYFORWARD',
+         'orderid': str(i), 'status': status[c['status']], 'updatetime': '20-Jan-2025 09:15:00'}
+        for i, c in enumerate(map(contract, range(rows)))
+    ]}
+
+
+def dhan_book(rows):
+    status = {'COMPLETE': 'TRADED', 'OPEN': 'PENDING', 'REJECTED': 'REJECTED', 'CANCELLED': 'CANCELLED'}
+    return [
+        {'tradingSymbol': c['brsymbol'], 'securityId': c['token'], 'exchangeSegment': DHAN_SEGMENTS[c['exchange']],
+         'transactionType': c['action'], 'quantity': 75, 'price': 101.5, 'triggerPrice': 0,
+         'orderType': 'STOP_LOSS' if i % 5 == 0 else 'LIMIT', 'productType': 'MARGIN',
+         'orderId': str(i), 'orderStatus': status[c['status']], 'updateTime': '2025-01-20 09:15:00'}
+        for i, c in enumerate(map(contract, range(rows)))
+    ]
+
+
+def statistics(orders, action, status, completed, open_, rejected):
+    return {
+        'total_buy_orders': sum(1 for o in orders if o[action] == 'BUY'),
+        'total_sell_orders': sum(1 for o in orders if o[action] == 'SELL'),
+        'total_completed_orders': sum(1 for o in orders if o[status] == completed),
+        'total_open_orders': sum(1 for o in orders if o[status] == open_),
+        'total_rejected_orders': sum(1 for o in orders if o[status] == rejected),
+    }
+
+
+def legacy_zerodha(book):
+    orders = book['data']
+    for order in orders:
+        order['tradingsymbol'] = get_oa_symbol(symbol=order['tradingsymbol'], exchange=order['exchange'])
+    stats = statistics(orders, 'transaction_type', 'status', 'COMPLETE', 'OPEN', 'REJECTED')
+    status = {'COMPLETE': 'complete', 'REJECTED': 'rejected', 'TRIGGER PENDING': 'trigger pending',
+              'OPEN': 'open', 'CANCELLED': 'cancelled'}
+    return stats, [{
+        'symbol': o.get('tradingsymbol', ''), 'exchange': o.get('exchange', ''),
+        'action': o.get('transaction_type', ''), 'quantity': o.get('quantity', 0), 'price': o.get('price', 0.0),
+        'trigger_price': o.get('trigger_price', 0.0), 'pricetype': o.get('order_type', ''),
+        'product': o.get('product', ''), 'orderid': o.get('order_id', ''), 'order_status': status[o['status']],
+        'timestamp': o.get('order_timestamp', ''),
+    } for o in orders]
+
+
+def legacy_angel(book):
+    orders = book['data']
+    for order in orders:
+        symbol_from_db = get_symbol(order['symboltoken'], order['exchange'])
+        if symbol_from_db:
+            order['tradingsymbol'] = symbol_from_db
+            if order['exchange'] in ['NFO', 'MCX', 'BFO', 'CDS'] and order['producttype'] == 'CARRYFORWARD':
+                order['producttype'] = 'NRML'
+    stats = statistics(orders, 'transactiontype', 'status', 'complete', 'open', 'rejected')
+    order_types = {'STOPLOSS_LIMIT': 'SL', 'STOPLOSS_MARKET': 'SL-M'}
+    return stats, [{
+        'symbol': o.get('tradingsymbol', ''), 'exchange': o.get('exchange', ''),
+        'action': o.get('transactiontype', ''), 'quantity': o.get('quantity', 0),
+        'price': o.get('averageprice', 0.0), 'trigger_price': o.get('triggerprice', 0.0),
+        'pricetype': order_types.get(o['ordertype'], o['ordertype']), 'product': o.get('producttype', ''),
+        'orderid': o.get('orderid', ''), 'order_status': o.get('status', ''), 'timestamp': o.get('updatetime', ''),
+    } for o in orders]
+
+
+def legacy_dhan(orders):
+    for order in orders:
+        order['exchangeSegment'] = map_exchange(order['exchangeSegment'])
+        symbol_from_db = get_symbol(order['securityId'], order['exchangeSegment'])
+        if symbol_from_db:
+            order['tradingSymbol'] = symbol_from_db
+            if order['exchangeSegment'] in ['NFO', 'MCX', 'BFO', 'CDS'] and order['productType'] == 'MARGIN':
+                order['productType'] = 'NRML'
+    stats = statistics(orders, 'transactionType', 'orderStatus', 'TRADED', 'PENDING', 'REJECTED')
+    status = {'TRADED': 'complete', 'PENDING': 'open', 'REJECTED': 'rejected', 'CANCELLED': 'cancelled'}
+    order_types = {'STOP_LOSS': 'SL', 'STOP_LOSS_MARKET': 'SL-M'}
+    return stats, [{
+        'symbol': o.get('tradingSymbol', ''), 'exchange': o.get('exchangeSegment', ''),
+        'action': o.get('transactionType', ''), 'quantity': o.get('quantity', 0), 'price': o.get('price', 0.0),
+        'trigger_price': o.get('triggerPrice', 0.0), 'pricetype': order_types.get(o['orderType'], o['orderType']),
+        'product': o.get('productType', ''), 'orderid': o.get('orderId', ''),
+        'order_status': status.get(o['orderStatus'], o['orderStatus']), 'timestamp': o.get('updateTime', ''),
+    } for o in orders]
+
+
+def pipeline(module):
+    def run(book):
+        orders = module.map_order_data(order_data=book)
+        stats = module.calculate_order_statistics(orders)
+        return stats, module.transform_order_data(orders)
+    return run
+
+
+def timed(fn, book, repeat, cold):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        data = copy.deepcopy(book)
+        if cold:
+            token_cache.clear()
+        start = time.perf_counter()
+        result = fn(data)
+        best = min(best, time.perf_counter() - start)
+        symbol.db_session.remove()
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark broker order book mapping')
+    parser.add_argument('--rows', type=int, default=5000, help='Orders per synthetic book')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case (best is reported)')
+    args = parser.parse_args()
+
+    seed_symbols(args.rows)
+    cases = (
+        ('zerodha', zerodha_book(args.rows), legacy_zerodha, pipeline(zerodha)),
+        ('angel', angel_book(args.rows), legacy_angel, pipeline(angel)),
+        ('dhan', dhan_book(args.rows), legacy_dhan, pipeline(dhan)),
+    )
+
+    print(f"Rows per book: {args.rows}, best of {args.repeat}")
+    print(f"{'Broker':<10}{'Cache':<7}{'Row-by-row ms':>15}{'Columnar ms':>14}{'Speedup':>10}  Match")
+    for name, book, legacy, columnar in cases:
+        for cold in (True, False):
+            if not cold:
+                # Fill the cache for the warm runs
+                columnar(copy.deepcopy(book))
+            legacy_ms, expected = timed(legacy, book, args.repeat, cold)
+            columnar_ms, actual = timed(columnar, book, args.repeat, cold)
+            print(f"{name:<10}{'cold' if cold else 'warm':<7}{legacy_ms:>15.1f}{columnar_ms:>14.1f}"
+                  f"{legacy_ms / columnar_ms:>9.1f}x  {'yes' if expected == actual else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Database Contention Benchmark
+
+Runs concurrent order logging (order and analyzer logs) alongside symbol
+lookups against one SQLite file and reports log throughput, lookup latency
+and lock errors for two setups:
+
+- legacy: one engine per database module with default SQLite settings
+  (rollback journal) and a two-thread executor per log table that commits
+  every row on its own
+- shared: the shared engines from database.db_engine (WAL, reader pool plus
+  a single writer connection) and the batching log writer
+
+Each setup gets its own database file.
+
+Usage:
+    python test/db_contention_benchmark.py --orders 2000 --lookup-threads 8
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Point the database modules at a throwaway SQLite file before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'shared.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from database import analyzer_db, apilog_db, symbol
+from database.analyzer_db import AnalyzerLog, async_log_analyzer
+from database.apilog_db import OrderLog, async_log_order
+from database.db_engine import log_writer
+from database.symbol import SymToken
+
+EXCHANGES = ('NSE', 'BSE', 'NFO')
+
+
+def seed_symbols(engine, count):
+    """Create the log and symbol tables and insert ``count`` symbols per exchange."""
+    for base in (apilog_db.Base, analyzer_db.Base, symbol.Base):
+        base.metadata.create_all(bind=engine)
+    rows = [
+        {'symbol': f'SYM{i}', 'brsymbol': f'SYM{i}-EQ', 'name': f'SYM{i}', 'exchange': exchange,
+         'brexchange': exchange, 'token': str(i), 'expiry': '', 'strike': 0.0, 'lotsize': 1,
+         'instrumenttype': 'EQ', 'tick_size': 0.05}
+        for exchange in EXCHANGES for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(SymToken.__table__.insert(), rows)
+
+
+def order_payloads(count):
+    request = {'apikey': 'x' * 64, 'strategy': 'bench', 'symbol': 'SBIN', 'exchange': 'NSE',
+               'action': 'BUY', 'quantity': '1', 'pricetype': 'MARKET', 'product': 'MIS'}
+    response = {'status': 'success', 'orderid': '250101000000001'}
+    return [(dict(request, symbol=f'SYM{i}'), response) for i in range(count)]
+
+
+def run_lookups(lookup, symbols, stop, latencies, errors):
+    rng = random.Random()
+    while not stop.is_set():
+        name = f'SYM{rng.randrange(symbols)}'
+        exchange = rng.choice(EXCHANGES)
+        start = time.perf_counter()
+        try:
+            lookup(name, exchange)
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(1)
+
+
+def run_case(label, submit_logs, wait_logs, lookup, args):
+    stop = threading.Event()
+    latencies, lookup_errors = [], []
+    lookups = [threading.Thread(target=run_lookups, args=(lookup, args.symbols, stop, latencies, lookup_errors))
+               for _ in range(args.lookup_threads)]
+    for thread in lookups:
+        thread.start()
+
+    start = time.perf_counter()
+    submit_logs()
+    log_errors = wait_logs()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in lookups:
+        thread.join()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f"{label:<8}{args.orders * 2 / elapsed:>12,.0f}{len(latencies) / elapsed:>14,.0f}"
+          f"{p50:>10.2f}{p99:>10.2f}{log_errors + len(lookup_errors):>10}")
+
+
+def legacy_case(args, payloads):
+    url = f"sqlite:///{os.path.join(_tmp_dir, 'legacy.db')}"
+    # One engine per module, as each database module created its own
+    log_engine = create_engine(url, pool_size=50, max_overflow=100, pool_timeout=10)
+    analyzer_engine = create_engine(url, pool_size=50, max_overflow=100, pool_timeout=10)
+    symbol_engine = create_engine(url)
+    seed_symbols(log_engine, args.symbols)
+    ist = pytz.timezone('Asia/Kolkata')
+    log_executor = ThreadPoolExecutor(2)
+    analyzer_executor = ThreadPoolExecutor(2)
+    errors = []
+
+    def write(engine, model, api_type, request, response):
+        with Session(bind=engine) as session:
+            try:
+                session.add(model(api_type=api_type, request_data=json.dumps(request),
+                                  response_data=json.dumps(response), created_at=datetime.now(ist)))
+                session.commit()
+            except Exception:
+                session.rollback()
+                errors.append(1)
+
+    futures = []
+
+    def submit_logs():
+        for request, response in payloads:
+            futures.append(log_executor.submit(write, log_engine, OrderLog, 'placeorder', request, response))
+            futures.append(analyzer_executor.submit(write, analyzer_engine, AnalyzerLog, 'placeorder',
+                                                    request, response))
+
+    def wait_logs():
+        for future in futures:
+            future.result()
+        return len(errors)
+
+    symbol_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=symbol_engine))
+
+    def lookup(name, exchange):
+        try:
+            return symbol_session.query(SymToken).filter_by(symbol=name, exchange=exchange).first()
+        finally:
+            symbol_session.remove()
+
+    run_case('legacy', submit_logs, wait_logs, lookup, args)
+
+
+def shared_case(args, payloads):
+    seed_symbols(symbol.engine, args.symbols)
+
+    def submit_logs():
+        for request, response in payloads:
+            apilog_db.executor.submit(async_log_order, 'placeorder', request, response)
+            analyzer_db.executor.submit(async_log_analyzer, request, response, 'placeorder')
+
+    def wait_logs():
+        log_writer.flush()
+        written = OrderLog.query.count() + AnalyzerLog.query.count()
+        symbol.db_session.remove()
+        return args.orders * 2 - written
+
+    def lookup(name, exchange):
+        try:
+            return SymToken.query.filter_by(symbol=name, exchange=exchange).first()
+        finally:
+            symbol.db_session.remove()
+
+    run_case('shared', submit_logs, wait_logs, lookup, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark order logging against concurrent symbol lookups')
+    parser.add_argument('--orders', type=int, default=2000, help='Orders to log (one order and one analyzer log each)')
+    parser.add_argument('--symbols', type=int, default=20000, help='Symbols per exchange in the symbol table')
+    parser.add_argument('--lookup-threads', type=int, default=8, help='Threads running symbol lookups')
+    args = parser.parse_args()
+
+    payloads = order_payloads(args.orders)
+    print(f"Orders: {args.orders}, symbols: {args.symbols * len(EXCHANGES)}, lookup threads: {args.lookup_threads}")
+    print(f"{'Setup':<8}{'Logs/s':>12}{'Lookups/s':>14}{'p50 ms':>10}{'p99 ms':>10}{'Errors':>10}")
+    legacy_case(args, payloads)
+    shared_case(args, payloads)
+
+
+if __name__ == '__main__':
+    main()
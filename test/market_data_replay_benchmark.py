@@ -0,0 +1,278 @@
+"""
+Market Data Replay Benchmark
+
+Drives the market data path offline with recorded sessions:
+
+- record: throughput of the recording tap (raw frames and published ticks)
+- adapter: replays normalized ticks (JSONL, and Parquet when pyarrow is
+  installed) and Zerodha/Dhan raw frames at max speed through
+  ReplayWebSocketAdapter into a ZeroMQ subscriber
+- proxy: replays the tick recording through the full adapter -> ZeroMQ ->
+  WebSocketProxy -> websocket client path, at max speed and at --speed,
+  reporting delivered ticks/sec and, for paced replay, delivery lag
+  percentiles (receive time against the recorded schedule). At max speed
+  ZeroMQ drops ticks once its queues fill, so fewer arrive than are published
+
+Recordings are synthesized into a temporary directory unless --record-dir
+points at a captured session (``*.jsonl``/``*.frames`` written by
+WEBSOCKET_RECORD_DIR).
+
+Usage:
+    python test/market_data_replay_benchmark.py --symbols 100 --ticks 50000 --proxy-ticks 5000 --speed 2
+    python test/market_data_replay_benchmark.py --record-dir recordings/
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# Point the database modules at a throwaway SQLite file before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'replay.db')}"
+# Adapters and the proxy share one process
+os.environ['ZMQ_TRANSPORT'] = 'inproc'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zmq
+
+from streaming_replay_benchmark import synthesize_frames
+from utils.columnar import arrow_available
+from websocket_proxy.base_adapter import SubscriptionRegistry, get_shared_zmq_context
+from websocket_proxy.replay_adapter import (
+    FRAME_REPLAYS, REPLAY_BROKER, MarketDataRecorder, ReplayWebSocketAdapter, frame_recording_info,
+    iter_tick_recording, tick_recording_to_parquet,
+)
+
+API_KEY = 'replay-benchmark-key'
+USER_ID = 'replay-benchmark'
+TOKEN_BASE = 100000
+
+
+def synthesize_ticks(path, symbols, ticks, rate, rng):
+    """Write a JSONL tick recording of ``ticks`` quotes, ``rate`` per recorded second."""
+    start = time.time()
+    prices = [100.0 + i for i in range(symbols)]
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(ticks):
+            index = rng.randrange(symbols)
+            prices[index] = round(prices[index] * (1 + rng.uniform(-0.001, 0.001)), 2)
+            ts = start + i / rate
+            data = {'symbol': f'SYM{index}', 'exchange': 'NSE', 'mode': 'QUOTE', 'ltp': prices[index],
+                    'ltt': int(ts * 1000), 'volume': i, 'open': 100.0 + index, 'high': prices[index],
+                    'low': prices[index], 'close': 100.0 + index, 'last_quantity': 10}
+            f.write(json.dumps({'ts': ts, 'symbol': data['symbol'], 'exchange': 'NSE',
+                                'mode': 'QUOTE', 'data': data}) + '\n')
+
+
+def record_frames(directory, broker, symbols, frame_count, packets, rng):
+    """Write a frame recording through the recording tap; returns (path, frames/s)."""
+    tokens = [TOKEN_BASE + i for i in range(symbols)]
+    registry = SubscriptionRegistry()
+    for token in tokens:
+        registry.add(token if broker == 'zerodha' else str(token), f'SYM{token - TOKEN_BASE}', 'NSE', 2)
+    frames = synthesize_frames(broker, tokens, frame_count, packets, rng)
+    recorder = MarketDataRecorder(directory, broker, registry)
+    start = time.perf_counter()
+    for frame in frames:
+        recorder.record_frame(frame)
+    elapsed = time.perf_counter() - start
+    recorder.close()
+    os.remove(recorder.tick_path)
+    return recorder.frame_path, len(frames) / elapsed
+
+
+def benchmark_tick_tap(directory, path):
+    """Published ticks/s the recording tap can write."""
+    records = [(f"NSE_{symbol}_{mode}", data, json.dumps(data).encode('utf-8'))
+               for _, symbol, _, mode, data in iter_tick_recording(path)]
+    recorder = MarketDataRecorder(directory, 'tap', None)
+    start = time.perf_counter()
+    for topic, data, payload in records:
+        recorder.record_tick(topic, data, payload)
+    elapsed = time.perf_counter() - start
+    recorder.close()
+    os.remove(recorder.tick_path)
+    return len(records) / elapsed
+
+
+def recording_symbols(path):
+    """(symbol, exchange) pairs in a recording."""
+    if path.endswith('.frames'):
+        return set(frame_recording_info(path)[1])
+    return {(symbol, exchange) for _, symbol, exchange, _, _ in iter_tick_recording(path)}
+
+
+def replay_to_zmq(path):
+    """Replay at max speed into a ZeroMQ subscriber; returns (records, received, seconds)."""
+    adapter = ReplayWebSocketAdapter()
+    subscriber = get_shared_zmq_context().socket(zmq.SUB)
+    subscriber.setsockopt(zmq.RCVHWM, 0)
+    subscriber.setsockopt(zmq.SUBSCRIBE, b'')
+    subscriber.connect(adapter.zmq_endpoint)
+    adapter.socket.setsockopt(zmq.SNDHWM, 0)
+
+    adapter.initialize(REPLAY_BROKER, USER_ID,
+                       {'file': path, 'speed': 'max', 'start_delay': 0.2})
+    adapter.connect()
+    for symbol, exchange in recording_symbols(path):
+        adapter.subscribe(symbol, exchange, 2)
+
+    received = 0
+    first = last = None
+    while True:
+        if subscriber.poll(500):
+            subscriber.recv_multipart()
+            last = time.perf_counter()
+            first = first or last
+            received += 1
+        elif adapter.finished.is_set():
+            break
+    records = adapter.replayed
+    adapter.disconnect()
+    subscriber.close(linger=0)
+    return records, received, (last - first) if received > 1 else 0.0
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed_auth():
+    from database import auth_db
+    auth_db.init_db()
+    auth_db.upsert_api_key(USER_ID, API_KEY)
+    auth_db.upsert_auth(USER_ID, 'replay-token', 'zerodha')
+
+
+def start_proxy():
+    from websocket_proxy.server import WebSocketProxy
+    proxy = WebSocketProxy(host='127.0.0.1', port=free_port())
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(proxy.start(),), daemon=True)
+    thread.start()
+    return proxy
+
+
+async def replay_through_proxy(port, symbols, speed, idle_timeout):
+    """Subscribe a websocket client to every symbol; returns (ticks, seconds, lags)."""
+    import websockets
+
+    arrivals = []
+    async with websockets.connect(f'ws://127.0.0.1:{port}', max_size=None) as ws:
+        await ws.send(json.dumps({'action': 'authenticate', 'api_key': API_KEY}))
+        await ws.recv()
+        await ws.send(json.dumps({
+            'action': 'subscribe', 'mode': 'Quote',
+            'symbols': [{'symbol': symbol, 'exchange': exchange} for symbol, exchange in sorted(symbols)],
+        }))
+        while True:
+            try:
+                message = json.loads(await asyncio.wait_for(ws.recv(), timeout=idle_timeout))
+            except asyncio.TimeoutError:
+                break
+            if message.get('type') == 'market_data':
+                arrivals.append((time.time(), message['data'].get('ltt', 0) / 1000))
+
+    if len(arrivals) < 2:
+        return len(arrivals), 0.0, []
+    elapsed = arrivals[-1][0] - arrivals[0][0]
+    lags = []
+    if speed:
+        # Lag behind the recorded schedule, relative to the best delivered tick
+        first_ts = min(ts for _, ts in arrivals)
+        offsets = [received - (ts - first_ts) / speed for received, ts in arrivals]
+        base = min(offsets)
+        lags = sorted((offset - base) * 1000 for offset in offsets)
+    return len(arrivals), elapsed, lags
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded market data through the streaming path')
+    parser.add_argument('--symbols', type=int, default=100, help='Symbols in synthesized recordings')
+    parser.add_argument('--ticks', type=int, default=50000, help='Ticks in the synthesized tick recording')
+    parser.add_argument('--rate', type=float, default=500, help='Recorded ticks per second of the tick recording')
+    parser.add_argument('--proxy-ticks', type=int, default=5000, help='Ticks replayed through the proxy')
+    parser.add_argument('--frames', type=int, default=2000, help='Frames per synthesized frame recording')
+    parser.add_argument('--packets', type=int, default=10, help='Packets per synthesized frame')
+    parser.add_argument('--speed', type=float, default=1, help='Paced replay speed for the proxy run')
+    parser.add_argument('--record-dir', help='Directory with captured *.jsonl / *.frames recordings')
+    parser.add_argument('--log-level', default='WARNING', help='Log level during replay')
+    args = parser.parse_args()
+
+    # Suppress records below the requested level (per-tick INFO logs by default)
+    logging.disable(logging.getLevelName(args.log_level.upper()) - 1)
+    rng = random.Random(42)
+    directory = tempfile.mkdtemp(prefix='openalgo_replay_')
+
+    if args.record_dir:
+        tick_paths = sorted(glob.glob(os.path.join(args.record_dir, '*.jsonl')))
+        frame_paths = sorted(glob.glob(os.path.join(args.record_dir, '*.frames')))
+    else:
+        tick_path = os.path.join(directory, 'ticks.jsonl')
+        synthesize_ticks(tick_path, args.symbols, args.ticks, args.rate, rng)
+        tick_paths = [tick_path]
+        frame_paths = []
+        print(f"{'Record tap':<22}{'Rate':>16}")
+        print(f"{'ticks (jsonl)':<22}{benchmark_tick_tap(directory, tick_path):>12,.0f} /s")
+        for broker in FRAME_REPLAYS:
+            path, rate = record_frames(directory, broker, args.symbols, args.frames, args.packets, rng)
+            frame_paths.append(path)
+            print(f"{broker + ' frames':<22}{rate:>12,.0f} /s")
+        print()
+
+    replays = list(tick_paths) + list(frame_paths)
+    if tick_paths and arrow_available():
+        parquet_path = os.path.splitext(tick_paths[0])[0] + '.parquet'
+        tick_recording_to_parquet(tick_paths[0], parquet_path)
+        replays.insert(1, parquet_path)
+
+    print(f"{'Adapter -> ZeroMQ':<34}{'Records':>10}{'Ticks':>10}{'Seconds':>10}{'Ticks/s':>12}")
+    for path in replays:
+        records, received, elapsed = replay_to_zmq(path)
+        rate = received / elapsed if elapsed else 0.0
+        print(f"{os.path.basename(path):<34}{records:>10}{received:>10}{elapsed:>10.3f}{rate:>12,.0f}")
+
+    if not tick_paths:
+        return
+    print()
+    seed_auth()
+    # The first --proxy-ticks ticks of the recording
+    proxy_path = os.path.join(directory, 'proxy_ticks.jsonl')
+    with open(tick_paths[0], encoding='utf-8') as source, open(proxy_path, 'w', encoding='utf-8') as target:
+        for _, line in zip(range(args.proxy_ticks), source):
+            target.write(line)
+    symbols = recording_symbols(proxy_path)
+    print(f"{'Replay -> proxy -> client':<28}{'Ticks':>10}{'Seconds':>10}{'Ticks/s':>12}"
+          f"{'Lag p50 ms':>12}{'Lag p99 ms':>12}")
+    for speed in ('max', args.speed):
+        os.environ['WEBSOCKET_REPLAY_FILE'] = proxy_path
+        os.environ['WEBSOCKET_REPLAY_SPEED'] = str(speed)
+        os.environ['WEBSOCKET_REPLAY_START_DELAY'] = '0.5'
+        proxy = start_proxy()
+        time.sleep(0.5)
+        ticks, elapsed, lags = asyncio.run(
+            replay_through_proxy(proxy.port, symbols, 0 if speed == 'max' else float(speed), idle_timeout=3.0))
+        proxy.running = False
+        label = 'max speed' if speed == 'max' else f'{speed:g}x'
+        lag = f"{percentile(lags, 50):>12.2f}{percentile(lags, 99):>12.2f}" if lags else f"{'-':>12}{'-':>12}"
+        print(f"{label:<28}{ticks:>10}{elapsed:>10.3f}{ticks / elapsed if elapsed else 0:>12,.0f}{lag}")
+
+
+if __name__ == '__main__':
+    main()
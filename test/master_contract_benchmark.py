@@ -0,0 +1,149 @@
+"""
+Master Contract Ingestion Benchmark
+
+Loads a synthetic 150k-row master contract into an empty temporary SQLite
+table twice: once with the legacy per-broker path (row-wise symbol formatting,
+to_dict + bulk_insert_mappings) and once with the shared vectorized
+ingestion engine in database/master_contract_ingest.py. It then applies a
+next-day contract (expired rows dropped, new strikes added) incrementally.
+
+Usage:
+    python test/master_contract_benchmark.py --rows 150000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Point the database modules at a throwaway SQLite file before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from database.symbol import SymToken, db_session, init_db
+from database.master_contract_ingest import MasterContractLoader, build_derivative_symbols
+
+
+def generate_contract(rows):
+    """Build a raw broker-style contract frame with equities, futures and options."""
+    rng = np.random.default_rng(42)
+    names = np.array([f"UNDERLYING{i}" for i in range(200)])
+    expiries = np.array(['27-MAR-25', '24-APR-25', '29-MAY-25', '26-JUN-25'])
+    instrument = rng.choice(['EQ', 'FUT', 'CE', 'PE'], size=rows, p=[0.05, 0.05, 0.45, 0.45])
+    name = rng.choice(names, size=rows)
+    strike = np.where(np.isin(instrument, ['CE', 'PE']),
+                      (rng.integers(100, 5000, size=rows) * 10).astype(float), 0.0)
+    df = pd.DataFrame({
+        'token': np.arange(rows).astype(str),
+        'name': name,
+        'expiry': np.where(instrument == 'EQ', '', rng.choice(expiries, size=rows)),
+        'strike': strike,
+        'lotsize': rng.integers(1, 1800, size=rows),
+        'instrumenttype': instrument,
+        'exchange': np.where(instrument == 'EQ', 'NSE', 'NFO'),
+        'tick_size': 0.05,
+    })
+    df['symbol'] = df['name']
+    df['brsymbol'] = df['name'] + ' ' + df['expiry'] + ' ' + df['instrumenttype']
+    df['brexchange'] = df['exchange']
+    return df
+
+
+def legacy_format_symbol(row):
+    if row['instrumenttype'] == 'FUT':
+        return f"{row['name']}{row['expiry'].replace('-', '')}FUT"
+    if row['instrumenttype'] in ('CE', 'PE'):
+        return f"{row['name']}{row['expiry'].replace('-', '')}{int(row['strike'])}{row['instrumenttype']}"
+    return row['symbol']
+
+
+def clear_symtoken():
+    """Empty the table so each timed load starts from the same state."""
+    SymToken.query.delete()
+    db_session.commit()
+    db_session.remove()
+
+
+def run_legacy(df):
+    start = time.perf_counter()
+    df = df.copy()
+    df['symbol'] = df.apply(legacy_format_symbol, axis=1)
+    format_done = time.perf_counter()
+
+    SymToken.query.delete()
+    db_session.commit()
+    data_dict = df.to_dict(orient='records')
+    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
+    filtered = [row for row in data_dict if row['token'] not in existing_tokens]
+    db_session.bulk_insert_mappings(SymToken, filtered)
+    db_session.commit()
+    end = time.perf_counter()
+    return format_done - start, end - format_done
+
+
+def run_engine(df):
+    start = time.perf_counter()
+    df = df.copy()
+    df['symbol'] = build_derivative_symbols(df, keep_fraction=False)
+    format_done = time.perf_counter()
+
+    loader = MasterContractLoader()
+    loader.add(df)
+    loader.commit()
+    end = time.perf_counter()
+    return format_done - start, end - format_done
+
+
+def next_day_contract(df, churn):
+    """Drop ``churn`` of the rows and append as many new ones."""
+    drop = int(len(df) * churn)
+    new_rows = generate_contract(drop)
+    new_rows['token'] = (np.arange(drop) + len(df)).astype(str)
+    new_rows['symbol'] = build_derivative_symbols(new_rows, keep_fraction=False)
+    return pd.concat([df.iloc[drop:], new_rows], ignore_index=True)
+
+
+def run_incremental(df):
+    start = time.perf_counter()
+    loader = MasterContractLoader()
+    loader.add(df)
+    loader.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Master contract ingestion benchmark')
+    parser.add_argument('--rows', type=int, default=150000, help='Number of contract rows')
+    parser.add_argument('--churn', type=float, default=0.02, help='Fraction of rows replaced the next day')
+    args = parser.parse_args()
+
+    init_db()
+    df = generate_contract(args.rows)
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(f"Rows: {len(df)}")
+
+    clear_symtoken()
+    legacy_format, legacy_load = run_legacy(df)
+    clear_symtoken()
+    engine_format, engine_load = run_engine(df)
+    count = SymToken.query.count()
+
+    next_df = next_day_contract(df, args.churn)
+    next_df['symbol'] = build_derivative_symbols(next_df, keep_fraction=False)
+    incremental = run_incremental(next_df)
+
+    print(f"{'Path':<10}{'Format (s)':>12}{'Load (s)':>12}{'Total (s)':>12}")
+    print(f"{'legacy':<10}{legacy_format:>12.3f}{legacy_load:>12.3f}{legacy_format + legacy_load:>12.3f}")
+    print(f"{'engine':<10}{engine_format:>12.3f}{engine_load:>12.3f}{engine_format + engine_load:>12.3f}")
+    print(f"{'diff':<10}{'':>12}{incremental:>12.3f}{incremental:>12.3f}  ({args.churn:.0%} churn)")
+    print(f"Rows in symtoken after engine load: {count}")
+
+
+if __name__ == '__main__':
+    main()
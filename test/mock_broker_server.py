@@ -0,0 +1,420 @@
+"""
+Mock Broker Server
+
+A local HTTP server emulating the order REST endpoints of three reference
+brokers, so the order path can be exercised and load-tested without a broker
+account:
+
+- Zerodha: /orders, /orders/regular, /portfolio/positions, /trades, /portfolio/holdings
+- Angel One: /rest/secure/angelbroking/order/v1/* and portfolio/v1/getAllHolding
+- Dhan: /v2/orders, /v2/positions, /v2/trades, /v2/holdings
+
+Orders are kept in memory per broker: MARKET orders fill at once and move the
+net position, every other order type rests open until cancelled. Each request
+can be delayed (fixed latency plus uniform jitter) and failed at random with
+the broker's own error body.
+
+Broker plugins hard-code their base URLs, so redirect_client() adds a request
+hook to an httpx client (such as OpenAlgo's shared broker client) that sends
+every request to the mock instead; the broker is told apart by the request
+path. Only loopback addresses are accepted as targets.
+
+Usage:
+    python test/mock_broker_server.py --port 8899 --latency-ms 20 --jitter-ms 5 --error-rate 0.01
+"""
+
+import argparse
+import ipaddress
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import httpx
+
+ANGEL_ORDER = '/rest/secure/angelbroking/order/v1'
+
+# (method, path pattern, broker, action)
+ROUTES = [
+    ('POST', r'/orders/regular', 'zerodha', 'place'),
+    ('GET', r'/orders', 'zerodha', 'orders'),
+    ('GET', r'/orders/(?P<orderid>[^/]+)', 'zerodha', 'order'),
+    ('PUT', r'/orders/regular/(?P<orderid>[^/]+)', 'zerodha', 'modify'),
+    ('DELETE', r'/orders/regular/(?P<orderid>[^/]+)', 'zerodha', 'cancel'),
+    ('GET', r'/portfolio/positions', 'zerodha', 'positions'),
+    ('GET', r'/trades', 'zerodha', 'trades'),
+    ('GET', r'/portfolio/holdings', 'zerodha', 'holdings'),
+    ('POST', ANGEL_ORDER + r'/placeOrder', 'angel', 'place'),
+    ('GET', ANGEL_ORDER + r'/getOrderBook', 'angel', 'orders'),
+    ('POST', ANGEL_ORDER + r'/modifyOrder', 'angel', 'modify'),
+    ('POST', ANGEL_ORDER + r'/cancelOrder', 'angel', 'cancel'),
+    ('GET', ANGEL_ORDER + r'/getPosition', 'angel', 'positions'),
+    ('GET', ANGEL_ORDER + r'/getTradeBook', 'angel', 'trades'),
+    ('GET', r'/rest/secure/angelbroking/portfolio/v1/getAllHolding', 'angel', 'holdings'),
+    ('POST', r'/v2/orders', 'dhan', 'place'),
+    ('GET', r'/v2/orders', 'dhan', 'orders'),
+    ('GET', r'/v2/orders/(?P<orderid>[^/]+)', 'dhan', 'order'),
+    ('PUT', r'/v2/orders/(?P<orderid>[^/]+)', 'dhan', 'modify'),
+    ('DELETE', r'/v2/orders/(?P<orderid>[^/]+)', 'dhan', 'cancel'),
+    ('GET', r'/v2/positions', 'dhan', 'positions'),
+    ('GET', r'/v2/trades', 'dhan', 'trades'),
+    ('GET', r'/v2/holdings', 'dhan', 'holdings'),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + r'/?$'), broker, action)
+                   for method, pattern, broker, action in ROUTES]
+
+# Order and position field names of each broker
+FIELDS = {
+    'zerodha': {'orderid': 'order_id', 'status': 'status', 'symbol': 'tradingsymbol', 'exchange': 'exchange',
+                'product': 'product', 'side': 'transaction_type', 'type': 'order_type', 'quantity': 'quantity',
+                'net': 'quantity'},
+    'angel': {'orderid': 'orderid', 'status': 'status', 'symbol': 'tradingsymbol', 'exchange': 'exchange',
+              'product': 'producttype', 'side': 'transactiontype', 'type': 'ordertype', 'quantity': 'quantity',
+              'net': 'netqty'},
+    'dhan': {'orderid': 'orderId', 'status': 'orderStatus', 'symbol': 'tradingSymbol', 'exchange': 'exchangeSegment',
+             'product': 'productType', 'side': 'transactionType', 'type': 'orderType', 'quantity': 'quantity',
+             'net': 'netQty'},
+}
+
+STATUSES = {
+    'zerodha': {'open': 'OPEN', 'complete': 'COMPLETE', 'cancelled': 'CANCELLED'},
+    'angel': {'open': 'open', 'complete': 'complete', 'cancelled': 'cancelled'},
+    'dhan': {'open': 'PENDING', 'complete': 'TRADED', 'cancelled': 'CANCELLED'},
+}
+
+
+class BrokerError(Exception):
+    """A request the broker would reject"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def success_body(broker, data):
+    if broker == 'zerodha':
+        return {'status': 'success', 'data': data}
+    if broker == 'angel':
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': data}
+    return data
+
+
+def error_body(broker, message):
+    if broker == 'zerodha':
+        return {'status': 'error', 'message': message, 'error_type': 'GeneralException', 'data': None}
+    if broker == 'angel':
+        return {'status': False, 'message': message, 'errorcode': 'AB1004', 'data': None}
+    return {'errorType': 'Order_Error', 'errorCode': 'DH-906', 'errorMessage': message}
+
+
+def order_ack(broker, order):
+    """Body of a place, modify or cancel response"""
+    fields = FIELDS[broker]
+    orderid = order[fields['orderid']]
+    if broker == 'zerodha':
+        return {'order_id': orderid}
+    if broker == 'angel':
+        return {'script': order.get('tradingsymbol'), 'orderid': orderid, 'uniqueorderid': orderid}
+    return {'orderId': orderid, 'orderStatus': order[fields['status']]}
+
+
+class MockBrokerBooks:
+    """In-memory order books and net positions of every emulated broker"""
+
+    def __init__(self, instruments=None):
+        # Dhan orders carry a security ID only; map it back to a trading symbol
+        self.instruments = instruments or {}
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(int(time.strftime('%y%m%d')) * 10 ** 9 + 1)
+        self.orders = {broker: {} for broker in FIELDS}
+        self.positions = {broker: {} for broker in FIELDS}
+
+    def reset(self):
+        with self.lock:
+            for broker in FIELDS:
+                self.orders[broker].clear()
+                self.positions[broker].clear()
+
+    def place(self, broker, request):
+        fields = FIELDS[broker]
+        order = dict(request)
+        if broker == 'dhan':
+            order['tradingSymbol'] = self.instruments.get(str(order.get('securityId')), order.get('securityId'))
+        try:
+            quantity = int(float(order[fields['quantity']]))
+            side = order[fields['side']].upper()
+            symbol = order[fields['symbol']]
+        except (KeyError, TypeError, ValueError) as e:
+            raise BrokerError(f'Invalid order: {e}')
+        if quantity <= 0 or side not in ('BUY', 'SELL'):
+            raise BrokerError('Invalid quantity or transaction type')
+
+        with self.lock:
+            orderid = str(next(self.sequence))
+            order[fields['orderid']] = orderid
+            if str(order.get(fields['type'], '')).upper() == 'MARKET':
+                order[fields['status']] = STATUSES[broker]['complete']
+                key = (symbol, order.get(fields['exchange']), order.get(fields['product']))
+                signed = quantity if side == 'BUY' else -quantity
+                self.positions[broker][key] = self.positions[broker].get(key, 0) + signed
+            else:
+                order[fields['status']] = STATUSES[broker]['open']
+            self.orders[broker][orderid] = order
+        return order
+
+    def rest_orders(self, broker, count, symbol='MOCK', exchange='NSE', product='MIS'):
+        """Add open LIMIT orders straight to a book"""
+        fields = FIELDS[broker]
+        for _ in range(count):
+            self.place(broker, {fields['symbol']: symbol, fields['exchange']: exchange, fields['product']: product,
+                                fields['side']: 'BUY', fields['type']: 'LIMIT', fields['quantity']: 1,
+                                'securityId': symbol})
+
+    def _open_order(self, broker, orderid):
+        order = self.orders[broker].get(str(orderid))
+        if order is None:
+            raise BrokerError(f'Order {orderid} not found')
+        if order[FIELDS[broker]['status']] != STATUSES[broker]['open']:
+            raise BrokerError(f'Order {orderid} is not open')
+        return order
+
+    def modify(self, broker, orderid, request):
+        fields = FIELDS[broker]
+        with self.lock:
+            order = self._open_order(broker, orderid)
+            for name in ('price', 'triggerprice', 'triggerPrice', 'trigger_price', fields['quantity']):
+                if name in request:
+                    order[name] = request[name]
+            return order
+
+    def cancel(self, broker, orderid):
+        with self.lock:
+            order = self._open_order(broker, orderid)
+            order[FIELDS[broker]['status']] = STATUSES[broker]['cancelled']
+            return order
+
+    def order_list(self, broker):
+        with self.lock:
+            return [dict(order) for order in self.orders[broker].values()]
+
+    def order(self, broker, orderid):
+        with self.lock:
+            order = self.orders[broker].get(str(orderid))
+            if order is None:
+                raise BrokerError(f'Order {orderid} not found')
+            return dict(order)
+
+    def position_list(self, broker):
+        fields = FIELDS[broker]
+        with self.lock:
+            items = list(self.positions[broker].items())
+        positions = []
+        for (symbol, exchange, product), quantity in items:
+            positions.append({fields['symbol']: symbol, fields['exchange']: exchange, fields['product']: product,
+                              # Angel reports quantities as strings
+                              fields['net']: str(quantity) if broker == 'angel' else quantity})
+        return positions
+
+
+class MockBrokerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY the body
+    # waits on the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not raw:
+            return {}
+        if 'form-urlencoded' in self.headers.get('Content-Type', ''):
+            return dict(parse_qsl(raw.decode()))
+        return json.loads(raw)
+
+    def dispatch(self):
+        start = time.perf_counter()
+        server = self.server
+        path = self.path.split('?', 1)[0]
+        for method, pattern, broker, action in COMPILED_ROUTES:
+            match = pattern.match(path)
+            if method == self.command and match:
+                break
+        else:
+            self.send_json(404, {'status': 'error', 'message': f'No mock route for {self.command} {path}'})
+            return
+
+        status, body = 200, None
+        try:
+            request = self.read_body()
+            server.delay()
+            if server.inject_error():
+                status, body = 500, error_body(broker, 'Injected mock broker error')
+            else:
+                body = success_body(broker, server.handle(broker, action, match.groupdict().get('orderid'), request))
+        except BrokerError as e:
+            status, body = e.status, error_body(broker, e.message)
+        except ValueError as e:
+            status, body = 400, error_body(broker, f'Invalid request body: {e}')
+        self.send_json(status, body)
+        server.record(broker, action, time.perf_counter() - start)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def redirect_client(client, url):
+    """
+    Send every request made on an httpx client to the mock broker at url.
+
+    Args:
+        client: httpx.Client to redirect, e.g. utils.httpx_client.get_httpx_client()
+        url: Base URL of the mock broker; must be a loopback address
+
+    Raises:
+        ValueError: If url is not on a loopback address
+    """
+    target = httpx.URL(url)
+    try:
+        loopback = target.host == 'localhost' or ipaddress.ip_address(target.host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"Refusing to redirect broker requests to non-loopback host {target.host!r}")
+
+    def redirect(request):
+        request.url = request.url.copy_with(scheme=target.scheme, host=target.host, port=target.port)
+
+    client.event_hooks['request'].insert(0, redirect)
+
+
+class MockBrokerServer(ThreadingHTTPServer):
+    """
+    Threaded mock broker with configurable latency and error injection.
+
+    Args:
+        address: (host, port) to listen on, port 0 picks a free one
+        latency_ms: Delay added to every request
+        jitter_ms: Uniform jitter around latency_ms
+        error_rate: Fraction of requests answered with an HTTP 500 broker error
+        instruments: Security ID -> trading symbol, for Dhan positions
+        seed: Random seed for jitter and error injection
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address=('127.0.0.1', 0), latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 instruments=None, seed=None):
+        super().__init__(address, MockBrokerHandler)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.books = MockBrokerBooks(instruments)
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        # (broker, action, seconds) of every request served
+        self.timings = []
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='mock-broker', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        self.books.reset()
+        self.timings = []
+
+    def delay(self):
+        if not (self.latency or self.jitter):
+            return
+        with self.random_lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency + jitter))
+
+    def inject_error(self):
+        if not self.error_rate:
+            return False
+        with self.random_lock:
+            return self.random.random() < self.error_rate
+
+    def record(self, broker, action, seconds):
+        self.timings.append((broker, action, seconds))
+
+    def handle(self, broker, action, orderid, request):
+        books = self.books
+        if action == 'place':
+            return order_ack(broker, books.place(broker, request))
+        if action == 'cancel':
+            return order_ack(broker, books.cancel(broker, orderid or request.get('orderid')))
+        if action == 'modify':
+            return order_ack(broker, books.modify(broker, orderid or request.get('orderid'), request))
+        if action == 'orders':
+            return books.order_list(broker)
+        if action == 'order':
+            order = books.order(broker, orderid)
+            return [order] if broker == 'zerodha' else order
+        if action == 'positions':
+            positions = books.position_list(broker)
+            return {'net': positions, 'day': []} if broker == 'zerodha' else positions
+        if action == 'holdings' and broker == 'angel':
+            return {'holdings': [], 'totalholding': None}
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve mock Zerodha, Angel One and Dhan order APIs')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8899, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform jitter around the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failed with HTTP 500')
+    args = parser.parse_args()
+
+    server = MockBrokerServer((args.host, args.port), args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Mock broker listening on {server.url} (redirect a client with redirect_client(client, '{server.url}'))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {len(server.timings)} requests")
+
+
+if __name__ == '__main__':
+    main()
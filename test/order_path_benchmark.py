@@ -0,0 +1,261 @@
+"""
+Order Path Benchmark
+
+Drives the order REST API end to end against the mock broker server in
+test/mock_broker_server.py: HTTP client -> Flask /api/v1 -> order services ->
+broker plugin -> shared httpx client -> mock broker.
+
+For each broker, placeorder, placesmartorder, basketorder, splitorder and
+cancelallorder are sent open loop at a fixed request rate (cancelallorder at
+its own, lower rate). Latency is counted
+from the time a request was due, so a stalled server shows up as latency
+instead of a lower send rate. Reported per endpoint and stage:
+
+- rest: API request to response, as a strategy sees it
+- broker: each broker HTTP call made by the plugin, timed on the shared client
+- mock: time the mock broker spent on those calls (including injected latency)
+
+Usage:
+    python test/order_path_benchmark.py --brokers zerodha angel dhan --rate 50 --requests 500 --latency-ms 20
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Point the database modules at throwaway SQLite files before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'orders.db')}"
+os.environ['LATENCY_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'latency.db')}"
+os.environ['LOGS_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'logs.db')}"
+# The benchmark sets the request rate, not the API rate limiter
+os.environ['API_RATE_LIMIT'] = '1000000 per second'
+os.environ['SMART_ORDER_DELAY'] = '0'
+os.environ.setdefault('BROKER_API_KEY', 'benchmark')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from flask import Flask
+from werkzeug.serving import make_server
+
+from database import apilog_db, auth_db, settings_db, symbol
+from database.db_engine import log_writer
+from database.symbol import SymToken
+from extensions import socketio
+from limiter import limiter
+from mock_broker_server import MockBrokerServer, redirect_client
+from utils.broker_registry import load_brokers
+
+ENDPOINTS = ('placeorder', 'placesmartorder', 'basketorder', 'splitorder', 'cancelallorder')
+
+
+def seed_symbols(count):
+    symbol.Base.metadata.create_all(bind=symbol.engine)
+    with symbol.engine.begin() as conn:
+        conn.execute(SymToken.__table__.insert(), [
+            {'symbol': f'SYM{i}', 'brsymbol': f'SYM{i}', 'name': f'SYM{i}', 'exchange': 'NSE', 'brexchange': 'NSE',
+             'token': str(1000 + i), 'expiry': '', 'strike': 0.0, 'lotsize': 1, 'instrumenttype': 'EQ',
+             'tick_size': 0.05}
+            for i in range(count)
+        ])
+    return {str(1000 + i): f'SYM{i}' for i in range(count)}
+
+
+def seed_accounts(brokers):
+    """One user, API key and broker login per broker"""
+    auth_db.init_db()
+    keys = {}
+    for broker in brokers:
+        user = f'bench_{broker}'
+        keys[broker] = f'benchmark-{broker}-' + '0' * 40
+        auth_db.upsert_api_key(user, keys[broker])
+        auth_db.upsert_auth(user, f'{broker}-token', broker)
+    return keys
+
+
+def start_api_server():
+    # Imported after the database setup, as the app does
+    from restx_api import api_v1_bp
+
+    app = Flask(__name__)
+    limiter.init_app(app)
+    socketio.init_app(app)
+    app.register_blueprint(api_v1_bp)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='api-server', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/api/v1'
+
+
+class BrokerCallTimer:
+    """Times every request made on the shared broker httpx client"""
+
+    def __init__(self, client):
+        self.started = {}
+        self.timings = []
+        client.event_hooks['request'].append(self.on_request)
+        client.event_hooks['response'].append(self.on_response)
+
+    def on_request(self, request):
+        self.started[id(request)] = time.perf_counter()
+
+    def on_response(self, response):
+        start = self.started.pop(id(response.request), None)
+        if start is not None:
+            self.timings.append(time.perf_counter() - start)
+
+    def reset(self):
+        self.started.clear()
+        self.timings = []
+
+
+def make_payloads(endpoint, api_key, count, symbols, basket_size, split_legs):
+    base = {'apikey': api_key, 'strategy': 'benchmark', 'exchange': 'NSE', 'product': 'MIS'}
+    payloads = []
+    for i in range(count):
+        name = f'SYM{i % symbols}'
+        if endpoint == 'placeorder':
+            # Every other order is a LIMIT order left open for cancelallorder
+            payload = dict(base, symbol=name, action='BUY' if i % 4 < 2 else 'SELL', quantity='1',
+                           pricetype='MARKET' if i % 2 else 'LIMIT', price='0' if i % 2 else '100')
+        elif endpoint == 'placesmartorder':
+            payload = dict(base, symbol=name, action='BUY', quantity='1', pricetype='MARKET',
+                           position_size=str(i % 3 - 1))
+        elif endpoint == 'basketorder':
+            payload = {'apikey': api_key, 'strategy': 'benchmark', 'orders': [
+                {'symbol': f'SYM{(i + leg) % symbols}', 'exchange': 'NSE', 'action': 'BUY' if leg % 2 else 'SELL',
+                 'quantity': '1', 'pricetype': 'MARKET', 'product': 'MIS'}
+                for leg in range(basket_size)
+            ]}
+        elif endpoint == 'splitorder':
+            payload = dict(base, symbol=name, action='BUY', quantity=str(split_legs * 10), splitsize='10',
+                           pricetype='MARKET')
+        else:
+            payload = {'apikey': api_key, 'strategy': 'benchmark'}
+        payloads.append(payload)
+    return payloads
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def drive(client, url, payloads, rate, workers, prepare=None):
+    """Send payloads open loop at rate/s; returns (latencies, ok count, elapsed)"""
+    latencies = []
+    ok = [0]
+    lock = threading.Lock()
+
+    def send(payload, due):
+        try:
+            response = client.post(url, json=payload)
+            success = response.status_code == 200 and response.json().get('status') == 'success'
+        except (httpx.HTTPError, ValueError):
+            success = False
+        latency = time.perf_counter() - due
+        with lock:
+            latencies.append(latency)
+            ok[0] += success
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, payload in enumerate(payloads):
+            due = start + i / rate
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            if prepare:
+                prepare()
+            pool.submit(send, payload, due)
+    return latencies, ok[0], time.perf_counter() - start
+
+
+def run_broker(broker, api_key, api_url, mock, timer, args):
+    client = httpx.Client(timeout=60.0, limits=httpx.Limits(max_connections=args.workers))
+    mock.reset()
+    print(f"\n{broker}")
+    print(f"{'Endpoint':<16}{'Sent':>6}{'Req/s':>8}{'OK':>6}{'REST p50':>10}{'REST p99':>10}"
+          f"{'Calls/req':>11}{'Broker p50':>12}{'Broker p99':>12}{'Mock p50':>10}{'Mock p99':>10}")
+    for endpoint in args.endpoints:
+        payloads = make_payloads(endpoint, api_key, args.requests, args.symbols, args.basket_size, args.split_legs)
+        # One unmeasured request first; for cancelallorder it also clears placeorder's open orders
+        client.post(f'{api_url}/{endpoint}', json=payloads[0])
+        prepare = None
+        if endpoint == 'cancelallorder':
+            prepare = lambda: mock.books.rest_orders(broker, args.open_orders)
+        mock.timings = []
+        timer.reset()
+        rate = args.cancel_all_rate if endpoint == 'cancelallorder' else args.rate
+        latencies, ok, elapsed = drive(client, f'{api_url}/{endpoint}', payloads, rate, args.workers, prepare)
+        broker_times = list(timer.timings)
+        mock_times = [seconds for name, _, seconds in mock.timings if name == broker]
+        ms = lambda values, fraction: percentile(values, fraction) * 1000
+        print(f"{endpoint:<16}{len(payloads):>6}{len(payloads) / elapsed:>8.1f}{ok:>6}"
+              f"{ms(latencies, 0.5):>10.1f}{ms(latencies, 0.99):>10.1f}"
+              f"{len(broker_times) / len(payloads):>11.1f}"
+              f"{ms(broker_times, 0.5):>12.1f}{ms(broker_times, 0.99):>12.1f}"
+              f"{ms(mock_times, 0.5):>10.1f}{ms(mock_times, 0.99):>10.1f}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the order REST API against a mock broker')
+    parser.add_argument('--brokers', nargs='+', default=['zerodha', 'angel', 'dhan'],
+                        choices=['zerodha', 'angel', 'dhan'], help='Brokers to emulate')
+    parser.add_argument('--endpoints', nargs='+', default=list(ENDPOINTS), choices=ENDPOINTS,
+                        help='Endpoints to drive, in order')
+    parser.add_argument('--rate', type=float, default=50, help='Requests per second per endpoint')
+    parser.add_argument('--cancel-all-rate', type=float, default=5,
+                        help='Requests per second for cancelallorder; overlapping cancel-alls of an account '
+                             'each cancel the same open orders, so this runs away at higher rates')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+    parser.add_argument('--workers', type=int, default=64, help='Concurrent client requests')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Mock broker delay per call')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='Uniform jitter around the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of broker calls failed')
+    parser.add_argument('--symbols', type=int, default=50, help='Symbols traded')
+    parser.add_argument('--basket-size', type=int, default=5, help='Orders per basket')
+    parser.add_argument('--split-legs', type=int, default=5, help='Orders per split order')
+    parser.add_argument('--open-orders', type=int, default=2, help='Open orders added per cancel-all request')
+    args = parser.parse_args()
+
+    # Per-order logs would dominate the timings; failed requests show in the OK column
+    logging.disable(logging.ERROR)
+
+    instruments = seed_symbols(args.symbols)
+    keys = seed_accounts(args.brokers)
+    apilog_db.init_db()
+    settings_db.init_db()
+    settings_db.set_analyze_mode(False)
+    load_brokers(args.brokers)
+
+    mock = MockBrokerServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                            instruments=instruments, seed=1).start()
+    from utils.httpx_client import get_httpx_client
+    broker_client = get_httpx_client()
+    redirect_client(broker_client, mock.url)
+    timer = BrokerCallTimer(broker_client)
+
+    api_server, api_url = start_api_server()
+    print(f"Mock broker {mock.url}: {args.latency_ms:g} ms +/- {args.jitter_ms:g} ms, "
+          f"error rate {args.error_rate:g}; {args.rate:g} req/s ({args.cancel_all_rate:g} for cancelallorder), "
+          f"{args.requests} requests per endpoint")
+    try:
+        for broker in args.brokers:
+            run_broker(broker, keys[broker], api_url, mock, timer, args)
+    finally:
+        api_server.shutdown()
+        mock.stop()
+        log_writer.flush()
+
+
+if __name__ == '__main__':
+    main()
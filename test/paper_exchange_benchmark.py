@@ -0,0 +1,145 @@
+"""
+Paper Exchange Benchmark
+
+Load-tests the analyze mode paper exchange:
+
+- engine: a mix of MARKET, LIMIT, SL and SL-M orders over many symbols with
+  ticks interleaved, reporting orders/sec, ticks/sec and the fills made
+- service: the same flow through place_order in analyze mode (validation,
+  analysis, paper fill, analyzer log), as a strategy would drive it
+
+Usage:
+    python test/paper_exchange_benchmark.py --orders 50000 --symbols 100 --service-orders 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Point the database modules at throwaway SQLite files before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'paper.db')}"
+os.environ['LATENCY_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'latency.db')}"
+os.environ['LOGS_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'logs.db')}"
+# Prices come from the benchmark's ticks only
+os.environ['PAPER_PRICE_MAX_AGE'] = '1e9'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from database import analyzer_db, settings_db, symbol
+from database.db_engine import log_writer
+from database.symbol import SymToken
+from extensions import socketio
+
+BROKER = 'paper'
+AUTH_TOKEN = 'benchmark'
+
+
+def seed_symbols(count):
+    symbol.Base.metadata.create_all(bind=symbol.engine)
+    with symbol.engine.begin() as conn:
+        conn.execute(SymToken.__table__.insert(), [
+            {'symbol': f'SYM{i}', 'brsymbol': f'SYM{i}', 'name': f'SYM{i}', 'exchange': 'NSE', 'brexchange': 'NSE',
+             'token': str(i), 'expiry': '', 'strike': 0.0, 'lotsize': 1, 'instrumenttype': 'EQ', 'tick_size': 0.05}
+            for i in range(count)
+        ])
+
+
+def random_order(rng, symbols, prices):
+    name = f'SYM{rng.randrange(symbols)}'
+    price = prices[name]
+    action = rng.choice(('BUY', 'SELL'))
+    pricetype = rng.choice(('MARKET', 'LIMIT', 'LIMIT', 'SL', 'SL-M'))
+    away = 1 if action == 'BUY' else -1
+    order = {'apikey': 'benchmark', 'strategy': 'benchmark', 'symbol': name, 'exchange': 'NSE', 'action': action,
+             'quantity': str(rng.randint(1, 10)), 'pricetype': pricetype, 'product': 'MIS'}
+    if pricetype == 'LIMIT':
+        order['price'] = str(round(price * (1 - away * rng.uniform(0, 0.01)), 2))
+    elif pricetype in ('SL', 'SL-M'):
+        trigger = price * (1 + away * rng.uniform(0, 0.01))
+        order['trigger_price'] = str(round(trigger, 2))
+        order['price'] = str(round(trigger * (1 + away * 0.002), 2))
+    return order
+
+
+def tick(rng, exchange, prices, symbols):
+    name = f'SYM{rng.randrange(symbols)}'
+    prices[name] = round(prices[name] * (1 + rng.uniform(-0.002, 0.002)), 2)
+    exchange.on_tick('NSE', name, prices[name])
+
+
+def run_engine(exchange, orders, symbols, ticks_per_order):
+    rng = random.Random(1)
+    prices = {f'SYM{i}': 100.0 + i for i in range(symbols)}
+    for name, price in prices.items():
+        exchange.on_tick('NSE', name, price)
+    batch = [random_order(rng, symbols, prices) for _ in range(orders)]
+
+    order_time = tick_time = 0.0
+    ticks = 0
+    for order in batch:
+        start = time.perf_counter()
+        exchange.place_order(BROKER, AUTH_TOKEN, order)
+        order_time += time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(ticks_per_order):
+            tick(rng, exchange, prices, symbols)
+        tick_time += time.perf_counter() - start
+        ticks += ticks_per_order
+
+    book = exchange.orderbook(BROKER, AUTH_TOKEN)
+    print(f"Engine:  {orders / order_time:>10,.0f} orders/s  {ticks / tick_time:>10,.0f} ticks/s  "
+          f"({len(exchange.tradebook(BROKER, AUTH_TOKEN))} fills, "
+          f"{book['statistics']['total_open_orders']} resting, "
+          f"{book['statistics']['total_rejected_orders']} rejected)")
+
+
+def run_service(exchange, orders, symbols):
+    # Imported after the database setup; restx_api first, as the app does
+    import restx_api  # noqa: F401
+    from services.place_order_service import place_order
+
+    rng = random.Random(2)
+    prices = {f'SYM{i}': 100.0 + i for i in range(symbols)}
+    for name, price in prices.items():
+        exchange.on_tick('NSE', name, price)
+    batch = [random_order(rng, symbols, prices) for _ in range(orders)]
+
+    start = time.perf_counter()
+    placed = 0
+    for order in batch:
+        success, response, _ = place_order(order, auth_token=AUTH_TOKEN, broker=BROKER)
+        placed += success and response.get('status') == 'success'
+    elapsed = time.perf_counter() - start
+    log_writer.flush()
+    print(f"Service: {orders / elapsed:>10,.0f} orders/s  ({placed} accepted, "
+          f"{len(exchange.tradebook(BROKER, AUTH_TOKEN))} fills)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analyze mode paper exchange')
+    parser.add_argument('--orders', type=int, default=50000, help='Orders sent straight to the engine')
+    parser.add_argument('--symbols', type=int, default=100, help='Symbols traded')
+    parser.add_argument('--ticks-per-order', type=int, default=2, help='Ticks fed between engine orders')
+    parser.add_argument('--service-orders', type=int, default=5000, help='Orders sent through place_order')
+    args = parser.parse_args()
+
+    analyzer_db.init_db()
+    settings_db.init_db()
+    settings_db.set_analyze_mode(True)
+    seed_symbols(args.symbols)
+    socketio.init_app(Flask(__name__))
+
+    from services.paper_exchange import PaperExchange, paper_exchange
+
+    run_engine(PaperExchange(), args.orders, args.symbols, args.ticks_per_order)
+    run_service(paper_exchange, args.service_orders, args.symbols)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Streaming Adapter Replay Benchmark
+
+Replays binary market data frames through the Zerodha, Dhan and Angel
+websocket decoders and adapters (decode -> subscription lookup -> normalize
+-> ZeroMQ publish) and reports ticks/sec. It also times the per-tick
+subscription lookup on its own: the legacy linear scan over all
+subscriptions against the token-keyed SubscriptionRegistry.
+
+Frames are read from a recording directory when given (one file per broker,
+``<broker>.frames``, each frame stored as a 4-byte big-endian length followed
+by the raw websocket payload, or a session captured with WEBSOCKET_RECORD_DIR
+renamed to ``<broker>.frames``); otherwise representative quote frames are
+synthesized.
+
+Usage:
+    python test/streaming_replay_benchmark.py --subscriptions 1000 --frames 2000
+    python test/streaming_replay_benchmark.py --record-dir recordings/
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+# Point the database modules at a throwaway SQLite file before importing them
+_tmp_dir = tempfile.mkdtemp(prefix='openalgo_bench_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.base_adapter import SubscriptionRegistry, default_topic
+from websocket_proxy.replay_adapter import FRAME_DATA, iter_frame_recording
+
+BROKERS = ('zerodha', 'dhan', 'angel')
+
+ZERODHA_QUOTE = struct.Struct('>11i')
+DHAN_QUOTE = struct.Struct('<BHBIfHIfIIIffff')
+ANGEL_QUOTE = struct.Struct('<BB25sqqqqqqddqqqq')
+
+
+def read_frames(path):
+    """Read the frames of a recording file (length-prefixed, or captured with WEBSOCKET_RECORD_DIR)."""
+    return [payload for kind, _, payload in iter_frame_recording(path) if kind == FRAME_DATA]
+
+
+def write_frames(path, frames):
+    """Write frames in the recording format read by :func:`read_frames`."""
+    with open(path, 'wb') as f:
+        for frame in frames:
+            f.write(struct.pack('>I', len(frame)))
+            f.write(frame)
+
+
+def synthesize_frames(broker, tokens, frame_count, packets_per_frame, rng):
+    """Build quote frames for the given broker's wire format."""
+    frames = []
+    for _ in range(frame_count):
+        chosen = [rng.choice(tokens) for _ in range(packets_per_frame)]
+        if broker == 'zerodha':
+            parts = [struct.pack('>H', len(chosen))]
+            for token in chosen:
+                price = rng.randint(10000, 500000)
+                parts.append(struct.pack('>H', ZERODHA_QUOTE.size))
+                parts.append(ZERODHA_QUOTE.pack(token, price, 10, price, 100000, 5000, 4000,
+                                                price, price + 100, price - 100, price))
+            frames.append(b''.join(parts))
+        elif broker == 'dhan':
+            frames.append(b''.join(
+                DHAN_QUOTE.pack(17, DHAN_QUOTE.size, 1, token, rng.uniform(100, 5000), 10,
+                                int(time.time()), 1000.0, 100000, 5000, 4000,
+                                1000.0, 1000.0, 1010.0, 990.0)
+                for token in chosen
+            ))
+        else:
+            # Angel sends one packet per websocket message
+            for token in chosen:
+                price = rng.randint(10000, 500000)
+                frames.append(ANGEL_QUOTE.pack(2, 1, str(token).encode(), 1, int(time.time() * 1000),
+                                               price, 10, price, 100000, 5000.0, 4000.0,
+                                               price, price + 100, price - 100, price))
+    return frames
+
+
+def build_adapter(broker, tokens):
+    """Create an adapter with ``tokens`` subscribed, without a broker connection."""
+    if broker == 'zerodha':
+        from broker.zerodha.streaming.zerodha_adapter import ZerodhaWebSocketAdapter
+        from broker.zerodha.streaming.zerodha_websocket import ZerodhaWebSocket
+        adapter = ZerodhaWebSocketAdapter()
+        for token in tokens:
+            symbol = f"SYM{token}"
+            adapter.subscribed_symbols[f"NSE:{symbol}"] = {
+                'exchange': 'NSE', 'symbol': symbol, 'token': token, 'mode': 2, 'mapped_exchange': 'NSE'
+            }
+            adapter.token_to_symbol[token] = (symbol, 'NSE')
+            adapter.subscription_registry.add(token, symbol, 'NSE', 2, replace=True, tick_mode='quote')
+        client = ZerodhaWebSocket('bench', 'bench')
+
+        def handle(frame):
+            adapter._handle_ticks(client._parse_binary_message(frame))
+        return adapter, handle
+
+    if broker == 'dhan':
+        from broker.dhan.streaming.dhan_adapter import DhanWebSocketAdapter
+        from broker.dhan.streaming.dhan_websocket import DhanWebSocket
+        adapter = DhanWebSocketAdapter()
+        adapter.broker_name = 'dhan'
+        for token in tokens:
+            symbol = f"SYM{token}"
+            adapter.subscribed_symbols[symbol] = {
+                'exchange': 'NSE', 'dhan_exchange': 'NSE_EQ', 'token': token, 'mode': 2, 'depth_level': 5
+            }
+            adapter.token_to_symbol[str(token)] = (symbol, 'NSE')
+            adapter.token_to_symbol[int(token)] = (symbol, 'NSE')
+            adapter.subscription_registry.add(
+                str(token), symbol, 'NSE', 2, replace=True,
+                legacy_topics={m: default_topic(symbol, 'NSE', m).encode() for m in ('LTP', 'QUOTE', 'DEPTH')}
+            )
+        client = DhanWebSocket('bench', 'bench', on_ticks=adapter._on_ticks)
+        loop = asyncio.new_event_loop()
+
+        def handle(frame):
+            loop.run_until_complete(client._process_binary_packet(frame))
+        return adapter, handle
+
+    from broker.angel.streaming.angel_adapter import AngelWebSocketAdapter
+    from broker.angel.streaming.smartWebSocketV2 import SmartWebSocketV2
+    adapter = AngelWebSocketAdapter()
+    for token in tokens:
+        symbol = f"SYM{token}"
+        token_list = [{'exchangeType': 1, 'tokens': [str(token)]}]
+        adapter.subscriptions[f"{symbol}_NSE_2"] = {
+            'symbol': symbol, 'exchange': 'NSE', 'brexchange': 'NSE', 'token': str(token), 'mode': 2,
+            'depth_level': 5, 'actual_depth': 5, 'token_list': token_list, 'is_fallback': False
+        }
+        adapter.subscription_registry.add((str(token), 1), symbol, 'NSE', 2)
+    # Only the parser is needed, skip the connection setup in __init__
+    client = SmartWebSocketV2.__new__(SmartWebSocketV2)
+
+    def handle(frame):
+        adapter._on_data(None, client._parse_binary_data(frame))
+    return adapter, handle
+
+
+def benchmark_lookup(subscription_count, lookups, rng):
+    """Time the per-tick subscription lookup: linear scan vs registry."""
+    lock = threading.Lock()
+    subscribed = {}
+    registry = SubscriptionRegistry()
+    tokens = list(range(100000, 100000 + subscription_count))
+    for token in tokens:
+        subscribed[f"NSE:SYM{token}"] = {'token': token, 'mode': 2, 'exchange': 'NSE'}
+        registry.add(token, f"SYM{token}", 'NSE', 2)
+    probes = [rng.choice(tokens) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    for token in probes:
+        with lock:
+            for sub_info in subscribed.values():
+                if sub_info['token'] == token:
+                    f"{sub_info['exchange']}_SYM{token}_QUOTE".encode()
+                    break
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for token in probes:
+        registry.get(token).topic
+    indexed = time.perf_counter() - start
+    return lookups / legacy, lookups / indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming adapter replay benchmark')
+    parser.add_argument('--subscriptions', type=int, default=1000, help='Subscribed tokens per adapter')
+    parser.add_argument('--frames', type=int, default=2000, help='Synthetic frames per broker')
+    parser.add_argument('--packets', type=int, default=10, help='Packets per synthetic frame')
+    parser.add_argument('--record-dir', help='Directory with <broker>.frames recordings')
+    parser.add_argument('--brokers', default=','.join(BROKERS), help='Comma separated brokers to replay')
+    parser.add_argument('--log-level', default='WARNING', help='Log level during replay')
+    args = parser.parse_args()
+
+    # Suppress records below the requested level (per-tick INFO logs by default)
+    logging.disable(logging.getLevelName(args.log_level.upper()) - 1)
+    rng = random.Random(42)
+    tokens = list(range(100000, 100000 + args.subscriptions))
+
+    legacy_rate, indexed_rate = benchmark_lookup(args.subscriptions, 20000, rng)
+    print(f"Subscriptions: {args.subscriptions}")
+    print(f"Lookup  legacy scan: {legacy_rate:>14,.0f} lookups/s")
+    print(f"Lookup  registry:    {indexed_rate:>14,.0f} lookups/s  ({indexed_rate / legacy_rate:.0f}x)")
+    print()
+    print(f"{'Broker':<10}{'Frames':>10}{'Ticks':>10}{'Seconds':>10}{'Ticks/s':>14}")
+
+    for broker in args.brokers.split(','):
+        broker = broker.strip()
+        if args.record_dir:
+            path = os.path.join(args.record_dir, f'{broker}.frames')
+            if not os.path.exists(path):
+                print(f"{broker:<10}{'no recording':>54}")
+                continue
+            frames = read_frames(path)
+        else:
+            frames = synthesize_frames(broker, tokens, args.frames, args.packets, rng)
+
+        adapter, handle = build_adapter(broker, tokens)
+        published = [0]
+        publish = adapter.publish_market_data
+
+        def counting_publish(topic, data, _publish=publish):
+            published[0] += 1
+            _publish(topic, data)
+        adapter.publish_market_data = counting_publish
+
+        start = time.perf_counter()
+        for frame in frames:
+            handle(frame)
+        elapsed = time.perf_counter() - start
+        adapter.cleanup_zmq()
+        print(f"{broker:<10}{len(frames):>10}{published[0]:>10}{elapsed:>10.3f}{published[0] / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
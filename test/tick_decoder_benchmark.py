@@ -0,0 +1,202 @@
+"""
+Tick Decoder Benchmark
+
+Measures packets/sec of the Zerodha and Dhan binary decoders on quote frames:
+
+- legacy:  slice every packet out of the frame and ``struct.unpack`` it with a
+           format string (the decoders before precompiled structs)
+- struct:  the websocket clients' per-packet dict decoders, which use
+           precompiled ``struct.Struct`` objects with ``unpack_from`` on a
+           memoryview of the frame
+- numpy:   ``decode_frame_columnar``, which decodes a whole frame into a
+           structured array in one vectorized step
+
+Frames are synthesized with the same generator as the streaming replay
+benchmark, or read from ``<broker>.frames`` recordings.
+
+Usage:
+    python test/tick_decoder_benchmark.py --frames 2000 --packets 50
+    python test/tick_decoder_benchmark.py --record-dir recordings/
+"""
+
+import argparse
+import logging
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Sets DATABASE_URL and sys.path before the broker modules are imported
+from streaming_replay_benchmark import read_frames, synthesize_frames
+
+BROKERS = ('zerodha', 'dhan')
+
+EXCHANGE_MAP = {0: 'IDX_I', 1: 'NSE_EQ', 2: 'NSE_FNO', 3: 'NSE_CURRENCY', 4: 'BSE_EQ', 5: 'MCX_COMM'}
+
+
+def legacy_zerodha(frame, token_exchange_map={}, lock=threading.Lock()):
+    """Zerodha quote decode with per-packet slices and format strings (previous decoder)."""
+    ticks = []
+    num_packets = struct.unpack('>H', frame[0:2])[0]
+    offset = 2
+    for _ in range(num_packets):
+        packet_length = struct.unpack('>H', frame[offset:offset + 2])[0]
+        offset += 2
+        packet = frame[offset:offset + packet_length]
+        instrument_token = struct.unpack('>I', packet[0:4])[0]
+        last_price = struct.unpack('>i', packet[4:8])[0] / 100.0
+        with lock:
+            exchange = token_exchange_map.get(instrument_token)
+        tick = {
+            'instrument_token': instrument_token,
+            'last_traded_price': last_price,
+            'last_price': last_price,
+            'mode': 'quote',
+            'timestamp': int(time.time() * 1000)
+        }
+        if exchange:
+            tick['source_exchange'] = exchange
+        fields = struct.unpack('>11i', packet[0:44])
+        tick.update({
+            'instrument_token': fields[0],
+            'last_traded_price': fields[1] / 100.0,
+            'last_price': fields[1] / 100.0,
+            'last_traded_quantity': fields[2],
+            'average_traded_price': fields[3] / 100.0,
+            'average_price': fields[3] / 100.0,
+            'volume_traded': fields[4],
+            'volume': fields[4],
+            'total_buy_quantity': fields[5],
+            'total_sell_quantity': fields[6],
+            'open_price': fields[7] / 100.0,
+            'high_price': fields[8] / 100.0,
+            'low_price': fields[9] / 100.0,
+            'close_price': fields[10] / 100.0,
+            'ohlc': {
+                'open': fields[7] / 100.0,
+                'high': fields[8] / 100.0,
+                'low': fields[9] / 100.0,
+                'close': fields[10] / 100.0
+            }
+        })
+        ticks.append(tick)
+        offset += packet_length
+    return ticks
+
+
+def legacy_dhan(frame):
+    """Dhan quote decode with per-packet slices and format strings (previous decoder)."""
+    ticks = []
+    offset = 0
+    while offset + 8 <= len(frame):
+        msg_type, msg_length, exchange_code, token = struct.unpack('<BHBI', frame[offset:offset + 8])
+        message = frame[offset:offset + msg_length]
+        unpacked = struct.unpack('<BHBIfHIfIIIffff', message[0:50])
+
+        def utc_time(epoch_time):
+            return datetime.fromtimestamp(epoch_time).strftime('%H:%M:%S')
+
+        ticks.append({
+            'symbol': '',
+            'exchange': EXCHANGE_MAP.get(unpacked[2], 'UNKNOWN'),
+            'token': unpacked[3],
+            'ltt': utc_time(unpacked[6]) if unpacked[6] > 0 else None,
+            'timestamp': utc_time(unpacked[6]) if unpacked[6] > 0 else None,
+            'ltp': round(unpacked[4], 2),
+            'volume': unpacked[8],
+            'oi': 0,
+            'open': round(unpacked[11], 2),
+            'high': round(unpacked[13], 2),
+            'low': round(unpacked[14], 2),
+            'close': round(unpacked[12], 2),
+            'mode': 'QUOTE',
+            'instrument_token': unpacked[3],
+            'last_price': round(unpacked[4], 2),
+            'last_quantity': unpacked[5],
+            'average_price': round(unpacked[7], 2),
+            'total_buy_quantity': unpacked[10],
+            'total_sell_quantity': unpacked[9]
+        })
+        offset += msg_length
+    return ticks
+
+
+def build_decoders(broker):
+    """Return (legacy, struct, numpy) frame decoders for the broker."""
+    import websocket_proxy  # noqa: F401  (imports the adapters before the broker packages)
+
+    if broker == 'zerodha':
+        from broker.zerodha.streaming.zerodha_websocket import ZerodhaWebSocket
+        client = ZerodhaWebSocket('bench', 'bench')
+        return legacy_zerodha, client._parse_binary_message, client.decode_frame_columnar
+
+    from broker.dhan.streaming.dhan_websocket import DhanWebSocket, _HEADER
+    client = DhanWebSocket('bench', 'bench')
+
+    def struct_dhan(frame):
+        view = memoryview(frame)
+        ticks = []
+        offset = 0
+        while offset + 8 <= len(view):
+            msg_length = _HEADER.unpack_from(view, offset)[1]
+            ticks.append(client._parse_quote_data(view[offset:offset + msg_length]))
+            offset += msg_length
+        return ticks
+    return legacy_dhan, struct_dhan, client.decode_frame_columnar
+
+
+def time_decoder(decode, frames, repeat):
+    """Best-of-``repeat`` wall time to decode all frames."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Binary tick decoder benchmark')
+    parser.add_argument('--subscriptions', type=int, default=1000, help='Distinct tokens in synthetic frames')
+    parser.add_argument('--frames', type=int, default=2000, help='Synthetic frames per broker')
+    parser.add_argument('--packets', type=int, default=50, help='Packets per synthetic frame')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per decoder (best is reported)')
+    parser.add_argument('--record-dir', help='Directory with <broker>.frames recordings')
+    parser.add_argument('--brokers', default=','.join(BROKERS), help='Comma separated brokers')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(42)
+    tokens = list(range(100000, 100000 + args.subscriptions))
+
+    print(f"{'Broker':<10}{'Decoder':<10}{'Packets':>10}{'Seconds':>10}{'Packets/s':>14}{'Speedup':>10}")
+    for broker in args.brokers.split(','):
+        broker = broker.strip()
+        if args.record_dir:
+            path = os.path.join(args.record_dir, f'{broker}.frames')
+            if not os.path.exists(path):
+                print(f"{broker:<10}{'no recording':>54}")
+                continue
+            frames = read_frames(path)
+        else:
+            frames = synthesize_frames(broker, tokens, args.frames, args.packets, rng)
+
+        legacy, precompiled, columnar = build_decoders(broker)
+        packets = sum(len(columnar(frame)) for frame in frames)
+        baseline = None
+        for name, decode in (('legacy', legacy), ('struct', precompiled), ('numpy', columnar)):
+            elapsed = time_decoder(decode, frames, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{broker:<10}{name:<10}{packets:>10}{elapsed:>10.3f}"
+                  f"{packets / elapsed:>14,.0f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,7 @@
-from datetime import datetime, timedelta
-import pytz
-from database.analyzer_db import AnalyzerLog, db_session
-from database.symbol import SymToken
-from sqlalchemy import func
+from datetime import datetime
+import threading
+from database.analyzer_db import AnalyzerLog, analyzer_stats, db_session, reserve_counter_block
+from database.token_db import get_token
 import json
 from extensions import socketio
 from utils.constants import (
@@ -26,63 +25,78 @@ from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
-# Global variable to track order sequence
-_order_sequence = 0
+# Order IDs are YYMMDD + a 5 digit sequence that wraps after 99999
+ORDER_SEQUENCE_MAX = 99999
+ORDER_SEQUENCE_COUNTER = 'order_sequence'
 
-def generate_order_id():
-    """Generate a sequential order ID in format YYMMDDXXXXXXXX"""
-    global _order_sequence
-    now = datetime.now()
-    date_prefix = now.strftime("%y%m%d")
-    
-    # Get the last order from analyzer logs to ensure sequence continuity
+# Sequence values reserved in the counter row per database write
+ORDER_SEQUENCE_BLOCK_SIZE = 100
+
+# Requests per minute above which analyzed requests carry a rate warning
+REQUEST_RATE_WARNING_THRESHOLD = 50
+
+def _last_logged_order_sequence():
+    """Sequence of the newest logged analyzer order, used once when the counter row is created"""
     try:
         last_order = AnalyzerLog.query.filter(
-            AnalyzerLog.response_data.like('%"orderid": "%"')
-        ).order_by(AnalyzerLog.created_at.desc()).first()
-        
+            AnalyzerLog.response_data.like('%"orderid": "%')
+        ).order_by(AnalyzerLog.id.desc()).first()
+
         if last_order:
-            try:
-                last_response = json.loads(last_order.response_data)
-                last_orderid = last_response.get('orderid', '')
-                if len(last_orderid) >= 5:  # Ensure there's a sequence number
-                    _order_sequence = int(last_orderid[-5:])
-            except (json.JSONDecodeError, ValueError):
-                pass
+            last_orderid = json.loads(last_order.response_data).get('orderid', '')
+            if len(last_orderid) >= 5:  # Ensure there's a sequence number
+                return int(last_orderid[-5:])
     except Exception as e:
         logger.error(f"Error getting last order sequence: {e}")
-    
-    # Increment sequence
-    _order_sequence += 1
-    
-    # Reset sequence if it exceeds 99999
-    if _order_sequence > 99999:
-        _order_sequence = 1
-    
+    finally:
+        db_session.remove()
+    return 0
+
+class OrderIdSequence:
+    """
+    Thread-safe in-memory order ID sequence.
+
+    Values are reserved from the analyzer counter row a block at a time, so
+    only one ID in ORDER_SEQUENCE_BLOCK_SIZE touches the database and a
+    restart resumes after the last reserved block (skipping its unused IDs).
+    """
+
+    def __init__(self, counter=ORDER_SEQUENCE_COUNTER, block_size=ORDER_SEQUENCE_BLOCK_SIZE):
+        self.counter = counter
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._value = 0
+        self._limit = 0
+
+    def next(self):
+        with self._lock:
+            if self._value >= self._limit:
+                try:
+                    self._limit = reserve_counter_block(self.counter, self.block_size, _last_logged_order_sequence)
+                    self._value = self._limit - self.block_size
+                except Exception as e:
+                    logger.error(f"Error reserving order sequence: {e}")
+                    self._limit = self._value + self.block_size
+            self._value += 1
+            return (self._value - 1) % ORDER_SEQUENCE_MAX + 1
+
+_order_sequence = OrderIdSequence()
+
+def generate_order_id():
+    """Generate a sequential order ID in format YYMMDDXXXXX"""
+    date_prefix = datetime.now().strftime("%y%m%d")
     # Format: YYMMDDXXXXX (where XXXXX is the sequence padded to 5 digits)
-    return f"{date_prefix}{_order_sequence:05d}"
+    return f"{date_prefix}{_order_sequence.next():05d}"
 
 def check_rate_limits(user_id):
     """Check if user has hit rate limits recently"""
-    try:
-        cutoff = datetime.now(pytz.UTC) - timedelta(minutes=5)
-        rate_limited = AnalyzerLog.query.filter(
-            AnalyzerLog.created_at >= cutoff,
-            AnalyzerLog.response_data.like('%rate limit%')
-        ).count()
-        return rate_limited > 0
-    except Exception as e:
-        logger.error(f"Error checking rate limits: {str(e)}")
-        return False
+    return analyzer_stats.recent_rate_limits() > 0
 
 def validate_symbol(symbol: str, exchange: str) -> bool:
     """Validate if symbol exists in the database for given exchange"""
     try:
-        symbol_exists = SymToken.query.filter(
-            SymToken.symbol == symbol,
-            SymToken.exchange == exchange
-        ).first() is not None
-        return symbol_exists
+        # Served from the symbol token cache after the first lookup
+        return get_token(symbol, exchange) is not None
     except Exception as e:
         logger.error(f"Error validating symbol: {str(e)}")
         return False
@@ -155,14 +169,8 @@ def analyze_api_request(order_data):
             issues.append("Invalid numeric value for price, trigger_price, or disclosed_quantity")
 
         # Check for potential rate limit issues
-        try:
-            if AnalyzerLog.query.filter(
-                AnalyzerLog.created_at >= datetime.now(pytz.UTC) - timedelta(minutes=1)
-            ).count() > 50:
-                warnings.append("High request frequency detected. Consider reducing request rate.")
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            warnings.append("Unable to check rate limits")
+        if analyzer_stats.recent_requests() > REQUEST_RATE_WARNING_THRESHOLD:
+            warnings.append("High request frequency detected. Consider reducing request rate.")
 
         # Prepare response
         response = {
@@ -256,14 +264,8 @@ def analyze_smart_order_request(order_data):
             issues.append("Invalid numeric value for price, trigger_price, or disclosed_quantity")
 
         # Check for potential rate limit issues
-        try:
-            if AnalyzerLog.query.filter(
-                AnalyzerLog.created_at >= datetime.now(pytz.UTC) - timedelta(minutes=1)
-            ).count() > 50:
-                warnings.append("High request frequency detected. Consider reducing request rate.")
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            warnings.append("Unable to check rate limits")
+        if analyzer_stats.recent_requests() > REQUEST_RATE_WARNING_THRESHOLD:
+            warnings.append("High request frequency detected. Consider reducing request rate.")
 
         # Prepare response
         response = {
@@ -294,14 +296,8 @@ def analyze_cancel_order_request(order_data):
             issues.append(f"Missing mandatory field(s): {', '.join(missing_fields)}")
 
         # Check for potential rate limit issues
-        try:
-            if AnalyzerLog.query.filter(
-                AnalyzerLog.created_at >= datetime.now(pytz.UTC) - timedelta(minutes=1)
-            ).count() > 50:
-                warnings.append("High request frequency detected. Consider reducing request rate.")
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            warnings.append("Unable to check rate limits")
+        if analyzer_stats.recent_requests() > REQUEST_RATE_WARNING_THRESHOLD:
+            warnings.append("High request frequency detected. Consider reducing request rate.")
 
         # Prepare response
         response = {
@@ -332,14 +328,8 @@ def analyze_cancel_all_order_request(order_data):
             issues.append(f"Missing mandatory field(s): {', '.join(missing_fields)}")
 
         # Check for potential rate limit issues
-        try:
-            if AnalyzerLog.query.filter(
-                AnalyzerLog.created_at >= datetime.now(pytz.UTC) - timedelta(minutes=1)
-            ).count() > 50:
-                warnings.append("High request frequency detected. Consider reducing request rate.")
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            warnings.append("Unable to check rate limits")
+        if analyzer_stats.recent_requests() > REQUEST_RATE_WARNING_THRESHOLD:
+            warnings.append("High request frequency detected. Consider reducing request rate.")
 
         # Prepare response
         response = {
@@ -370,14 +360,8 @@ def analyze_close_position_request(order_data):
             issues.append(f"Missing mandatory field(s): {', '.join(missing_fields)}")
 
         # Check for potential rate limit issues
-        try:
-            if AnalyzerLog.query.filter(
-                AnalyzerLog.created_at >= datetime.now(pytz.UTC) - timedelta(minutes=1)
-            ).count() > 50:
-                warnings.append("High request frequency detected. Consider reducing request rate.")
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            warnings.append("Unable to check rate limits")
+        if analyzer_stats.recent_requests() > REQUEST_RATE_WARNING_THRESHOLD:
+            warnings.append("High request frequency detected. Consider reducing request rate.")
 
         # Prepare response
         response = {
@@ -462,14 +446,8 @@ def analyze_modify_order_request(order_data):
             issues.append("Invalid numeric value for price, trigger_price, quantity, or disclosed_quantity")
 
         # Check for potential rate limit issues
-        try:
-            if AnalyzerLog.query.filter(
-                AnalyzerLog.created_at >= datetime.now(pytz.UTC) - timedelta(minutes=1)
-            ).count() > 50:
-                warnings.append("High request frequency detected. Consider reducing request rate.")
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            warnings.append("Unable to check rate limits")
+        if analyzer_stats.recent_requests() > REQUEST_RATE_WARNING_THRESHOLD:
+            warnings.append("High request frequency detected. Consider reducing request rate.")
 
         # Prepare response
         response = {
@@ -518,70 +496,9 @@ def analyze_request(request_data, api_type='placeorder', should_log=False):
         return False, error_response
 
 def get_analyzer_stats():
-    """Get analyzer statistics"""
+    """Get analyzer statistics of the last 24 hours"""
     try:
-        cutoff = datetime.now(pytz.UTC) - timedelta(hours=24)
-        
-        # Get recent requests
-        recent_requests = AnalyzerLog.query.filter(
-            AnalyzerLog.created_at >= cutoff
-        ).all()
-
-        # Initialize stats
-        stats = {
-            'total_requests': len(recent_requests),
-            'sources': {},
-            'symbols': set(),
-            'issues': {
-                'total': 0,
-                'by_type': {
-                    'rate_limit': 0,
-                    'invalid_symbol': 0,
-                    'missing_quantity': 0,
-                    'invalid_exchange': 0,
-                    'other': 0
-                }
-            }
-        }
-
-        # Process requests
-        for req in recent_requests:
-            try:
-                request_data = json.loads(req.request_data)
-                response_data = json.loads(req.response_data)
-                
-                # Update sources
-                source = request_data.get('strategy', 'Unknown')
-                stats['sources'][source] = stats['sources'].get(source, 0) + 1
-                
-                # Update symbols
-                if 'symbol' in request_data:
-                    stats['symbols'].add(request_data['symbol'])
-                
-                # Update issues
-                if response_data.get('status') == 'error':
-                    stats['issues']['total'] += 1
-                    error_msg = response_data.get('message', '').lower()
-                    
-                    if 'rate limit' in error_msg:
-                        stats['issues']['by_type']['rate_limit'] += 1
-                    elif 'invalid symbol' in error_msg:
-                        stats['issues']['by_type']['invalid_symbol'] += 1
-                    elif 'quantity' in error_msg:
-                        stats['issues']['by_type']['missing_quantity'] += 1
-                    elif 'exchange' in error_msg:
-                        stats['issues']['by_type']['invalid_exchange'] += 1
-                    else:
-                        stats['issues']['by_type']['other'] += 1
-
-            except Exception as e:
-                logger.error(f"Error processing request: {str(e)}")
-                continue
-
-        # Convert set to list for JSON serialization
-        stats['symbols'] = list(stats['symbols'])
-        return stats
-
+        return analyzer_stats.snapshot()
     except Exception as e:
         logger.error(f"Error getting analyzer stats: {str(e)}")
         return {
@@ -0,0 +1,178 @@
+"""
+Column-wise mapping of broker order, trade and position books.
+
+Broker mappers used to walk a book row by row, resolving each symbol with
+its own cache/database lookup and translating statuses and products with
+if/elif chains. The helpers here work a column at a time instead:
+
+- symbols of the whole book are resolved in one bulk lookup
+  (:func:`resolve_symbols`, :func:`resolve_oa_symbols`)
+- value translations (status, order type, product) are declared as dicts
+  and applied to a whole column (:func:`map_values`, :func:`map_products`)
+- the OpenAlgo rows are built from a declared :class:`FieldMap`, one
+  column at a time (:func:`transform_rows`)
+
+Broker modules declare their field maps next to their mappers, e.g.::
+
+    ORDER_FIELDS = FieldMap({
+        'symbol': 'tradingsymbol',
+        'order_status': Field('status', values=ORDER_STATUS_MAP),
+        'trade_value': lambda row: row.get('quantity', 0) * row.get('price', 0.0),
+    })
+
+Plain Python lists are used rather than DataFrames: books are JSON-bound
+lists of dicts, and the DataFrame round trip costs more than it saves.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+from database.token_db import get_oa_symbols_bulk, get_symbols_bulk
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+
+class Field(NamedTuple):
+    """Source of one OpenAlgo field in a field map."""
+    source: str
+    default: Any = ''
+    # Broker value -> OpenAlgo value; values not in the map are passed through
+    values: Optional[Mapping[Any, Any]] = None
+
+
+FieldSpec = Union[str, Field, Callable[[Dict[str, Any]], Any]]
+
+# Broker product -> (OpenAlgo product, exchanges the rule applies to or None for all)
+ProductRules = Mapping[str, Tuple[str, Optional[Iterable[str]]]]
+
+
+class FieldMap:
+    """OpenAlgo field -> broker field declarations of one book."""
+
+    def __init__(self, fields: Mapping[str, FieldSpec]):
+        self.fields = dict(fields)
+        self._names = tuple(self.fields)
+        self._specs = [Field(spec) if isinstance(spec, str) else spec for spec in self.fields.values()]
+
+    @staticmethod
+    def _column(spec: Union[Field, Callable], rows: Sequence[Dict[str, Any]]) -> List[Any]:
+        if callable(spec):
+            return [spec(row) for row in rows]
+        source, default, values = spec
+        column = [row.get(source, default) for row in rows]
+        if values:
+            get = values.get
+            column = [get(value, value) for value in column]
+        return column
+
+    def build(self, rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build the OpenAlgo rows one column at a time."""
+        out = [{} for _ in rows]
+        for name, spec in zip(self._names, self._specs):
+            for target, value in zip(out, self._column(spec, rows)):
+                target[name] = value
+        return out
+
+
+def _resolve(rows, key_field, exchange_field, symbol_field, lookup, label) -> List[bool]:
+    pairs = [(row.get(key_field), row.get(exchange_field)) for row in rows]
+    resolved = lookup(pair for pair in pairs if pair[0])
+
+    found = []
+    missing = 0
+    for row, (key, exchange) in zip(rows, pairs):
+        symbol = resolved.get((str(key), exchange)) if key else None
+        if symbol:
+            row[symbol_field] = symbol
+            found.append(True)
+        else:
+            missing += 1
+            found.append(False)
+    if missing:
+        logger.info(f"{missing} of {len(rows)} rows have no {label} match. Keeping original trading symbols.")
+    return found
+
+
+def resolve_symbols(rows: Sequence[Dict[str, Any]], token_field: str, exchange_field: str,
+                    symbol_field: str) -> List[bool]:
+    """
+    Set ``symbol_field`` of every row to the OpenAlgo symbol of its token.
+
+    Returns:
+        Mask of rows whose token was found; other rows keep their symbol
+    """
+    return _resolve(rows, token_field, exchange_field, symbol_field, get_symbols_bulk, 'token')
+
+
+def resolve_oa_symbols(rows: Sequence[Dict[str, Any]], symbol_field: str, exchange_field: str,
+                       target_field: Optional[str] = None) -> List[bool]:
+    """
+    Replace the broker symbol in ``symbol_field`` (or write to ``target_field``)
+    with the OpenAlgo symbol.
+
+    Returns:
+        Mask of rows whose broker symbol was found; other rows are unchanged
+    """
+    return _resolve(rows, symbol_field, exchange_field, target_field or symbol_field,
+                    get_oa_symbols_bulk, 'symbol')
+
+
+def map_values(rows: Sequence[Dict[str, Any]], field: str, mapping: Mapping[Any, Any],
+               mask: Optional[Sequence[bool]] = None) -> None:
+    """Translate ``field`` of every row (or every masked row) in place; unknown values are kept."""
+    for index, row in enumerate(rows):
+        if mask is not None and not mask[index]:
+            continue
+        value = row.get(field, _MISSING)
+        if value is not _MISSING:
+            row[field] = mapping.get(value, value)
+
+
+def map_products(rows: Sequence[Dict[str, Any]], product_field: str, exchange_field: str,
+                 rules: ProductRules, mask: Optional[Sequence[bool]] = None) -> None:
+    """
+    Translate broker product types to OpenAlgo products in place.
+
+    A rule only applies to rows of its exchanges, e.g. a broker's delivery
+    product becomes CNC on NSE/BSE only.
+    """
+    rules = {
+        product: (target, frozenset(exchanges) if exchanges is not None else None)
+        for product, (target, exchanges) in rules.items()
+    }
+    for index, row in enumerate(rows):
+        if mask is not None and not mask[index]:
+            continue
+        rule = rules.get(row.get(product_field))
+        if rule is not None and (rule[1] is None or row.get(exchange_field) in rule[1]):
+            row[product_field] = rule[0]
+
+
+def transform_rows(rows: Iterable[Any], fields: FieldMap) -> List[Dict[str, Any]]:
+    """Build OpenAlgo rows from broker rows according to a field map, skipping non-dict items."""
+    if isinstance(rows, dict):
+        rows = [rows]
+    valid = []
+    for row in rows:
+        if isinstance(row, dict):
+            valid.append(row)
+        else:
+            logger.warning(f"Warning: Expected a dict, but found a {type(row)}. Skipping this item.")
+    return fields.build(valid)
+
+
+def order_statistics(rows: Sequence[Dict[str, Any]], action_field: str, status_field: str,
+                     completed: Any, open_: Any, rejected: Any) -> Dict[str, int]:
+    """Order book totals, given the broker's action field and its complete/open/rejected status values."""
+    actions = Counter(row.get(action_field) for row in rows) if rows else Counter()
+    statuses = Counter(row.get(status_field) for row in rows) if rows else Counter()
+    return {
+        'total_buy_orders': actions['BUY'],
+        'total_sell_orders': actions['SELL'],
+        'total_completed_orders': statuses[completed],
+        'total_open_orders': statuses[open_],
+        'total_rejected_orders': statuses[rejected]
+    }
@@ -0,0 +1,223 @@
+# utils/broker_registry.py
+"""
+Registry of broker plugins and the functions they provide.
+
+Each broker package (``broker/<name>``) is imported once and its order, data,
+funds, mapping and streaming entry points are resolved into a capability
+table. Request handlers then fetch a callable with a dict lookup instead of
+importing modules and resolving attributes on every call.
+
+Brokers listed in ``VALID_BROKERS`` are loaded by :func:`load_brokers` at
+startup; any other broker is loaded on first use.
+"""
+
+import importlib
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Capability -> (module path inside broker/<name>, functions resolved from it)
+CAPABILITIES = {
+    'auth': ('api.auth_api', ('authenticate_broker',)),
+    'order': ('api.order_api', (
+        'place_order_api', 'place_smartorder_api', 'modify_order', 'cancel_order',
+        'cancel_all_orders_api', 'close_all_positions', 'get_open_position',
+        'get_order_book', 'get_trade_book', 'get_positions', 'get_holdings',
+        # Optional: single order lookup used by the order state store
+        'get_order_history',
+    )),
+    'data': ('api.data', ('BrokerData',)),
+    'funds': ('api.funds', ('get_margin_data',)),
+    'mapping': ('mapping.order_data', (
+        'map_order_data', 'calculate_order_statistics', 'transform_order_data',
+        'map_trade_data', 'transform_tradebook_data',
+        'map_position_data', 'transform_positions_data',
+        'map_portfolio_data', 'calculate_portfolio_statistics', 'transform_holdings_data',
+    )),
+}
+
+
+def get_valid_brokers() -> List[str]:
+    """Brokers enabled in VALID_BROKERS."""
+    return [name.strip().lower() for name in os.getenv('VALID_BROKERS', '').split(',') if name.strip()]
+
+
+def _streaming_module(name: str) -> str:
+    return f'broker.{name}.streaming.{name}_adapter'
+
+
+@dataclass
+class BrokerPlugin:
+    """Resolved modules and callables of one broker package."""
+    name: str
+    modules: Dict[str, Any] = field(default_factory=dict)
+    functions: Dict[str, Callable] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    # Positional arguments BrokerData.__init__ takes after self (auth_token, feed_token, user_id)
+    data_handler_args: int = 1
+    has_streaming: bool = False
+
+    def module(self, capability: str) -> Optional[Any]:
+        return self.modules.get(capability)
+
+    def function(self, name: str) -> Optional[Callable]:
+        return self.functions.get(name)
+
+    def create_data_handler(self, auth_token: str, *args: Any) -> Any:
+        """
+        Instantiate the broker's BrokerData with as many of
+        ``(auth_token, feed_token, user_id)`` as its constructor accepts.
+        """
+        broker_data = self.functions['BrokerData']
+        return broker_data(auth_token, *args[:self.data_handler_args - 1])
+
+    def streaming_adapter(self) -> Optional[type]:
+        """The broker's WebSocket adapter class, imported on first use."""
+        if 'streaming' not in self.modules:
+            if not self.has_streaming:
+                return None
+            module = importlib.import_module(_streaming_module(self.name))
+            self.modules['streaming'] = module
+            self.functions['WebSocketAdapter'] = getattr(
+                module, f'{self.name.capitalize()}WebSocketAdapter', None
+            )
+        return self.functions.get('WebSocketAdapter')
+
+    def capability_report(self) -> Dict[str, Any]:
+        """Which capabilities and functions this broker provides."""
+        report = {}
+        for capability, (_, names) in CAPABILITIES.items():
+            report[capability] = {
+                'available': capability in self.modules,
+                'functions': [name for name in names if name in self.functions],
+                'missing': [name for name in names if name not in self.functions],
+            }
+            if capability in self.errors:
+                report[capability]['error'] = self.errors[capability]
+        report['streaming'] = {'available': self.has_streaming}
+        return report
+
+
+_registry: Dict[str, BrokerPlugin] = {}
+_registry_lock = threading.Lock()
+
+
+def _load_plugin(name: str) -> BrokerPlugin:
+    plugin = BrokerPlugin(name=name)
+    for capability, (module_path, names) in CAPABILITIES.items():
+        try:
+            module = importlib.import_module(f'broker.{name}.{module_path}')
+        except ImportError as error:
+            plugin.errors[capability] = str(error)
+            continue
+        except Exception as error:
+            # Module-level setup (e.g. parsing BROKER_API_KEY) failed; the broker
+            # stays loadable for its other capabilities and the app still starts
+            logger.warning(f"Broker {name}: failed to import {capability} module: {error}")
+            plugin.errors[capability] = f'{type(error).__name__}: {error}'
+            continue
+        plugin.modules[capability] = module
+        for function_name in names:
+            function = getattr(module, function_name, None)
+            if function is not None:
+                plugin.functions[function_name] = function
+
+    broker_data = plugin.functions.get('BrokerData')
+    init_code = getattr(getattr(broker_data, '__init__', None), '__code__', None)
+    if init_code is not None:
+        plugin.data_handler_args = max(init_code.co_argcount - 1, 1)
+
+    # Checked on disk: importing the streaming package pulls in the WebSocket proxy
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    plugin.has_streaming = os.path.exists(
+        os.path.join(root_dir, 'broker', name, 'streaming', f'{name}_adapter.py')
+    )
+    return plugin
+
+
+def get_broker(name: str) -> Optional[BrokerPlugin]:
+    """Get a broker's plugin, loading it on first use. None if there is no such broker."""
+    plugin = _registry.get(name)
+    if plugin is not None:
+        return plugin
+    if not name:
+        return None
+    with _registry_lock:
+        plugin = _registry.get(name)
+        if plugin is None:
+            try:
+                found = importlib.util.find_spec(f'broker.{name}') is not None
+            except (ImportError, ValueError):
+                found = False
+            if not found:
+                logger.error(f"Broker plugin '{name}' not found")
+                return None
+            plugin = _load_plugin(name)
+            for capability, error in plugin.errors.items():
+                logger.debug(f"Broker {name} has no {capability} module: {error}")
+            _registry[name] = plugin
+    return plugin
+
+
+def load_brokers(names: Optional[Iterable[str]] = None) -> Dict[str, BrokerPlugin]:
+    """Load the given brokers (default: VALID_BROKERS) into the registry."""
+    names = get_valid_brokers() if names is None else names
+    loaded = {}
+    for name in names:
+        plugin = get_broker(name)
+        if plugin is not None:
+            loaded[name] = plugin
+            logger.info(f"Loaded broker {name}: {', '.join(sorted(plugin.modules)) or 'no modules'}")
+    return loaded
+
+
+def get_broker_module(broker: str, capability: str) -> Optional[Any]:
+    """Get one of a broker's modules (e.g. 'order', 'data', 'funds'), None if unavailable."""
+    plugin = get_broker(broker)
+    module = plugin.module(capability) if plugin else None
+    if module is None:
+        logger.error(f"Broker '{broker}' has no {capability} module")
+    return module
+
+
+def get_broker_function(broker: str, name: str) -> Optional[Callable]:
+    """Get a single broker function, None if the broker does not provide it."""
+    plugin = get_broker(broker)
+    return plugin.function(name) if plugin else None
+
+
+def get_broker_functions(broker: str, names: Iterable[str]) -> Optional[Dict[str, Callable]]:
+    """Get several broker functions by name, None if any of them is missing."""
+    plugin = get_broker(broker)
+    if plugin is None:
+        return None
+    functions = {}
+    for name in names:
+        function = plugin.function(name)
+        if function is None:
+            logger.error(f"Broker '{broker}' does not provide {name}")
+            return None
+        functions[name] = function
+    return functions
+
+
+def capability_report(brokers: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Capability report for the given brokers (default: all loaded brokers)."""
+    names = list(_registry) if brokers is None else brokers
+    return {name: plugin.capability_report() for name in names if (plugin := get_broker(name))}
+
+
+if __name__ == '__main__':
+    # Print the capability report: python -m utils.broker_registry [broker ...]
+    import json
+    import sys
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    print(json.dumps(capability_report(sys.argv[1:] or get_valid_brokers()), indent=2))
@@ -0,0 +1,198 @@
+"""
+Columnar and streamed response helpers for candle data.
+
+The default JSON responses build one Python dict per candle before encoding.
+These helpers encode a DataFrame column-wise in fixed-size row chunks so the
+peak memory of a response stays flat regardless of the requested date range.
+"""
+
+import io
+import json
+import math
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Number of rows encoded per streamed chunk
+CHUNK_ROWS = 50000
+
+IST = 'Asia/Kolkata'
+
+# Supported opt-in response formats
+COLUMNAR_FORMATS = ('json', 'columnar', 'csv', 'arrow')
+
+CSV_MIMETYPE = 'text/csv'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+JSON_MIMETYPE = 'application/json'
+
+ARROW_UNAVAILABLE = "Arrow format is not available: the server does not have the 'pyarrow' package installed"
+
+
+def arrow_available() -> bool:
+    """Return True if pyarrow can be imported."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def to_ist(timestamps: pd.Series) -> pd.Series:
+    """Vectorized conversion of epoch seconds to IST aware datetimes."""
+    return pd.to_datetime(timestamps, unit='s', utc=True).dt.tz_convert(IST)
+
+
+def _json_scalar(value):
+    """Map non-finite floats in object columns to None."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _json_values(values: np.ndarray) -> str:
+    """Encode a 1-D array as the body of a JSON array (without brackets)."""
+    if values.dtype.kind in 'iu':
+        return ','.join(map(str, values.tolist()))
+    if values.dtype.kind == 'b':
+        return ','.join('true' if v else 'false' for v in values.tolist())
+    if values.dtype.kind == 'f':
+        # NaN and infinity are not valid JSON, emit null instead
+        return ','.join(repr(v) if math.isfinite(v) else 'null' for v in values.tolist())
+    return ','.join(json.dumps(_json_scalar(v), default=str) for v in values.tolist())
+
+
+def stream_columnar_json(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """
+    Stream a DataFrame as {"status": "success", "data": {"col": [...], ...}}.
+
+    Each column is emitted as a JSON array, chunk by chunk, so no per-row
+    dict is ever materialized.
+    """
+    yield '{"status":"success","format":"columnar","rows":%d,"data":{' % len(df)
+    for col_index, column in enumerate(df.columns):
+        if col_index:
+            yield ','
+        yield json.dumps(str(column)) + ':['
+        values = df[column].to_numpy()
+        for start in range(0, len(values), chunk_rows):
+            if start:
+                yield ','
+            yield _json_values(values[start:start + chunk_rows])
+        yield ']'
+    yield '}}'
+
+
+def stream_csv(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS,
+               header: bool = True) -> Iterator[str]:
+    """Stream a DataFrame as CSV text in chunks of ``chunk_rows`` rows."""
+    if header:
+        yield ','.join(map(str, df.columns)) + '\n'
+    for start in range(0, len(df), chunk_rows):
+        buffer = io.StringIO()
+        df.iloc[start:start + chunk_rows].to_csv(buffer, header=False, index=False)
+        yield buffer.getvalue()
+
+
+def stream_arrow(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Stream a DataFrame as an Arrow IPC stream, one record batch per chunk.
+
+    Requires the optional ``pyarrow`` dependency; callers should check
+    :func:`arrow_available` before choosing this format.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+
+    class _ChunkSink(io.RawIOBase):
+        """File object that hands written bytes back after each batch."""
+
+        def __init__(self):
+            self.parts = []
+
+        def writable(self):
+            return True
+
+        def write(self, b):
+            self.parts.append(bytes(b))
+            return len(b)
+
+        def take(self) -> bytes:
+            data = b''.join(self.parts)
+            self.parts = []
+            return data
+
+    chunk_sink = _ChunkSink()
+    writer = pa.ipc.new_stream(chunk_sink, schema)
+    yield chunk_sink.take()
+    for start in range(0, len(df), chunk_rows):
+        batch = pa.RecordBatch.from_pandas(
+            df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False
+        )
+        writer.write_batch(batch)
+        yield chunk_sink.take()
+    writer.close()
+    yield chunk_sink.take()
+
+
+def format_ticker_frame(df: pd.DataFrame, symbol_with_exchange: str,
+                        interval: str) -> pd.DataFrame:
+    """
+    Build the ticker text-format frame with vectorized timestamp conversion.
+
+    Daily:    Ticker,Date_YMD,Open,High,Low,Close,Volume
+    Intraday: Ticker,Date_YMD,Time,Open,High,Low,Close,Volume
+    """
+    dt_ist = to_ist(df['timestamp'])
+    out = pd.DataFrame({'ticker': symbol_with_exchange}, index=df.index)
+    out['date'] = dt_ist.dt.strftime('%Y-%m-%d')
+    if interval.upper() != 'D':
+        out['time'] = dt_ist.dt.strftime('%H:%M:%S')
+    for column in ('open', 'high', 'low', 'close'):
+        out[column] = df[column]
+    # Volume is reported as an integer
+    out['volume'] = df['volume'].fillna(0).astype('int64')
+    return out
+
+
+def stream_ticker_text(df: pd.DataFrame, symbol_with_exchange: str, interval: str,
+                       chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """Stream the ticker plain-text format (no header, newline separated)."""
+    frame = format_ticker_frame(df, symbol_with_exchange, interval)
+    first = True
+    for start in range(0, len(frame), chunk_rows):
+        buffer = io.StringIO()
+        frame.iloc[start:start + chunk_rows].to_csv(
+            buffer, header=False, index=False, lineterminator='\n'
+        )
+        text = buffer.getvalue().rstrip('\n')
+        if not text:
+            continue
+        # Keep the legacy output shape: rows joined by newlines, no trailing newline
+        yield text if first else '\n' + text
+        first = False
+
+
+def stream_dataframe(df: pd.DataFrame, response_format: str,
+                     chunk_rows: Optional[int] = None):
+    """
+    Return ``(generator, mimetype)`` for a columnar response format.
+
+    Raises:
+        ValueError: If the format is unknown or its dependency is missing
+    """
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    if response_format == 'columnar':
+        return stream_columnar_json(df, chunk_rows), JSON_MIMETYPE
+    if response_format == 'csv':
+        return stream_csv(df, chunk_rows), CSV_MIMETYPE
+    if response_format == 'arrow':
+        if not arrow_available():
+            raise ValueError(ARROW_UNAVAILABLE)
+        return stream_arrow(df, chunk_rows), ARROW_MIMETYPE
+    raise ValueError(f"Unsupported response format: {response_format}")
@@ -0,0 +1,244 @@
+"""
+Concurrent, conditional master contract downloader.
+
+Broker master contract modules describe their exchange files as a
+``{key: url}`` mapping. All files are fetched in parallel through the shared
+httpx client, using ``If-None-Match``/``If-Modified-Since`` from the previous
+download so unchanged files come back as ``304 Not Modified``. Raw files are
+cached on disk per broker, and the fingerprint of the last contract loaded
+into the database is remembered so a login can skip parsing and the DB reload
+entirely when nothing changed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from utils.httpx_client import get_httpx_client
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+CONTRACT_CACHE_DIR = os.getenv('CONTRACT_CACHE_DIR', os.path.join('tmp', 'contract_cache'))
+MAX_DOWNLOAD_WORKERS = int(os.getenv('CONTRACT_DOWNLOAD_WORKERS', '8'))
+DOWNLOAD_TIMEOUT = float(os.getenv('CONTRACT_DOWNLOAD_TIMEOUT', '60'))
+
+_META_FILE = 'meta.json'
+_LOADED_FILE = 'loaded.json'
+_meta_lock = threading.Lock()
+
+
+@dataclass
+class DownloadedFile:
+    """Result of fetching a single exchange file."""
+    key: str
+    url: str
+    path: Optional[str] = None
+    sha256: Optional[str] = None
+    changed: bool = False
+    status: str = 'error'  # downloaded, not_modified, cached, error
+    error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self.path is not None and os.path.exists(self.path)
+
+
+@dataclass
+class ContractDownload:
+    """Aggregate result of downloading all exchange files for a broker."""
+    broker: str
+    files: Dict[str, DownloadedFile] = field(default_factory=dict)
+    current: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return any(item.changed for item in self.files.values())
+
+    @property
+    def complete(self) -> bool:
+        return all(item.available for item in self.files.values())
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable hash over the content of every exchange file."""
+        digest = hashlib.sha256()
+        for key in sorted(self.files):
+            digest.update(key.encode())
+            digest.update((self.files[key].sha256 or '').encode())
+        return digest.hexdigest()
+
+    def available_files(self) -> Dict[str, DownloadedFile]:
+        return {key: item for key, item in self.files.items() if item.available}
+
+
+def _broker_dir(broker: str) -> str:
+    path = os.path.join(CONTRACT_CACHE_DIR, broker)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _cache_filename(key: str, url: str) -> str:
+    name = os.path.basename(url.split('?', 1)[0]) or 'data'
+    return f'{key}__{name}'
+
+
+def _fetch(client, key: str, url: str, cache_path: str, previous: dict,
+           headers: Optional[dict], timeout: float) -> DownloadedFile:
+    """Fetch one file with conditional headers and store it in the cache."""
+    result = DownloadedFile(key=key, url=url)
+    request_headers = dict(headers or {})
+    if os.path.exists(cache_path) and previous.get('url') == url:
+        if previous.get('etag'):
+            request_headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            request_headers['If-Modified-Since'] = previous['last_modified']
+
+    try:
+        response = client.get(url, headers=request_headers, timeout=timeout, follow_redirects=True)
+        if response.status_code == 304:
+            result.path = cache_path
+            result.sha256 = previous.get('sha256') or _file_sha256(cache_path)
+            result.status = 'not_modified'
+            logger.info(f"{key} not modified since last download")
+            return result
+
+        response.raise_for_status()
+        tmp_path = f'{cache_path}.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, cache_path)
+
+        result.path = cache_path
+        result.sha256 = hashlib.sha256(response.content).hexdigest()
+        result.changed = result.sha256 != previous.get('sha256')
+        result.status = 'downloaded'
+        previous.update({
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': result.sha256,
+        })
+        logger.info(f"Downloaded {key} from {url} ({len(response.content)} bytes, "
+                    f"{'changed' if result.changed else 'unchanged'})")
+    except Exception as e:
+        result.error = str(e)
+        if os.path.exists(cache_path):
+            # Fall back to the last good copy so the contract stays loadable
+            result.path = cache_path
+            result.sha256 = previous.get('sha256') or _file_sha256(cache_path)
+            result.status = 'cached'
+            logger.warning(f"Error downloading {key} from {url}, using cached copy: {e}")
+        else:
+            logger.error(f"Error downloading {key} from {url}: {e}")
+    return result
+
+
+def download_contract_files(broker: str, urls: Dict[str, str],
+                            headers: Optional[dict] = None,
+                            timeout: float = DOWNLOAD_TIMEOUT,
+                            max_workers: Optional[int] = None) -> ContractDownload:
+    """
+    Download all exchange files for a broker concurrently.
+
+    Args:
+        broker: Broker name, used for the cache directory
+        urls: Mapping of file key (e.g. 'NSE') to download URL
+        headers: Extra request headers (e.g. Authorization)
+        timeout: Per-request timeout in seconds
+        max_workers: Maximum parallel downloads
+
+    Returns:
+        ContractDownload with per-file cache paths and change flags; ``current``
+        is True when the database already holds exactly this contract.
+    """
+    broker_dir = _broker_dir(broker)
+    meta_path = os.path.join(broker_dir, _META_FILE)
+    with _meta_lock:
+        meta = _read_json(meta_path)
+
+    client = get_httpx_client()
+    workers = max(1, min(max_workers or MAX_DOWNLOAD_WORKERS, len(urls)))
+    download = ContractDownload(broker=broker)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{broker}-contract') as pool:
+        futures = {
+            key: pool.submit(
+                _fetch, client, key, url,
+                os.path.join(broker_dir, _cache_filename(key, url)),
+                meta.setdefault(key, {}), headers, timeout
+            )
+            for key, url in urls.items()
+        }
+        for key, future in futures.items():
+            download.files[key] = future.result()
+
+    with _meta_lock:
+        _write_json(meta_path, meta)
+
+    download.current = is_contract_current(download)
+    return download
+
+
+def is_contract_current(download: ContractDownload) -> bool:
+    """
+    Return True if the symtoken table already holds this exact contract.
+
+    Requires every file to be present and unchanged, the last successful load
+    to have come from the same broker with the same fingerprint, and the
+    table to be non-empty.
+    """
+    if download.changed or not download.files or not download.complete:
+        return False
+
+    loaded = _read_json(os.path.join(CONTRACT_CACHE_DIR, _LOADED_FILE))
+    if loaded.get('broker') != download.broker or loaded.get('fingerprint') != download.fingerprint:
+        return False
+
+    try:
+        from database.token_db import get_symbol_count
+        return get_symbol_count() > 0
+    except Exception:
+        return False
+
+
+def mark_contract_loaded(download: ContractDownload) -> None:
+    """Remember that the database now holds the contract from ``download``."""
+    if not download.complete:
+        # A partial download must not mark the contract as current
+        return
+    os.makedirs(CONTRACT_CACHE_DIR, exist_ok=True)
+    _write_json(os.path.join(CONTRACT_CACHE_DIR, _LOADED_FILE), {
+        'broker': download.broker,
+        'fingerprint': download.fingerprint,
+    })
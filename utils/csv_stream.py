@@ -0,0 +1,66 @@
+"""
+Streamed CSV downloads.
+
+Exports used to write every row into one ``io.StringIO`` and send the
+finished string. These helpers write rows in fixed-size chunks and hand
+them to a chunked Flask response, so a download starts with the first
+chunk and the memory used stays flat however many rows are exported.
+Database exports pair them with ``Query.yield_per`` so the rows
+themselves are fetched batch by batch as well.
+"""
+
+import csv
+import io
+from typing import Any, Iterable, Iterator, Sequence
+
+from flask import Response, stream_with_context
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rows written per streamed chunk, also used as the yield_per batch size of export queries
+CSV_CHUNK_ROWS = 500
+
+CSV_MIMETYPE = 'text/csv'
+
+
+def iter_csv(headers: Sequence[Any], rows: Iterable[Sequence[Any]],
+             chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[str]:
+    """Yield the CSV text of ``headers`` and ``rows``, ``chunk_rows`` rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    pending = 1
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def csv_response(headers: Sequence[Any], rows: Iterable[Sequence[Any]], filename: str) -> Response:
+    """
+    Chunked CSV download of ``rows``.
+
+    ``rows`` is consumed while the response is sent, inside the request
+    context, so it may be a generator over a database query.
+    """
+    def generate():
+        try:
+            yield from iter_csv(headers, rows)
+        except Exception as e:
+            # Headers are already sent, so the download can only be cut short
+            logger.error(f"Error streaming {filename}: {str(e)}")
+            raise
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=CSV_MIMETYPE,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
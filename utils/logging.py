@@ -1,20 +1,32 @@
+import atexit
 import logging
 import os
+import queue
 import re
+import threading
+import time
 from datetime import datetime, timedelta
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from typing import Hashable, Optional
 
-# Sensitive patterns to filter out
-SENSITIVE_PATTERNS = [
-    (r'(api[_-]?key[\s]*[=:]\s*)[\w\-]+', r'\1[REDACTED]'),
-    (r'(password[\s]*[=:]\s*)[\w\-]+', r'\1[REDACTED]'),
-    (r'(token[\s]*[=:]\s*)[\w\-]+', r'\1[REDACTED]'),
-    (r'(secret[\s]*[=:]\s*)[\w\-]+', r'\1[REDACTED]'),
-    (r'(authorization[\s]*[=:]\s*)[\w\-]+', r'\1[REDACTED]'),
-    (r'(Bearer\s+)[\w\-\.]+', r'\1[REDACTED]'),
-]
+# API keys, passwords, tokens, secrets and authorization values as one
+# precompiled alternation so each record is scanned once: group 1 is a
+# key=value prefix, group 2 a Bearer prefix
+SENSITIVE_REGEX = re.compile(
+    r'((?:api[_-]?key|password|token|secret|authorization)[\s]*[=:]\s*)[\w\-]+'
+    r'|(Bearer\s+)[\w\-\.]+',
+    re.IGNORECASE
+)
+
+
+def _redact_match(match):
+    return (match.group(1) or match.group(2)) + '[REDACTED]'
+
+
+def redact_sensitive(text: str) -> str:
+    """Redact API keys, passwords, tokens and bearer credentials from text."""
+    return SENSITIVE_REGEX.sub(_redact_match, text)
 
 
 class SensitiveDataFilter(logging.Filter):
@@ -22,19 +34,10 @@ class SensitiveDataFilter(logging.Filter):
     
     def filter(self, record):
         try:
-            # Filter the main message
-            for pattern, replacement in SENSITIVE_PATTERNS:
-                record.msg = re.sub(pattern, replacement, str(record.msg), flags=re.IGNORECASE)
-            
-            # Filter args if present
-            if hasattr(record, 'args') and record.args:
-                filtered_args = []
-                for arg in record.args:
-                    filtered_arg = str(arg)
-                    for pattern, replacement in SENSITIVE_PATTERNS:
-                        filtered_arg = re.sub(pattern, replacement, filtered_arg, flags=re.IGNORECASE)
-                    filtered_args.append(filtered_arg)
-                record.args = tuple(filtered_args)
+            # Redact the fully formatted message in a single pass, so args keep
+            # their types for %-formatting and are only formatted once
+            record.msg = redact_sensitive(record.getMessage())
+            record.args = None
         except Exception:
             # If filtering fails, don't block the log message
             pass
@@ -42,6 +45,95 @@ class SensitiveDataFilter(logging.Filter):
         return True
 
 
+class HotPathLogger:
+    """
+    Rate limited logger for per-tick / per-message code paths.
+    
+    Each call names a key (e.g. a topic or token). A key is logged at most
+    once per ``interval`` seconds, or once every ``sample_every`` calls when
+    sampling is set; the emitted line reports how many calls were suppressed
+    since. Disabled levels return before any formatting, and messages use
+    lazy %-style args.
+    
+    Example:
+        hot_logger = get_hot_path_logger(__name__)
+        hot_logger.info(topic, "Publishing to %s: %s", topic, data)
+    """
+    
+    def __init__(self, logger: logging.Logger, interval: Optional[float] = None, sample_every: int = 0):
+        self.logger = logger
+        self.interval = float(os.getenv('LOG_HOT_PATH_INTERVAL', '10')) if interval is None else interval
+        self.sample_every = sample_every
+        # key -> [next emit time or countdown, suppressed count]
+        self._state = {}
+    
+    def _should_emit(self, key: Hashable):
+        state = self._state.get(key)
+        if self.sample_every > 0:
+            if state is None or state[0] <= 1:
+                suppressed = state[1] if state else 0
+                self._state[key] = [self.sample_every, 0]
+                return True, suppressed
+            state[0] -= 1
+            state[1] += 1
+            return False, 0
+        
+        now = time.monotonic()
+        if state is None or now >= state[0]:
+            suppressed = state[1] if state else 0
+            self._state[key] = [now + self.interval, 0]
+            return True, suppressed
+        state[1] += 1
+        return False, 0
+    
+    def _log(self, level: int, key: Hashable, msg: str, args, kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        emit, suppressed = self._should_emit(key)
+        if not emit:
+            return
+        if suppressed:
+            msg = f"{msg} (+{suppressed} suppressed)"
+        # Attribute the record to the caller of the public method
+        kwargs.setdefault('stacklevel', 3)
+        self.logger.log(level, msg, *args, **kwargs)
+    
+    def log(self, level: int, key: Hashable, msg: str, *args, **kwargs):
+        self._log(level, key, msg, args, kwargs)
+    
+    def debug(self, key: Hashable, msg: str, *args, **kwargs):
+        self._log(logging.DEBUG, key, msg, args, kwargs)
+    
+    def info(self, key: Hashable, msg: str, *args, **kwargs):
+        self._log(logging.INFO, key, msg, args, kwargs)
+    
+    def warning(self, key: Hashable, msg: str, *args, **kwargs):
+        self._log(logging.WARNING, key, msg, args, kwargs)
+    
+    def error(self, key: Hashable, msg: str, *args, **kwargs):
+        self._log(logging.ERROR, key, msg, args, kwargs)
+    
+    def reset(self, key: Optional[Hashable] = None):
+        """Forget the rate limit state of one key, or of all keys."""
+        if key is None:
+            self._state.clear()
+        else:
+            self._state.pop(key, None)
+
+
+# Background listener that owns the console/file handlers when LOG_QUEUE is on
+_queue_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    with _listener_lock:
+        if _queue_listener is not None:
+            _queue_listener.stop()
+            _queue_listener = None
+
+
 def cleanup_old_logs(log_dir: Path, retention_days: int):
     """Remove log files older than retention_days."""
     if not log_dir.exists():
@@ -62,19 +154,23 @@ def cleanup_old_logs(log_dir: Path, retention_days: int):
 
 def setup_logging():
     """Initialize the logging configuration from environment variables."""
+    global _queue_listener
     # Get configuration from environment
     log_to_file = os.getenv('LOG_TO_FILE', 'False').lower() == 'true'
     log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
     log_dir = os.getenv('LOG_DIR', 'log')
     log_format = os.getenv('LOG_FORMAT', '[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
     log_retention = int(os.getenv('LOG_RETENTION', '14'))
+    log_queue = os.getenv('LOG_QUEUE', 'True').lower() == 'true'
     
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level, logging.INFO))
     
-    # Remove existing handlers
+    # Remove existing handlers (and drain a previous queue listener)
+    _stop_queue_listener()
     root_logger.handlers = []
+    handlers = []
     
     # Create formatter
     formatter = logging.Formatter(log_format)
@@ -86,7 +182,7 @@ def setup_logging():
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.addFilter(sensitive_filter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # File handler (if enabled)
     if log_to_file:
@@ -107,7 +203,21 @@ def setup_logging():
         )
         file_handler.setFormatter(formatter)
         file_handler.addFilter(sensitive_filter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    if log_queue:
+        # QueueHandler.prepare still merges msg % args (and any traceback) on
+        # the calling thread; the background thread then redacts, applies
+        # LOG_FORMAT and writes, so console/file I/O never blocks the caller
+        # queue.Queue (not SimpleQueue) so green-thread servers can patch its locks
+        log_records = queue.Queue(-1)
+        root_logger.addHandler(QueueHandler(log_records))
+        with _listener_lock:
+            _queue_listener = QueueListener(log_records, *handlers, respect_handler_level=True)
+            _queue_listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
     
     # Suppress noisy third-party loggers
     logging.getLogger('werkzeug').setLevel(logging.WARNING)
@@ -130,5 +240,22 @@ def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
 
+def get_hot_path_logger(name: str, interval: Optional[float] = None, sample_every: int = 0) -> HotPathLogger:
+    """
+    Get a rate limited logger for per-tick / per-message code paths.
+    
+    Args:
+        name: Module name (typically __name__)
+        interval: Seconds between lines for the same key (default LOG_HOT_PATH_INTERVAL or 10)
+        sample_every: Log one in every N calls per key instead of by time (0 to disable)
+        
+    Returns:
+        HotPathLogger wrapping the module logger
+    """
+    return HotPathLogger(logging.getLogger(name), interval=interval, sample_every=sample_every)
+
+
 # Initialize logging on import
-setup_logging()
\ No newline at end of file
+setup_logging()
+# Flush queued records on interpreter exit
+atexit.register(_stop_queue_listener)
\ No newline at end of file
@@ -1,31 +1,65 @@
 # utils/plugin_loader.py
 
 import os
-import importlib
 from flask import current_app
+from utils.broker_registry import get_broker, get_valid_brokers
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+
+class BrokerAuthFunctions(dict):
+    """
+    Maps '<broker>_auth' to the broker's authenticate_broker function.
+
+    Brokers that are not preloaded are imported on first lookup, so the
+    app only pays the import cost for brokers that are actually used.
+    """
+
+    def __init__(self, broker_names):
+        super().__init__()
+        self.broker_names = set(broker_names)
+
+    def _load(self, key):
+        broker_name = key[:-len('_auth')] if key.endswith('_auth') else None
+        if broker_name not in self.broker_names:
+            return None
+        plugin = get_broker(broker_name)
+        auth_function = plugin.function('authenticate_broker') if plugin else None
+        if auth_function:
+            self[key] = auth_function
+        else:
+            logger.error(f"Authentication function not found in broker plugin {broker_name}")
+        return auth_function
+
+    def __missing__(self, key):
+        auth_function = self._load(key)
+        if auth_function is None:
+            raise KeyError(key)
+        return auth_function
+
+    def __contains__(self, key):
+        return super().__contains__(key) or self._load(key) is not None
+
+    def get(self, key, default=None):
+        if super().__contains__(key):
+            return super().__getitem__(key)
+        auth_function = self._load(key)
+        return default if auth_function is None else auth_function
+
+
 def load_broker_auth_functions(broker_directory='broker'):
-    auth_functions = {}
     broker_path = os.path.join(current_app.root_path, broker_directory)
     # List all items in broker directory and filter out __pycache__ and non-directories
     broker_names = [d for d in os.listdir(broker_path)
                     if os.path.isdir(os.path.join(broker_path, d)) and d != '__pycache__']
+    auth_functions = BrokerAuthFunctions(broker_names)
 
-    for broker_name in broker_names:
-        try:
-            # Construct module name and import the module
-            module_name = f"{broker_directory}.{broker_name}.api.auth_api"
-            auth_module = importlib.import_module(module_name)
-            # Retrieve the authenticate_broker function
-            auth_function = getattr(auth_module, 'authenticate_broker', None)
-            if auth_function:
-                auth_functions[f"{broker_name}_auth"] = auth_function
-        except ImportError as e:
-            logger.error(f"Failed to import broker plugin {broker_name}: {e}")
-        except AttributeError as e:
-            logger.error(f"Authentication function not found in broker plugin {broker_name}: {e}")
+    # Import the enabled brokers now, the rest on first use
+    for broker_name in get_valid_brokers():
+        if broker_name in auth_functions.broker_names:
+            auth_functions.get(f"{broker_name}_auth")
+        else:
+            logger.error(f"Failed to import broker plugin {broker_name}: not found in {broker_path}")
 
     return auth_functions
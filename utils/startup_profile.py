@@ -0,0 +1,132 @@
+# utils/startup_profile.py
+"""
+Startup profile mode.
+
+With ``STARTUP_PROFILE=True`` the app times every module import and each
+startup phase, and logs a report once startup completes:
+
+- slowest modules by cumulative import time (including their imports)
+- slowest modules by self time (excluding imports they trigger)
+- time per startup phase (create_app, setup_environment, ...)
+
+The import hook is only installed in profile mode; normal startups pay
+nothing for it.
+"""
+
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class _TimedLoader:
+    """Loader proxy that times ``exec_module`` of the wrapped loader."""
+
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._name)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    """Meta path finder that records per-module import times and startup phases."""
+
+    def __init__(self):
+        self.enabled = os.getenv('STARTUP_PROFILE', 'False').lower() in ('true', '1', 't')
+        self.top = int(os.getenv('STARTUP_PROFILE_TOP', '25'))
+        self.cumulative = {}
+        self.own = {}
+        self.phases = []
+        self._stack = []
+        self._local = threading.local()
+        self._started = time.perf_counter()
+
+    def install(self):
+        """Start timing imports (no-op unless STARTUP_PROFILE is enabled)."""
+        if self.enabled and self not in sys.meta_path:
+            self._started = time.perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        # Only time imports of the main thread; ask the remaining finders for the spec
+        if threading.current_thread() is not threading.main_thread() or getattr(self._local, 'busy', False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _TimedLoader(spec.loader, fullname, self)
+                    return spec
+            return None
+        finally:
+            self._local.busy = False
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        _, started, children = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.cumulative[name] = elapsed
+        self.own[name] = elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        """Time a startup phase (recorded only in profile mode)."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self):
+        """Log the profile and stop timing imports."""
+        if not self.enabled:
+            return
+        self.uninstall()
+        total = time.perf_counter() - self._started
+        lines = [f"Startup profile: {total:.3f}s total, {len(self.cumulative)} modules imported"]
+        for name, elapsed in self.phases:
+            lines.append(f"  phase {name:<40}{elapsed * 1000:>10.1f} ms")
+        lines.append("  slowest imports (cumulative):")
+        for name, elapsed in sorted(self.cumulative.items(), key=lambda item: -item[1])[:self.top]:
+            lines.append(f"    {name:<60}{elapsed * 1000:>10.1f} ms")
+        lines.append("  slowest imports (self):")
+        for name, elapsed in sorted(self.own.items(), key=lambda item: -item[1])[:self.top]:
+            lines.append(f"    {name:<60}{elapsed * 1000:>10.1f} ms")
+        logger.info('\n'.join(lines))
+
+
+startup_profiler = StartupProfiler()
@@ -8,23 +8,24 @@ from .broker_factory import register_adapter, create_broker_adapter
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# Import the angel_adapter directly from the broker directory
-from broker.angel.streaming.angel_adapter import AngelWebSocketAdapter
-
-# Import the zerodha_adapter
-from broker.zerodha.streaming.zerodha_adapter import ZerodhaWebSocketAdapter
-
-# Import the dhan_adapter
-from broker.dhan.streaming.dhan_adapter import DhanWebSocketAdapter
-
-# Import the flattrade_adapter
-from broker.flattrade.streaming.flattrade_adapter import FlattradeWebSocketAdapter
-
-# Register adapters
-register_adapter("angel", AngelWebSocketAdapter)
-register_adapter("zerodha", ZerodhaWebSocketAdapter)
-register_adapter("dhan", DhanWebSocketAdapter)
-register_adapter("flattrade", FlattradeWebSocketAdapter)
+# Broker adapters are imported on first use (see broker_factory.create_broker_adapter),
+# so only the broker that is actually streamed gets loaded
+_LAZY_ADAPTERS = {
+    'AngelWebSocketAdapter': 'angel',
+    'ZerodhaWebSocketAdapter': 'zerodha',
+    'DhanWebSocketAdapter': 'dhan',
+    'FlattradeWebSocketAdapter': 'flattrade',
+}
+
+
+def __getattr__(name):
+    broker_name = _LAZY_ADAPTERS.get(name)
+    if broker_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from utils.broker_registry import get_broker
+    adapter_class = get_broker(broker_name).streaming_adapter()
+    register_adapter(broker_name, adapter_class)
+    return adapter_class
 
 __all__ = [
     'WebSocketProxy',
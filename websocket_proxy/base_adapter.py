@@ -1,3 +1,4 @@
+import itertools
 import json
 import threading
 import zmq
@@ -11,6 +12,176 @@ from utils.logging import get_logger
 # Initialize logger
 logger = get_logger(__name__)
 
+# OpenAlgo subscription modes and their topic suffixes
+MODE_NAMES = {1: 'LTP', 2: 'QUOTE', 3: 'DEPTH'}
+
+
+def default_topic(symbol, exchange, mode_str):
+    """Standard ZeroMQ topic: EXCHANGE_SYMBOL_MODE"""
+    return f"{exchange}_{symbol}_{mode_str}"
+
+
+class Subscription:
+    """
+    A single (token, mode) subscription with everything the tick path needs
+    precomputed: encoded topics per mode, the mode string and the exchange
+    to put in published data.
+    """
+    __slots__ = ('key', 'symbol', 'exchange', 'mode', 'mode_str', 'data_exchange',
+                 'topics', 'topic', 'extra')
+
+    def __init__(self, key, symbol, exchange, mode, data_exchange, topic_builder, extra):
+        self.key = key
+        self.symbol = symbol
+        self.exchange = exchange
+        self.mode = mode
+        self.mode_str = MODE_NAMES.get(mode, 'LTP')
+        self.data_exchange = data_exchange
+        # Brokers may deliver a different packet type than subscribed, so encode all of them
+        self.topics = {
+            mode_str: topic_builder(symbol, exchange, mode_str).encode('utf-8')
+            for mode_str in MODE_NAMES.values()
+        }
+        self.topic = self.topics[self.mode_str]
+        self.extra = extra
+
+    def __repr__(self):
+        return f"Subscription({self.exchange}:{self.symbol}, key={self.key!r}, mode={self.mode})"
+
+
+class SubscriptionRegistry:
+    """
+    Token-keyed subscription registry shared by the broker adapters.
+
+    Subscriptions are stored per broker key (usually the instrument token, or
+    a tuple such as ``(token, exchange_type)`` when tokens are only unique per
+    segment) and mode. Writers take a lock and publish an immutable tuple per
+    key, so the tick path is a single lock-free dict lookup.
+    """
+
+    def __init__(self, topic_builder=default_topic, exchange_mapper=None):
+        self._topic_builder = topic_builder
+        self._exchange_mapper = exchange_mapper or (lambda exchange: exchange)
+        self._lock = threading.Lock()
+        self._by_mode = {}  # {key: {mode: Subscription}}
+        self._by_key = {}   # {key: (Subscription, ...)} highest mode first
+        self._by_symbol = {}  # {(symbol, exchange): set(key)}
+        # Bumped on every change, so readers can tell when to re-snapshot
+        self.version = 0
+
+    def add(self, key, symbol, exchange, mode, replace=False, **extra):
+        """
+        Register a subscription and precompute its topics.
+
+        Args:
+            key: Broker token or composite key used to look up ticks
+            symbol: OpenAlgo symbol
+            exchange: OpenAlgo exchange of the subscription
+            mode: OpenAlgo mode (1: LTP, 2: Quote, 3: Depth)
+            replace: Drop other modes for this key (feeds that stream one mode per token)
+            **extra: Broker specific fields (e.g. brexchange, token_list)
+
+        Returns:
+            Subscription: The stored subscription
+        """
+        subscription = Subscription(key, symbol, exchange, mode, self._exchange_mapper(exchange),
+                                    self._topic_builder, extra)
+        with self._lock:
+            modes = {} if replace else dict(self._by_mode.get(key, {}))
+            modes[mode] = subscription
+            self._publish(key, modes)
+            self._by_symbol.setdefault((symbol, exchange), set()).add(key)
+        return subscription
+
+    def remove(self, key, mode=None):
+        """Remove one mode (or all modes) for a key. Returns the removed subscriptions."""
+        with self._lock:
+            modes = dict(self._by_mode.get(key, {}))
+            if mode is None:
+                removed = list(modes.values())
+                modes.clear()
+            else:
+                removed = [modes.pop(mode)] if mode in modes else []
+            self._publish(key, modes)
+            if removed and key not in self._by_mode:
+                symbol_key = (removed[0].symbol, removed[0].exchange)
+                keys = self._by_symbol.get(symbol_key)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_symbol[symbol_key]
+            return removed
+
+    def remove_symbol(self, symbol, exchange, mode=None):
+        """Remove subscriptions by OpenAlgo symbol and exchange."""
+        removed = []
+        for key in list(self._by_symbol.get((symbol, exchange), ())):
+            removed.extend(self.remove(key, mode))
+        return removed
+
+    def _publish(self, key, modes):
+        self.version += 1
+        if modes:
+            self._by_mode[key] = modes
+            self._by_key[key] = tuple(modes[m] for m in sorted(modes, reverse=True))
+        else:
+            self._by_mode.pop(key, None)
+            self._by_key.pop(key, None)
+
+    def get(self, key):
+        """Primary (highest mode) subscription for a key, or None. Lock free."""
+        subscriptions = self._by_key.get(key)
+        return subscriptions[0] if subscriptions else None
+
+    def get_all(self, key):
+        """All subscriptions for a key, highest mode first. Lock free."""
+        return self._by_key.get(key, ())
+
+    def find(self, symbol, exchange, mode=None):
+        """Look up a subscription by OpenAlgo symbol and exchange."""
+        for key in self._by_symbol.get((symbol, exchange), ()):
+            subscription = self._by_mode.get(key, {}).get(mode) if mode is not None else self.get(key)
+            if subscription is not None:
+                return subscription
+        return None
+
+    def keys(self):
+        return list(self._by_key)
+
+    def __iter__(self):
+        for subscriptions in list(self._by_key.values()):
+            yield from subscriptions
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in list(self._by_key.values()))
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def clear(self):
+        with self._lock:
+            self._by_mode.clear()
+            self._by_key.clear()
+            self._by_symbol.clear()
+            self.version += 1
+
+
+def get_zmq_transport():
+    """
+    ZeroMQ transport between adapters and the proxy, from ZMQ_TRANSPORT.
+    
+    'inproc' when adapters and the proxy share a process (one shared context,
+    no TCP stack or port probing); 'tcp' (default) for multi-process layouts.
+    """
+    transport = os.getenv('ZMQ_TRANSPORT', 'tcp').strip().lower()
+    return transport if transport in ('tcp', 'inproc') else 'tcp'
+
+
+def get_shared_zmq_context():
+    """Process-wide ZeroMQ context; inproc endpoints only connect within one context."""
+    return zmq.Context.instance()
+
+
 def is_port_available(port):
     """
     Check if a port is available for use
@@ -80,23 +251,44 @@ class BaseBrokerWebSocketAdapter(ABC):
     # Class variable to track bound ports across instances
     _bound_ports = set()
     _port_lock = threading.Lock()
+    # Unique suffix for inproc endpoints
+    _inproc_ids = itertools.count(1)
     
     def __init__(self):
-        # ZeroMQ publisher setup for internal message distribution
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.PUB)
-        
-        # Find an available port for ZMQ
         self.logger = get_logger("broker_adapter")
-        self.zmq_port = self._bind_to_available_port()
-        self.logger.info(f"ZeroMQ socket bound to port {self.zmq_port}")
-        # Updating used ZMQ_PORT in environment variable.
-        # We must use os.environ (not os.getenv) for setting environment variables
-        os.environ["ZMQ_PORT"] = str(self.zmq_port)
+        self.zmq_transport = get_zmq_transport()
+        
+        if self.zmq_transport == 'inproc':
+            # Shared context and an inproc endpoint the proxy connects to directly
+            self.context = get_shared_zmq_context()
+            self._owns_context = False
+            self.socket = self.context.socket(zmq.PUB)
+            self.zmq_port = None
+            self.zmq_endpoint = f"inproc://openalgo-adapter-{next(BaseBrokerWebSocketAdapter._inproc_ids)}"
+            self.socket.bind(self.zmq_endpoint)
+            self.logger.info(f"ZeroMQ socket bound to {self.zmq_endpoint}")
+        else:
+            # ZeroMQ publisher setup for internal message distribution
+            self.context = zmq.Context()
+            self._owns_context = True
+            self.socket = self.context.socket(zmq.PUB)
+            
+            # Find an available port for ZMQ
+            self.zmq_port = self._bind_to_available_port()
+            self.zmq_endpoint = f"tcp://{os.getenv('ZMQ_HOST', 'localhost')}:{self.zmq_port}"
+            self.logger.info(f"ZeroMQ socket bound to port {self.zmq_port}")
+            # Updating used ZMQ_PORT in environment variable.
+            # We must use os.environ (not os.getenv) for setting environment variables
+            os.environ["ZMQ_PORT"] = str(self.zmq_port)
         
         # Subscription tracking
         self.subscriptions = {}
+        # Token-keyed registry for the tick path; adapters with their own topic
+        # format replace it with SubscriptionRegistry(topic_builder, exchange_mapper)
+        self.subscription_registry = SubscriptionRegistry()
         self.connected = False
+        # Session recorder tapping published ticks (websocket_proxy.replay_adapter.attach_recorder)
+        self.recorder = None
         
     def _bind_to_available_port(self):
         """
@@ -209,7 +401,7 @@ class BaseBrokerWebSocketAdapter(ABC):
         """
         try:
             # Release the port from the bound ports set
-            if hasattr(self, 'zmq_port'):
+            if getattr(self, 'zmq_port', None) is not None:
                 with BaseBrokerWebSocketAdapter._port_lock:
                     if self.zmq_port in BaseBrokerWebSocketAdapter._bound_ports:
                         BaseBrokerWebSocketAdapter._bound_ports.remove(self.zmq_port)
@@ -220,8 +412,8 @@ class BaseBrokerWebSocketAdapter(ABC):
                 self.socket.close(linger=0)  # Don't linger on close
                 self.logger.info("ZeroMQ socket closed")
                 
-            # Terminate the context
-            if hasattr(self, 'context') and self.context:
+            # Terminate the context (the shared inproc context stays up for other adapters)
+            if hasattr(self, 'context') and self.context and getattr(self, '_owns_context', True):
                 self.context.term()
                 self.logger.info("ZeroMQ context terminated")
         except Exception as e:
@@ -243,14 +435,18 @@ class BaseBrokerWebSocketAdapter(ABC):
         Publish market data to ZeroMQ subscribers
         
         Args:
-            topic: Topic string for subscriber filtering (e.g., 'NSE_RELIANCE_LTP')
+            topic: Topic for subscriber filtering (e.g., 'NSE_RELIANCE_LTP'), str or
+                   pre-encoded bytes from a Subscription
             data: Market data dictionary
         """
         try:
+            payload = json.dumps(data).encode('utf-8')
             self.socket.send_multipart([
-                topic.encode('utf-8'),
-                json.dumps(data).encode('utf-8')
+                topic if isinstance(topic, bytes) else topic.encode('utf-8'),
+                payload
             ])
+            if self.recorder is not None:
+                self.recorder.record_tick(topic, data, payload)
         except Exception as e:
             self.logger.exception(f"Error publishing market data: {e}")
     
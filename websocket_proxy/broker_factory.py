@@ -2,6 +2,7 @@ import importlib
 from typing import Dict, Type, Optional
 
 from .base_adapter import BaseBrokerWebSocketAdapter
+from utils.broker_registry import get_broker
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -40,41 +41,20 @@ def create_broker_adapter(broker_name: str) -> Optional[BaseBrokerWebSocketAdapt
         logger.info(f"Creating adapter for broker: {broker_name}")
         return BROKER_ADAPTERS[broker_name]()
     
-    # Try dynamic import if not registered
+    # Try the broker plugin registry if not registered
     try:
-        # Try to import from broker-specific directory first
-        module_name = f"broker.{broker_name}.streaming.{broker_name}_adapter"
-        class_name = f"{broker_name.capitalize()}WebSocketAdapter"
-        
-        try:
-            # Import the module
-            module = importlib.import_module(module_name)
-            
-            # Get the adapter class
-            adapter_class = getattr(module, class_name)
-            
-            # Register the adapter for future use
-            register_adapter(broker_name, adapter_class)
-            
-            # Create and return an instance
-            return adapter_class()
-        except (ImportError, AttributeError) as e:
-            logger.warning(f"Could not import from broker-specific path: {e}")
-            
+        plugin = get_broker(broker_name)
+        adapter_class = plugin.streaming_adapter() if plugin else None
+        if adapter_class is None:
             # Try websocket_proxy directory as fallback
-            module_name = f"websocket_proxy.{broker_name}_adapter"
-            
-            # Import the module
-            module = importlib.import_module(module_name)
-            
-            # Get the adapter class
-            adapter_class = getattr(module, class_name)
-            
-            # Register the adapter for future use
-            register_adapter(broker_name, adapter_class)
-            
-            # Create and return an instance
-            return adapter_class()
+            module = importlib.import_module(f"websocket_proxy.{broker_name}_adapter")
+            adapter_class = getattr(module, f"{broker_name.capitalize()}WebSocketAdapter")
+        
+        # Register the adapter for future use
+        register_adapter(broker_name, adapter_class)
+        
+        # Create and return an instance
+        return adapter_class()
     
     except (ImportError, AttributeError) as e:
         logger.exception(f"Failed to load adapter for broker {broker_name}: {e}")
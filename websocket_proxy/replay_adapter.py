@@ -0,0 +1,515 @@
+"""
+Market data recording and replay.
+
+``MarketDataRecorder`` taps a live broker adapter and writes the session to
+disk; ``ReplayWebSocketAdapter`` plays a recording back through the normal
+adapter -> ZeroMQ -> proxy -> client path, at recorded speed, N times faster
+or as fast as possible. With ``WEBSOCKET_REPLAY_FILE`` set the proxy uses the
+replay adapter instead of the user's broker, so the whole market data path
+can be driven and benchmarked offline and deterministically.
+
+Two recording formats are supported:
+
+- Normalized ticks, JSONL: one ``{"ts", "symbol", "exchange", "mode", "data"}``
+  object per line, ``data`` being the tick as published by the adapter. The
+  same columns (``data`` JSON encoded) can be read from Parquet, which needs
+  the optional ``pyarrow`` package (see :func:`tick_recording_to_parquet`).
+- Raw broker frames (``.frames``, Zerodha and Dhan): the binary websocket
+  payloads as received, replayed through the broker's own decoder and
+  adapter. The file starts with ``FRAME_MAGIC`` and holds records of a
+  ``FRAME_RECORD`` header (kind, epoch seconds, length) and a payload. Frame
+  records carry websocket payloads, subscription records a JSON snapshot of
+  the broker token -> symbol map, so a replay needs no broker database.
+  Files without the magic (length prefixed frames only, as read by
+  ``test/streaming_replay_benchmark.py``) are replayed untimed.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from database.token_db import get_token
+from utils.logging import get_logger
+
+from .base_adapter import BaseBrokerWebSocketAdapter
+from .broker_factory import register_adapter
+
+logger = get_logger(__name__)
+
+# Name the replay adapter is registered under in the broker factory
+REPLAY_BROKER = 'replay'
+
+FRAME_MAGIC = b'OAFRAMES1\n'
+# kind, epoch seconds, payload length
+FRAME_RECORD = struct.Struct('>BdI')
+FRAME_DATA = 0
+FRAME_SUBSCRIPTIONS = 1
+# Header of the untimed legacy frame files: payload length only
+LEGACY_FRAME_HEADER = struct.Struct('>I')
+
+TICK_FORMATS = ('.jsonl', '.json', '.parquet')
+
+# A recorded tick serves subscriptions of its own and lower modes (DEPTH > QUOTE > LTP)
+MODE_LEVELS = {'LTP': 1, 'QUOTE': 2, 'DEPTH': 3}
+
+
+def replay_file() -> Optional[str]:
+    """Recording the proxy replays instead of a live feed (WEBSOCKET_REPLAY_FILE), if any."""
+    return os.getenv('WEBSOCKET_REPLAY_FILE') or None
+
+
+def record_dir() -> Optional[str]:
+    """Directory live sessions are recorded to (WEBSOCKET_RECORD_DIR), if any."""
+    return os.getenv('WEBSOCKET_RECORD_DIR') or None
+
+
+def parse_speed(value) -> float:
+    """
+    Replay speed multiplier from '1', '10', '10x' or 'max'.
+
+    Returns:
+        float: Multiplier of the recorded pace; 0 replays as fast as possible
+    """
+    text = str(value).strip().lower()
+    if text in ('max', 'inf', '0', ''):
+        return 0.0
+    try:
+        speed = float(text[:-1] if text.endswith('x') else text)
+    except ValueError:
+        logger.warning(f"Invalid replay speed {value!r}, replaying at recorded speed")
+        return 1.0
+    return speed if speed > 0 else 0.0
+
+
+def is_frame_recording(path: str) -> bool:
+    return not path.lower().endswith(TICK_FORMATS)
+
+
+def iter_frame_recording(path: str) -> Iterator[Tuple[int, float, bytes]]:
+    """Yield ``(kind, timestamp, payload)`` records; legacy files yield untimed frames."""
+    with open(path, 'rb') as f:
+        if f.read(len(FRAME_MAGIC)) != FRAME_MAGIC:
+            f.seek(0)
+            while True:
+                header = f.read(LEGACY_FRAME_HEADER.size)
+                if len(header) < LEGACY_FRAME_HEADER.size:
+                    return
+                (length,) = LEGACY_FRAME_HEADER.unpack(header)
+                yield FRAME_DATA, 0.0, f.read(length)
+        while True:
+            header = f.read(FRAME_RECORD.size)
+            if len(header) < FRAME_RECORD.size:
+                return
+            kind, timestamp, length = FRAME_RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                # Truncated by a crash mid-write
+                return
+            yield kind, timestamp, payload
+
+
+def frame_recording_info(path: str) -> Tuple[str, Dict[Tuple[str, str], Any]]:
+    """
+    Broker and ``{(symbol, exchange): broker key}`` of a frame recording.
+
+    Only the subscription records are decoded; frame payloads are skipped.
+    Legacy files carry neither, so the broker is taken from the file name
+    (``<broker>.frames`` or ``<broker>-<time>.frames``).
+    """
+    broker = os.path.basename(path).split('.')[0].split('-')[0].lower()
+    keys = {}
+    with open(path, 'rb') as f:
+        if f.read(len(FRAME_MAGIC)) != FRAME_MAGIC:
+            return broker, keys
+        while True:
+            header = f.read(FRAME_RECORD.size)
+            if len(header) < FRAME_RECORD.size:
+                break
+            kind, _, length = FRAME_RECORD.unpack(header)
+            if kind != FRAME_SUBSCRIPTIONS:
+                f.seek(length, os.SEEK_CUR)
+                continue
+            snapshot = json.loads(f.read(length))
+            broker = snapshot.get('broker', broker)
+            for key, symbol, exchange, _mode in snapshot.get('subscriptions', ()):
+                keys[(symbol, exchange)] = key
+    return broker, keys
+
+
+def iter_tick_recording(path: str) -> Iterator[Tuple[float, str, str, str, Dict[str, Any]]]:
+    """Yield ``(timestamp, symbol, exchange, mode, data)`` from a JSONL or Parquet recording."""
+    if path.lower().endswith('.parquet'):
+        import pandas as pd
+
+        frame = pd.read_parquet(path, columns=['ts', 'symbol', 'exchange', 'mode', 'data'])
+        for ts, symbol, exchange, mode, data in frame.itertuples(index=False, name=None):
+            yield float(ts), symbol, exchange, mode, json.loads(data)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record['ts'], record['symbol'], record['exchange'], record['mode'], record['data']
+
+
+def tick_recording_to_parquet(jsonl_path: str, parquet_path: str) -> int:
+    """
+    Convert a JSONL tick recording to Parquet. Requires the optional ``pyarrow`` package.
+
+    Returns:
+        int: Number of ticks written
+    """
+    import pandas as pd
+
+    rows = [(ts, symbol, exchange, mode, json.dumps(data))
+            for ts, symbol, exchange, mode, data in iter_tick_recording(jsonl_path)]
+    frame = pd.DataFrame(rows, columns=['ts', 'symbol', 'exchange', 'mode', 'data'])
+    frame.to_parquet(parquet_path, index=False)
+    return len(frame)
+
+
+class MarketDataRecorder:
+    """
+    Records a live adapter session: every published tick to ``<broker>-<time>.jsonl``
+    and, for brokers with a frame replay, every binary frame to ``<broker>-<time>.frames``.
+
+    Attached with :func:`attach_recorder`. Writes go to buffered files under a
+    lock and never raise into the tick path.
+    """
+
+    def __init__(self, directory: str, broker_name: str, registry=None):
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{broker_name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        # Sessions started within the same second get a counter suffix
+        base, suffix = stem, 1
+        while os.path.exists(f'{base}.jsonl'):
+            suffix += 1
+            base = f'{stem}-{suffix}'
+        self.broker_name = broker_name
+        self.registry = registry
+        self.lock = threading.Lock()
+        self.tick_path = f'{base}.jsonl'
+        self.tick_file = open(self.tick_path, 'w', encoding='utf-8')
+        self.frame_path = None
+        self.frame_file = None
+        if broker_name in FRAME_REPLAYS:
+            self.frame_path = f'{base}.frames'
+            self.frame_file = open(self.frame_path, 'wb')
+            self.frame_file.write(FRAME_MAGIC)
+        self.ticks = 0
+        self.frames = 0
+        # Registry version of the last subscription snapshot written
+        self._snapshot_version = None
+        # Adapters may publish one tick under several topics; it is recorded once
+        self._last_tick = None
+
+    def record_tick(self, topic, data: Dict[str, Any], payload: bytes):
+        """Append one published tick; ``payload`` is its JSON encoding."""
+        if data is self._last_tick:
+            return
+        self._last_tick = data
+        try:
+            topic = topic.decode('utf-8') if isinstance(topic, bytes) else topic
+            mode = topic.rsplit('_', 1)[-1]
+            line = '{"ts":%r,"symbol":%s,"exchange":%s,"mode":%s,"data":%s}\n' % (
+                time.time(), json.dumps(data.get('symbol')), json.dumps(data.get('exchange')),
+                json.dumps(mode), payload.decode('utf-8'))
+            with self.lock:
+                if self.tick_file is not None:
+                    self.tick_file.write(line)
+                    self.ticks += 1
+        except Exception as e:
+            logger.error(f"Error recording tick: {e}")
+
+    def record_frame(self, frame: bytes):
+        """Append one raw websocket frame, preceded by a subscription snapshot when they changed."""
+        try:
+            with self.lock:
+                if self.frame_file is None:
+                    return
+                now = time.time()
+                if self.registry is not None and self.registry.version != self._snapshot_version:
+                    self._snapshot_version = self.registry.version
+                    snapshot = json.dumps({
+                        'broker': self.broker_name,
+                        'subscriptions': [[s.key, s.symbol, s.exchange, s.mode] for s in self.registry],
+                    }).encode('utf-8')
+                    self.frame_file.write(FRAME_RECORD.pack(FRAME_SUBSCRIPTIONS, now, len(snapshot)))
+                    self.frame_file.write(snapshot)
+                self.frame_file.write(FRAME_RECORD.pack(FRAME_DATA, now, len(frame)))
+                self.frame_file.write(frame)
+                self.frames += 1
+        except Exception as e:
+            logger.error(f"Error recording frame: {e}")
+
+    def close(self):
+        with self.lock:
+            for f in (self.tick_file, self.frame_file):
+                if f is not None:
+                    f.close()
+            self.tick_file = self.frame_file = None
+        logger.info(f"Recorded {self.ticks} ticks to {self.tick_path}"
+                    + (f" and {self.frames} frames to {self.frame_path}" if self.frame_path else ''))
+
+
+def attach_recorder(adapter: BaseBrokerWebSocketAdapter, broker_name: str,
+                    directory: Optional[str] = None) -> MarketDataRecorder:
+    """Start recording a connected adapter's ticks and, where supported, raw frames."""
+    recorder = MarketDataRecorder(directory or record_dir(), broker_name, adapter.subscription_registry)
+    adapter.recorder = recorder
+    client = getattr(adapter, 'ws_client', None)
+    if recorder.frame_file is not None and hasattr(client, 'on_frame'):
+        client.on_frame = recorder.record_frame
+    logger.info(f"Recording {broker_name} market data to {recorder.tick_path}")
+    return recorder
+
+
+def detach_recorder(adapter: BaseBrokerWebSocketAdapter):
+    """Stop and close an adapter's recorder, if it has one."""
+    recorder = getattr(adapter, 'recorder', None)
+    if recorder is None:
+        return
+    adapter.recorder = None
+    client = getattr(adapter, 'ws_client', None)
+    if client is not None and getattr(client, 'on_frame', None) == recorder.record_frame:
+        client.on_frame = None
+    recorder.close()
+
+
+class FrameReplay:
+    """
+    Decodes recorded frames of one broker with that broker's websocket parser
+    and adapter, so replayed ticks go through the same decode -> lookup ->
+    normalize code as live ones. The adapter's own ZeroMQ socket is closed;
+    it publishes through ``publish``.
+    """
+
+    def __init__(self, publish):
+        # Adapters record the port they bound in ZMQ_PORT; keep the replay adapter's
+        zmq_port = os.environ.get('ZMQ_PORT')
+        self.adapter, self.client = self._create()
+        if zmq_port is not None:
+            os.environ['ZMQ_PORT'] = zmq_port
+        self.adapter.cleanup_zmq()
+        self.adapter.publish_market_data = publish
+
+    def _create(self):
+        raise NotImplementedError
+
+    def subscribe(self, key, symbol: str, exchange: str, mode: int):
+        raise NotImplementedError
+
+    def unsubscribe(self, key):
+        self.adapter.subscription_registry.remove(key)
+
+    def feed(self, frame: bytes):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ZerodhaFrameReplay(FrameReplay):
+    def _create(self):
+        from broker.zerodha.streaming.zerodha_adapter import ZerodhaWebSocketAdapter
+        from broker.zerodha.streaming.zerodha_websocket import ZerodhaWebSocket
+        return ZerodhaWebSocketAdapter(), ZerodhaWebSocket('replay', 'replay')
+
+    def subscribe(self, key, symbol, exchange, mode):
+        token = int(key)
+        self.adapter.token_to_symbol[token] = (symbol, exchange)
+        self.adapter.subscription_registry.add(token, symbol, exchange, mode, replace=True,
+                                               tick_mode=self.adapter.TICK_MODES.get(mode, 'ltp'))
+        return token
+
+    def feed(self, frame):
+        self.adapter._handle_ticks(self.client._parse_binary_message(frame))
+
+
+class DhanFrameReplay(FrameReplay):
+    def _create(self):
+        from broker.dhan.streaming.dhan_adapter import DhanWebSocketAdapter
+        from broker.dhan.streaming.dhan_websocket import DhanWebSocket
+        adapter = DhanWebSocketAdapter()
+        adapter.broker_name = 'dhan'
+        # The Dhan client decodes frames in a coroutine
+        self.loop = asyncio.new_event_loop()
+        return adapter, DhanWebSocket('replay', 'replay', on_ticks=adapter._on_ticks)
+
+    def subscribe(self, key, symbol, exchange, mode):
+        token = str(key)
+        self.adapter.token_to_symbol[token] = (symbol, exchange)
+        self.adapter.token_to_symbol[int(token)] = (symbol, exchange)
+        legacy_topics = {
+            mode_str: f"{exchange}_{symbol}_{mode_str}".encode('utf-8')
+            for mode_str in MODE_LEVELS
+        }
+        self.adapter.subscription_registry.add(token, symbol, exchange, mode, replace=True,
+                                               legacy_topics=legacy_topics)
+        return token
+
+    def feed(self, frame):
+        self.loop.run_until_complete(self.client._process_binary_packet(frame))
+
+    def close(self):
+        self.loop.close()
+
+
+# Brokers whose raw websocket frames can be recorded and replayed
+FRAME_REPLAYS = {
+    'zerodha': ZerodhaFrameReplay,
+    'dhan': DhanFrameReplay,
+}
+
+
+class ReplayWebSocketAdapter(BaseBrokerWebSocketAdapter):
+    """
+    Broker adapter that publishes a recorded session instead of a live feed.
+
+    Configured from ``auth_data`` (``file``, ``speed``, ``loop``, ``start_delay``)
+    or the WEBSOCKET_REPLAY_* environment variables. Like a live feed, only
+    subscribed symbols are published. Playback starts ``start_delay`` seconds
+    after the first subscription, so clients subscribing in a burst all see
+    the recording from its start.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.logger = get_logger("replay_websocket")
+        self.broker_name = REPLAY_BROKER
+        self.user_id = None
+        self.lock = threading.Lock()
+        self.path = None
+        self.speed = 1.0
+        self.loop = False
+        self.start_delay = 1.0
+        # Raw frame recordings: broker decoder and {(symbol, exchange): broker key}
+        self.frame_replay = None
+        self.frame_keys = {}
+        self.subscribed_keys = {}  # {(symbol, exchange): broker key}
+        self._thread = None
+        self._stop_event = threading.Event()
+        # Set when the recording has been played through (not set while looping)
+        self.finished = threading.Event()
+        self.replayed = 0
+
+    def initialize(self, broker_name, user_id, auth_data=None):
+        auth_data = auth_data or {}
+        self.user_id = user_id
+        self.path = auth_data.get('file') or replay_file()
+        if not self.path or not os.path.exists(self.path):
+            return self._create_error_response('REPLAY_FILE_NOT_FOUND', f"Replay file not found: {self.path}")
+        self.speed = parse_speed(auth_data.get('speed', os.getenv('WEBSOCKET_REPLAY_SPEED', '1')))
+        self.loop = str(auth_data.get('loop', os.getenv('WEBSOCKET_REPLAY_LOOP', 'False'))).lower() == 'true'
+        self.start_delay = float(auth_data.get('start_delay', os.getenv('WEBSOCKET_REPLAY_START_DELAY', '1')))
+
+        if is_frame_recording(self.path):
+            recorded_broker, self.frame_keys = frame_recording_info(self.path)
+            replay_class = FRAME_REPLAYS.get(recorded_broker)
+            if replay_class is None:
+                return self._create_error_response(
+                    'REPLAY_UNSUPPORTED', f"No frame replay for broker {recorded_broker!r}")
+            self.frame_replay = replay_class(self.publish_market_data)
+
+        self.logger.info(f"Replaying {self.path} for user {user_id} "
+                         f"at {'max' if not self.speed else f'{self.speed:g}x'} speed")
+        return self._create_success_response('Replay adapter initialized', file=self.path)
+
+    def connect(self):
+        self.connected = True
+        return self._create_success_response('Connected to replay')
+
+    def disconnect(self):
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.connected = False
+        if self.frame_replay is not None:
+            self.frame_replay.close()
+            self.frame_replay = None
+        self.subscription_registry.clear()
+        self.cleanup_zmq()
+        return self._create_success_response('Disconnected from replay')
+
+    def subscribe(self, symbol, exchange, mode=2, depth_level=5):
+        with self.lock:
+            if self.frame_replay is not None:
+                key = self.frame_keys.get((symbol, exchange))
+                if key is None:
+                    # Recordings without subscription snapshots: the broker's token
+                    token = get_token(symbol, exchange)
+                    if token is None:
+                        return self._create_error_response('SYMBOL_NOT_FOUND', f"No token for {exchange}:{symbol}")
+                    key = str(token).split(':')[0]
+                self.subscribed_keys[(symbol, exchange)] = self.frame_replay.subscribe(key, symbol, exchange, mode)
+            else:
+                self.subscription_registry.add((symbol, exchange), symbol, exchange, mode)
+            self._start()
+        return self._create_success_response(f'Subscribed to {symbol}', symbol=symbol, exchange=exchange, mode=mode)
+
+    def unsubscribe(self, symbol, exchange, mode=2):
+        with self.lock:
+            if self.frame_replay is not None:
+                key = self.subscribed_keys.pop((symbol, exchange), None)
+                if key is not None:
+                    self.frame_replay.unsubscribe(key)
+            else:
+                self.subscription_registry.remove_symbol(symbol, exchange, mode)
+        return self._create_success_response(f'Unsubscribed from {symbol}', symbol=symbol, exchange=exchange, mode=mode)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='replay_adapter', daemon=True)
+            self._thread.start()
+
+    def _records(self) -> Iterator[Tuple[float, Any]]:
+        if self.frame_replay is not None:
+            for kind, timestamp, payload in iter_frame_recording(self.path):
+                if kind == FRAME_DATA:
+                    yield timestamp, payload
+        else:
+            for timestamp, symbol, exchange, mode, data in iter_tick_recording(self.path):
+                yield timestamp, ((symbol, exchange), MODE_LEVELS.get(mode, 2), data)
+
+    def _publish_tick(self, record):
+        key, level, data = record
+        for subscription in self.subscription_registry.get_all(key):
+            if subscription.mode <= level:
+                self.publish_market_data(subscription.topic, data)
+
+    def _run(self):
+        if self._stop_event.wait(self.start_delay):
+            return
+        handle = self.frame_replay.feed if self.frame_replay is not None else self._publish_tick
+        stop_event = self._stop_event
+        try:
+            while True:
+                started = time.monotonic()
+                first = None
+                for timestamp, record in self._records():
+                    if self.speed and timestamp:
+                        if first is None:
+                            first = timestamp
+                        delay = (timestamp - first) / self.speed - (time.monotonic() - started)
+                        if delay > 0 and stop_event.wait(delay):
+                            return
+                    if stop_event.is_set():
+                        return
+                    handle(record)
+                    self.replayed += 1
+                if not self.loop or stop_event.is_set():
+                    break
+            self.logger.info(f"Replay of {self.path} finished after {self.replayed} records")
+            self.finished.set()
+        except Exception as e:
+            self.logger.exception(f"Error replaying {self.path}: {e}")
+
+
+register_adapter(REPLAY_BROKER, ReplayWebSocketAdapter)
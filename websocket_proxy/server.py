@@ -15,8 +15,10 @@ from .port_check import is_port_in_use, find_available_port
 from database.auth_db import get_broker_name
 from sqlalchemy import text
 from database.auth_db import verify_api_key
+from services.paper_exchange import paper_exchange
 from .broker_factory import create_broker_adapter
-from .base_adapter import BaseBrokerWebSocketAdapter
+from .replay_adapter import REPLAY_BROKER, attach_recorder, detach_recorder, record_dir, replay_file
+from .base_adapter import BaseBrokerWebSocketAdapter, get_zmq_transport, get_shared_zmq_context
 
 # Initialize logger
 logger = get_logger("websocket_proxy")
@@ -61,16 +63,37 @@ class WebSocketProxy:
         self.running = False
         
         # ZeroMQ context for subscribing to broker adapters
-        self.context = zmq.asyncio.Context()
-        self.socket = self.context.socket(zmq.SUB)
-        # Connecting to ZMQ
-        ZMQ_HOST = os.getenv('ZMQ_HOST', 'localhost')
-        ZMQ_PORT = os.getenv('ZMQ_PORT')
-        self.socket.connect(f"tcp://{ZMQ_HOST}:{ZMQ_PORT}")  # Connect to broker adapter publisher
+        self.zmq_transport = get_zmq_transport()
+        if self.zmq_transport == 'inproc':
+            # Share the adapters' context; each adapter is connected when it is created
+            self.context = zmq.asyncio.Context.shadow(get_shared_zmq_context().underlying)
+            self.socket = self.context.socket(zmq.SUB)
+        else:
+            self.context = zmq.asyncio.Context()
+            self.socket = self.context.socket(zmq.SUB)
+            # Connecting to ZMQ
+            ZMQ_HOST = os.getenv('ZMQ_HOST', 'localhost')
+            ZMQ_PORT = os.getenv('ZMQ_PORT')
+            self.socket.connect(f"tcp://{ZMQ_HOST}:{ZMQ_PORT}")  # Connect to broker adapter publisher
         
         # Set up ZeroMQ subscriber to receive all messages
         self.socket.setsockopt(zmq.SUBSCRIBE, b"")  # Subscribe to all topics
     
+    def _attach_adapter(self, adapter):
+        """Subscribe directly to an adapter's inproc publisher"""
+        if self.zmq_transport == 'inproc':
+            self.socket.connect(adapter.zmq_endpoint)
+            logger.info(f"Subscribed to adapter publisher {adapter.zmq_endpoint}")
+    
+    def _detach_adapter(self, adapter):
+        """Stop receiving from an adapter's inproc publisher"""
+        detach_recorder(adapter)
+        if self.zmq_transport == 'inproc':
+            try:
+                self.socket.disconnect(adapter.zmq_endpoint)
+            except zmq.ZMQError as e:
+                logger.warning(f"Error disconnecting from {adapter.zmq_endpoint}: {e}")
+    
     async def start(self):
         """Start the WebSocket server and ZeroMQ listener"""
         self.running = True
@@ -134,6 +157,7 @@ class WebSocketProxy:
         # Disconnect all broker adapters
         for user_id, adapter in self.broker_adapters.items():
             adapter.disconnect()
+            detach_recorder(adapter)
     
     async def handle_client(self, websocket):
         """
@@ -231,6 +255,7 @@ class WebSocketProxy:
                     # For all other brokers, disconnect the adapter completely
                     logger.info(f"Last client for user {user_id} disconnected. Disconnecting {broker_name or 'unknown broker'} adapter.")
                     adapter.disconnect()
+                    self._detach_adapter(adapter)
                     del self.broker_adapters[user_id]
                     if user_id in self.user_broker_mapping:
                         del self.user_broker_mapping[user_id]
@@ -376,8 +401,9 @@ class WebSocketProxy:
         # Create or reuse broker adapter
         if user_id not in self.broker_adapters:
             try:
-                # Create broker adapter with dynamic broker selection
-                adapter = create_broker_adapter(broker_name)
+                # Create broker adapter with dynamic broker selection;
+                # a recorded session replaces the live feed when WEBSOCKET_REPLAY_FILE is set
+                adapter = create_broker_adapter(REPLAY_BROKER if replay_file() else broker_name)
                 if not adapter:
                     await self.send_error(client_id, "BROKER_ERROR", f"Failed to create adapter for broker: {broker_name}")
                     return
@@ -397,8 +423,13 @@ class WebSocketProxy:
                     await self.send_error(client_id, "BROKER_CONNECTION_ERROR", error_msg)
                     return
                 
+                # Record the live session when WEBSOCKET_RECORD_DIR is set
+                if record_dir() and not replay_file():
+                    attach_recorder(adapter, broker_name)
+                
                 # Store the adapter
                 self.broker_adapters[user_id] = adapter
+                self._attach_adapter(adapter)
                 
                 logger.info(f"Successfully created and connected {broker_name} adapter for user {user_id}")
                 
@@ -834,6 +865,10 @@ class WebSocketProxy:
                     logger.warning(f"Invalid mode in topic: {mode_str}")
                     continue
                 
+                # Fill analyze mode paper orders resting on this symbol
+                if 'ltp' in market_data:
+                    paper_exchange.on_tick(exchange, symbol, market_data['ltp'])
+                
                 # Find clients subscribed to this data
                 # Create a snapshot of the subscriptions before iteration to avoid
                 # 'dictionary changed size during iteration' errors
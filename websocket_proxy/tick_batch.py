@@ -0,0 +1,43 @@
+"""
+Helpers for decoding whole binary market data frames into numpy arrays.
+
+Broker feeds pack many fixed-layout packets into one websocket frame. The
+per-packet decoders build one dict per tick; consumers that want columnar
+ticks can instead gather all packets of a frame into a ``(n, record_size)``
+byte matrix and view it through a structured dtype in a single step.
+"""
+
+import numpy as np
+
+
+def gather_records(buffer, offsets, lengths, record_size):
+    """
+    Copy variable-length packets into a zero-padded ``(n, record_size)`` uint8 matrix.
+
+    Args:
+        buffer: Frame bytes (bytes, bytearray or memoryview)
+        offsets: Start offset of each packet within the frame
+        lengths: Length of each packet (bytes past it are zero filled)
+        record_size: Width of each output row
+
+    Returns:
+        np.ndarray: Contiguous uint8 matrix that can be ``.view()``-ed as a
+        structured dtype of ``record_size`` bytes
+    """
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.minimum(np.asarray(lengths, dtype=np.int64), record_size)
+    if len(offsets) == 0:
+        return np.zeros((0, record_size), dtype=np.uint8)
+
+    columns = np.arange(record_size, dtype=np.int64)
+    valid = columns[None, :] < lengths[:, None]
+    index = np.where(valid, offsets[:, None] + columns[None, :], 0)
+    records = raw[index]
+    records[~valid] = 0
+    return records
+
+
+def view_records(records, dtype):
+    """View a gathered byte matrix as a 1-D structured array of ``dtype``."""
+    return np.ascontiguousarray(records).view(dtype).reshape(-1)